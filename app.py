@@ -1,21 +1,33 @@
-from flask import Flask, request, send_file
+import os
+
+from flask import Flask, Response, request
 from flask_cors import CORS
 
-import logging
 from controllers.controller import Controller
+from controllers.json_provider import FastJSONProvider
+from controllers.log_config import LogConfig
+from controllers.request_metrics import RequestMetrics
+from controllers.static_assets import StaticAssets
 
 # 創建了一個 Flask 應用程式物件，並指定了靜態檔案的 URL 路徑和儲存位置。
 app = Flask(__name__, static_url_path="/", static_folder="web")
+# jsonify 與 get_json 改用較快的 JSON 編碼器 (有安裝 orjson 時使用 orjson)
+app.json = FastJSONProvider(app)
 # 啟用了跨來源資源共享 (CORS)，允許從其他來源的網頁進行請求。
 CORS(app)
-app.logger.setLevel(logging.INFO)
+# 所有 log (含 app.logger) 經由佇列在背景執行緒輸出成 JSON, 等級由 LOG_LEVEL/LOG_LEVELS 設定
+LogConfig.configure(app)
+# 記錄每個路由的延遲與 AWS 呼叫時間, 由 /metrics 輸出
+RequestMetrics.init_app(app)
+# web/ 的靜態檔案改為預先壓縮 (gzip/brotli) 並加上 ETag 與快取標頭
+StaticAssets.init_app(app)
 
 
 # 透過 / 目錄, 避免以往資源原先抓取資源的 /index.html 重整頁面後卻找不到網頁
 @app.route("/")
 def open_index_html():
     """當用戶直接訪問 /web 目錄，直接回傳網頁"""
-    return send_file('web/index.html')
+    return StaticAssets.serve('index.html')
 
 # 建立了一個路由（route），將根目錄 '/' 對應到一個名為 hello() 的函式。
 @app.route('/dummy')
@@ -37,8 +49,21 @@ def check_dynamodb():
 
 @app.route('/new-table/<table_name>', methods=["POST"])
 def create_table(table_name):
-    """建立新的表格"""
-    return Controller.create_table(table_name)
+    """建立新的表格, 等待表格可以使用後才回應
+
+    request data 範例 (選填, 未傳入時主鍵為 ID 字串, 讀寫容量各 5):
+    body -> raw data -> JSON
+    {
+    "hash_key": "UserID", "sort_key": "CreatedAt", "sort_key_type": "N",
+    "billing_mode": "PAY_PER_REQUEST",
+    "global_indexes": [{"name": "by-email", "hash_key": "Email"}],
+    "local_indexes": [{"name": "by-status", "sort_key": "Status", "projection": "KEYS_ONLY"}],
+    "ttl_attribute": "ExpiresAt"
+    }
+    query string:
+    active_index: true 時一併建立只收錄未軟刪除資料的稀疏索引, 供 include_deleted=false 的掃描使用
+    """
+    return Controller.create_table(table_name, request)
 
 @app.route('/table/<table_name>', methods=["POST"])
 def insert_data(table_name):
@@ -53,19 +78,61 @@ def insert_data(table_name):
     """
     return Controller.insert_data_into_dynamodb(table_name, request)
 
+@app.route('/table/<table_name>/batch', methods=["POST"])
+def batch_insert_data(table_name):
+    """在指定表格批次插入多筆資料
+
+    request data 範例:
+    body -> raw data -> JSON
+    [
+    {"ID": "1", "Name": "Tom"},
+    {"ID": "2", "Name": "Amy"}
+    ]
+    或 Content-Type: application/x-ndjson, 每行一筆 JSON
+    """
+    return Controller.batch_insert_into_dynamodb(table_name, request)
+
 @app.route('/table/<table_name>', methods=["GET"])
 def scan_table(table_name):
-    """獲取指定表格的所有資料"""
-    return Controller.scan_dynamodb(table_name)
+    """獲取指定表格的所有資料
+
+    query string:
+    limit: 單頁筆數, 與 page_token 搭配可自行分頁
+    page_token: 上一頁回傳的 NextToken
+    format: ndjson 時以每行一筆 JSON 的串流回傳, 預設為 JSON 陣列
+    segments: 平行掃描的分段數, 大於 1 時以多執行緒平行讀取整張表
+    ids: 以逗號分隔的多個 id, 有傳入時改為批次查詢這些 id (可搭配 projection=Name,Age)
+    include_deleted: false 時只回傳未軟刪除的資料
+    """
+    if 'ids' in request.args:
+        return Controller.batch_get_dynamodb(table_name, request)
+    return Controller.scan_dynamodb(table_name, request)
+
+@app.route('/table/<table_name>/batch-get', methods=["POST"])
+def batch_get_data(table_name):
+    """批次查詢特定表格的多個 id
+
+    request data 範例:
+    body -> raw data -> JSON
+    {
+    "ids": ["12321", "12322"],
+    "projection": ["Name"]
+    }
+    """
+    return Controller.batch_get_dynamodb(table_name, request)
 
 @app.route('/table/<table_name>/<id>', methods=["GET"])
 def query_data(table_name, id):
-    """查詢特定表格的特定 id"""
-    return Controller.query_db(table_name, id)
+    """查詢特定表格的特定 id, include_deleted=false 時已軟刪除的資料視為查無資料"""
+    return Controller.query_db(table_name, id, request)
 
 @app.route('/table/<table_name>', methods=["PUT"])
 def update_dynamodb_data(table_name):
-    """更新特定表格的資料"""
+    """更新特定表格的資料
+
+    body: {"ID": "1", "Name": "Amy", "$remove": ["Nickname"], "$add": {"Count": 1}, "$version": 3}
+    $version 為目前的版本號, 版本不符時回傳 409
+    """
     return Controller.update_dynamodb_data(table_name, request)
 
 @app.route('/table/<table_name>/deletion', methods=["PUT"])
@@ -75,8 +142,19 @@ def soft_delete(table_name):
 
 @app.route('/table/<table_name>/<id>', methods=["DELETE"])
 def delete_item(table_name, id):
-    """硬刪除"""
-    return Controller.delete_item(table_name, id)
+    """硬刪除, 有排序鍵的表格以 query string 的 sort_key 指定排序鍵的值"""
+    return Controller.delete_item(table_name, id, request)
+
+@app.route('/dynamodb-cache-stats')
+def cache_stats():
+    """查看 DynamoDB 單筆查詢快取的統計資料"""
+    return Controller.get_cache_stats()
+
+@app.route('/metrics')
+def metrics():
+    """以 Prometheus 的文字格式輸出各路由與 AWS 操作的延遲、重試、節流與傳輸量"""
+    body, content_type = RequestMetrics.render()
+    return Response(body, content_type=content_type)
 
 @app.route('/s3-connection-status')
 def check_s3():
@@ -90,17 +168,31 @@ def create_s3_bucket(bucket_name):
 
 @app.route('/s3/bucket/<bucket_name>/new-object', methods=["POST"])
 def upload_object(bucket_name):
-    """在特定值區上傳物件"""
+    """在特定值區上傳物件
+
+    request data 範例:
+    body -> form-data, object_name 為物件名稱, file 為檔案
+    或 body -> binary, 以 ?object_name= 指定物件名稱, 直接串流上傳 request body
+    """
     return Controller.upload_s3_object(bucket_name, request)
 
 @app.route('/s3/bucket/<bucket_name>/object', methods=["GET"])
 def download_file(bucket_name):
-    """在特定值區下載物件"""
+    """在特定值區下載物件
+
+    query string:
+    object_name: 物件名稱
+    file_name: 下載時的檔案名稱 (可省略)
+    支援 Range、If-None-Match、If-Modified-Since 等 HTTP 標頭
+    """
     return Controller.download_file(bucket_name, request)
 
 @app.route('/s3/bucket/<bucket_name>/new-object', methods=["PUT"])
 def update_object(bucket_name):
-    """在特定值區更新物件"""
+    """在特定值區更新物件, request data 格式同上傳物件
+
+    可帶 If-Match: <ETag> (物件未被其他人更新時才寫入) 或 If-None-Match: * (物件不存在時才建立), 條件不成立時回傳 412
+    """
     return Controller.update_s3_object(bucket_name, request)
 
 @app.route('/s3/bucket/<bucket_name>/object', methods=["DELETE"])
@@ -108,18 +200,100 @@ def delete_object(bucket_name):
     """在特定值區刪除物件"""
     return Controller.delete_s3_object(bucket_name, request)
 
+@app.route('/s3/bucket/<bucket_name>/delete-objects', methods=["POST"])
+def delete_objects(bucket_name):
+    """在特定值區批次刪除物件, 每 1000 筆以一次 DeleteObjects 刪除
+
+    request data 範例:
+    {"keys": ["a.txt", "b.txt"]} 或 {"prefix": "logs/2023/", "dry_run": true}
+    """
+    return Controller.delete_s3_objects(bucket_name, request)
+
+@app.route('/s3/bucket/<bucket_name>/copy-objects', methods=["POST"])
+def copy_objects(bucket_name):
+    """在 S3 內複製物件或路徑, 超過 5 GB 的物件以分段複製, 內容不經過 Flask
+
+    request data 範例:
+    {"object_name": "a.txt", "dest_object_name": "backup/a.txt"}
+    或 {"prefix": "2023/", "dest_prefix": "archive/2023/", "dest_bucket": "cxcxc-archive"}
+    """
+    return Controller.copy_s3_objects(bucket_name, request)
+
+@app.route('/s3/bucket/<bucket_name>/move-objects', methods=["POST"])
+def move_objects(bucket_name):
+    """在 S3 內搬移 (重新命名) 物件或路徑, 複製完成後刪除來源, request data 格式同複製物件"""
+    return Controller.copy_s3_objects(bucket_name, request, delete_source=True)
+
+@app.route('/s3/bucket/<bucket_name>/presigned-url', methods=["GET"])
+def presign_object(bucket_name):
+    """產生下載或上傳物件的預先簽署網址, 瀏覽器直接與 S3 傳輸, 檔案內容不經過 Flask
+
+    query string:
+    object_name: 物件名稱
+    method: GET (下載, 預設) 或 PUT (上傳)
+    expires: 有效秒數 (預設 S3_PRESIGN_EXPIRES)
+    file_name: 下載時的檔案名稱
+    content_type, content_length: 上傳時必須帶上相同的標頭 (回應的 headers)
+    """
+    return Controller.presign_s3_object(bucket_name, request)
+
+@app.route('/s3/bucket/<bucket_name>/presigned-post', methods=["POST"])
+def presign_post(bucket_name):
+    """產生以 HTML 表單上傳的預先簽署 POST
+
+    request data 範例:
+    body -> raw data -> JSON
+    {"object_name": "photos/a.png", "content_type": "image/png", "max_size": 10485760, "expires": 600}
+    回應: {"url": 表單的 action, "fields": 表單需包含的欄位, "expires_in": 有效秒數}
+    """
+    return Controller.presign_s3_post(bucket_name, request)
+
+@app.route('/s3/bucket/<bucket_name>/multipart-upload', methods=["POST"])
+def create_multipart_upload(bucket_name):
+    """建立分段上傳, 回傳每一段的預先簽署網址, 瀏覽器以 PUT 上傳每一段
+
+    request data 範例:
+    body -> raw data -> JSON
+    {"object_name": "videos/a.mp4", "size": 2147483648, "content_type": "video/mp4"}
+    回應: {"upload_id", "part_size", "parts": [{"part_number", "url"}], "expires_in"}
+    """
+    return Controller.create_multipart_upload(bucket_name, request)
+
+@app.route('/s3/bucket/<bucket_name>/multipart-upload/<upload_id>/parts', methods=["POST"])
+def presign_multipart_parts(bucket_name, upload_id):
+    """重新產生指定段的預先簽署網址, body: {"object_name", "part_numbers": [1, 2]}"""
+    return Controller.presign_multipart_parts(bucket_name, upload_id, request)
+
+@app.route('/s3/bucket/<bucket_name>/multipart-upload/<upload_id>/complete', methods=["POST"])
+def complete_multipart_upload(bucket_name, upload_id):
+    """合併分段上傳, body: {"object_name", "parts": [{"part_number": 1, "etag": "..."}]}"""
+    return Controller.complete_multipart_upload(bucket_name, upload_id, request)
+
+@app.route('/s3/bucket/<bucket_name>/multipart-upload/<upload_id>', methods=["DELETE"])
+def abort_multipart_upload(bucket_name, upload_id):
+    """取消分段上傳, query string: object_name"""
+    return Controller.abort_multipart_upload(bucket_name, upload_id, request)
+
 @app.route('/list_objects', methods=['GET'])
 def list_objects():
-    """在特定值區指定特定路徑並列出該路徑的所有物件名稱的清單"""
-    bucket_name = request.args.get('bucket')
-    prefix = request.args.get('prefix')
-    return Controller.get_all_object_names_from_bucket_and_directory(bucket_name, prefix)
+    """在特定值區指定特定路徑並列出該路徑的所有物件名稱的清單
+
+    query string:
+    bucket, prefix: 值區名稱與路徑開頭
+    delimiter: 以資料夾方式瀏覽 (例如 /)
+    max_keys, page_token: 分頁讀取
+    details: true 時附上物件大小、最後修改時間與 ETag
+    format: ndjson 時以串流逐行回傳完整清單
+    """
+    return Controller.list_objects(request)
 
 
 if __name__ == '__main__':
     """
     檢查是否直接執行這個 Python 模組。
-    如果是的話，它會啟動 Flask 應用程式的伺服器，並在所有網路介面上監聽連接請求。這使得 Flask 應用程式可以被從任何裝置或瀏覽器進行訪問。
+    如果是的話，它會啟動 Flask 的開發伺服器，並在所有網路介面上監聽連接請求。這使得 Flask 應用程式可以被從任何裝置或瀏覽器進行訪問。
     伺服器啟動後，會等待並處理傳入的請求，根據路由定義呼叫相應的函式。
+    開發伺服器只有單一行程, 正式環境請改用 gunicorn -c gunicorn.conf.py (容器的預設指令)
+    FLASK_DEBUG=false 時關閉除錯模式與自動重新載入
     """
-    app.run(host="0.0.0.0", debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", debug=os.getenv('FLASK_DEBUG', 'true').lower() in ('1', 'true', 'yes'))
@@ -0,0 +1,41 @@
+"""非同步模式的 ASGI 進入點
+
+安裝: pip install -r requirements-async.txt
+啟動: hypercorn asgi:application --bind 0.0.0.0:5000 --workers 2
+"""
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+
+from app import app
+from async_app import async_app
+
+
+class AsyncModeDispatcher:
+    """依路由分派請求
+
+    async_app 有對應路由的請求 (DynamoDB 資料表、物件下載、物件清單等) 以非同步 handler 處理,
+    同一個 worker 可同時處理多個等待 AWS 回應的請求
+    其他請求轉交給原本的 Flask 應用程式, 在執行緒中以同步方式處理
+    """
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        self.wsgi_app = WsgiToAsgi(wsgi_app)
+        self.url_adapter = async_app.url_map.bind('localhost')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self._is_async_route(scope):
+            await self.wsgi_app(scope, receive, send)
+        else:
+            # lifespan 事件交給 async_app, 以便在關閉時釋放 AWS 客戶端
+            await self.async_app(scope, receive, send)
+
+    def _is_async_route(self, scope):
+        try:
+            self.url_adapter.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return True
+
+
+application = AsyncModeDispatcher(async_app, app)
@@ -0,0 +1,100 @@
+from quart import Quart, request
+
+from controllers.async_controller import AsyncController
+from controllers.json_provider import FastJSONProvider
+from controllers.request_metrics import RequestMetrics
+from daos.async_client_factory import AsyncAWSClientFactory
+
+# 非同步模式的應用程式物件, 只包含以非同步 I/O 實作的路由
+# 其他路由 (上傳、批次寫入、靜態網頁等) 由 asgi.py 轉交給原本的 Flask 應用程式處理
+async_app = Quart(__name__, static_folder=None)
+# 與 Flask 應用程式相同, jsonify 與 get_json 改用較快的 JSON 編碼器
+async_app.json = FastJSONProvider(async_app)
+# 與 Flask 應用程式共用同一份指標, /metrics 由 Flask 應用程式輸出
+RequestMetrics.init_async_app(async_app)
+
+
+@async_app.after_request
+async def allow_cors(response):
+    """與 Flask 應用程式的 CORS 設定相同, 允許從其他來源的網頁進行請求"""
+    response.headers.setdefault("Access-Control-Allow-Origin", "*")
+    if request.method == "OPTIONS":
+        response.headers.setdefault("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
+        allow_headers = request.headers.get("Access-Control-Request-Headers")
+        if allow_headers:
+            response.headers.setdefault("Access-Control-Allow-Headers", allow_headers)
+    return response
+
+
+@async_app.after_serving
+async def close_aws_clients():
+    """伺服器關閉時釋放 AWS 客戶端的連線"""
+    await AsyncAWSClientFactory.close()
+
+
+@async_app.route('/dummy')
+async def hello():
+    """測試 quart api, app 程式是否正常運作"""
+    return 'Hello, World!'
+
+@async_app.route('/dynamodb-connection-status')
+async def check_dynamodb():
+    """確認是否接通 dynamodb"""
+    return await AsyncController.check_dynamodb_connection()
+
+@async_app.route('/table/<table_name>', methods=["POST"])
+async def insert_data(table_name):
+    """在指定表格插入新的值"""
+    return await AsyncController.insert_data_into_dynamodb(table_name, request)
+
+@async_app.route('/table/<table_name>', methods=["GET"])
+async def scan_table(table_name):
+    """獲取指定表格的所有資料, query string 同 Flask 版本"""
+    if 'ids' in request.args:
+        return await AsyncController.batch_get_dynamodb(table_name, request)
+    return await AsyncController.scan_dynamodb(table_name, request)
+
+@async_app.route('/table/<table_name>/batch-get', methods=["POST"])
+async def batch_get_data(table_name):
+    """批次查詢特定表格的多個 id"""
+    return await AsyncController.batch_get_dynamodb(table_name, request)
+
+@async_app.route('/table/<table_name>/<id>', methods=["GET"])
+async def query_data(table_name, id):
+    """查詢特定表格的特定 id"""
+    return await AsyncController.query_db(table_name, id, request)
+
+@async_app.route('/table/<table_name>', methods=["PUT"])
+async def update_dynamodb_data(table_name):
+    """更新特定表格的資料"""
+    return await AsyncController.update_dynamodb_data(table_name, request)
+
+@async_app.route('/table/<table_name>/deletion', methods=["PUT"])
+async def soft_delete(table_name):
+    """軟刪除"""
+    return await AsyncController.soft_delete_item(table_name, request)
+
+@async_app.route('/table/<table_name>/<id>', methods=["DELETE"])
+async def delete_item(table_name, id):
+    """硬刪除"""
+    return await AsyncController.delete_item(table_name, id, request)
+
+@async_app.route('/dynamodb-cache-stats')
+async def cache_stats():
+    """查看 DynamoDB 單筆查詢快取的統計資料"""
+    return await AsyncController.get_cache_stats()
+
+@async_app.route('/s3-connection-status')
+async def check_s3():
+    """確認是否接通 s3"""
+    return await AsyncController.check_s3_connection()
+
+@async_app.route('/s3/bucket/<bucket_name>/object', methods=["GET"])
+async def download_file(bucket_name):
+    """在特定值區下載物件"""
+    return await AsyncController.download_file(bucket_name, request)
+
+@async_app.route('/list_objects', methods=['GET'])
+async def list_objects():
+    """在特定值區指定特定路徑並列出該路徑的物件"""
+    return await AsyncController.list_objects(request)
@@ -0,0 +1,85 @@
+"""比較同步模式 (Flask) 與非同步模式 (asgi.py) 的 DynamoDB 路由效能
+
+使用方式 (在專案根目錄執行):
+    python benchmarks/bench_async.py --items 1000 --requests 2000 --concurrency 1 16 64
+
+未指定 --sync-url / --async-url 時, 會以子行程各自啟動 Flask 開發伺服器與 hypercorn,
+兩者都使用目前的環境變數 (ENV 等) 連接後端
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from http_load import run_load, ServerProcess, SYNC_DEV_SERVER, ASYNC_SERVER
+
+
+def seed_table(base_url, table_name, items):
+    """建立表格並以批次寫入 items 筆資料"""
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=300)
+    connection.request('POST', f'/new-table/{table_name}')
+    connection.getresponse().read()
+    rows = '\n'.join(json.dumps({'ID': str(i), 'Name': f'name-{i}'}) for i in range(items))
+    connection.request('POST', f'/table/{table_name}/batch', body=rows.encode(),
+                       headers={'Content-Type': 'application/x-ndjson'})
+    connection.getresponse().read()
+    connection.close()
+
+
+def scenarios(table_name, items):
+    """各路由的壓測情境: (名稱, method, path)"""
+    random_id = lambda i: random.randrange(items)
+    return [
+        ('get_item', 'GET', lambda i: f'/table/{table_name}/{random_id(i)}'),
+        ('scan_page', 'GET', f'/table/{table_name}?limit=100'),
+        ('batch_get_50', 'GET', lambda i: f'/table/{table_name}?ids=' +
+         ','.join(str(random_id(i)) for _ in range(50))),
+    ]
+
+
+def run_mode(mode, base_url, args):
+    results = []
+    seed_table(base_url, args.table, args.items)
+    for name, method, path in scenarios(args.table, args.items):
+        for concurrency in args.concurrency:
+            result = run_load(base_url, method, path, concurrency, args.requests)
+            result.update({'mode': mode, 'scenario': name, 'concurrency': concurrency})
+            results.append(result)
+            print(f"{mode:5} {name:13} c={concurrency:<4} {result['throughput_rps']:>9} req/s  "
+                  f"p50={result['latency_ms']['p50']}ms p99={result['latency_ms']['p99']}ms "
+                  f"errors={result['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sync-url', help='已啟動的同步模式伺服器')
+    parser.add_argument('--async-url', help='已啟動的非同步模式伺服器')
+    parser.add_argument('--table', default='bench_async')
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--output', help='將結果寫成 JSON 檔')
+    args = parser.parse_args()
+
+    results = []
+    for mode, url, command in (('sync', args.sync_url, SYNC_DEV_SERVER),
+                               ('async', args.async_url, ASYNC_SERVER)):
+        if url:
+            results.extend(run_mode(mode, url, args))
+        else:
+            with ServerProcess(command) as base_url:
+                results.extend(run_mode(mode, base_url, args))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""DynamoDB 屬性值轉換與 JSON 序列化的微基準測試
+
+每次掃描、查詢的每一筆資料都會經過 unmarshall_item 與 dumps, 以大批次的資料量測吞吐量,
+並與 boto3 的 TypeSerializer/TypeDeserializer 及標準函式庫的 json 比較
+
+使用方式 (在專案根目錄執行):
+    python benchmarks/bench_marshaller.py --items 10000 --repeat 5 --output marshaller.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from daos import dynamodb_marshaller
+from daos.dynamodb_marshaller import dumps, marshall_item, unmarshall_item
+
+
+def make_items(count, seed=0):
+    """產生 count 筆混合各種型別的資料, 近似一般的表格內容"""
+    rng = random.Random(seed)
+    return [{
+        'ID': str(i),
+        'Name': f'name-{i}',
+        'Age': rng.randrange(100),
+        'Score': round(rng.random() * 100, 2),
+        'Active': rng.random() < 0.5,
+        'Note': None,
+        'Tags': [f'tag-{rng.randrange(10)}' for _ in range(3)],
+        'Address': {'City': 'Taipei', 'Zip': rng.randrange(100, 999), 'Lines': ['a', 'b']},
+    } for i in range(count)]
+
+
+def best_of(repeat, func):
+    """執行 repeat 次, 回傳最快一次的秒數"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def to_decimal(value):
+    """boto3 的 TypeSerializer 不接受 float, 先轉成 Decimal"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {key: to_decimal(element) for key, element in value.items()}
+    if isinstance(value, list):
+        return [to_decimal(element) for element in value]
+    return value
+
+
+def run(items_count, repeat):
+    """執行所有情境, 回傳 {情境名稱: {"seconds", "items_per_s"}}"""
+    items = make_items(items_count)
+    typed = [marshall_item(item) for item in items]
+    plain = [unmarshall_item(item) for item in typed]
+    serializer, deserializer = TypeSerializer(), TypeDeserializer()
+    decimal_items = [to_decimal(item) for item in items]
+
+    cases = {
+        'marshall_item': lambda: [marshall_item(item) for item in items],
+        'unmarshall_item': lambda: [unmarshall_item(item) for item in typed],
+        'boto3_serialize': lambda: [{k: serializer.serialize(v) for k, v in item.items()}
+                                    for item in decimal_items],
+        'boto3_deserialize': lambda: [{k: deserializer.deserialize(v) for k, v in item.items()}
+                                      for item in typed],
+        'dumps': lambda: dumps(plain),
+        'json_dumps': lambda: json.dumps(plain, ensure_ascii=False, separators=(',', ':')),
+        'unmarshall_and_dumps': lambda: dumps([unmarshall_item(item) for item in typed]),
+    }
+    results = {}
+    for name, func in cases.items():
+        seconds = best_of(repeat, func)
+        results[name] = {'seconds': seconds, 'items_per_s': items_count / seconds}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000, help='每批資料的筆數')
+    parser.add_argument('--repeat', type=int, default=5, help='每個情境重複次數, 取最快一次')
+    parser.add_argument('--output', help='將結果另存成 JSON 檔')
+    args = parser.parse_args()
+
+    results = run(args.items, args.repeat)
+    backend = 'orjson' if dynamodb_marshaller.orjson is not None else 'json'
+    print(f'items={args.items} repeat={args.repeat} dumps 使用 {backend}')
+    for name, result in results.items():
+        print(f"{name:<22} {result['seconds'] * 1000:10.2f} ms {result['items_per_s']:14,.0f} items/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'items': args.items, 'repeat': args.repeat, 'json_backend': backend,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
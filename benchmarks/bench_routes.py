@@ -0,0 +1,344 @@
+"""所有 HTTP 路由的端對端壓測
+
+依序對 DynamoDB (/table/...)、S3 (/s3/...) 與物件清單 (/list_objects) 的路由送出請求,
+每個情境在每個 --concurrency 各執行一次, 統計吞吐量、p50/p95/p99 延遲與伺服器行程的最大常駐記憶體,
+結果以 JSON 寫入 --output, 可用 benchmarks/compare_results.py 比較兩次 commit 的結果
+
+- 未指定 --url 時以子行程啟動伺服器 (--server sync 為 Flask 開發伺服器, gunicorn 為正式環境的 gunicorn.conf.py,
+  async 為 hypercorn), 以相同參數分別執行 sync 與 gunicorn 後可比較開發伺服器與正式環境的差異
+  --backend local (預設) 使用行程內的 DynamoDB 與本機 S3 後端, env 則沿用目前的環境變數 (例如 ENV=development)
+- 指定 --url 時對已啟動的伺服器壓測 (例如真正的 AWS 端點), 伺服器在同一台主機時可以 --pid 讀取記憶體用量
+
+使用方式 (在專案根目錄執行):
+    python benchmarks/bench_routes.py --output before.json
+    python benchmarks/bench_routes.py --object-sizes 1KB 1MB 64MB 1GB --list-objects 10000 --output after.json
+    python benchmarks/bench_routes.py --only get_item scan_page --concurrency 1 32
+    python benchmarks/bench_routes.py --server gunicorn --workers 1 --threads 16 --output gunicorn.json
+    python benchmarks/compare_results.py before.json after.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import fnmatch
+import platform
+import argparse
+import tempfile
+import itertools
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from http_load import (run_load, ServerProcess, SYNC_DEV_SERVER, PRODUCTION_SERVER, ASYNC_SERVER, PROJECT_DIR,
+                       reset_peak_rss, peak_rss_mb)
+
+SERVERS = {'sync': SYNC_DEV_SERVER, 'gunicorn': PRODUCTION_SERVER, 'async': ASYNC_SERVER}
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+# 超過此大小的物件先寫到暫存檔, 上傳時以檔案串流送出, 不在壓測端的記憶體中保留整個物件
+FILE_PAYLOAD_THRESHOLD = 64 * 1024 ** 2
+RANGE_SIZE = 1024 * 1024
+
+
+def parse_size(text):
+    """將 1KB、64MB、1GB 等大小轉換成 bytes"""
+    text = text.strip().upper()
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f'{size // SIZE_UNITS[unit]}{unit}'
+    return f'{size}B'
+
+
+class Scenario:
+    """單一壓測情境
+
+    name: 情境名稱, group: 分類 (dynamodb/s3/list), route: 對應的路由 (報表用)
+    path、body、headers 可以是固定值, 或接收請求編號的函式 (同 run_load)
+    requests: 此情境的請求數, 未指定時使用 --requests
+    """
+
+    def __init__(self, name, group, method, route, path, body=None, headers=None, requests=None,
+                 payload_bytes=None):
+        self.name = name
+        self.group = group
+        self.method = method
+        self.route = route
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.requests = requests
+        self.payload_bytes = payload_bytes
+
+
+class Payload:
+    """上傳用的物件內容, 小物件保留在記憶體, 大物件寫到暫存檔後每次請求重新開啟"""
+
+    def __init__(self, size, directory):
+        self.size = size
+        self.path = None
+        self.data = None
+        if size > FILE_PAYLOAD_THRESHOLD:
+            self.path = os.path.join(directory, f'payload-{size}.bin')
+            with open(self.path, 'wb') as f:
+                remaining = size
+                while remaining:
+                    chunk = os.urandom(min(remaining, 8 * 1024 ** 2))
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        else:
+            self.data = os.urandom(size)
+
+    def __call__(self, index=None):
+        return open(self.path, 'rb') if self.path else self.data
+
+
+class Client:
+    """準備壓測資料用的簡易 HTTP 客戶端"""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(url.hostname, url.port, timeout=600)
+        self.base_path = url.path.rstrip('/')
+
+    def request(self, method, path, body=None, headers=None):
+        self.connection.request(method, self.base_path + path, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status >= 400:
+            raise RuntimeError(f'{method} {path} 失敗: {response.status} {data[:200]!r}')
+        return data
+
+    def close(self):
+        self.connection.close()
+
+
+def prepare(base_url, args, payloads):
+    """建立表格、寫入 --items 筆資料、建立值區並上傳下載與列出物件用的物件"""
+    client = Client(base_url)
+    try:
+        client.request('POST', f'/new-table/{args.table}')
+        for start in range(0, args.items, 1000):
+            rows = '\n'.join(json.dumps(make_item(i)) for i in range(start, min(start + 1000, args.items)))
+            client.request('POST', f'/table/{args.table}/batch', body=rows.encode(),
+                           headers={'Content-Type': 'application/x-ndjson'})
+        client.request('POST', f'/s3/bucket/{args.bucket}')
+        for size, payload in payloads.items():
+            body = payload()
+            try:
+                client.request('POST', f'/s3/bucket/{args.bucket}/new-object?object_name=download-{format_size(size)}',
+                               body=body, headers={'Content-Type': 'application/octet-stream',
+                                                   'Content-Length': str(size)})
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+    finally:
+        client.close()
+    # 物件清單用的物件數量多, 以多條連線平行上傳
+    if args.list_objects:
+        result = run_load(base_url, 'POST',
+                          lambda i: f'/s3/bucket/{args.bucket}/new-object?object_name=list/{i // 100:04}/{i:08}.txt',
+                          concurrency=16, total_requests=args.list_objects, body=b'x',
+                          headers={'Content-Type': 'application/octet-stream'})
+        if result['errors']:
+            raise RuntimeError(f"上傳物件清單用的物件失敗 {result['errors']} 次")
+
+
+def make_item(i, prefix=''):
+    return {'ID': f'{prefix}{i}', 'Name': f'name-{i}', 'Age': i % 100, 'Tags': ['a', 'b'],
+            'Address': {'City': 'Taipei', 'Zip': 100 + i % 900}}
+
+
+def scenarios(args, payloads):
+    """所有路由的壓測情境"""
+    table, bucket, items = args.table, args.bucket, args.items
+    random_id = lambda i: random.randrange(items)
+    # 新增的資料使用不重複的 ID, 不同並行數的情境之間也不會重複
+    new_ids = itertools.count()
+    json_headers = {'Content-Type': 'application/json'}
+    batch = args.batch_size
+
+    result = [
+        Scenario('insert_item', 'dynamodb', 'POST', '/table/<table_name>', f'/table/{table}',
+                 body=lambda i: json.dumps(make_item(next(new_ids), 'new-')).encode(), headers=json_headers),
+        Scenario(f'batch_insert_{batch}', 'dynamodb', 'POST', '/table/<table_name>/batch', f'/table/{table}/batch',
+                 body=lambda i: '\n'.join(json.dumps(make_item(next(new_ids), 'batch-'))
+                                          for _ in range(batch)).encode(),
+                 headers={'Content-Type': 'application/x-ndjson'}),
+        Scenario('get_item', 'dynamodb', 'GET', '/table/<table_name>/<id>',
+                 lambda i: f'/table/{table}/{random_id(i)}'),
+        Scenario('scan_page', 'dynamodb', 'GET', '/table/<table_name>', f'/table/{table}?limit=100'),
+        Scenario('scan_all_ndjson', 'dynamodb', 'GET', '/table/<table_name>', f'/table/{table}?format=ndjson',
+                 requests=max(1, args.requests // 20)),
+        Scenario('batch_get_50', 'dynamodb', 'GET', '/table/<table_name>?ids=',
+                 lambda i: f'/table/{table}?ids=' + ','.join(str(random_id(i)) for _ in range(50))),
+        Scenario('batch_get_post_100', 'dynamodb', 'POST', '/table/<table_name>/batch-get',
+                 f'/table/{table}/batch-get', headers=json_headers,
+                 body=lambda i: json.dumps({'ids': [str(random_id(i)) for _ in range(100)]}).encode()),
+        Scenario('update_item', 'dynamodb', 'PUT', '/table/<table_name>', f'/table/{table}', headers=json_headers,
+                 body=lambda i: json.dumps({'ID': str(random_id(i)), 'Name': f'updated-{i}'}).encode()),
+        Scenario('soft_delete', 'dynamodb', 'PUT', '/table/<table_name>/deletion', f'/table/{table}/deletion',
+                 headers=json_headers, body=lambda i: json.dumps({'ID': str(random_id(i))}).encode()),
+        Scenario('delete_item', 'dynamodb', 'DELETE', '/table/<table_name>/<id>',
+                 lambda i: f'/table/{table}/new-{i}'),
+    ]
+
+    budget = parse_size(args.max_transfer)
+    for size, payload in payloads.items():
+        label = format_size(size)
+        # 大物件依 --max-transfer 減少請求數, 避免單一情境傳輸過多資料
+        requests = max(1, min(args.requests, budget // size))
+        upload_names = itertools.count()
+        result.extend([
+            Scenario(f'upload_{label}', 's3', 'POST', '/s3/bucket/<bucket_name>/new-object',
+                     lambda i, label=label, names=upload_names:
+                     f'/s3/bucket/{bucket}/new-object?object_name=upload-{label}-{next(names) % 10}',
+                     body=payload, headers={'Content-Type': 'application/octet-stream', 'Content-Length': str(size)},
+                     requests=requests, payload_bytes=size),
+            Scenario(f'download_{label}', 's3', 'GET', '/s3/bucket/<bucket_name>/object',
+                     f'/s3/bucket/{bucket}/object?object_name=download-{label}', requests=requests,
+                     payload_bytes=size),
+        ])
+        if size > RANGE_SIZE:
+            def random_range(i, size=size):
+                start = random.randrange(size - RANGE_SIZE)
+                return {'Range': f'bytes={start}-{start + RANGE_SIZE - 1}'}
+
+            result.append(Scenario(f'range_1MB_of_{label}', 's3', 'GET', '/s3/bucket/<bucket_name>/object',
+                                   f'/s3/bucket/{bucket}/object?object_name=download-{label}',
+                                   headers=random_range, payload_bytes=RANGE_SIZE))
+
+    if args.list_objects:
+        count = args.list_objects
+        result.extend([
+            Scenario('list_page_1000', 'list', 'GET', '/list_objects',
+                     f'/list_objects?bucket={bucket}&prefix=list/&max_keys=1000&details=true'),
+            Scenario('list_delimiter', 'list', 'GET', '/list_objects',
+                     f'/list_objects?bucket={bucket}&prefix=list/&delimiter=/'),
+            Scenario(f'list_all_{count}_ndjson', 'list', 'GET', '/list_objects',
+                     f'/list_objects?bucket={bucket}&prefix=list/&format=ndjson',
+                     requests=max(1, args.requests // 20)),
+        ])
+    return result
+
+
+def selected(scenario, patterns):
+    return not patterns or any(fnmatch.fnmatch(scenario.name, pattern) or scenario.group == pattern
+                               for pattern in patterns)
+
+
+def run(base_url, args, pid=None):
+    """執行所有情境, 回傳結果清單"""
+    with tempfile.TemporaryDirectory(prefix='bench-routes-') as directory:
+        payloads = {size: Payload(size, directory) for size in sorted(map(parse_size, args.object_sizes))}
+        prepare(base_url, args, payloads)
+        results = []
+        for scenario in scenarios(args, payloads):
+            if not selected(scenario, args.only):
+                continue
+            for concurrency in args.concurrency:
+                if pid:
+                    reset_peak_rss(pid)
+                result = run_load(base_url, scenario.method, scenario.path, concurrency,
+                                  scenario.requests or args.requests, scenario.body, scenario.headers)
+                duration = result['duration_s'] or None
+                transferred = result['bytes_sent'] + result['bytes_received']
+                result.update({
+                    'scenario': scenario.name,
+                    'group': scenario.group,
+                    'method': scenario.method,
+                    'route': scenario.route,
+                    'concurrency': concurrency,
+                    'payload_bytes': scenario.payload_bytes,
+                    'mb_per_s': round(transferred / 1024 ** 2 / duration, 2) if duration else None,
+                    'server_peak_rss_mb': peak_rss_mb(pid) if pid else None,
+                })
+                results.append(result)
+                print(f"{scenario.name:24} c={concurrency:<4} {result['throughput_rps']:>10} req/s "
+                      f"{result['mb_per_s']:>9} MB/s p50={result['latency_ms']['p50']}ms "
+                      f"p95={result['latency_ms']['p95']}ms p99={result['latency_ms']['p99']}ms "
+                      f"rss={result['server_peak_rss_mb']}MB errors={result['errors']}", flush=True)
+    return results
+
+
+def metadata(args):
+    """結果檔的執行環境資訊, 比較時用來確認兩份結果的條件相同"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'server': args.url or args.server,
+        'workers': args.workers,
+        'threads': args.threads,
+        'backend': args.backend if not args.url else 'remote',
+        # 伺服器的設定另外記錄, 比較不同伺服器的結果時不視為壓測參數不同
+        'args': {key: value for key, value in vars(args).items()
+                 if key not in ('output', 'url', 'pid', 'server', 'workers', 'threads')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='已啟動的伺服器, 未指定時以子行程啟動')
+    parser.add_argument('--pid', type=int, help='已啟動的伺服器的行程編號, 用於讀取記憶體用量')
+    parser.add_argument('--server', choices=sorted(SERVERS), default='sync', help='以子行程啟動的伺服器')
+    parser.add_argument('--workers', type=int,
+                        help='gunicorn 的 worker 數 (GUNICORN_WORKERS); --backend local 時預設 1, '
+                             '因為行程內的 DynamoDB 資料不會在 worker 之間共用')
+    parser.add_argument('--threads', type=int, help='gunicorn 每個 worker 的執行緒數 (GUNICORN_THREADS)')
+    parser.add_argument('--backend', choices=('local', 'env'), default='local',
+                        help='local: 行程內 DynamoDB 與本機 S3, env: 沿用目前的環境變數')
+    parser.add_argument('--table', default='bench_routes')
+    parser.add_argument('--bucket', default='bench-routes')
+    parser.add_argument('--items', type=int, default=1000, help='表格中預先寫入的資料筆數')
+    parser.add_argument('--batch-size', type=int, default=25, help='批次寫入情境每個請求的筆數')
+    parser.add_argument('--object-sizes', nargs='+', default=['1KB', '1MB', '16MB'],
+                        help='上傳與下載情境的物件大小, 例如 1KB 1MB 64MB 1GB')
+    parser.add_argument('--max-transfer', default='1GB', help='每個物件情境最多傳輸的資料量, 大物件依此減少請求數')
+    parser.add_argument('--list-objects', type=int, default=2000, help='物件清單情境預先上傳的物件數, 0 時略過')
+    parser.add_argument('--requests', type=int, default=500, help='每個情境的請求數')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--only', nargs='+', help='只執行指定的情境名稱 (可用 * 萬用字元) 或分類 (dynamodb/s3/list)')
+    parser.add_argument('--seed', type=int, default=0, help='隨機 id 與 Range 的亂數種子')
+    parser.add_argument('--output', help='將結果寫成 JSON 檔')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.url:
+        results = run(args.url, args, args.pid)
+    else:
+        env = {}
+        if args.backend == 'local':
+            env = {'ENV': 'memory', 'DYNAMODB_BACKEND': 'memory', 'S3_BACKEND': 'local',
+                   'S3_LOCAL_ROOT': tempfile.mkdtemp(prefix='bench-routes-s3-')}
+            if args.server == 'gunicorn' and args.workers is None:
+                args.workers = 1
+        if args.workers:
+            env['GUNICORN_WORKERS'] = str(args.workers)
+        if args.threads:
+            env['GUNICORN_THREADS'] = str(args.threads)
+        server = ServerProcess(SERVERS[args.server], env=env)
+        with server as base_url:
+            results = run(base_url, args, server.process.pid)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': metadata(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""S3 路由的上傳、下載與 Range 下載吞吐量
+
+以子行程啟動 Flask 開發伺服器 (預設 S3_BACKEND=local, 物件存放在暫存資料夾),
+上傳一個 --size MB 的物件後, 量測整個物件下載、隨機 Range 下載與上傳的吞吐量
+
+使用方式 (在專案根目錄執行):
+    python benchmarks/bench_s3.py --size 64 --requests 50 --concurrency 1 8
+    S3_BACKEND=aws ENV=development python benchmarks/bench_s3.py --url http://localhost:5000
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from http_load import run_load, ServerProcess, SYNC_DEV_SERVER
+
+RANGE_SIZE = 1024 * 1024
+
+
+def prepare_object(base_url, bucket, object_name, data):
+    """建立值區並上傳壓測用的物件"""
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=300)
+    connection.request('POST', f'/s3/bucket/{bucket}')
+    connection.getresponse().read()
+    connection.request('POST', f'/s3/bucket/{bucket}/new-object?object_name={object_name}', body=data,
+                       headers={'Content-Type': 'application/octet-stream'})
+    connection.getresponse().read()
+    connection.close()
+
+
+def scenarios(bucket, object_name, size, data):
+    """各情境: (名稱, method, path, body, headers)"""
+    download = f'/s3/bucket/{bucket}/object?object_name={object_name}'
+
+    def random_range(i):
+        start = random.randrange(max(1, size - RANGE_SIZE))
+        return {'Range': f'bytes={start}-{start + RANGE_SIZE - 1}'}
+
+    return [
+        ('download', 'GET', download, None, None),
+        ('range_1mb', 'GET', download, None, random_range),
+        ('upload', 'POST', lambda i: f'/s3/bucket/{bucket}/new-object?object_name=upload-{i}', data, None),
+    ]
+
+
+def run(base_url, args):
+    size = args.size * 1024 * 1024
+    data = os.urandom(size)
+    prepare_object(base_url, args.bucket, 'bench.bin', data)
+    results = []
+    for name, method, path, body, make_headers in scenarios(args.bucket, 'bench.bin', size, data):
+        for concurrency in args.concurrency:
+            headers = make_headers or ({'Content-Type': 'application/octet-stream'} if body else None)
+            result = run_load(base_url, method, path, concurrency, args.requests, body, headers)
+            transferred = result['bytes_received'] + result['bytes_sent']
+            result.update({'scenario': name, 'concurrency': concurrency, 'object_mb': args.size,
+                           'mb_per_s': round(transferred / 1024 / 1024 / result['duration_s'], 2)})
+            results.append(result)
+            print(f"{name:10} c={concurrency:<4} {result['throughput_rps']:>9} req/s "
+                  f"{result['mb_per_s']:>9} MB/s p50={result['latency_ms']['p50']}ms "
+                  f"p99={result['latency_ms']['p99']}ms errors={result['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='已啟動的伺服器, 未指定時以子行程啟動 Flask 開發伺服器')
+    parser.add_argument('--bucket', default='bench-s3')
+    parser.add_argument('--size', type=int, default=64, help='壓測物件的大小 (MB)')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--output', help='將結果寫成 JSON 檔')
+    args = parser.parse_args()
+
+    if args.url:
+        results = run(args.url, args)
+    else:
+        env = {'S3_BACKEND': os.getenv('S3_BACKEND', 'local'),
+               'S3_LOCAL_ROOT': os.getenv('S3_LOCAL_ROOT') or tempfile.mkdtemp(prefix='bench-s3-')}
+        with ServerProcess(SYNC_DEV_SERVER, env=env) as base_url:
+            results = run(base_url, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
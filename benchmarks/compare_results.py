@@ -0,0 +1,100 @@
+"""比較兩份 bench_routes.py 的結果
+
+以 (情境, 並行數) 對應兩份結果, 列出吞吐量、p50/p99 延遲與伺服器最大常駐記憶體的變化,
+變差超過 --threshold 百分比的項目標示為 REGRESSION
+
+使用方式 (在專案根目錄執行):
+    python benchmarks/compare_results.py before.json after.json
+    python benchmarks/compare_results.py before.json after.json --threshold 5 --fail
+"""
+import sys
+import json
+import argparse
+
+# 比較的指標: (名稱, 取值函式, 數值越大越好)
+METRICS = [
+    ('rps', lambda result: result.get('throughput_rps'), True),
+    ('p50_ms', lambda result: result.get('latency_ms', {}).get('p50'), False),
+    ('p99_ms', lambda result: result.get('latency_ms', {}).get('p99'), False),
+    ('rss_mb', lambda result: result.get('server_peak_rss_mb'), False),
+]
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    results = {(result['scenario'], result['concurrency']): result for result in data['results']}
+    return data.get('meta', {}), results
+
+
+def change(before, after):
+    """變化的百分比, 無法計算時回傳 None"""
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    """回傳 (表格的每一列, 變差的項目)"""
+    rows, regressions = [], []
+    for key in sorted(set(before) & set(after), key=lambda key: (list(before).index(key), key[1])):
+        scenario, concurrency = key
+        cells = []
+        for name, value, higher_is_better in METRICS:
+            old, new = value(before[key]), value(after[key])
+            percent = change(old, new)
+            cells.append((old, new, percent))
+            if percent is not None:
+                worse = -percent if higher_is_better else percent
+                if worse > threshold:
+                    regressions.append((scenario, concurrency, name, old, new, percent))
+        errors = (before[key].get('errors', 0), after[key].get('errors', 0))
+        rows.append((scenario, concurrency, cells, errors))
+    return rows, regressions
+
+
+def format_cell(old, new, percent):
+    if percent is None:
+        return f"{'-' if new is None else new:>10} {'':>8}"
+    return f'{new:>10} {percent:>+7.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before', help='比較基準的結果檔')
+    parser.add_argument('after', help='要比較的結果檔')
+    parser.add_argument('--threshold', type=float, default=10, help='變差超過此百分比時標示為 REGRESSION')
+    parser.add_argument('--fail', action='store_true', help='有 REGRESSION 時以結束碼 1 結束 (CI 用)')
+    args = parser.parse_args()
+
+    before_meta, before = load(args.before)
+    after_meta, after = load(args.after)
+    print(f"before: {before_meta.get('commit')} {before_meta.get('timestamp')} ({args.before})")
+    print(f"after:  {after_meta.get('commit')} {after_meta.get('timestamp')} ({args.after})")
+    if before_meta.get('args') != after_meta.get('args') or before_meta.get('backend') != after_meta.get('backend'):
+        print('注意: 兩份結果的壓測參數或後端不同, 數值可能無法直接比較')
+    servers = [(meta.get('server'), meta.get('workers'), meta.get('threads')) for meta in (before_meta, after_meta)]
+    if servers[0] != servers[1]:
+        print('伺服器: ' + ' -> '.join(f'{server} (workers={workers}, threads={threads})'
+                                       for server, workers, threads in servers))
+
+    rows, regressions = compare(before, after, args.threshold)
+    header = f"{'scenario':<24} {'c':>4} " + ' '.join(f'{name:>19}' for name, _, _ in METRICS) + '  errors'
+    print(header)
+    print('-' * len(header))
+    for scenario, concurrency, cells, errors in rows:
+        print(f'{scenario:<24} {concurrency:>4} ' + ' '.join(format_cell(*cell) for cell in cells) +
+              f'  {errors[0]}->{errors[1]}')
+
+    for key in sorted(set(before) ^ set(after)):
+        print(f"只存在於 {'before' if key in before else 'after'}: {key[0]} c={key[1]}")
+    for scenario, concurrency, name, old, new, percent in regressions:
+        print(f'REGRESSION {scenario} c={concurrency} {name}: {old} -> {new} ({percent:+.1f}%)')
+    if not regressions:
+        print(f'沒有變差超過 {args.threshold}% 的項目')
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
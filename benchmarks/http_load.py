@@ -0,0 +1,214 @@
+"""HTTP 壓測的共用工具
+
+- run_load: 以多個執行緒 (每個執行緒一條 keep-alive 連線) 對同一個路由送出請求, 統計吞吐量與延遲百分位數
+- ServerProcess: 以子行程啟動待測的伺服器, 等待可以連線後才開始壓測, 結束時關閉
+- reset_peak_rss/peak_rss_mb: 讀取伺服器行程 (含 worker 子行程) 在每個情境中的最大常駐記憶體 (Linux)
+"""
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+# 專案根目錄, 啟動伺服器時作為工作目錄
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, percent):
+    """由已排序的數值取得百分位數 (nearest-rank)"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_load(base_url, method, path, concurrency=10, total_requests=1000, body=None,
+             headers=None, expected_status=(200, 206)):
+    """對 base_url + path 送出 total_requests 個請求, 同時進行 concurrency 個
+
+    path 可以是字串, 或接收第 i 個請求編號並回傳路徑的函式 (例如每次查詢不同 id)
+    body 可以是 bytes, 或接收請求編號並回傳 bytes 或檔案物件的函式 (大檔案以檔案串流送出, 送出後關閉)
+    headers 可以是 dict, 或接收請求編號並回傳 dict 的函式 (例如每次請求不同的 Range)
+    回傳 {requests, errors, duration_s, throughput_rps, bytes_sent, bytes_received, latency_ms}
+    """
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    base_path = url.path.rstrip('/')
+    counter = iter(range(total_requests))
+    counter_lock = threading.Lock()
+    latencies = []
+    stats = {'errors': 0, 'bytes_sent': 0, 'bytes_received': 0}
+    stats_lock = threading.Lock()
+
+    def next_index():
+        with counter_lock:
+            return next(counter, None)
+
+    def worker():
+        connection = connection_class(url.hostname, url.port, timeout=300)
+        local_latencies = []
+        errors = bytes_sent = bytes_received = 0
+        while (index := next_index()) is not None:
+            request_path = base_path + (path(index) if callable(path) else path)
+            payload = body(index) if callable(body) else body
+            request_headers = headers(index) if callable(headers) else headers
+            started = time.perf_counter()
+            try:
+                connection.request(method, request_path, body=payload, headers=request_headers or {})
+                response = connection.getresponse()
+                while chunk := response.read(1024 * 1024):
+                    bytes_received += len(chunk)
+                if response.status not in expected_status:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+                connection = connection_class(url.hostname, url.port, timeout=300)
+            local_latencies.append(time.perf_counter() - started)
+            bytes_sent += payload_size(payload)
+            if hasattr(payload, 'close'):
+                payload.close()
+        connection.close()
+        with stats_lock:
+            latencies.extend(local_latencies)
+            stats['errors'] += errors
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': stats['errors'],
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'bytes_sent': stats['bytes_sent'],
+        'bytes_received': stats['bytes_received'],
+        'latency_ms': {
+            'p50': _ms(percentile(latencies, 50)),
+            'p95': _ms(percentile(latencies, 95)),
+            'p99': _ms(percentile(latencies, 99)),
+            'max': _ms(latencies[-1] if latencies else None),
+            'mean': _ms(sum(latencies) / len(latencies) if latencies else None),
+        },
+    }
+
+
+def payload_size(payload):
+    """請求 body 的大小, 檔案物件以檔案大小計算"""
+    if not payload:
+        return 0
+    if hasattr(payload, 'fileno'):
+        return os.fstat(payload.fileno()).st_size
+    return len(payload)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def free_port():
+    """取得一個目前沒有被使用的 TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """以子行程啟動待測的伺服器
+
+    with ServerProcess(command, port) as base_url: ...
+    command 中的 {port} 會被替換成實際的 port, 伺服器可以回應 /dummy 後才會進入 with 區塊
+    """
+
+    def __init__(self, command, port=None, env=None, startup_timeout=60):
+        self.port = port or free_port()
+        self.command = [part.format(port=self.port) for part in command]
+        self.env = {**os.environ, **(env or {})}
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, cwd=PROJECT_DIR, env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"伺服器啟動失敗: {' '.join(self.command)}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                connection.request('GET', '/dummy')
+                connection.getresponse().read()
+                connection.close()
+                return self.base_url
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"伺服器啟動逾時: {' '.join(self.command)}")
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def process_tree(pid):
+    """行程與其所有子行程 (例如 gunicorn 的 worker) 的編號, 只支援 Linux, 其他平台只回傳 pid"""
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def reset_peak_rss(pid):
+    """重設行程與子行程的最大常駐記憶體 (VmHWM), 只支援 Linux, 其他平台略過"""
+    for current in process_tree(pid):
+        try:
+            with open(f'/proc/{current}/clear_refs', 'w') as f:
+                f.write('5')
+        except OSError:
+            pass
+
+
+def peak_rss_mb(pid):
+    """讀取行程與子行程的最大常駐記憶體總和 (MB), 只支援 Linux, 其他平台回傳 None"""
+    total = None
+    for current in process_tree(pid):
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total = (total or 0) + int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return round(total / 1024, 1) if total is not None else None
+
+
+# 常用的伺服器啟動指令
+SYNC_DEV_SERVER = [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+                   '--port', '{port}', '--with-threads', '--no-reload']
+# 正式環境的 gunicorn (gunicorn.conf.py), worker 與執行緒數由 GUNICORN_WORKERS/GUNICORN_THREADS 調整
+PRODUCTION_SERVER = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', '127.0.0.1:{port}']
+ASYNC_SERVER = [sys.executable, '-m', 'hypercorn', 'asgi:application', '--bind', '127.0.0.1:{port}']
@@ -0,0 +1,232 @@
+import logging
+
+from botocore.exceptions import ClientError
+from quart import jsonify, Response
+
+from controllers.controller import Controller
+from daos.async_dynamodb_dao import AsyncDynamoDBDao
+from daos.async_s3_dao import AsyncS3Dao
+from daos.dynamodb_dao import DynamoDBDao
+from daos.s3_dao import S3Dao
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncController:
+    """非同步模式的 Controller, 接收API輸入並處理、控制流程與調用非同步的組件
+
+    回傳內容與 Controller 相同, query string 解析、串流編碼等共用 Controller 的實作
+    """
+
+    @classmethod
+    async def check_dynamodb_connection(cls):
+        """確認 dynamodb 是否成功串接"""
+        if await AsyncDynamoDBDao.check_dynamodb():
+            return "已連接到 LocalStack 的 DynamoDB 服務"
+        else:
+            return "無法連接到 LocalStack 的 DynamoDB 服務"
+
+    @classmethod
+    async def insert_data_into_dynamodb(cls, table_name, request_data):
+        """插入資料到資料表, 回傳「插入資料成功」或「插入資料失敗」"""
+        data = await request_data.get_json()
+        if await AsyncDynamoDBDao.insert_into_dynamodb(table_name, data):
+            return "插入資料成功"
+        else:
+            return "插入資料失敗"
+
+    @classmethod
+    async def scan_dynamodb(cls, table_name, request_data):
+        """查詢特定表格的內容, 參數與回傳格式同 Controller.scan_dynamodb"""
+        limit, page_token, segments, error = Controller._scan_args(request_data.args)
+        if error:
+            return error, 400
+        scan_kwargs = {}
+        if not Controller._bool_param(request_data.args, 'include_deleted', True):
+            scan_kwargs = await AsyncDynamoDBDao.active_scan_kwargs(table_name)
+
+        if limit is not None or page_token:
+            try:
+                items, next_token = await AsyncDynamoDBDao.scan_page(table_name, limit, page_token,
+                                                                     **scan_kwargs)
+            except ValueError as e:
+                return str(e), 400
+            except Exception as e:
+                logger.error("讀取資料出錯: %s", e)
+                return f"查詢資料表 {table_name} 失敗"
+            return jsonify({"Items": items, "NextToken": next_token})
+
+        if segments and segments > 1:
+            pages = AsyncDynamoDBDao.parallel_scan_pages(table_name, segments, **scan_kwargs)
+        else:
+            pages = (items async for items, _ in AsyncDynamoDBDao.scan_pages(table_name, **scan_kwargs))
+        return await cls._stream_pages(pages, Controller._wants_ndjson(request_data),
+                                       f"查詢資料表 {table_name} 失敗")
+
+    @staticmethod
+    async def _stream_pages(pages, ndjson, error_message):
+        """將逐頁產出的資料以串流回應回傳, 流程同 Controller._stream_pages"""
+        try:
+            first_page = await anext(pages, [])
+        except Exception as e:
+            logger.error("%s: %s", error_message, e)
+            return error_message
+
+        async def generate():
+            if not ndjson:
+                yield b'['
+            if first_page:
+                yield Controller._encode_page(first_page, ndjson, True)
+            first = not first_page
+            try:
+                async for page in pages:
+                    if not page:
+                        continue
+                    yield Controller._encode_page(page, ndjson, first)
+                    first = False
+            except Exception as e:
+                logger.error("%s: 串流中斷: %s", error_message, e)
+                return
+            if not ndjson:
+                yield b']'
+
+        mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+        return Response(generate(), mimetype=mimetype)
+
+    @classmethod
+    async def query_db(cls, table_name, id, request_data=None):
+        """查詢特定表格的特定 id 資料, 查無資料時回傳「查無資料」, include_deleted 同 Controller.query_db"""
+        include_deleted = request_data is None or Controller._bool_param(request_data.args, 'include_deleted', True)
+        response = await AsyncDynamoDBDao.query_dynamodb(table_name, id, include_deleted)
+        if response:
+            return jsonify(response)
+        else:
+            return "查無資料"
+
+    @classmethod
+    async def batch_get_dynamodb(cls, table_name, request_data):
+        """一次查詢特定表格的多個 id 資料, 參數與回傳格式同 Controller.batch_get_dynamodb"""
+        data = None if request_data.method == 'GET' else await request_data.get_json(silent=True)
+        ids, projection, error = Controller._batch_get_args(request_data.args, data)
+        if error:
+            return error, 400
+
+        try:
+            items = await AsyncDynamoDBDao.batch_get_dynamodb(table_name, ids, projection or None)
+        except ValueError as e:
+            return str(e), 400
+        except Exception as e:
+            logger.error("批次查詢資料出錯: %s", e)
+            return f"查詢資料表 {table_name} 失敗"
+        return jsonify({"Items": items})
+
+    @classmethod
+    async def update_dynamodb_data(cls, table_name, new_request_data):
+        """更新特定表格的特定資料, 參數與回傳格式同 Controller.update_dynamodb_data"""
+        data = await new_request_data.get_json()
+        try:
+            response = await AsyncDynamoDBDao.update_dynamodb_item(table_name, data)
+        except ValueError as e:
+            return str(e), 400
+        except ClientError as e:
+            if Controller._is_conditional_check_failed(e):
+                return "資料版本已變更, 請重新讀取後再更新", 409
+            raise
+        return jsonify(response)
+
+    @classmethod
+    async def soft_delete_item(cls, table_name, request_data):
+        """軟刪除資料, 回傳結果"""
+        data = await request_data.get_json()
+        try:
+            return jsonify(await AsyncDynamoDBDao.soft_delete_item(table_name, data))
+        except ValueError as e:
+            return str(e), 400
+
+    @classmethod
+    async def delete_item(cls, table_name, id, request_data=None):
+        """直接刪除資料, 回傳結果, sort_key 同 Controller.delete_item"""
+        sort_key = request_data.args.get('sort_key') if request_data is not None else None
+        try:
+            return str(await AsyncDynamoDBDao.delete_item(table_name, id, sort_key))
+        except ValueError as e:
+            return str(e), 400
+
+    @classmethod
+    async def get_cache_stats(cls):
+        """回傳 DynamoDB 單筆查詢快取的統計資料"""
+        stats = DynamoDBDao.get_cache_stats()
+        if stats is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, **stats})
+
+    # S3
+    @classmethod
+    async def check_s3_connection(cls):
+        """確認 S3 是否可以串接, 並回傳結果"""
+        return await AsyncS3Dao.check_s3_connection()
+
+    @classmethod
+    async def download_file(cls, bucket_name, data_request):
+        """下載 S3 物件, 直接以串流回傳給用戶端, 參數與回傳格式同 Controller.download_file"""
+        object_name = data_request.args.get("object_name")
+        file_name = data_request.args.get("file_name")
+        if not object_name:
+            return "缺少 object_name", 400
+
+        headers = data_request.headers
+        try:
+            response = await AsyncS3Dao.get_object(
+                bucket_name, object_name,
+                range_header=headers.get("Range"),
+                if_match=headers.get("If-Match"),
+                if_none_match=headers.get("If-None-Match"),
+                if_modified_since=data_request.if_modified_since,
+                if_unmodified_since=data_request.if_unmodified_since,
+            )
+        except ClientError as e:
+            return Controller._s3_error_response(e, "下載失敗")
+
+        body = response["Body"]
+
+        async def generate():
+            try:
+                async for chunk in body.iter_chunks(S3Dao.DOWNLOAD_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                body.close()
+
+        status, download_headers = Controller._download_headers(response, file_name)
+        return Response(generate(), status=status, headers=download_headers)
+
+    @classmethod
+    async def list_objects(cls, data_request):
+        """列出特定值區特定路徑下的物件, 參數與回傳格式同 Controller.list_objects"""
+        try:
+            args = Controller._list_args(data_request.args)
+        except ValueError as e:
+            return str(e), 400
+        bucket_name, prefix, delimiter = args['bucket_name'], args['prefix'], args['delimiter']
+        details = args['details']
+
+        if Controller._wants_ndjson(data_request):
+            pages = (Controller._ndjson_list_page(page, details)
+                     async for page in AsyncS3Dao.iter_object_pages(bucket_name, prefix, delimiter))
+            return await cls._stream_pages(pages, True, "列出物件失敗")
+
+        try:
+            if args['max_keys'] is not None or args['page_token']:
+                page = await AsyncS3Dao.list_objects_page(bucket_name, prefix, delimiter,
+                                                          args['max_keys'], args['page_token'])
+                return jsonify(Controller._format_list_page(page, details))
+
+            objects, prefixes = [], []
+            async for page in AsyncS3Dao.iter_object_pages(bucket_name, prefix, delimiter):
+                page = Controller._format_list_page(page, details)
+                objects.extend(page['objects'])
+                prefixes.extend(page['prefixes'])
+        except ClientError as e:
+            return Controller._s3_error_response(e, "列出物件失敗")
+        if not delimiter and not details:
+            return jsonify(objects)
+        return jsonify({'objects': objects, 'prefixes': prefixes, 'next_token': None})
@@ -1,10 +1,19 @@
-import boto3
+import logging
+import itertools
+from urllib.parse import quote
 
-from flask import jsonify
+from botocore.exceptions import ClientError
+from flask import jsonify, Response, stream_with_context
+from werkzeug.http import http_date
+from werkzeug.wsgi import wrap_file
 
+from daos.aws_client_factory import AWSClientFactory
 from daos.dynamodb_dao import DynamoDBDao
+from daos.dynamodb_marshaller import dumps, loads
 from daos.s3_dao import S3Dao
 
+logger = logging.getLogger(__name__)
+
 
 class Controller:
     """接收API輸入並處理、控制流程與調用組件"""
@@ -13,26 +22,19 @@ class Controller:
     def check_localstack_connection(cls):
         """確認 localstack 是否成功串接
         
-        呼叫 boto3 客戶端物件, 用此物件讀取 S3, 取得所有值區名稱
+        使用共用的 boto3 客戶端物件, 用此物件讀取 S3, 取得所有值區名稱
         若成功讀取, 回傳「成功連線到 LocalStack！」
         若失敗, 回傳「無法連線到 LocalStack： error」
         """
-        # 創建 s3 客戶端
-        s3 = boto3.client('s3',
-            region_name='us-east-1',  # 指定區域，localstack-pro 的默認區域是 us-east-1
-            endpoint_url='http://localstack:4566',  # localstack-pro 的 S3 服務 URL localstack 是 docker compose 的 container 服務名稱
-            aws_access_key_id='test',  # 測試用的 AWS 存取金鑰 ID
-            aws_secret_access_key='test' # 測試用的 AWS 秘密存取金鑰
-            )  
+        s3 = AWSClientFactory.client('s3')
         
         # 測試是否成功連線
         try:
             response = s3.list_buckets()["Buckets"]
-            print(f"值區清單: {response}")
-            print("成功連線到 LocalStack！")
+            logger.info("成功連線到 LocalStack, 值區: %s", [bucket["Name"] for bucket in response])
             return "成功連線到 LocalStack！"
         except Exception as e:
-            print("無法連線到 LocalStack：", str(e))
+            logger.error("無法連線到 LocalStack: %s", e)
             return "無法連線到 LocalStack：" + str(e)
  
     @classmethod
@@ -52,14 +54,30 @@ class Controller:
             return "無法連接到 LocalStack 的 DynamoDB 服務"
         
     @classmethod
-    def create_table(cls, table_name):
+    def create_table(cls, table_name, request_data=None):
         """建立新表格
         
-        使用 DynamoDBDao 創建表格, 
+        使用 DynamoDBDao 創建表格, 並等待表格可以使用
+        JSON body 可指定主鍵、排序鍵、索引、計費模式與 TTL 欄位 (格式見 DynamoDBDao._create_table_request)
+        若 query string 傳入 active_index=true, 一併建立只收錄未軟刪除資料的稀疏索引
         若成功創建, 回傳「表格 {table_name} 建立成功」
-        若失敗, 回傳「表格 {table_name} 建立失敗」
+        若失敗, 回傳「表格 {table_name} 建立失敗」, 表格定義格式錯誤時回傳 400
         """
-        response = DynamoDBDao.create_table(table_name)
+        definition = {}
+        if request_data is not None:
+            if request_data.content_length:
+                definition = request_data.get_json(silent=True)
+                if not isinstance(definition, dict):
+                    return "表格定義必須是 JSON 物件", 400
+            if cls._bool_param(request_data.args, 'active_index', False):
+                definition = {**definition, 'active_index': True}
+        try:
+            response = DynamoDBDao.create_table(table_name, definition)
+        except ValueError as e:
+            return str(e), 400
+        except ClientError as e:
+            logger.error("無法建立 DynamoDB 表格 %s: %s", table_name, e)
+            response = False
 
         if response:
             return f"表格 {table_name} 建立成功"
@@ -83,45 +101,223 @@ class Controller:
             return "插入資料失敗"
     
     @classmethod
-    def scan_dynamodb(cls, table_name):
+    def batch_insert_into_dynamodb(cls, table_name, request_data):
+        """批次插入資料到資料表
+
+        接受 JSON 陣列, 或 Content-Type 為 application/x-ndjson 的串流 (每行一筆 JSON)
+        NDJSON 會邊讀取邊寫入, 不需先把整個 request body 讀進記憶體
+        使用 DynamoDBDao 的批次插入功能, 回傳成功、失敗筆數與每筆資料的結果
+        """
+        if request_data.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            items = cls._iter_ndjson(request_data.stream)
+        else:
+            items = request_data.get_json(silent=True)
+            if not isinstance(items, list):
+                return "請傳入 JSON 陣列或 NDJSON", 400
+
+        results = DynamoDBDao.batch_insert_into_dynamodb(table_name, items)
+        succeeded = sum(1 for result in results if result["success"])
+        return jsonify({
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+        })
+
+    @staticmethod
+    def _iter_ndjson(stream):
+        """逐行解析 NDJSON, 無法解析的行原樣產出, 交由 DAO 回報該筆失敗"""
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                yield line.decode('utf-8', 'replace')
+
+    @classmethod
+    def scan_dynamodb(cls, table_name, request_data):
         """查詢特定表格的內容
 
-        使用 DynamoDBDao 的查詢資料表功能
-        若成功, 則回傳「查詢的結果」
+        若有傳入 limit 或 page_token, 只回傳一頁資料與下一頁的 NextToken (JSON)
+        否則逐頁讀取整張表, 並以串流方式回傳
+        若有傳入 segments=N (N > 1), 以 N 段平行掃描整張表, 資料順序不固定
+        - format=ndjson 或 Accept: application/x-ndjson, 每行一筆 JSON
+        - 其他情況, 回傳分段傳輸的 JSON 陣列
+        若有傳入 include_deleted=false, 只回傳未軟刪除的資料 (表格有稀疏索引時只讀取索引)
         若失敗, 則回傳「查詢資料表 {table_name} 失敗」
         """
-        response = DynamoDBDao.scan_dynamodb(table_name)
-        if response:
-            return response
+        limit, page_token, segments, error = cls._scan_args(request_data.args)
+        if error:
+            return error, 400
+        scan_kwargs = {}
+        if not cls._bool_param(request_data.args, 'include_deleted', True):
+            scan_kwargs = DynamoDBDao.active_scan_kwargs(table_name)
+
+        if limit is not None or page_token:
+            try:
+                items, next_token = DynamoDBDao.scan_page(table_name, limit, page_token, **scan_kwargs)
+            except ValueError as e:
+                return str(e), 400
+            except Exception as e:
+                logger.error("讀取資料出錯: %s", e)
+                return f"查詢資料表 {table_name} 失敗"
+            return jsonify({"Items": items, "NextToken": next_token})
+
+        if segments and segments > 1:
+            pages = DynamoDBDao.parallel_scan_pages(table_name, segments, **scan_kwargs)
         else:
-            return f"查詢資料表 {table_name} 失敗"
+            pages = (items for items, _ in DynamoDBDao.scan_pages(table_name, **scan_kwargs))
+        return cls._stream_pages(pages, cls._wants_ndjson(request_data),
+                                 f"查詢資料表 {table_name} 失敗")
+
+    @classmethod
+    def _scan_args(cls, args):
+        """解析查詢表格的 query string, 回傳 (limit, page_token, segments, 錯誤訊息)"""
+        try:
+            limit = cls._int_param(args, 'limit')
+            segments = cls._int_param(args, 'segments')
+        except ValueError as e:
+            return None, None, None, str(e)
+        page_token = args.get('page_token')
+        error = None
+        if segments is not None:
+            if limit is not None or page_token:
+                error = "segments 不可與 limit、page_token 同時使用"
+            elif not 1 <= segments <= DynamoDBDao.SCAN_MAX_SEGMENTS:
+                error = f"segments 必須介於 1 到 {DynamoDBDao.SCAN_MAX_SEGMENTS} 之間"
+        return limit, page_token, segments, error
+
+    @staticmethod
+    def _wants_ndjson(request_data):
+        """判斷用戶是否要求 NDJSON 格式"""
+        if request_data.args.get('format') == 'ndjson':
+            return True
+        return request_data.accept_mimetypes.best == 'application/x-ndjson'
+
+    @staticmethod
+    def _stream_pages(pages, ndjson, error_message):
+        """將逐頁產出的資料以串流回應回傳
+
+        先讀取第一頁, 讓表格不存在等錯誤仍能以一般回應告知用戶
+        之後每一頁編碼成一個 chunk 送出, 記憶體中最多只保留一頁資料
+        串流途中出錯時直接中斷, JSON 陣列不會補上結尾, 讓用戶端能察覺資料不完整
+        """
+        try:
+            first_page = next(pages, [])
+        except Exception as e:
+            logger.error("%s: %s", error_message, e)
+            return error_message
+
+        def generate():
+            if not ndjson:
+                yield b'['
+            first = True
+            try:
+                for page in itertools.chain((first_page,), pages):
+                    if not page:
+                        continue
+                    yield Controller._encode_page(page, ndjson, first)
+                    first = False
+            except Exception as e:
+                logger.error("%s: 串流中斷: %s", error_message, e)
+                return
+            if not ndjson:
+                yield b']'
+
+        mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+        return Response(stream_with_context(generate()), mimetype=mimetype)
+
+    @staticmethod
+    def _encode_page(page, ndjson, first):
+        """將一頁資料編碼成串流回應的一個 chunk (bytes), JSON 陣列時除第一頁外以逗號開頭"""
+        if ndjson:
+            return b''.join(dumps(item) + b'\n' for item in page)
+        chunk = b','.join(dumps(item) for item in page)
+        return chunk if first else b',' + chunk
         
     @classmethod
-    def query_db(cls, table_name, id):
+    def query_db(cls, table_name, id, request_data=None):
         """查詢特定表格的特定 id 資料
 
         使用 DynamoDBDao 的查詢資料功能, 查詢特定表格的特定主鍵的值
+        若有傳入 include_deleted=false, 已軟刪除的資料視為查無資料
         若成功, 回傳該值
         若失敗, 回傳「查無資料」
         """
-        response = DynamoDBDao.query_dynamodb(table_name, id)
+        include_deleted = request_data is None or cls._bool_param(request_data.args, 'include_deleted', True)
+        response = DynamoDBDao.query_dynamodb(table_name, id, include_deleted)
 
         if response:
             return response
         else:
             return "查無資料"
     
+    @classmethod
+    def batch_get_dynamodb(cls, table_name, request_data):
+        """一次查詢特定表格的多個 id 資料
+
+        id 可由 query string 傳入 (ids=a,b,c&projection=Name,Age)
+        或由 JSON body 傳入 ({"ids": ["a", "b"], "projection": ["Name"]})
+        使用 DynamoDBDao 的批次查詢功能, 依 id 順序回傳資料, 查無資料的位置為 null
+        若失敗, 則回傳「查詢資料表 {table_name} 失敗」
+        """
+        data = None if request_data.method == 'GET' else request_data.get_json(silent=True)
+        ids, projection, error = cls._batch_get_args(request_data.args, data)
+        if error:
+            return error, 400
+
+        try:
+            items = DynamoDBDao.batch_get_dynamodb(table_name, ids, projection or None)
+        except ValueError as e:
+            return str(e), 400
+        except Exception as e:
+            logger.error("批次查詢資料出錯: %s", e)
+            return f"查詢資料表 {table_name} 失敗"
+        return jsonify({"Items": items})
+
+    @staticmethod
+    def _batch_get_args(args, data=None):
+        """解析批次查詢的 id 與 projection, 回傳 (ids, projection, 錯誤訊息)
+
+        data 為 None 時由 query string 解析, 否則由 JSON body 解析
+        """
+        if data is None:
+            ids = [id for id in args.get('ids', '').split(',') if id]
+            projection = [name for name in args.get('projection', '').split(',') if name]
+            return ids, projection, None
+        if not isinstance(data, dict):
+            return None, None, "ids 與 projection 必須是 JSON 陣列"
+        ids = data.get('ids')
+        projection = data.get('projection')
+        if not isinstance(ids, list) or (projection is not None and not isinstance(projection, list)):
+            return None, None, "ids 與 projection 必須是 JSON 陣列"
+        return ids, projection, None
+
     @classmethod
     def update_dynamodb_data(cls, table_name, new_request_data):
         """更新特定表格的特定資料
 
         取出 用戶傳的資料
         使用 DynamoDBDao 的更新資料方法, 傳入表格名稱與資料
-        回傳結果
+        可用 "$remove"、"$add" 移除或累加欄位, 用 "$version" 指定目前的版本號做樂觀鎖
+        回傳結果, 格式錯誤時回傳 400, 版本號不符時回傳 409
         """
         data = new_request_data.get_json()
-        response = DynamoDBDao.update_dynamodb_item(table_name, data)
+        try:
+            response = DynamoDBDao.update_dynamodb_item(table_name, data)
+        except ValueError as e:
+            return str(e), 400
+        except ClientError as e:
+            if cls._is_conditional_check_failed(e):
+                return "資料版本已變更, 請重新讀取後再更新", 409
+            raise
         return response
+
+    @staticmethod
+    def _is_conditional_check_failed(error):
+        """是否為 ConditionExpression 不成立 (例如樂觀鎖的版本號不符) 的錯誤"""
+        return error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
     
     @classmethod
     def soft_delete_item(cls, table_name, request_data):
@@ -131,18 +327,37 @@ class Controller:
         使用 DynamoDBDao 的 軟刪除功能, 並傳入表格名稱與資料
         """
         data = request_data.get_json()
-        response = DynamoDBDao.soft_delete_item(table_name, data)
+        try:
+            response = DynamoDBDao.soft_delete_item(table_name, data)
+        except ValueError as e:
+            return str(e), 400
         return response
     
     @classmethod
-    def delete_item(cls, table_name, id):
+    def delete_item(cls, table_name, id, request_data=None):
         """直接刪除資料
 
         使用 DynamoDBDao 的刪除方法並傳入表格名稱與特定 ID 進行刪除
+        有排序鍵的表格以 query string 的 sort_key 傳入排序鍵的值
         """
-        response = DynamoDBDao.delete_item(table_name, id)
+        sort_key = request_data.args.get('sort_key') if request_data is not None else None
+        try:
+            response = DynamoDBDao.delete_item(table_name, id, sort_key)
+        except ValueError as e:
+            return str(e), 400
         return str(response)
     
+    @classmethod
+    def get_cache_stats(cls):
+        """回傳 DynamoDB 單筆查詢快取的命中、未命中與淘汰次數
+
+        若未啟用快取, 回傳 {"enabled": false}
+        """
+        stats = DynamoDBDao.get_cache_stats()
+        if stats is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, **stats})
+
     # S3
     @classmethod
     def check_s3_connection(cls):
@@ -168,58 +383,147 @@ class Controller:
     def upload_s3_object(cls, bucket_name, data_request):
         """上傳 S3 物件到特定值區
 
-        接收用戶傳過來的物件名稱與檔案 byte
-        使用 S3Dao 的上傳物件方法, 
+        接收用戶傳過來的物件名稱與檔案串流
+        使用 S3Dao 的串流上傳方法, 大檔案會自動以 multipart upload 分段上傳
         若成功, 回傳「上傳成功」, 
         若失敗, 回傳「上傳失敗」        
         """
-        object_name = data_request.form["object_name"]
-        print(object_name)
-        data_byte = data_request.files["file"].read()
-        print("data_byte")
-        print(data_byte)
-        response = S3Dao.upload_bytes(bucket_name, object_name, data_byte)
+        object_name, stream, content_type = cls._get_upload_stream(data_request)
+        if not object_name:
+            return "缺少 object_name", 400
+        logger.debug("上傳物件 %s/%s", bucket_name, object_name)
+        response = S3Dao.upload_stream(bucket_name, object_name, stream, content_type)
         
         if response:
             return "上傳成功"
         else:
             return "上傳失敗"
+
+    @staticmethod
+    def _get_upload_stream(data_request):
+        """取出上傳的物件名稱、檔案串流與 Content-Type
+
+        - multipart/form-data: 物件名稱取自 form 的 object_name, 檔案取自 files 的 file
+        - 其他 Content-Type: 物件名稱取自 query string 的 object_name, 整個 request body 即為檔案內容,
+          不經過表單解析, 直接從連線串流上傳
+        """
+        if data_request.mimetype == 'multipart/form-data':
+            file = data_request.files.get("file")
+            if file is None:
+                return None, None, None
+            return data_request.form.get("object_name"), file.stream, file.mimetype or None
+        return data_request.args.get("object_name"), data_request.stream, data_request.mimetype or None
         
     @classmethod
     def download_file(cls, bucket_name, data_request):
-        """下載檔案至程式碼所在的專案資料夾
+        """下載 S3 物件, 直接以串流回傳給用戶端
         
-        獲取用戶傳的物件名稱與檔案名稱
-        使用 S3Dao 的下載檔案功能, 將檔案下載到程式碼所在的專案資料夾
-        若成功, 回傳「下載成功」
+        獲取用戶傳的物件名稱 (object_name) 與下載時的檔案名稱 (file_name, 可省略)
+        使用 S3Dao 的取得物件功能, 將物件內容逐段轉送到 HTTP 回應, 不會暫存到伺服器磁碟
+        - 支援 Range, 回傳 206 與 Content-Range, 可續傳或平行下載不同範圍
+        - 回傳 ETag、Last-Modified, 支援 If-None-Match、If-Modified-Since 條件下載 (304)
+        - 本機 S3 後端 (S3_BACKEND=local) 下載整個物件時, 交給 WSGI 伺服器的 file_wrapper 傳送檔案 (例如 sendfile)
+        若物件不存在, 回傳「下載失敗: 物件不存在」(404)
         若失敗, 回傳「下載失敗」
         """
-        object_name = data_request.form["object_name"]
-        file_name = data_request.form["file_name"]
-        response = S3Dao.download_file(bucket_name, object_name, file_name)
-        if response:
-            return "下載成功"
+        object_name = data_request.args.get("object_name") or data_request.form.get("object_name")
+        file_name = data_request.args.get("file_name") or data_request.form.get("file_name")
+        if not object_name:
+            return "缺少 object_name", 400
+
+        headers = data_request.headers
+        try:
+            response = S3Dao.get_object(
+                bucket_name, object_name,
+                range_header=headers.get("Range"),
+                if_match=headers.get("If-Match"),
+                if_none_match=headers.get("If-None-Match"),
+                if_modified_since=data_request.if_modified_since,
+                if_unmodified_since=data_request.if_unmodified_since,
+            )
+        except ClientError as e:
+            return cls._s3_error_response(e, "下載失敗")
+
+        body = response["Body"]
+        status, download_headers = cls._download_headers(response, file_name)
+        whole_file = body.whole_file() if hasattr(body, "whole_file") else None
+        if whole_file is not None:
+            content = wrap_file(data_request.environ, whole_file, S3Dao.DOWNLOAD_CHUNK_SIZE)
         else:
-            return "下載失敗"
+            content = body.iter_chunks(S3Dao.DOWNLOAD_CHUNK_SIZE)
+        download = Response(
+            content,
+            status=status,
+            headers=download_headers,
+            direct_passthrough=True,
+        )
+        download.call_on_close(body.close)
+        return download
+
+    @staticmethod
+    def _download_headers(response, file_name=None):
+        """依 get_object 的回應建立下載回應的狀態碼與標頭"""
+        headers = {
+            "Content-Type": response.get("ContentType") or "application/octet-stream",
+            "Content-Length": str(response["ContentLength"]),
+            "Accept-Ranges": "bytes",
+        }
+        if response.get("ContentRange"):
+            headers["Content-Range"] = response["ContentRange"]
+        if response.get("ETag"):
+            headers["ETag"] = response["ETag"]
+        if response.get("LastModified"):
+            headers["Last-Modified"] = http_date(response["LastModified"])
+        if file_name:
+            headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(file_name)}"
+        return (206 if response.get("ContentRange") else 200), headers
+
+    @staticmethod
+    def _s3_error_response(error, message):
+        """將 S3 的 ClientError 轉換成對應的 HTTP 回應"""
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if code in ("304", "NotModified") or status == 304:
+            return "", 304
+        if code in ("412", "PreconditionFailed") or status == 412:
+            return f"{message}: 條件不成立", 412
+        if code == "ConditionalRequestConflict" or status == 409:
+            return f"{message}: 物件正被同時寫入, 請重試", 409
+        if code == "InvalidRange" or status == 416:
+            return f"{message}: 範圍無效", 416
+        if code in ("404", "NoSuchKey", "NoSuchBucket") or status == 404:
+            return f"{message}: 物件不存在", 404
+        logger.error("%s: %s", message, error)
+        return message
         
     @classmethod
     def update_s3_object(cls, bucket_name, data_request):
         """更新 S3 物件
         
-        獲取用戶傳的物件名稱、檔案 byte
-        使用 S3Dao 的更新物件方法, 傳入值區名稱、物件名稱與物件的 byte
-        若成功, 回傳「更新成功」
-        若失敗, 回傳「更新失敗」
+        獲取用戶傳的物件名稱、檔案串流 (格式同上傳物件)
+        使用 S3Dao 的覆寫物件方法, 傳入值區名稱、物件名稱與檔案串流
+        可帶 If-Match (物件的 ETag 相同時才更新, 避免覆蓋其他人的更新) 或 If-None-Match: * (物件不存在時才建立)
+        若成功, 回傳「更新成功」, ETag 標頭為物件新的 ETag
+        若條件不成立, 回傳 412; 若失敗, 回傳「更新失敗」
         """
-        object_name = data_request.form["object_name"]
-        print(object_name)
-        data_byte = data_request.files["file"].read()
-        print("data_byte")
-        # print(data_byte)
-        response = S3Dao.update_object(bucket_name, object_name, data_byte)
+        object_name, stream, content_type = cls._get_upload_stream(data_request)
+        if not object_name:
+            return "缺少 object_name", 400
+        logger.debug("更新物件 %s/%s", bucket_name, object_name)
+        try:
+            etag = S3Dao.replace_object(bucket_name, object_name, stream, content_type,
+                                        if_match=data_request.headers.get("If-Match"),
+                                        if_none_match=data_request.headers.get("If-None-Match"))
+        except ValueError as e:
+            return str(e), 400
+        except ClientError as e:
+            return cls._s3_error_response(e, "更新失敗")
+        except Exception as e:
+            logger.error("更新物件失敗 %s/%s: %s", bucket_name, object_name, e)
+            return "更新失敗"
         
-        if response:
-            return "更新成功"
+        if etag is not None:
+            return "更新成功", 200, {"ETag": etag}
         else:
             return "更新失敗"
     
@@ -232,14 +536,237 @@ class Controller:
         """
         object_name = data_request.form["object_name"]
         return S3Dao.delete_object(bucket_name, object_name)
+
+    @classmethod
+    def delete_s3_objects(cls, bucket_name, data_request):
+        """批次刪除 S3 特定值區的物件
+
+        JSON body:
+        keys: 物件名稱的清單, 或 prefix: 刪除此路徑下的所有物件 (擇一)
+        dry_run: true 時只回傳符合的物件數, 不刪除
+        回傳 {"count", "deleted", "errors": [{"key", "code", "message"}]}
+        """
+        def delete(params):
+            return S3Dao.delete_objects(bucket_name, params.get("keys"), params.get("prefix"),
+                                        dry_run=cls._bool_param(params, "dry_run"))
+        return cls._params_response(delete, data_request, "批次刪除失敗")
+
+    @classmethod
+    def copy_s3_objects(cls, bucket_name, data_request, delete_source=False):
+        """在 S3 內複製 (delete_source 時為搬移) 物件, 內容不經過應用程式
+
+        JSON body:
+        object_name 與 dest_object_name: 複製單一物件, 或 prefix 與 dest_prefix: 複製路徑下的所有物件 (擇一)
+        dest_bucket: 目的值區, 未傳入時為同一值區
+        回傳 {"count", "copied", "errors": [{"key", "code", "message"}]}, 搬移時另有 "deleted"
+        """
+        def copy(params):
+            return S3Dao.copy_objects(bucket_name, params.get("dest_bucket"),
+                                      params.get("object_name"), params.get("dest_object_name"),
+                                      params.get("prefix"), params.get("dest_prefix"), delete_source=delete_source)
+        return cls._params_response(copy, data_request, "搬移失敗" if delete_source else "複製失敗")
     
+    # 預先簽署網址: 瀏覽器直接與 S3 傳輸物件內容, 應用程式只負責簽署
     @classmethod
-    def get_all_object_names_from_bucket_and_directory(cls, bucket_name, prefix):
-        """獲取所有物件的名稱
+    def presign_s3_object(cls, bucket_name, data_request):
+        """產生下載 (GET) 或上傳 (PUT) 物件的預先簽署網址
 
-        使用 S3Dao 的方法 - 獲取特定值區的特定路徑的所有物件名稱
-        回傳所有物件名稱的清單
+        query string:
+        object_name: 物件名稱
+        method: GET (預設) 或 PUT
+        expires: 網址的有效秒數
+        file_name: GET 時下載的檔案名稱
+        content_type, content_length: PUT 時列入簽章, 上傳時必須帶上相同的標頭
         """
-        file_list = S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket_name, prefix)
-        
-        return jsonify(file_list)
\ No newline at end of file
+        def presign(params):
+            object_name = cls._required(params, 'object_name')
+            method = (params.get('method') or 'GET').upper()
+            expires = cls._int_param(params, 'expires')
+            if method == 'GET':
+                return S3Dao.presign_get(bucket_name, object_name, expires, params.get('file_name'))
+            if method == 'PUT':
+                return S3Dao.presign_put(bucket_name, object_name, expires, params.get('content_type'),
+                                         cls._int_param(params, 'content_length'))
+            raise ValueError("method 必須是 GET 或 PUT")
+        return cls._params_response(presign, data_request, "產生預先簽署網址失敗")
+
+    @classmethod
+    def presign_s3_post(cls, bucket_name, data_request):
+        """產生瀏覽器以 HTML 表單上傳的預先簽署 POST (url 與表單欄位 fields)
+
+        參數 (JSON body 或 query string): object_name, expires, content_type, max_size, min_size
+        """
+        def presign(params):
+            return S3Dao.presign_post(bucket_name, cls._required(params, 'object_name'),
+                                      cls._int_param(params, 'expires'), params.get('content_type'),
+                                      cls._int_param(params, 'max_size'), cls._int_param(params, 'min_size') or 0)
+        return cls._params_response(presign, data_request, "產生預先簽署表單失敗")
+
+    @classmethod
+    def create_multipart_upload(cls, bucket_name, data_request):
+        """建立分段上傳, 回傳 upload_id、每段大小與每一段的預先簽署網址
+
+        參數 (JSON body 或 query string): object_name, size (檔案的位元組數), expires, content_type, part_size
+        """
+        def presign(params):
+            return S3Dao.create_presigned_multipart_upload(
+                bucket_name, cls._required(params, 'object_name'), cls._int_param(params, 'size', required=True),
+                cls._int_param(params, 'expires'), params.get('content_type'), cls._int_param(params, 'part_size'))
+        return cls._params_response(presign, data_request, "建立分段上傳失敗")
+
+    @classmethod
+    def presign_multipart_parts(cls, bucket_name, upload_id, data_request):
+        """重新產生分段上傳中指定段的預先簽署網址 (例如網址已過期)
+
+        參數 (JSON body): object_name, part_numbers ([1, 2, ...]), expires
+        """
+        def presign(params):
+            part_numbers = params.get('part_numbers')
+            if not isinstance(part_numbers, list) or not part_numbers:
+                raise ValueError("part_numbers 必須是段號的清單")
+            return {'parts': S3Dao.presign_parts(
+                bucket_name, cls._required(params, 'object_name'), upload_id,
+                [cls._int_param({'part_number': number}, 'part_number') for number in part_numbers],
+                cls._int_param(params, 'expires'))}
+        return cls._params_response(presign, data_request, "產生預先簽署網址失敗")
+
+    @classmethod
+    def complete_multipart_upload(cls, bucket_name, upload_id, data_request):
+        """合併分段上傳
+
+        參數 (JSON body): object_name, parts ([{"part_number": 1, "etag": "..."}], etag 為上傳每一段時回應的 ETag)
+        """
+        def complete(params):
+            parts = params.get('parts')
+            if not isinstance(parts, list):
+                raise ValueError("parts 必須是 [{part_number, etag}] 的清單")
+            etag = S3Dao.complete_multipart_upload(bucket_name, cls._required(params, 'object_name'),
+                                                   upload_id, parts)
+            return {'etag': etag}
+        return cls._params_response(complete, data_request, "合併分段上傳失敗")
+
+    @classmethod
+    def abort_multipart_upload(cls, bucket_name, upload_id, data_request):
+        """取消分段上傳, 刪除已上傳的段 (query string: object_name)"""
+        def abort(params):
+            S3Dao.abort_multipart_upload(bucket_name, cls._required(params, 'object_name'), upload_id)
+            return {'aborted': True}
+        return cls._params_response(abort, data_request, "取消分段上傳失敗")
+
+    @classmethod
+    def _params_response(cls, handler, data_request, message):
+        """以 query string 與 JSON body 的參數呼叫 handler, 將結果以 JSON 回傳
+
+        參數錯誤回傳 400, 本機 S3 後端不支援時回傳 501, S3 的錯誤依 _s3_error_response 轉換
+        """
+        params = data_request.args.to_dict()
+        if data_request.content_length:
+            body = data_request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return "參數必須是 JSON 物件", 400
+            params.update(body)
+        try:
+            return jsonify(handler(params))
+        except ValueError as e:
+            return str(e), 400
+        except NotImplementedError as e:
+            return str(e), 501
+        except ClientError as e:
+            return cls._s3_error_response(e, message)
+
+    @staticmethod
+    def _required(params, name):
+        value = params.get(name)
+        if not value or not isinstance(value, str):
+            raise ValueError(f"缺少 {name}")
+        return value
+
+    @staticmethod
+    def _bool_param(params, name, default=False):
+        """取出布林參數 (JSON 的 true/false 或 query string 的 true/1/yes), 未傳入時回傳 default"""
+        value = params.get(name)
+        if value is None:
+            return default
+        if isinstance(value, str):
+            return value.lower() in ('1', 'true', 'yes')
+        return value is True
+
+    @staticmethod
+    def _int_param(params, name, required=False):
+        """取出整數參數 (JSON 的數值或 query string 的字串), 未傳入時回傳 None, 格式錯誤時拋出 ValueError"""
+        value = params.get(name)
+        if value is None or value == '':
+            if required:
+                raise ValueError(f"缺少 {name}")
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"{name} 必須是整數")
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{name} 必須是整數") from None
+
+    @classmethod
+    def list_objects(cls, data_request):
+        """列出特定值區特定路徑下的物件
+
+        query string:
+        bucket, prefix: 值區名稱與路徑開頭
+        delimiter: 以資料夾方式瀏覽, 子資料夾會列在 prefixes
+        max_keys, page_token: 只回傳一頁, 並附上下一頁的 next_token
+        details: true 時每個物件附上 Size、LastModified、ETag, 不需再逐一 head_object
+        format: ndjson 時以串流逐行回傳完整清單 (物件為 {"Key", ...}, 子資料夾為 {"Prefix"})
+        皆未指定時, 回傳所有物件名稱的清單
+        """
+        try:
+            args = cls._list_args(data_request.args)
+        except ValueError as e:
+            return str(e), 400
+        bucket_name, prefix, delimiter = args['bucket_name'], args['prefix'], args['delimiter']
+        details = args['details']
+
+        if cls._wants_ndjson(data_request):
+            pages = (cls._ndjson_list_page(page, details)
+                     for page in S3Dao.iter_object_pages(bucket_name, prefix, delimiter))
+            return cls._stream_pages(pages, True, "列出物件失敗")
+
+        try:
+            if args['max_keys'] is not None or args['page_token']:
+                page = S3Dao.list_objects_page(bucket_name, prefix, delimiter,
+                                               args['max_keys'], args['page_token'])
+                return jsonify(cls._format_list_page(page, details))
+            if not delimiter and not details:
+                return jsonify(S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket_name, prefix))
+
+            objects, prefixes = [], []
+            for page in S3Dao.iter_object_pages(bucket_name, prefix, delimiter):
+                page = cls._format_list_page(page, details)
+                objects.extend(page['objects'])
+                prefixes.extend(page['prefixes'])
+        except ClientError as e:
+            return cls._s3_error_response(e, "列出物件失敗")
+        return jsonify({'objects': objects, 'prefixes': prefixes, 'next_token': None})
+
+    @classmethod
+    def _list_args(cls, args):
+        """解析列出物件的 query string, 缺少 bucket 或 max_keys 不是整數時拋出 ValueError"""
+        return {
+            'bucket_name': cls._required(args, 'bucket'),
+            'prefix': args.get('prefix') or '',
+            'delimiter': args.get('delimiter'),
+            'max_keys': cls._int_param(args, 'max_keys'),
+            'page_token': args.get('page_token'),
+            'details': cls._bool_param(args, 'details'),
+        }
+
+    @staticmethod
+    def _format_list_page(page, details):
+        """整理一頁的物件清單, details 為 False 時只保留物件名稱"""
+        objects = page['objects'] if details else [obj['Key'] for obj in page['objects']]
+        return {'objects': objects, 'prefixes': page['prefixes'], 'next_token': page['next_token']}
+
+    @staticmethod
+    def _ndjson_list_page(page, details):
+        """將一頁的物件清單轉成 NDJSON 的每一行 (物件為 {"Key", ...}, 子資料夾為 {"Prefix"})"""
+        return ([obj if details else {'Key': obj['Key']} for obj in page['objects']]
+                + [{'Prefix': common_prefix} for common_prefix in page['prefixes']])
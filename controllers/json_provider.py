@@ -0,0 +1,19 @@
+from flask.json.provider import DefaultJSONProvider
+
+from daos.dynamodb_marshaller import dumps, loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """以 dynamodb_marshaller 的 dumps/loads 取代標準函式庫的 json
+
+    有安裝 orjson 時 jsonify 與 request.get_json 都改用 orjson
+    bytes、集合、Decimal 等 DynamoDB 的型別也能直接回傳
+    輸出一律為緊湊格式, 不排序 key, 非 ASCII 字元不跳脫
+    Quart 的 JSON provider 與 Flask 相同, 非同步模式也使用這個類別
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
@@ -0,0 +1,161 @@
+import os
+import sys
+import copy
+import json
+import atexit
+import logging
+import threading
+import logging.handlers
+from queue import SimpleQueue
+
+# LogRecord 本身的屬性, 其餘屬性 (logger.info(..., extra={...}) 傳入的欄位) 輸出到 JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """將 log 輸出成一行一筆的 JSON
+
+    固定欄位: time、level、logger、message、module、function、line、thread
+    extra 傳入的欄位原樣加入, 有例外時加上 exception (traceback 文字)
+    """
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """依比例取樣 DEBUG 的 log, 例如 rate=0.01 時相同訊息樣板每 100 筆只保留 1 筆
+
+    以 (logger 名稱, 訊息樣板) 分別計數, 每種事件的第一筆一定保留, INFO 以上不取樣
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if not self.every:
+            return False
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """在呼叫端只組合訊息與例外文字, 格式化與輸出都在 QueueListener 的執行緒中進行"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class LogConfig:
+    """設定整個 logging 階層 (root logger)
+
+    - 所有 log 先放進佇列 (QueueHandler), 由背景執行緒的 QueueListener 寫到 stderr, 呼叫端不會等待 I/O
+    - 輸出格式由 LOG_FORMAT 決定: json (預設, 一行一筆 JSON) 或 text
+    - LOG_LEVEL 為預設的等級, LOG_LEVELS 可個別設定模組的等級, 例如 daos.dynamodb_dao=DEBUG,botocore=WARNING
+    - LOG_DEBUG_SAMPLE_RATE 小於 1 時依比例取樣 DEBUG 的 log (例如 0.01)
+    - 重複呼叫 configure 不會重複設定, 行程結束時自動停止 QueueListener 並送出剩餘的 log
+    """
+
+    TEXT_FORMAT = '[%(asctime)s] %(levelname)s in %(name)s: %(message)s'
+
+    _listener = None
+    _handler = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, app=None, stream=None):
+        """設定 root logger, 傳入 Flask 應用程式時改由 root logger 處理 app.logger 的輸出"""
+        with cls._lock:
+            if cls._listener is None:
+                output = logging.StreamHandler(stream or sys.stderr)
+                if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+                    output.setFormatter(logging.Formatter(cls.TEXT_FORMAT))
+                else:
+                    output.setFormatter(JSONFormatter())
+                log_queue = SimpleQueue()
+                cls._handler = _QueueHandler(log_queue)
+                # 在放進佇列前取樣, 被捨棄的 log 不會佔用佇列與背景執行緒
+                sample_rate = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1'))
+                if sample_rate < 1:
+                    cls._handler.addFilter(SamplingFilter(sample_rate))
+                cls._listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+                cls._listener.start()
+                atexit.register(cls.shutdown)
+
+                root = logging.getLogger()
+                root.addHandler(cls._handler)
+                root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+                for name, level in cls.module_levels().items():
+                    logging.getLogger(name).setLevel(level)
+
+        if app is not None:
+            from flask.logging import default_handler
+            app.logger.removeHandler(default_handler)
+        return cls._listener
+
+    @classmethod
+    def after_fork(cls):
+        """在 fork 出的子行程 (例如 gunicorn 的 worker) 中重新啟動背景執行緒
+
+        父行程的 QueueListener 執行緒不會複製到子行程, 需重新建立佇列與執行緒, 否則子行程的 log 不會輸出
+        """
+        cls._lock = threading.Lock()
+        if cls._listener is None:
+            return
+        logging.getLogger().removeHandler(cls._handler)
+        cls._listener = None
+        cls._handler = None
+        cls.configure()
+
+    @staticmethod
+    def module_levels():
+        """解析 LOG_LEVELS, 回傳 {logger 名稱: 等級}"""
+        levels = {}
+        for pair in os.getenv('LOG_LEVELS', '').split(','):
+            name, _, level = pair.partition('=')
+            if name.strip() and level.strip():
+                levels[name.strip()] = level.strip().upper()
+        return levels
+
+    @classmethod
+    def shutdown(cls):
+        """停止 QueueListener, 送出佇列中剩餘的 log"""
+        with cls._lock:
+            if cls._listener is None:
+                return
+            cls._listener.stop()
+            logging.getLogger().removeHandler(cls._handler)
+            cls._listener = None
+            cls._handler = None
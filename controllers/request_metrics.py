@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+
+from flask import g, request
+
+from daos.metrics import REGISTRY, AWSCallMetrics, metrics_enabled
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetrics:
+    """量測每個 HTTP 請求的延遲, 並區分應用程式本身與等待 AWS 的時間
+
+    - 以路由的樣板 (例如 /table/<table_name>) 作為標籤, 不同的表格或 id 不會產生新的時間序列
+    - http_request_aws_seconds 為請求中 AWS 呼叫的總時間, 與 http_request_duration_seconds 相減即為應用程式本身的開銷
+    - 請求時間超過 METRICS_SLOW_REQUEST_MS 毫秒時, 記錄一筆慢請求的 log, 附上每次 AWS 呼叫的時間
+    - 串流回應 (NDJSON、檔案下載) 在送完最後一段後才結束計時
+    """
+
+    requests = REGISTRY.counter('http_requests', 'HTTP 請求次數', ('method', 'route', 'status'))
+    duration = REGISTRY.histogram('http_request_duration_seconds', 'HTTP 請求的處理時間', ('method', 'route'))
+    aws_duration = REGISTRY.histogram('http_request_aws_seconds', 'HTTP 請求中等待 AWS 呼叫的時間',
+                                      ('method', 'route'))
+    bytes_received = REGISTRY.counter('http_request_bytes', '收到的 request body 位元組數', ('method', 'route'))
+    bytes_sent = REGISTRY.counter('http_response_bytes', '送出的 response body 位元組數 (已知長度的回應)',
+                                  ('method', 'route'))
+
+    @classmethod
+    def init_app(cls, app):
+        """在 Flask 應用程式註冊量測的 hook"""
+        if not metrics_enabled():
+            return
+
+        @app.before_request
+        def start_request_timer():
+            g.metrics_started = time.perf_counter()
+            AWSCallMetrics.start_trace()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop('metrics_started', None)
+            if started is not None:
+                labels = cls._labels(request)
+                path, content_length = request.path, request.content_length
+                # 串流回應在送完後 (close) 才記錄, 一般回應在 close 時也已送出
+                response.call_on_close(lambda: cls.record(labels, path, response.status_code, started,
+                                                          content_length, response.content_length))
+            return response
+
+    @classmethod
+    def init_async_app(cls, app):
+        """在 Quart 應用程式註冊量測的 hook, 串流回應以產生回應物件的時間為準"""
+        if not metrics_enabled():
+            return
+        import quart
+
+        @app.before_request
+        async def start_request_timer():
+            quart.g.metrics_started = time.perf_counter()
+            AWSCallMetrics.start_trace()
+
+        @app.after_request
+        async def record_request(response):
+            started = quart.g.pop('metrics_started', None)
+            if started is not None:
+                async_request = quart.request
+                cls.record(cls._labels(async_request), async_request.path, response.status_code, started,
+                           async_request.content_length, response.content_length)
+            return response
+
+    @staticmethod
+    def _labels(request):
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        return request.method, rule
+
+    @classmethod
+    def record(cls, labels, path, status, started, request_length=None, response_length=None):
+        """記錄一次請求的指標, 超過門檻時寫入慢請求 log"""
+        elapsed = time.perf_counter() - started
+        calls = AWSCallMetrics.stop_trace()
+        aws_elapsed = calls.aws_seconds()
+        method, route = labels
+        cls.requests.inc(method, route, status)
+        cls.duration.observe(method, route, value=elapsed)
+        cls.aws_duration.observe(method, route, value=aws_elapsed)
+        if request_length:
+            cls.bytes_received.inc(method, route, amount=request_length)
+        if response_length:
+            cls.bytes_sent.inc(method, route, amount=response_length)
+
+        threshold = float(os.getenv('METRICS_SLOW_REQUEST_MS', '0'))
+        if threshold and elapsed * 1000 >= threshold:
+            breakdown = ', '.join(f'{service}.{operation} {seconds * 1000:.1f}ms'
+                                  for service, operation, seconds in calls)
+            logger.warning("慢請求 %s %s %s 共 %.1fms, AWS %.1fms (%d 次呼叫), 應用程式 %.1fms%s",
+                           method, path, status, elapsed * 1000, aws_elapsed * 1000, len(calls),
+                           (elapsed - aws_elapsed) * 1000, f': {breakdown}' if breakdown else '')
+
+    @staticmethod
+    def render():
+        """/metrics 的回應內容與 Content-Type"""
+        return REGISTRY.render(), REGISTRY.CONTENT_TYPE
@@ -0,0 +1,262 @@
+"""Flutter 網頁 (web/) 的靜態檔案
+
+- 預先壓縮: 可壓縮的檔案 (JS、wasm、字型、JSON 等) 產生 gzip 與 brotli 版本, 存在 STATIC_CACHE_DIR,
+  檔名包含原始檔案的內容雜湊, 原始檔案改變後不會送出舊的壓縮版本
+  啟動時在背景執行緒產生 (STATIC_PRECOMPRESS), 也可在建置映像檔時執行 python -m controllers.static_assets
+- 依 Accept-Encoding 選擇 br > gzip > 原始檔案, 回應加上 Content-Encoding 與 Vary: Accept-Encoding
+- ETag 為內容雜湊 (strong ETag, 壓縮版本加上編碼後綴), 支援 If-None-Match / If-Modified-Since (304) 與 Range
+- 檔名含雜湊或帶有 ?v= 的請求快取一年 (immutable); index.html、service worker 等入口檔案每次重新驗證
+- 以 send_file 回應, WSGI 伺服器提供 wsgi.file_wrapper 時以 sendfile 直接送出檔案, 不經過 Python 複製
+"""
+import os
+import re
+import stat
+import gzip
+import hashlib
+import logging
+import tempfile
+import threading
+import mimetypes
+from collections import namedtuple
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # 未安裝 brotli 時只產生 gzip 版本
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# path: 檔案路徑; key: (mtime_ns, size), 用來判斷檔案是否改變; variants: {編碼: 壓縮檔路徑}
+Asset = namedtuple('Asset', ['path', 'name', 'key', 'size', 'mtime', 'etag', 'mimetype', 'variants'])
+
+
+def _enabled(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+class StaticAssets:
+    """取代 Flask 預設的靜態檔案處理 (static 路由)"""
+
+    # 依偏好順序排列的 (編碼, 副檔名)
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+    COMPRESSIBLE_EXTENSIONS = frozenset([
+        '.js', '.mjs', '.css', '.html', '.htm', '.json', '.map', '.wasm', '.svg', '.txt', '.xml',
+        '.ttf', '.otf', '.frag', '',  # 沒有副檔名的檔案 (例如 assets/NOTICES) 多半是文字
+    ])
+    # 小於此大小的檔案壓縮後節省有限, 不產生壓縮版本
+    MIN_SIZE = 1024
+    # 壓縮後至少要小於原始大小的比例, 否則直接送出原始檔案
+    MIN_RATIO = 0.9
+    # 入口檔案: 內容改變時檔名不變, 每次都需要重新驗證
+    REVALIDATE_FILES = frozenset(['index.html', 'flutter_service_worker.js', 'manifest.json', 'version.json'])
+    # 檔名含內容雜湊, 例如 main.3f2a9c1d.js 或 chunk-0b1c2d3e4f.wasm
+    HASHED_NAME = re.compile(r'[.-][0-9a-fA-F]{8,}\.[^/]+$')
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+
+    root = None
+    cache_dir = None
+    _assets = {}
+    _lock = threading.Lock()
+    _thread = None
+
+    @classmethod
+    def init_app(cls, app):
+        """以 app.static_folder 為根目錄, 取代 static 路由, 並在背景執行緒產生壓縮版本"""
+        cls.configure(app.static_folder)
+        app.view_functions['static'] = cls.serve
+        if _enabled('STATIC_PRECOMPRESS', 'true'):
+            cls._thread = threading.Thread(target=cls.precompress, name='static-precompress', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def wait(cls, timeout=None):
+        """等待啟動時的背景壓縮完成, 回傳是否已完成
+
+        gunicorn 以 preload_app 在 fork 前載入應用程式時, 需先等待壓縮完成,
+        worker 才會繼承完整的檔案資訊, 也不會在背景執行緒持有鎖時 fork
+        """
+        if cls._thread is not None:
+            cls._thread.join(timeout)
+            if cls._thread.is_alive():
+                return False
+            cls._thread = None
+        return True
+
+    @classmethod
+    def configure(cls, root, cache_dir=None):
+        cls.root = os.path.abspath(root)
+        cls.cache_dir = os.path.abspath(cache_dir or os.getenv(
+            'STATIC_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'microapp-static')))
+        cls.clear()
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._assets.clear()
+
+    @classmethod
+    def asset(cls, filename):
+        """取得檔案資訊, 檔案不存在或路徑超出根目錄時回傳 None
+
+        以 (mtime, 大小) 判斷檔案是否改變, 未改變時不重新計算雜湊
+        """
+        path = safe_join(cls.root, filename)
+        if path is None:
+            return None
+        try:
+            result = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(result.st_mode):
+            return None
+        key = (result.st_mtime_ns, result.st_size)
+        asset = cls._assets.get(path)
+        if asset is None or asset.key != key:
+            asset = cls._load(path, filename, key, result.st_mtime)
+            with cls._lock:
+                cls._assets[path] = asset
+        return asset
+
+    @classmethod
+    def _load(cls, path, filename, key, mtime):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()[:32]
+        size = key[1]
+        variants = {}
+        for encoding, suffix in cls.ENCODINGS:
+            variant = cls._variant_path(filename, etag, suffix)
+            try:
+                if os.path.getsize(variant) < size * cls.MIN_RATIO:
+                    variants[encoding] = variant
+            except OSError:
+                continue
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return Asset(path, filename, key, size, mtime, etag, mimetype, variants)
+
+    @classmethod
+    def _variant_path(cls, filename, etag, suffix):
+        return os.path.join(cls.cache_dir, f'{filename}.{etag}{suffix}')
+
+    @classmethod
+    def compressible(cls, filename, size):
+        return size >= cls.MIN_SIZE and os.path.splitext(filename)[1].lower() in cls.COMPRESSIBLE_EXTENSIONS
+
+    @classmethod
+    def compressors(cls):
+        """可用的 (編碼, 副檔名, 壓縮函式), gzip 固定 mtime 讓相同內容產生相同的壓縮檔"""
+        quality = int(os.getenv('STATIC_BROTLI_QUALITY', '11'))
+        available = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            available['br'] = lambda data: brotli.compress(data, quality=quality)
+        return [(encoding, suffix, available[encoding]) for encoding, suffix in cls.ENCODINGS
+                if encoding in available]
+
+    @classmethod
+    def filenames(cls):
+        """根目錄下所有檔案的相對路徑 (以 / 分隔)"""
+        for directory, _, filenames in os.walk(cls.root):
+            for name in filenames:
+                yield os.path.relpath(os.path.join(directory, name), cls.root).replace(os.sep, '/')
+
+    @classmethod
+    def index(cls):
+        """讀取所有檔案的資訊 (雜湊與壓縮版本), 回傳檔案數"""
+        return sum(cls.asset(filename) is not None for filename in cls.filenames())
+
+    @classmethod
+    def precompress(cls):
+        """為根目錄下可壓縮的檔案產生壓縮版本並讀取所有檔案的資訊, 已存在的版本不會重新壓縮, 回傳新產生的檔案數"""
+        created = 0
+        compressors = cls.compressors()
+        for filename in cls.filenames():
+            try:
+                created += cls._precompress_file(filename, compressors)
+            except OSError:
+                logger.warning("無法產生 %s 的壓縮版本", filename, exc_info=True)
+        logger.info("靜態檔案壓縮完成, 新產生 %d 個檔案 (%s)", created,
+                    ', '.join(encoding for encoding, _, _ in compressors))
+        return created
+
+    @classmethod
+    def _precompress_file(cls, filename, compressors):
+        asset = cls.asset(filename)
+        if asset is None or not cls.compressible(filename, asset.size):
+            return 0
+        missing = [(suffix, compress) for _, suffix, compress in compressors
+                   if not os.path.exists(cls._variant_path(filename, asset.etag, suffix))]
+        if not missing:
+            return 0
+        with open(asset.path, 'rb') as file:
+            data = file.read()
+        for suffix, compress in missing:
+            # 壓縮效果不佳的檔案仍寫出壓縮檔, 避免每次啟動都重新壓縮; 是否使用由 _load 依大小決定
+            cls._write_atomic(cls._variant_path(filename, asset.etag, suffix), compress(data))
+        # 重新讀取檔案資訊, 開始使用新的壓縮版本
+        with cls._lock:
+            cls._assets.pop(asset.path, None)
+        cls.asset(filename)
+        return len(missing)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        """先寫入暫存檔再改名, 多個 worker 同時壓縮時不會讀到寫到一半的檔案"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def negotiate(cls, asset, accept_encodings):
+        """依 Accept-Encoding 選擇編碼, 回傳 (編碼, 檔案路徑), 不使用壓縮版本時編碼為 None"""
+        for encoding, _ in cls.ENCODINGS:
+            if encoding in asset.variants and accept_encodings[encoding]:
+                return encoding, asset.variants[encoding]
+        return None, asset.path
+
+    @classmethod
+    def cache_control(cls, filename, versioned=False):
+        if os.path.basename(filename) in cls.REVALIDATE_FILES:
+            return 'no-cache'
+        if versioned or cls.HASHED_NAME.search(filename):
+            return cls.IMMUTABLE
+        max_age = int(os.getenv('STATIC_MAX_AGE', '0'))
+        return f'public, max-age={max_age}' if max_age > 0 else 'no-cache'
+
+    @classmethod
+    def serve(cls, filename):
+        """static 路由的 view function, 也用來回傳 / 的 index.html"""
+        asset = cls.asset(filename)
+        if asset is None:
+            abort(404)
+        encoding, path = cls.negotiate(asset, request.accept_encodings)
+        # 不同編碼的內容不同, ETag 也要不同, 否則快取可能以 gzip 的內容回應不支援 gzip 的用戶端
+        etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+        response = send_file(path, mimetype=asset.mimetype, download_name=os.path.basename(filename),
+                             conditional=True, etag=etag, last_modified=asset.mtime)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = cls.cache_control(filename, 'v' in request.args)
+        return response
+
+
+if __name__ == '__main__':
+    # 建置映像檔時預先產生壓縮版本: python -m controllers.static_assets [web 資料夾]
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    StaticAssets.configure(sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web'))
+    StaticAssets.precompress()
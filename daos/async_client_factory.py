@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # 非同步模式為選用功能, 需另外安裝 requirements-async.txt
+    AioConfig = None
+    get_session = None
+
+from daos.aws_client_factory import AWSClientFactory
+
+
+class AsyncAWSClientFactory:
+    """非同步模式用的共用 AWS 客戶端工廠 (aiobotocore)
+
+    - 連線設定 (端點、區域、連線池、逾時、重試) 與 AWSClientFactory 相同
+    - aiobotocore 的客戶端綁定在建立時的 event loop, 因此每個 event loop 各建立一組, 同一個 loop 內共用
+    - 伺服器關閉時需呼叫 close, 釋放目前 event loop 的連線
+    - 使用行程內模擬後端 (ENV=memory 等) 時, 以 AsyncClientAdapter 包裝 AWSClientFactory 的共用客戶端,
+      同步與非同步模式看到的是同一份資料
+    """
+
+    _session = None
+    _states = {}
+
+    @classmethod
+    async def client(cls, service_name):
+        """取得目前 event loop 中特定服務的共用客戶端, 第一次呼叫時才建立"""
+        loop = asyncio.get_running_loop()
+        state = cls._states.get(loop)
+        if state is None:
+            state = cls._states[loop] = {'stack': AsyncExitStack(), 'clients': {}, 'lock': asyncio.Lock()}
+        client = state['clients'].get(service_name)
+        if client is not None:
+            return client
+        async with state['lock']:
+            client = state['clients'].get(service_name)
+            if client is None and AWSClientFactory.backend(service_name) != 'aws':
+                client = state['clients'][service_name] = AsyncClientAdapter(AWSClientFactory.client(service_name))
+            if client is None:
+                if get_session is None:
+                    raise RuntimeError("非同步模式需要安裝 aiobotocore: pip install -r requirements-async.txt")
+                if cls._session is None:
+                    cls._session = get_session()
+                kwargs = AWSClientFactory.client_kwargs()
+                kwargs['config'] = AioConfig(**AWSClientFactory.config_options())
+                client = await state['stack'].enter_async_context(
+                    cls._session.create_client(service_name, **kwargs)
+                )
+                AWSClientFactory.instrument(client)
+                state['clients'][service_name] = client
+        return client
+
+    @classmethod
+    async def close(cls):
+        """關閉目前 event loop 的所有客戶端"""
+        state = cls._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state['stack'].aclose()
+
+
+class AsyncClientAdapter:
+    """將行程內模擬後端的同步方法包裝成 coroutine, 介面與 aiobotocore 的客戶端相同
+
+    模擬後端的操作都在記憶體中完成, 不會阻塞 event loop, 因此直接在目前的 loop 中呼叫
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.exceptions = client.exceptions
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class AsyncLazyClient:
+    """類別屬性用的描述器, 讀取時回傳取得共用客戶端的 coroutine
+
+    例如 dynamodb = AsyncLazyClient('dynamodb'), 使用時 client = await cls.dynamodb
+    """
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def __get__(self, instance, owner):
+        return AsyncAWSClientFactory.client(self.service_name)
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+
+from daos.async_client_factory import AsyncLazyClient
+from daos.dynamodb_dao import DynamoDBDao
+from daos.table_registry import TableRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDynamoDBDao:
+    """以非同步 I/O 對 DynamoDB 服務進行操作 (非同步模式使用)
+
+    功能與回傳值與 DynamoDBDao 相同
+    請求參數的建立、分頁 token、批次大小、表格資訊 (TableRegistry) 與單筆查詢快取皆共用 DynamoDBDao 的實作
+    """
+
+    # aiobotocore 客戶端, 使用時 client = await cls.dynamodb
+    dynamodb = AsyncLazyClient('dynamodb')
+
+    @classmethod
+    async def check_dynamodb(cls):
+        """確認讀取到 dynamodb, 成功回傳「OK」(str), 失敗回傳 False"""
+        try:
+            client = await cls.dynamodb
+            response = await client.list_tables()
+        except Exception as e:
+            logger.error("無法連接到 LocalStack 的 DynamoDB 服務: %s", e)
+            return False
+        return "OK" if response else False
+
+    @classmethod
+    async def schema(cls, table_name):
+        """取得表格的 TableSchema, 未快取時以 describe_table 讀取, 同 DynamoDBDao.schema"""
+        schema = DynamoDBDao.tables.get(table_name)
+        if schema is not None:
+            return schema
+        try:
+            client = await cls.dynamodb
+            description = (await client.describe_table(TableName=table_name))['Table']
+        except Exception as e:
+            logger.warning("讀取表格 %s 的資訊出錯, 使用預設的主鍵: %s", table_name, e)
+            return TableRegistry.DEFAULT_SCHEMA
+        return DynamoDBDao.tables.put(description)
+
+    @classmethod
+    async def insert_into_dynamodb(cls, table_name, data):
+        """新增資料到指定的表格, 成功回傳「OK」(str), 失敗回傳 False"""
+        schema = await cls.schema(table_name)
+        try:
+            client = await cls.dynamodb
+            await client.put_item(TableName=table_name, Item=DynamoDBDao._to_dynamodb_item(data, schema))
+        except Exception as e:
+            logger.error("新增資料出錯: %s", e)
+            return False
+        DynamoDBDao._invalidate_cache(table_name, data.get(schema.hash_key))
+        return 'OK'
+
+    @classmethod
+    async def scan_pages(cls, table_name, limit=None, exclusive_start_key=None, **scan_kwargs):
+        """逐頁掃描特定表格, 產出 (items, LastEvaluatedKey), 流程同 DynamoDBDao.scan_pages"""
+        client = await cls.dynamodb
+        kwargs = {'TableName': table_name, **scan_kwargs}
+        if exclusive_start_key:
+            kwargs['ExclusiveStartKey'] = exclusive_start_key
+        remaining = limit
+        while True:
+            if remaining is not None:
+                kwargs['Limit'] = remaining
+            response = await client.scan(**kwargs)
+            items = [DynamoDBDao._from_dynamodb_item(item) for item in response.get('Items', [])]
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            yield items, last_evaluated_key
+
+            if remaining is not None:
+                remaining -= len(items)
+                if remaining <= 0:
+                    break
+            if not last_evaluated_key:
+                break
+            kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    @classmethod
+    async def parallel_scan_pages(cls, table_name, total_segments, **scan_kwargs):
+        """以 Segment/TotalSegments 在同一個 event loop 中平行掃描, 產出每一頁的 items
+
+        流程同 DynamoDBDao.parallel_scan_pages, 以 asyncio task 取代執行緒
+        同時進行的段數上限為 DynamoDBDao.SCAN_MAX_WORKERS, 讀到的頁面放進有上限的佇列
+        """
+        pages = asyncio.Queue(maxsize=DynamoDBDao.SCAN_MAX_WORKERS * 2)
+        semaphore = asyncio.Semaphore(DynamoDBDao.SCAN_MAX_WORKERS)
+        segment_done = object()
+
+        async def scan_segment(segment):
+            try:
+                async with semaphore:
+                    async for items, _ in cls.scan_pages(table_name, Segment=segment,
+                                                         TotalSegments=total_segments, **scan_kwargs):
+                        await pages.put(items)
+            except Exception as e:
+                await pages.put(e)
+            finally:
+                await pages.put(segment_done)
+
+        tasks = [asyncio.create_task(scan_segment(segment)) for segment in range(total_segments)]
+        try:
+            finished = 0
+            while finished < total_segments:
+                entry = await pages.get()
+                if entry is segment_done:
+                    finished += 1
+                elif isinstance(entry, Exception):
+                    raise entry
+                else:
+                    yield entry
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @classmethod
+    async def scan_page(cls, table_name, limit=None, page_token=None, **scan_kwargs):
+        """讀取特定表格的一頁資料, 回傳 (items, next_token), 流程同 DynamoDBDao.scan_page"""
+        if limit is None or limit <= 0 or limit > DynamoDBDao.SCAN_PAGE_MAX_LIMIT:
+            limit = DynamoDBDao.SCAN_PAGE_MAX_LIMIT
+        exclusive_start_key = DynamoDBDao.decode_page_token(page_token) if page_token else None
+
+        items = []
+        last_evaluated_key = None
+        async for page_items, last_evaluated_key in cls.scan_pages(table_name, limit, exclusive_start_key,
+                                                                   **scan_kwargs):
+            items.extend(page_items)
+        return items, DynamoDBDao.encode_page_token(last_evaluated_key)
+
+    @classmethod
+    async def active_scan_kwargs(cls, table_name):
+        """只讀取未軟刪除資料的 scan 參數, 同 DynamoDBDao.active_scan_kwargs"""
+        if (await cls.schema(table_name)).has_index(DynamoDBDao.ACTIVE_INDEX):
+            return {'IndexName': DynamoDBDao.ACTIVE_INDEX}
+        return dict(DynamoDBDao.ACTIVE_FILTER)
+
+    @classmethod
+    async def query_dynamodb(cls, table_name, id, include_deleted=True):
+        """查詢特定表格的特定 id 資料, 查無資料或失敗時回傳 None, 流程同 DynamoDBDao.query_dynamodb"""
+        if not include_deleted:
+            return DynamoDBDao._without_deleted(await cls.query_dynamodb(table_name, id))
+        cache = DynamoDBDao.item_cache
+        token = None
+        if cache:
+            cached, token = cache.get(table_name, str(id))
+            if cached is not None:
+                return cached
+
+        try:
+            client = await cls.dynamodb
+            response = await client.query(**DynamoDBDao._query_request(table_name, id, await cls.schema(table_name)))
+            items = [DynamoDBDao._from_dynamodb_item(item) for item in response['Items']]
+        except Exception as e:
+            logger.error("查詢資料出錯: %s", e)
+            return None
+        if not items:
+            return None
+        if cache:
+            cache.put(table_name, str(id), items, token)
+        return items
+
+    @classmethod
+    async def batch_get_dynamodb(cls, table_name, ids, projection=None):
+        """一次查詢特定表格的多個 id 資料, 依 ids 順序回傳, 流程同 DynamoDBDao.batch_get_dynamodb"""
+        schema = await cls.schema(table_name)
+        if schema.range_key:
+            raise ValueError(f"表格 {table_name} 的主鍵包含排序鍵 {schema.range_key}, 無法只以 id 批次查詢")
+        identities, unique_ids = DynamoDBDao._batch_get_ids(schema, ids)
+        semaphore = asyncio.Semaphore(DynamoDBDao.BATCH_MAX_WORKERS)
+
+        async def get_chunk(chunk):
+            async with semaphore:
+                return await cls._batch_get_chunk(table_name, chunk, projection, schema)
+
+        chunks = DynamoDBDao._chunked(unique_ids, DynamoDBDao.BATCH_GET_SIZE)
+        found = {}
+        for items in await asyncio.gather(*(get_chunk(chunk) for chunk in chunks)):
+            for item in items:
+                found[DynamoDBDao._batch_identity(schema, item)] = DynamoDBDao._from_dynamodb_item(item)
+        return [found.get(identities[str(id)]) for id in ids]
+
+    @classmethod
+    async def _batch_get_chunk(cls, table_name, ids, projection=None, schema=TableRegistry.DEFAULT_SCHEMA):
+        """以 batch_get_item 查詢一批 id, UnprocessedKeys 以隨機化的指數退避重試"""
+        client = await cls.dynamodb
+        request = DynamoDBDao._batch_get_request(ids, projection, schema)
+        items = []
+        attempt = 0
+        while True:
+            response = await client.batch_get_item(RequestItems={table_name: request})
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            unprocessed = response.get('UnprocessedKeys', {}).get(table_name)
+            if not unprocessed or not unprocessed.get('Keys'):
+                return items
+            if attempt >= DynamoDBDao.BATCH_MAX_RETRIES:
+                raise RuntimeError(f"UnprocessedKeys 重試次數已達上限, 尚有 {len(unprocessed['Keys'])} 筆未讀取")
+            request = unprocessed
+            await asyncio.sleep(DynamoDBDao._backoff_delay(attempt))
+            attempt += 1
+
+    @classmethod
+    async def update_dynamodb_item(cls, table_name, new_data):
+        """更新特定表格的特定資料, 流程同 DynamoDBDao.update_dynamodb_item"""
+        schema = await cls.schema(table_name)
+        id, request = DynamoDBDao._update_request(table_name, new_data, schema)
+        client = await cls.dynamodb
+        try:
+            response = await client.update_item(**request)
+        except Exception as e:
+            if not DynamoDBDao._deleted_conflict(e, request):
+                raise
+            id, request = DynamoDBDao._update_request(table_name, new_data, schema, deleted=True)
+            response = await client.update_item(**request)
+        DynamoDBDao._invalidate_cache(table_name, id)
+        return DynamoDBDao._unmarshall_attributes(response)
+
+    @classmethod
+    async def soft_delete_item(cls, table_name, new_data):
+        """軟刪除資料, 流程同 DynamoDBDao.soft_delete_item"""
+        id, request = DynamoDBDao._soft_delete_request(table_name, new_data, await cls.schema(table_name))
+        client = await cls.dynamodb
+        response = await client.update_item(**request)
+        DynamoDBDao._invalidate_cache(table_name, id)
+        return DynamoDBDao._unmarshall_attributes(response)
+
+    @classmethod
+    async def delete_item(cls, table_name, id, sort_key=None):
+        """直接刪除資料, 流程同 DynamoDBDao.delete_item"""
+        request = DynamoDBDao._delete_request(table_name, id, await cls.schema(table_name), sort_key)
+        client = await cls.dynamodb
+        response = await client.delete_item(**request)
+        DynamoDBDao._invalidate_cache(table_name, id)
+        return response
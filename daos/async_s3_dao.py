@@ -0,0 +1,74 @@
+import logging
+
+from daos.async_client_factory import AsyncLazyClient
+from daos.s3_dao import S3Dao
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncS3Dao:
+    """以非同步 I/O 對 S3 進行操作 (非同步模式使用)
+
+    功能與回傳值與 S3Dao 相同, 上傳等需要執行緒池分段處理的功能仍由 S3Dao 負責
+    """
+
+    # aiobotocore 客戶端, 使用時 client = await cls.s3
+    s3 = AsyncLazyClient('s3')
+
+    @classmethod
+    async def check_s3_connection(cls):
+        """測試是否成功連線, 回傳「成功連線到 S3」或「無法連線到 S3」"""
+        try:
+            client = await cls.s3
+            await client.list_buckets()
+            return "成功連線到 S3"
+        except Exception as e:
+            logger.error("無法連線到 S3: %s", e)
+            return "無法連線到 S3" + str(e)
+
+    @classmethod
+    async def get_object(cls, bucket_name, object_name, range_header=None, if_match=None,
+                         if_none_match=None, if_modified_since=None, if_unmodified_since=None):
+        """取得 S3 物件, 流程同 S3Dao.get_object, 回傳的 Body 需以 async 方式讀取"""
+        kwargs = {'Bucket': bucket_name, 'Key': object_name}
+        if range_header:
+            kwargs['Range'] = range_header
+        if if_match:
+            kwargs['IfMatch'] = if_match
+        if if_none_match:
+            kwargs['IfNoneMatch'] = if_none_match
+        if if_modified_since:
+            kwargs['IfModifiedSince'] = if_modified_since
+        if if_unmodified_since:
+            kwargs['IfUnmodifiedSince'] = if_unmodified_since
+        client = await cls.s3
+        return await client.get_object(**kwargs)
+
+    @classmethod
+    async def list_objects_page(cls, bucket_name, prefix='', delimiter=None, max_keys=None, page_token=None):
+        """列出指定值區與路徑下的一頁物件, 流程同 S3Dao.list_objects_page"""
+        if not max_keys or max_keys <= 0 or max_keys > S3Dao.LIST_MAX_KEYS:
+            max_keys = S3Dao.LIST_MAX_KEYS
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix or '', 'MaxKeys': max_keys}
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        if page_token:
+            kwargs['ContinuationToken'] = page_token
+        client = await cls.s3
+        response = await client.list_objects_v2(**kwargs)
+        return {
+            'objects': [S3Dao._object_summary(content) for content in response.get('Contents', [])],
+            'prefixes': [common_prefix['Prefix'] for common_prefix in response.get('CommonPrefixes', [])],
+            'next_token': response.get('NextContinuationToken') if response.get('IsTruncated') else None,
+        }
+
+    @classmethod
+    async def iter_object_pages(cls, bucket_name, prefix='', delimiter=None):
+        """逐頁產出指定值區與路徑下的物件, 直到最後一頁"""
+        page_token = None
+        while True:
+            page = await cls.list_objects_page(bucket_name, prefix, delimiter, page_token=page_token)
+            yield page
+            page_token = page['next_token']
+            if not page_token:
+                break
@@ -0,0 +1,204 @@
+import os
+import importlib
+import threading
+
+import boto3
+from botocore.config import Config
+
+from daos.metrics import AWSCallMetrics, metrics_enabled
+
+
+class AWSClientFactory:
+    """共用的 AWS 客戶端工廠
+
+    - 每種服務只建立一個客戶端, 第一次使用時才建立 (lazy), 之後所有 DAO 與 Controller 共用
+    - boto3 的客戶端可跨執行緒共用, 多執行緒的伺服器可重複使用已建立的連線池
+    - boto3 的 resource 不可跨執行緒共用, 因此每個執行緒各建立一個
+    - 連線設定由環境變數決定:
+      ENV: development 時預設連接 LocalStack, production 時預設連接 AWS
+      AWS_ENDPOINT_URL: 服務端點, 未設定時依 ENV 決定
+      AWS_REGION: 區域, 未設定時依 ENV 決定
+      AWS_MAX_POOL_CONNECTIONS: 每個客戶端的連線池大小
+      AWS_CONNECT_TIMEOUT, AWS_READ_TIMEOUT: 連線與讀取逾時秒數
+      AWS_TCP_KEEPALIVE: 是否啟用 TCP keepalive
+      AWS_RETRY_MODE: 重試模式 (legacy/standard/adaptive)
+      AWS_MAX_ATTEMPTS: 最多嘗試次數 (含第一次)
+    - 服務後端: <服務>_BACKEND (例如 DYNAMODB_BACKEND=memory、S3_BACKEND=local) 指定時改用本機的模擬後端,
+      ENV=memory 時每個服務預設使用各自的第一個模擬後端, 不需連線到 LocalStack 或 AWS, 可用於測試與本機開發
+    - 連接 AWS 的客戶端會註冊量測事件, 記錄每種操作的延遲、重試與節流次數 (METRICS_ENABLED)
+    """
+
+    # 各服務的本機模擬後端 {後端名稱: (模組路徑, 類別名稱)}, 使用時才匯入, 第一個為 ENV=memory 時的預設值
+    LOCAL_BACKENDS = {
+        'dynamodb': {'memory': ('daos.memory_dynamodb', 'MemoryDynamoDBClient')},
+        's3': {'local': ('daos.local_s3', 'LocalS3Client')},
+    }
+
+    # 預先簽署網址使用的簽章版本, S3 的 s3v4 會將 Content-Type 等參數列入簽章
+    PRESIGN_SIGNATURE_VERSIONS = {'s3': 's3v4'}
+
+    _clients = {}
+    # 模擬後端相當於遠端的服務, reset 時保留, 資料在整個行程中共用
+    _local_clients = {}
+    _local = threading.local()
+    _session = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(cls, service_name):
+        """取得特定服務的共用客戶端, 第一次呼叫時才建立"""
+        client = cls._clients.get(service_name)
+        if client is not None:
+            return client
+        with cls._lock:
+            client = cls._clients.get(service_name)
+            if client is None:
+                backend = cls.backend(service_name)
+                if backend != 'aws':
+                    client = cls._create_local_client(service_name, backend)
+                else:
+                    client = cls._get_session().client(service_name, **cls.client_kwargs())
+                    cls.instrument(client)
+                cls._clients[service_name] = client
+        return client
+
+    @classmethod
+    def presign_client(cls, service_name):
+        """簽署預先簽署網址 (presigned URL) 用的客戶端, 只在本機計算簽章, 不會建立連線
+
+        - 網址中的主機必須是瀏覽器連得到的位址, 與伺服器使用的端點不同時 (例如 docker compose 內的 http://localstack:4566),
+          以 <服務>_PRESIGN_ENDPOINT_URL 指定 (例如 S3_PRESIGN_ENDPOINT_URL=http://localhost:4566)
+        - 一律使用 SigV4, Content-Type、Content-Length 等參數會列入簽章, 用戶端送出的值不符時 AWS 拒絕請求
+        """
+        endpoint_url = os.getenv(f'{service_name.upper()}_PRESIGN_ENDPOINT_URL')
+        key = (service_name, 'presign', endpoint_url)
+        client = cls._clients.get(key)
+        if client is not None:
+            return client
+        with cls._lock:
+            client = cls._clients.get(key)
+            if client is None:
+                kwargs = cls.client_kwargs()
+                kwargs['config'] = kwargs['config'].merge(
+                    Config(signature_version=cls.PRESIGN_SIGNATURE_VERSIONS.get(service_name, 'v4')))
+                if endpoint_url:
+                    kwargs['endpoint_url'] = endpoint_url
+                client = cls._clients[key] = cls._get_session().client(service_name, **kwargs)
+        return client
+
+    @classmethod
+    def resource(cls, service_name):
+        """取得目前執行緒專用的 resource, 底層共用同一個 session 的設定"""
+        resources = getattr(cls._local, 'resources', None)
+        if resources is None:
+            resources = cls._local.resources = {}
+        resource = resources.get(service_name)
+        if resource is None:
+            # boto3 的 session 建立客戶端時不是執行緒安全的, 需持有鎖
+            with cls._lock:
+                resource = cls._get_session().resource(service_name, **cls.client_kwargs())
+            cls.instrument(resource.meta.client)
+            resources[service_name] = resource
+        return resource
+
+    @classmethod
+    def reset(cls):
+        """清除已建立的客戶端, 下次使用時依目前的環境變數重新建立"""
+        with cls._lock:
+            cls._clients = {}
+            cls._local = threading.local()
+            cls._session = None
+
+    @classmethod
+    def backend(cls, service_name):
+        """特定服務使用的後端: aws (LocalStack 或 AWS) 或 LOCAL_BACKENDS 中的模擬後端 (例如 memory、local)"""
+        backends = cls.LOCAL_BACKENDS.get(service_name, {})
+        backend = os.getenv(f'{service_name.upper()}_BACKEND')
+        if not backend:
+            # ENV=memory 時只有具備模擬後端的服務改用模擬後端
+            if os.getenv('ENV') == 'memory' and backends:
+                return next(iter(backends))
+            return 'aws'
+        if backend != 'aws' and backend not in backends:
+            raise ValueError(f"{service_name} 沒有 {backend} 後端")
+        return backend
+
+    @classmethod
+    def _create_local_client(cls, service_name, backend):
+        """取得特定服務的模擬後端, 需在持有 _lock 時呼叫"""
+        client = cls._local_clients.get((service_name, backend))
+        if client is None:
+            module_name, class_name = cls.LOCAL_BACKENDS[service_name][backend]
+            client_class = getattr(importlib.import_module(module_name), class_name)
+            client = cls._local_clients[(service_name, backend)] = client_class(region_name=cls.region())
+        return client
+
+    @staticmethod
+    def instrument(client):
+        """METRICS_ENABLED 時在客戶端註冊 AWS 呼叫的量測事件 (見 daos/metrics.py)"""
+        if metrics_enabled():
+            AWSCallMetrics.install(client.meta.events)
+        return client
+
+    @classmethod
+    def _get_session(cls):
+        """取得共用的 boto3 session, 需在持有 _lock 時呼叫"""
+        if cls._session is None:
+            cls._session = boto3.session.Session()
+        return cls._session
+
+    @classmethod
+    def region(cls):
+        """目前使用的區域"""
+        default_region = 'us-east-1' if os.getenv('ENV') == 'development' else 'ap-northeast-1'
+        return os.getenv('AWS_REGION') or default_region
+
+    @classmethod
+    def client_kwargs(cls):
+        """建立客戶端所需的參數
+
+        development: 連接 LocalStack, 使用測試用的金鑰
+        production: 連接 AWS, 金鑰需透過其他方式設定 (例如 AWS CLI 或環境變數)
+        """
+        kwargs = {'region_name': cls.region(), 'config': cls.build_config()}
+        endpoint_url = os.getenv('AWS_ENDPOINT_URL')
+        if os.getenv('ENV') == 'development':
+            # localstack 是 docker compose 的 container 服務名稱
+            kwargs['endpoint_url'] = endpoint_url or 'http://localstack:4566'
+            kwargs['aws_access_key_id'] = 'test'
+            kwargs['aws_secret_access_key'] = 'test'
+        elif endpoint_url:
+            kwargs['endpoint_url'] = endpoint_url
+        return kwargs
+
+    @classmethod
+    def build_config(cls):
+        """依環境變數建立連線池、逾時、keepalive 與重試的設定"""
+        return Config(**cls.config_options())
+
+    @staticmethod
+    def config_options():
+        """botocore Config 的參數, 同步與非同步的客戶端共用"""
+        return {
+            'max_pool_connections': int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '50')),
+            'connect_timeout': float(os.getenv('AWS_CONNECT_TIMEOUT', '5')),
+            'read_timeout': float(os.getenv('AWS_READ_TIMEOUT', '60')),
+            'tcp_keepalive': os.getenv('AWS_TCP_KEEPALIVE', 'true').lower() in ('1', 'true', 'yes'),
+            'retries': {
+                'mode': os.getenv('AWS_RETRY_MODE', 'standard'),
+                'max_attempts': int(os.getenv('AWS_MAX_ATTEMPTS', '3')),
+            },
+        }
+
+
+class LazyClient:
+    """類別屬性用的描述器, 讀取時才向 AWSClientFactory 取得共用客戶端
+
+    例如 DAO 中的 dynamodb = LazyClient('dynamodb'), 使用方式與原本的 cls.dynamodb 相同
+    """
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def __get__(self, instance, owner):
+        return AWSClientFactory.client(self.service_name)
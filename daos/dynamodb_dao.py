@@ -1,232 +1,863 @@
 import os
-import boto3
+import json
+import logging
+import time
+import queue
+import base64
+import random
+import itertools
+import functools
+import threading
+from collections import deque, namedtuple
+from decimal import Decimal
+
+from daos.aws_client_factory import LazyClient
+from daos.dynamodb_marshaller import dumps, marshall, marshall_item, unmarshall_item
+from daos.item_cache import ItemCache
+from daos.metrics import ContextThreadPoolExecutor
+from daos.table_registry import TableRegistry
+
+logger = logging.getLogger(__name__)
+
+# 編譯好的更新表達式: 表達式字串、欄位名稱佔位符、SET/ADD 值的佔位符 (依欄位名稱排序) 與條件表達式
+CompiledUpdate = namedtuple('CompiledUpdate', ['update_expression', 'names', 'set_values', 'add_values',
+                                               'condition_expression'])
 
 
 class DynamoDBDao:
     """對 localstack 的 DynamoDB 服務進行操作"""
     
-    
-    # 讀取環境變數
-    env = os.getenv('ENV')
-
-    if env == 'development':
-    # 建立 DynamoDB 客戶端
-    # 連接到 LocalStack
-        dynamodb = boto3.client(
-            'dynamodb',
-            endpoint_url='http://localstack:4566',
-            region_name='us-east-1',  
-            aws_access_key_id='test',
-            aws_secret_access_key='test',
-        )
-    elif env == 'production':
-        # 連接到 AWS 生產環境
-        # 注意：請確保在此環境下，AWS 的訪問金鑰和秘密金鑰已通過其他方式設定（例如，透過 AWS CLI 或環境變數）
-        dynamodb = boto3.client('dynamodb', region_name='ap-northeast-1')
+    # DynamoDB 客戶端, 由 AWSClientFactory 依環境變數 (ENV 等) 建立, 所有請求共用
+    dynamodb = LazyClient('dynamodb')
+
+    # 單次分頁查詢最多回傳的筆數
+    SCAN_PAGE_MAX_LIMIT = 1000
+    # 平行掃描的執行緒上限與分段數上限
+    SCAN_MAX_WORKERS = int(os.getenv('DYNAMODB_SCAN_MAX_WORKERS', '8'))
+    SCAN_MAX_SEGMENTS = 1000
+    # 批次寫入: 每次 batch_write_item 的筆數上限 (DynamoDB 限制 25 筆) 與平行數
+    BATCH_WRITE_SIZE = 25
+    BATCH_MAX_WORKERS = int(os.getenv('DYNAMODB_BATCH_MAX_WORKERS', '4'))
+    # 批次讀取: 每次 batch_get_item 的筆數上限 (DynamoDB 限制 100 筆)
+    BATCH_GET_SIZE = 100
+    # UnprocessedItems/UnprocessedKeys 重試次數與指數退避的基準、上限秒數
+    BATCH_MAX_RETRIES = 8
+    BATCH_BACKOFF_BASE = 0.05
+    BATCH_BACKOFF_CAP = 5.0
+
+    # 更新資料時的特殊欄位與樂觀鎖使用的版本號欄位
+    UPDATE_OPERATORS = ('$remove', '$add', '$version')
+    VERSION_ATTRIBUTE = os.getenv('DYNAMODB_VERSION_ATTRIBUTE', 'version')
+
+    # 單筆查詢的行程內快取, 以 DYNAMODB_CACHE_ENABLED 等環境變數設定, 未啟用時為 None
+    item_cache = ItemCache.from_env()
+
+    # 未軟刪除的資料帶有 ACTIVE_ATTRIBUTE (值為分區鍵的字串), 軟刪除時移除
+    # 以此屬性為分區鍵的 ACTIVE_INDEX 只收錄未刪除的資料 (稀疏索引), 讀取時不會回傳此屬性
+    ACTIVE_ATTRIBUTE = '_active'
+    ACTIVE_INDEX = 'active-items'
+    # 沒有 ACTIVE_INDEX 的表格以篩選條件排除已軟刪除的資料
+    ACTIVE_FILTER = {
+        'FilterExpression': 'attribute_not_exists(is_deleted) OR is_deleted <> :true',
+        'ExpressionAttributeValues': {':true': {'BOOL': True}},
+    }
+
+    # 表格的主鍵與索引 (describe_table 的結果), 所有請求共用
+    tables = TableRegistry.from_env()
+    # 主鍵屬性可用的型別, 建立表格時等待 ACTIVE 的逾時秒數與輪詢間隔 (指數增加到上限)
+    KEY_ATTRIBUTE_TYPES = ('S', 'N', 'B')
+    TABLE_WAIT_TIMEOUT = float(os.getenv('DYNAMODB_TABLE_WAIT_TIMEOUT', '120'))
+    TABLE_WAIT_DELAY = 0.2
+    TABLE_WAIT_MAX_DELAY = 5.0
 
     @classmethod
     def check_dynamodb(cls):
         """確認讀取到 dynamodb
         
-        使用 boto3 的客戶端物件, 列出所有表格
+        使用共用的 boto3 客戶端物件, 列出所有表格
         若無法列出, 回傳「False」(bool)
         若列出，回傳「OK」(str)
         """
 
-        # 建立 DynamoDB 客戶端
-        dynamodb = boto3.client(
-            'dynamodb',
-            endpoint_url='http://localstack:4566',
-            region_name='us-east-1',
-            aws_access_key_id='test',
-            aws_secret_access_key='test',
-        )
-
         # 列出所有 DynamoDB 表格
-        response = dynamodb.list_tables()
+        try:
+            response = cls.dynamodb.list_tables()
+        except Exception as e:
+            logger.error("無法連接到 LocalStack 的 DynamoDB 服務: %s", e)
+            return False
         if response:
-            print("已連接到 LocalStack 的 DynamoDB 服務，並列出：")
-            print(response)
+            logger.info("已連接到 LocalStack 的 DynamoDB 服務, 表格: %s", response.get('TableNames'))
             return "OK"
         else:
-            print("無法連接到 LocalStack 的 DynamoDB 服務。")
-            print(response)
+            logger.error("無法連接到 LocalStack 的 DynamoDB 服務: %s", response)
             return False
         
     @classmethod
-    def create_table(cls,table_name):
+    def create_table(cls, table_name, definition=None):
         """新增一個表格
         
         流程: 
-        1. 定義表格的欄位名稱與屬性
-        2. 定義表格的主鍵
-        3. 設定表格讀寫的吞吐量
-        4. 建立表格
-        5. 判定表格是否建立成功, 
+        1. 依 definition 建立 create_table 的參數 (主鍵、排序鍵、索引與計費模式), 格式錯誤時拋出 ValueError
+           未傳入時與以往相同: 主鍵為 ID (字串), 讀寫容量各 5
+        2. 建立表格
+        3. 等待表格與所有索引變成 ACTIVE
+        4. 若有指定 ttl_attribute, 啟用 TTL
+        5. 將表格資訊寫入 TableRegistry, 
         若成功, 回傳 OK
-        若失敗, 回傳 False(bool)
+        若失敗 (等待逾時), 回傳 False(bool)
         """ 
-        # 表格欄位屬性定義
-        attribute_definitions = [
-            {
-                'AttributeName': 'ID',
-                'AttributeType': 'S'
-            },
-        ]
-        # 定義表格的主鍵。主鍵可以包括一個分區鍵和一個可選的排序鍵。
-        key_schema = [
-            {
-                'AttributeName': 'ID',
-                'KeyType': 'HASH' # 'HASH' 表示這是分區鍵
-            },
-        ]
-        # 設定預期的讀寫容量。讀寫容量表示每秒能處理的讀/寫數量。
-        provisioned_throughput = {
-            'ReadCapacityUnits': 5, # 每秒的讀取次數
-            'WriteCapacityUnits': 5 # 每秒的寫入次數
-        }
-        # 建立表格
-        response = cls.dynamodb.create_table(
-            TableName=table_name,
-            AttributeDefinitions=attribute_definitions,
-            KeySchema=key_schema,
-            ProvisionedThroughput=provisioned_throughput
-        )
-        # 檢查建立表格的回應
-        if response['TableDescription']['TableStatus'] == 'ACTIVE':
-            print(f"已成功建立 DynamoDB 表格：{table_name}")
-            return 'OK'
-        else:
-            print(f"無法建立 DynamoDB 表格：{table_name}")
+        definition = definition or {}
+        cls.dynamodb.create_table(**cls._create_table_request(table_name, definition))
+        cls.tables.invalidate(table_name)
+        description = cls._wait_until_active(table_name)
+        if description is None:
+            logger.error("等待 DynamoDB 表格 %s 建立逾時", table_name)
             return False
+        if definition.get('ttl_attribute'):
+            cls.dynamodb.update_time_to_live(
+                TableName=table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': definition['ttl_attribute']}
+            )
+        cls.tables.put(description)
+        logger.info("已成功建立 DynamoDB 表格: %s", table_name)
+        return 'OK'
+
+    @classmethod
+    def _create_table_request(cls, table_name, definition):
+        """由 definition 建立 create_table 的參數
+
+        definition 範例 (皆為選填):
+        {
+        "hash_key": "ID", "hash_key_type": "S",
+        "sort_key": "CreatedAt", "sort_key_type": "N",
+        "billing_mode": "PROVISIONED" 或 "PAY_PER_REQUEST", "read_capacity": 5, "write_capacity": 5,
+        "global_indexes": [{"name": "by-email", "hash_key": "Email", "sort_key": "...", "projection": "ALL"}],
+        "local_indexes": [{"name": "by-name", "sort_key": "Name", "projection": ["Age"]}],
+        "ttl_attribute": "ExpiresAt",
+        "active_index": true
+        }
+        projection 可為 ALL (預設)、KEYS_ONLY 或要一併投影的欄位名稱 list
+        """
+        if not isinstance(definition, dict):
+            raise ValueError("表格定義必須是 JSON 物件")
+        attribute_types = {}
+
+        def key_schema(spec, default_hash=None):
+            hash_key = spec.get('hash_key', default_hash)
+            if not hash_key or not isinstance(hash_key, str):
+                raise ValueError("hash_key 必須是欄位名稱")
+            keys = [(hash_key, spec.get('hash_key_type', 'S'), 'HASH')]
+            if spec.get('sort_key'):
+                keys.append((spec['sort_key'], spec.get('sort_key_type', 'S'), 'RANGE'))
+            schema = []
+            for name, attribute_type, key_type in keys:
+                if attribute_type not in cls.KEY_ATTRIBUTE_TYPES:
+                    raise ValueError(f"{name} 的型別必須是 {'/'.join(cls.KEY_ATTRIBUTE_TYPES)}")
+                if attribute_types.setdefault(name, attribute_type) != attribute_type:
+                    raise ValueError(f"{name} 在不同的主鍵或索引中型別不一致")
+                schema.append({'AttributeName': name, 'KeyType': key_type})
+            return schema
+
+        def capacity(spec, name):
+            value = spec.get(name, definition.get(name, 5))
+            if isinstance(value, str) and value.isdigit():
+                value = int(value)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError(f"{name} 必須是正整數")
+            return value
+
+        def throughput(spec):
+            return {'ReadCapacityUnits': capacity(spec, 'read_capacity'),
+                    'WriteCapacityUnits': capacity(spec, 'write_capacity')}
+
+        def projection(spec):
+            value = spec.get('projection', 'ALL')
+            if isinstance(value, list):
+                return {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': value}
+            if value not in ('ALL', 'KEYS_ONLY'):
+                raise ValueError("projection 必須是 ALL、KEYS_ONLY 或欄位名稱的 list")
+            return {'ProjectionType': value}
+
+        billing_mode = definition.get('billing_mode', 'PROVISIONED')
+        if billing_mode not in ('PROVISIONED', 'PAY_PER_REQUEST'):
+            raise ValueError("billing_mode 必須是 PROVISIONED 或 PAY_PER_REQUEST")
+        provisioned = billing_mode == 'PROVISIONED'
+        request = {
+            'TableName': table_name,
+            'KeySchema': key_schema(definition, 'ID'),
+            'BillingMode': billing_mode,
+        }
+        if provisioned:
+            request['ProvisionedThroughput'] = throughput({})
+
+        def index(spec, is_global):
+            if not isinstance(spec, dict) or not spec.get('name'):
+                raise ValueError("索引必須是含有 name 的 JSON 物件")
+            if not is_global:
+                # 本地索引與表格共用分區鍵, 只能改變排序鍵
+                if not spec.get('sort_key') or len(request['KeySchema']) < 2:
+                    raise ValueError(f"本地索引 {spec['name']} 與表格都必須指定 sort_key")
+                hash_key = request['KeySchema'][0]['AttributeName']
+                spec = {**spec, 'hash_key': hash_key, 'hash_key_type': attribute_types[hash_key]}
+            result = {'IndexName': spec['name'], 'KeySchema': key_schema(spec), 'Projection': projection(spec)}
+            if is_global and provisioned:
+                result['ProvisionedThroughput'] = throughput(spec)
+            return result
+
+        global_indexes = [index(spec, True) for spec in definition.get('global_indexes') or []]
+        if definition.get('active_index'):
+            # 只收錄未軟刪除資料的稀疏索引, 見 ACTIVE_ATTRIBUTE
+            global_indexes.append(index({'name': cls.ACTIVE_INDEX, 'hash_key': cls.ACTIVE_ATTRIBUTE}, True))
+        local_indexes = [index(spec, False) for spec in definition.get('local_indexes') or []]
+        if global_indexes:
+            request['GlobalSecondaryIndexes'] = global_indexes
+        if local_indexes:
+            request['LocalSecondaryIndexes'] = local_indexes
+        request['AttributeDefinitions'] = [{'AttributeName': name, 'AttributeType': attribute_type}
+                                           for name, attribute_type in attribute_types.items()]
+        return request
+
+    @classmethod
+    def _wait_until_active(cls, table_name):
+        """等待表格與所有 GSI 變成 ACTIVE, 回傳 describe_table 的 Table, 逾時回傳 None"""
+        deadline = time.monotonic() + cls.TABLE_WAIT_TIMEOUT
+        delay = cls.TABLE_WAIT_DELAY
+        while True:
+            try:
+                description = cls.dynamodb.describe_table(TableName=table_name)['Table']
+                if TableRegistry.is_active(description):
+                    return description
+            except cls.dynamodb.exceptions.ResourceNotFoundException:
+                # 剛建立的表格可能還查詢不到
+                pass
+            if time.monotonic() + delay > deadline:
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, cls.TABLE_WAIT_MAX_DELAY)
+
+    @classmethod
+    def schema(cls, table_name):
+        """取得表格的 TableSchema (主鍵名稱與型別、索引), 未快取時以 describe_table 讀取並寫入 TableRegistry
+
+        讀取失敗 (例如表格不存在) 時回傳預設的主鍵 (ID 字串), 不寫入快取, 由之後的操作回報錯誤
+        """
+        schema = cls.tables.get(table_name)
+        if schema is not None:
+            return schema
+        try:
+            description = cls.dynamodb.describe_table(TableName=table_name)['Table']
+        except Exception as e:
+            logger.warning("讀取表格 %s 的資訊出錯, 使用預設的主鍵: %s", table_name, e)
+            return TableRegistry.DEFAULT_SCHEMA
+        return cls.tables.put(description)
     
     @classmethod
     def insert_into_dynamodb(cls, table_name, data):
         """新增資料到指定的表格
         
         流程:
-        1. 將 data 轉換成 dynamodb 上傳表格資料的格式
+        1. 依表格的主鍵 (TableRegistry), 將 data 轉換成 dynamodb 上傳表格資料的格式
         2. 上傳資料
         3. 上傳成功, 回傳 「OK」(str)
         4. 上傳失敗, 回傳 「False」(bool)
         """
-        # 創建 DynamoDB 客戶端
-        dynamodb_data ={k:{'S':v} for k, v in data.items()}
+        schema = cls.schema(table_name)
 
         try:
             # 新增資料
+            dynamodb_data = cls._to_dynamodb_item(data, schema)
             response = cls.dynamodb.put_item(TableName = table_name, Item=dynamodb_data)
-            print("新增資料成功")
+            cls._invalidate_cache(table_name, data.get(schema.hash_key))
+            logger.debug("新增資料成功: %s", table_name)
             return 'OK'
         except Exception as e:
-            print("新增資料出錯")
-            print(e)
+            logger.error("新增資料出錯: %s", e)
             return False
     
+    @classmethod
+    def batch_insert_into_dynamodb(cls, table_name, items):
+        """批次新增資料到指定的表格
+
+        流程:
+        1. 依序讀取 items (可為 list 或逐筆產出的 generator), 每 25 筆切成一批
+        2. 交給有上限的執行緒池以 batch_write_item 平行寫入, 同時進行中的批次數有上限, 避免一次讀入所有資料
+        3. 每批的 UnprocessedItems 以隨機化的指數退避重試
+        4. 依輸入順序回傳每筆資料的結果 {"index", "ID", "success", "error"}
+        """
+        schema = cls.schema(table_name)
+        results = []
+        max_in_flight = cls.BATCH_MAX_WORKERS * 2
+        with ContextThreadPoolExecutor(max_workers=cls.BATCH_MAX_WORKERS,
+                                       thread_name_prefix='dynamodb-batch-write') as executor:
+            in_flight = deque()
+            for chunk in cls._chunked(enumerate(items), cls.BATCH_WRITE_SIZE):
+                in_flight.append(executor.submit(cls._batch_write_chunk, table_name, chunk, schema))
+                if len(in_flight) >= max_in_flight:
+                    results.extend(in_flight.popleft().result())
+            while in_flight:
+                results.extend(in_flight.popleft().result())
+        return results
+
+    @classmethod
+    def _batch_write_chunk(cls, table_name, chunk, schema=TableRegistry.DEFAULT_SCHEMA):
+        """以 batch_write_item 寫入一批 (index, data), 回傳該批每筆資料的結果, 結果的 ID 為分區鍵的值"""
+        results = {}
+        requests = {}
+        for index, data in chunk:
+            try:
+                key = schema.identity(schema.key_of(data))
+            except ValueError as e:
+                results[index] = {"index": index, "ID": None, "success": False, "error": str(e)}
+                continue
+            id = str(data[schema.hash_key])
+            if key in requests:
+                results[index] = {"index": index, "ID": id, "success": False,
+                                  "error": "同一批次內主鍵重複"}
+                continue
+            try:
+                requests[key] = (index, id, {'PutRequest': {'Item': cls._to_dynamodb_item(data, schema)}})
+            except Exception as e:
+                results[index] = {"index": index, "ID": id, "success": False, "error": str(e)}
+
+        pending = {key: request for key, (_, _, request) in requests.items()}
+        error = "UnprocessedItems 重試次數已達上限"
+        attempt = 0
+        while pending:
+            try:
+                response = cls.dynamodb.batch_write_item(
+                    RequestItems={table_name: list(pending.values())}
+                )
+            except Exception as e:
+                logger.error("批次新增資料出錯: %s", e)
+                error = str(e)
+                break
+            unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+            unprocessed_keys = {schema.identity(request['PutRequest']['Item']) for request in unprocessed}
+            pending = {key: request for key, request in pending.items() if key in unprocessed_keys}
+            if not pending or attempt >= cls.BATCH_MAX_RETRIES:
+                break
+            time.sleep(cls._backoff_delay(attempt))
+            attempt += 1
+
+        for key, (index, id, _) in requests.items():
+            cls._invalidate_cache(table_name, id)
+            if key in pending:
+                results[index] = {"index": index, "ID": id, "success": False, "error": error}
+            else:
+                results[index] = {"index": index, "ID": id, "success": True}
+        return [results[index] for index, _ in chunk]
+
+    @classmethod
+    def batch_get_dynamodb(cls, table_name, ids, projection=None):
+        """一次查詢特定表格的多個 id 資料
+
+        流程:
+        1. 去除重複的 id (依主鍵的型別與值, N 的 "1" 與 "1.0" 視為相同), 每 100 個切成一批
+        2. 交給有上限的執行緒池以 batch_get_item 平行查詢, 可指定 projection 只取部分欄位
+        3. 每批的 UnprocessedKeys 以隨機化的指數退避重試, 重試次數用盡時拋出 RuntimeError
+        4. 依傳入 ids 的順序回傳資料, 查無資料的位置為 None
+        id 為表格分區鍵的值, 有排序鍵的表格無法只以 id 查詢, 拋出 ValueError
+        """
+        schema = cls.schema(table_name)
+        if schema.range_key:
+            raise ValueError(f"表格 {table_name} 的主鍵包含排序鍵 {schema.range_key}, 無法只以 id 批次查詢")
+        identities, unique_ids = cls._batch_get_ids(schema, ids)
+        chunks = list(cls._chunked(unique_ids, cls.BATCH_GET_SIZE))
+        found = {}
+        if chunks:
+            max_workers = min(len(chunks), cls.BATCH_MAX_WORKERS)
+            with ContextThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='dynamodb-batch-get') as executor:
+                for items in executor.map(lambda chunk: cls._batch_get_chunk(table_name, chunk, projection, schema),
+                                          chunks):
+                    for item in items:
+                        found[cls._batch_identity(schema, item)] = cls._from_dynamodb_item(item)
+        return [found.get(identities[str(id)]) for id in ids]
+
+    @classmethod
+    def _batch_get_ids(cls, schema, ids):
+        """回傳 ({str(id): 主鍵}, 去除重複主鍵的 id), 型別不符的 id 拋出 ValueError"""
+        identities = {}
+        unique_ids = {}
+        for id in map(str, ids):
+            identities[id] = identity = cls._batch_identity(schema, schema.key(id))
+            unique_ids.setdefault(identity, id)
+        return identities, list(unique_ids.values())
+
+    @staticmethod
+    def _batch_identity(schema, item):
+        """DynamoDB 格式的資料 (或 Key) 的主鍵, 用來把 batch_get_item 的結果對應回查詢的 id
+
+        以型別與值比對 (B 為 bytes, 不能以 str 比對); N 轉為 Decimal, "1.0" 與 DynamoDB 回傳的 "1" 視為相同
+        """
+        return tuple((key_type, Decimal(value) if key_type == 'N' else value)
+                     for key_type, value in schema.identity(item))
+
+    @classmethod
+    def _batch_get_chunk(cls, table_name, ids, projection=None, schema=TableRegistry.DEFAULT_SCHEMA):
+        """以 batch_get_item 查詢一批 id, 回傳查到的資料"""
+        request = cls._batch_get_request(ids, projection, schema)
+        items = []
+        attempt = 0
+        while True:
+            response = cls.dynamodb.batch_get_item(RequestItems={table_name: request})
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            unprocessed = response.get('UnprocessedKeys', {}).get(table_name)
+            if not unprocessed or not unprocessed.get('Keys'):
+                return items
+            if attempt >= cls.BATCH_MAX_RETRIES:
+                raise RuntimeError(f"UnprocessedKeys 重試次數已達上限, 尚有 {len(unprocessed['Keys'])} 筆未讀取")
+            request = unprocessed
+            time.sleep(cls._backoff_delay(attempt))
+            attempt += 1
+
+    @staticmethod
+    def _batch_get_request(ids, projection=None, schema=TableRegistry.DEFAULT_SCHEMA):
+        """建立 batch_get_item 中單一表格的查詢參數"""
+        request = {'Keys': [schema.key(id) for id in ids]}
+        if projection:
+            # 一定要取回分區鍵, 才能把結果對應回查詢的 id
+            names = list(dict.fromkeys([schema.hash_key, *projection]))
+            request['ProjectionExpression'] = ', '.join(f'#p{i}' for i in range(len(names)))
+            request['ExpressionAttributeNames'] = {f'#p{i}': name for i, name in enumerate(names)}
+        return request
+
+    @classmethod
+    def _backoff_delay(cls, attempt):
+        """第 attempt 次重試前的等待秒數 (full jitter 指數退避)"""
+        return random.uniform(0, min(cls.BATCH_BACKOFF_CAP, cls.BATCH_BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _chunked(iterable, size):
+        """將 iterable 依序切成每份最多 size 筆的 list"""
+        iterator = iter(iterable)
+        while chunk := list(itertools.islice(iterator, size)):
+            yield chunk
+
+    @classmethod
+    def _to_dynamodb_item(cls, data, schema=TableRegistry.DEFAULT_SCHEMA):
+        """將 data (JSON 物件) 轉換成 dynamodb 上傳表格資料的格式, 主鍵屬性依表格定義的型別轉換 (預設 ID 存成字串)
+
+        未標記 is_deleted 的資料加上 ACTIVE_ATTRIBUTE, 讓表格的 ACTIVE_INDEX 收錄
+        """
+        item = marshall_item(data)
+        for name in schema.key_attributes:
+            if name in data:
+                item[name] = schema.key_attribute(name, data[name])
+        if schema.hash_key in data and not data.get('is_deleted'):
+            item[cls.ACTIVE_ATTRIBUTE] = {'S': str(data[schema.hash_key])}
+        return item
+
+    @classmethod
+    def _from_dynamodb_item(cls, item):
+        """將 dynamodb 的資料轉換成 JSON 物件, 不包含內部使用的 ACTIVE_ATTRIBUTE"""
+        data = unmarshall_item(item)
+        data.pop(cls.ACTIVE_ATTRIBUTE, None)
+        return data
+
+    @classmethod
+    def _unmarshall_attributes(cls, response):
+        """將 update_item 回應中的 Attributes 轉換成 JSON 物件"""
+        if 'Attributes' in response:
+            response['Attributes'] = cls._from_dynamodb_item(response['Attributes'])
+        return response
+
+    @staticmethod
+    def _without_deleted(items):
+        """排除已軟刪除 (is_deleted=true) 的資料, 全部都已刪除時回傳 None"""
+        if not items:
+            return items
+        return [item for item in items if item.get('is_deleted') is not True] or None
+
+    @classmethod
+    def active_scan_kwargs(cls, table_name):
+        """只讀取未軟刪除資料的 scan 參數
+
+        表格有 ACTIVE_INDEX 時改為掃描該稀疏索引, 讀取量只與未刪除的資料筆數成正比
+        否則以 ACTIVE_FILTER 篩選, 仍會讀取 (並計費) 整張表
+        """
+        if cls.schema(table_name).has_index(cls.ACTIVE_INDEX):
+            return {'IndexName': cls.ACTIVE_INDEX}
+        return dict(cls.ACTIVE_FILTER)
+
+    @classmethod
+    def scan_pages(cls, table_name, limit=None, exclusive_start_key=None, **scan_kwargs):
+        """逐頁掃描特定表格
+
+        流程:
+        1. 使用 dynamodb 物件的 scan 方法讀取一頁資料
+        2. 將該頁的 items 轉換成 JSON 物件, 產出 (items, LastEvaluatedKey)
+        3. 若有 LastEvaluatedKey, 從該位置繼續讀取下一頁, 直到最後一頁
+        4. 若有指定 limit, 取滿 limit 筆後即停止
+        """
+        kwargs = {'TableName': table_name, **scan_kwargs}
+        if exclusive_start_key:
+            kwargs['ExclusiveStartKey'] = exclusive_start_key
+        remaining = limit
+        while True:
+            if remaining is not None:
+                kwargs['Limit'] = remaining
+            response = cls.dynamodb.scan(**kwargs)
+            items = [cls._from_dynamodb_item(item) for item in response.get('Items', [])]
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            yield items, last_evaluated_key
+
+            if remaining is not None:
+                remaining -= len(items)
+                if remaining <= 0:
+                    break
+            if not last_evaluated_key:
+                break
+            kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    @classmethod
+    def iter_scan(cls, table_name, **scan_kwargs):
+        """逐筆產出特定表格的所有資料, 不會一次把整張表讀進記憶體"""
+        for items, _ in cls.scan_pages(table_name, **scan_kwargs):
+            yield from items
+
+    @classmethod
+    def parallel_scan_pages(cls, table_name, total_segments, max_workers=None, **scan_kwargs):
+        """以 Segment/TotalSegments 平行掃描特定表格, 並合併成單一的頁面串流
+
+        流程:
+        1. 將表格切成 total_segments 段, 交給有上限的執行緒池掃描
+        2. 每段各自逐頁讀取, 讀到的頁面放進有上限的佇列, 避免讀取速度超過回應速度時佔滿記憶體
+        3. 依完成順序產出每一頁的 items (不保證順序)
+        4. 任一段出錯時, 停止其他段並拋出該錯誤
+        5. 呼叫端提早結束 (例如用戶端斷線) 時, 也會通知所有段停止
+        """
+        max_workers = max(1, min(total_segments, max_workers or cls.SCAN_MAX_WORKERS))
+        pages = queue.Queue(maxsize=max_workers * 2)
+        stop = threading.Event()
+        segment_done = object()
+
+        def put(entry):
+            # 佇列已滿時定期檢查是否已被要求停止
+            while not stop.is_set():
+                try:
+                    pages.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_segment(segment):
+            try:
+                for items, _ in cls.scan_pages(table_name, Segment=segment,
+                                               TotalSegments=total_segments, **scan_kwargs):
+                    if not put(items):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(segment_done)
+
+        executor = ContextThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dynamodb-scan')
+        try:
+            for segment in range(total_segments):
+                executor.submit(scan_segment, segment)
+            finished = 0
+            while finished < total_segments:
+                entry = pages.get()
+                if entry is segment_done:
+                    finished += 1
+                elif isinstance(entry, Exception):
+                    raise entry
+                else:
+                    yield entry
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def scan_page(cls, table_name, limit=None, page_token=None, **scan_kwargs):
+        """讀取特定表格的一頁資料, 供呼叫端自行分頁
+
+        流程:
+        1. 將呼叫端傳入的 page_token 解碼回 ExclusiveStartKey
+        2. 從該位置讀取最多 limit 筆資料 (上限為 SCAN_PAGE_MAX_LIMIT)
+        3. 回傳 (items, next_token), 若已讀到最後一頁, next_token 為 None
+        若 page_token 格式錯誤, 拋出 ValueError
+        scan_kwargs 為額外的 scan 參數, 例如 active_scan_kwargs() 的結果
+        """
+        if limit is None or limit <= 0 or limit > cls.SCAN_PAGE_MAX_LIMIT:
+            limit = cls.SCAN_PAGE_MAX_LIMIT
+        exclusive_start_key = cls.decode_page_token(page_token) if page_token else None
+
+        items = []
+        last_evaluated_key = None
+        for page_items, last_evaluated_key in cls.scan_pages(table_name, limit, exclusive_start_key,
+                                                             **scan_kwargs):
+            items.extend(page_items)
+        return items, cls.encode_page_token(last_evaluated_key)
+
+    @staticmethod
+    def encode_page_token(last_evaluated_key):
+        """將 LastEvaluatedKey 編碼成不透明的分頁 token
+
+        主鍵的 B (bytes) 無法寫成 JSON, 以 {"B64": base64 字串} 標記型別, decode_page_token 時轉回 B
+        """
+        if not last_evaluated_key:
+            return None
+        key = {name: {'B64': base64.b64encode(value['B']).decode('ascii')} if 'B' in value else value
+               for name, value in last_evaluated_key.items()}
+        raw = json.dumps(key, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_page_token(page_token):
+        """將分頁 token 解碼回 ExclusiveStartKey, 格式錯誤時拋出 ValueError"""
+        try:
+            key = json.loads(base64.urlsafe_b64decode(page_token.encode('ascii')))
+            if not isinstance(key, dict) or not all(isinstance(value, dict) for value in key.values()):
+                raise ValueError(page_token)
+            return {name: {'B': base64.b64decode(value['B64'], validate=True)} if 'B64' in value else value
+                    for name, value in key.items()}
+        except Exception as e:
+            raise ValueError(f"無效的分頁 token: {page_token}") from e
+
     @classmethod
     def scan_dynamodb(cls, table_name):
         """查詢特定表格
         
         流程:
-        1. 使用 dynamodb 物件讀取特調表格
-        2. 取出回應的 items 欄位
-        3. 打印出每筆資料驗證
-        4. 將資料以字串型式回傳
-        5. 若失敗，則告知錯誤訊息，並回傳 None
+        1. 使用 dynamodb 物件逐頁讀取特定表格, 直到最後一頁
+        2. 將資料序列化成 JSON 字串回傳
+        3. 若失敗，則告知錯誤訊息，並回傳 None
         """
         try:
             # 掃描資料
-            response = cls.dynamodb.scan(TableName=table_name)
-            items = response['Items']
-            print("items" + str(items))
-            print("掃描資料成功")
-            _list = []
-            for item in items:
-                print(item)
-                _list.append(item)
-            return str(_list)
+            items = list(cls.iter_scan(table_name))
+            logger.debug("掃描資料成功: %s, %d 筆", table_name, len(items))
+            return dumps(items).decode('utf-8')
         except Exception as e:
-            print("掃描資料出錯")
-            print(e)
+            logger.error("掃描資料出錯: %s", e)
             return None
         
     @classmethod
-    def query_dynamodb(cls, table_name, id):
+    def query_dynamodb(cls, table_name, id, include_deleted=True):
         """查詢特定表格的特定 id 資料
         
         流程:
         1. 設定特定 id 主鍵
         2. 用客戶端物件的 query 方法, 查詢特定表格的特定屬性欄位值
         3. 
-        若查詢成功, 印出所有欄位
+        若查詢成功, 回傳查到的資料清單, 查無資料時回傳 None
         若失敗, 告知「查詢資料出錯」
+        若有啟用 item_cache, 先讀取快取, 未命中時才查詢 DynamoDB 並寫入快取
+        include_deleted 為 False 時, 已軟刪除的資料視為查無資料 (以主鍵查詢只讀取一筆, 不需要索引)
         """
-        key_condition = f'ID = :id'
-        _value = f'{id}'
+        if not include_deleted:
+            return cls._without_deleted(cls.query_dynamodb(table_name, id))
+        token = None
+        if cls.item_cache:
+            cached, token = cls.item_cache.get(table_name, str(id))
+            if cached is not None:
+                return cached
+
         try:
             # 查詢單筆資料
-            response = cls.dynamodb.query(
-                TableName=table_name,
-                KeyConditionExpression=key_condition,
-                ExpressionAttributeValues={
-                    ':id': {'S': _value} # 根據實際情況修改
-                }
-            )
-            items = response['Items']
-            print("查詢資料成功")
-            _list = []
-            for item in items:
-                print(item)
-                _list.append(item)
-                return _list
+            response = cls.dynamodb.query(**cls._query_request(table_name, id, cls.schema(table_name)))
+            items = [cls._from_dynamodb_item(item) for item in response['Items']]
+            logger.debug("查詢資料成功: %s %s", table_name, id)
         except Exception as e:
-            print("查詢資料出錯")
-            print(e)
+            logger.error("查詢資料出錯: %s", e)
+            return None
+        if not items:
             return None
+        if cls.item_cache:
+            cls.item_cache.put(table_name, str(id), items, token)
+        return items
+
+    @staticmethod
+    def _query_request(table_name, id, schema=TableRegistry.DEFAULT_SCHEMA):
+        """建立查詢特定 id (分區鍵的值) 的 query 參數, 有排序鍵的表格回傳該分區的所有資料"""
+        return {
+            'TableName': table_name,
+            'KeyConditionExpression': '#pk = :id',
+            'ExpressionAttributeNames': {'#pk': schema.hash_key},
+            'ExpressionAttributeValues': {
+                ':id': schema.key_attribute(schema.hash_key, id)
+            },
+        }
     
     @classmethod
     def update_dynamodb_item(cls, table_name, new_data):
         """更新特定表格的特定資料
-        
+
+        new_data 除了要 SET 的欄位外, 可包含:
+        - "$remove": 要移除的欄位名稱 list
+        - "$add": 要累加的欄位 {欄位: 數值或 list (加入集合, 元素須全部是字串或全部是數值)}
+        - "$version": 目前的版本號, 指定時以 VERSION_ATTRIBUTE 做樂觀鎖,
+          版本不符時 update_item 拋出 ConditionalCheckFailedException, 成功時版本號加一
+
         流程:
-        1. 建立表達式屬性名稱和表達式屬性值
-        2. 取出要更新的資料的 ID
-        3. 將 ID 欄刪掉，避免寫入
-        4. 取出其它的值
-        5. 建立更新表達式
-        6. 更新資料
+        1. 依欄位名稱取得編譯好的更新表達式 (相同欄位組合只建立一次)
+        2. 將本次的值綁定到表達式的佔位符, 不會修改傳入的 new_data
+        3. 更新資料, 並依 is_deleted 維護 ACTIVE_ATTRIBUTE (見 _update_request)
+        4. 未指定 is_deleted 而資料已軟刪除時 (條件不成立), 以不加回 ACTIVE_ATTRIBUTE 的表達式重新更新
+        格式錯誤時拋出 ValueError
         """
-        
-        # 建立表達式屬性名稱和表達式屬性值
-        expression_attribute_names = {}
-        expression_attribute_values = {}
-        update_expressions = []
+        schema = cls.schema(table_name)
+        id, request = cls._update_request(table_name, new_data, schema)
+        logger.debug("更新資料: %s %s", table_name, id)
 
-        id = new_data.get("ID", "")
-        del new_data["ID"]
-        for key, value in new_data.items():
-            attribute_name_placeholder = '#' + key
-            attribute_value_placeholder = ':' + key
+        try:
+            response = cls.dynamodb.update_item(**request)
+        except Exception as e:
+            if not cls._deleted_conflict(e, request):
+                raise
+            id, request = cls._update_request(table_name, new_data, schema, deleted=True)
+            response = cls.dynamodb.update_item(**request)
+        cls._invalidate_cache(table_name, id)
+        return cls._unmarshall_attributes(response)
 
-            expression_attribute_names[attribute_name_placeholder] = key
-            expression_attribute_values[attribute_value_placeholder] = {'S': value}
+    @classmethod
+    def _update_request(cls, table_name, new_data, schema=TableRegistry.DEFAULT_SCHEMA, deleted=False):
+        """建立更新特定資料的 update_item 參數, 回傳 (id, 參數), id 為分區鍵的值
 
-            update_expressions.append(f'{attribute_name_placeholder} = {attribute_value_placeholder}')
+        ACTIVE_ATTRIBUTE 與 is_deleted 保持一致, 讓 ACTIVE_INDEX 與篩選條件讀到相同的資料:
+        - is_deleted 設為 true 時 REMOVE ACTIVE_ATTRIBUTE; 設為其他值或以 $remove 移除時 SET
+        - 未指定 is_deleted 時, 條件為資料未軟刪除 (或尚不存在) 才 SET;
+          deleted=True (已知資料已軟刪除) 時不修改 ACTIVE_ATTRIBUTE
+        """
+        key = schema.key_of(new_data)
+        id = str(new_data[schema.hash_key])
+        set_data = {name: value for name, value in new_data.items()
+                    if name not in schema.key_attributes and name not in cls.UPDATE_OPERATORS}
+        remove_names = new_data.get("$remove", [])
+        add_data = new_data.get("$add", {})
+        version = new_data.get("$version")
+        if not isinstance(remove_names, list) or not all(isinstance(name, str) for name in remove_names):
+            raise ValueError("$remove 必須是欄位名稱的 list")
+        if not isinstance(add_data, dict):
+            raise ValueError("$add 必須是 {欄位: 數值} 的 JSON 物件")
+        if version is not None and (isinstance(version, bool) or not isinstance(version, int) or version < 0):
+            raise ValueError("$version 必須是大於等於 0 的整數")
+        if version is not None and cls.VERSION_ATTRIBUTE in {*set_data, *remove_names, *add_data}:
+            raise ValueError(f"指定 $version 時不可直接修改 {cls.VERSION_ATTRIBUTE}")
+        if cls.ACTIVE_ATTRIBUTE in {*set_data, *remove_names, *add_data}:
+            raise ValueError(f"不可直接修改 {cls.ACTIVE_ATTRIBUTE}")
+
+        set_names = tuple(sorted(set_data))
+        add_names = tuple(sorted(add_data))
+        remove_names = tuple(sorted(set(remove_names)))
+        if len({*set_names, *add_names, *remove_names}) != len(set_names) + len(add_names) + len(remove_names):
+            raise ValueError("同一個欄位只能出現在 SET、$remove、$add 其中之一")
+        lock = None if version is None else ('initial' if version == 0 else 'match')
+        if set_data.get('is_deleted') is True:
+            active = 'remove'
+        elif 'is_deleted' in set_data or 'is_deleted' in remove_names:
+            active = 'set'
+        else:
+            active = None if deleted else 'if_not_deleted'
+        compiled = cls._compile_update(set_names, remove_names, add_names, lock, cls.VERSION_ATTRIBUTE,
+                                       active, cls.ACTIVE_ATTRIBUTE)
+
+        # 依編譯時的欄位順序綁定本次的值
+        values = {placeholder: marshall(set_data[name])
+                  for placeholder, name in zip(compiled.set_values, set_names)}
+        for placeholder, name in zip(compiled.add_values, add_names):
+            values[placeholder] = cls._add_value(name, add_data[name])
+        if lock:
+            values[':next_version'] = {'N': str(version + 1)}
+            if lock == 'match':
+                values[':version'] = {'N': str(version)}
+        if active in ('set', 'if_not_deleted'):
+            values[':active'] = {'S': id}
+        if active == 'if_not_deleted':
+            values[':deleted'] = {'BOOL': True}
+
+        request = {
+            'TableName': table_name,
+            'Key': key,
+            'UpdateExpression': compiled.update_expression,
+            'ExpressionAttributeNames': compiled.names,
+            'ReturnValues': "UPDATED_NEW",
+        }
+        if values:
+            request['ExpressionAttributeValues'] = values
+        if compiled.condition_expression:
+            request['ConditionExpression'] = compiled.condition_expression
+        return id, request
+
+    @staticmethod
+    def _deleted_conflict(error, request):
+        """update_item 是否因資料已軟刪除 (未指定 is_deleted 時的條件) 而失敗, 是的話應以 deleted=True 重新更新
+
+        同時指定 $version 時無法區分是哪個條件不成立, 重新更新時版本不符仍會拋出 ConditionalCheckFailedException
+        """
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return code == 'ConditionalCheckFailedException' and ':deleted' in request.get('ExpressionAttributeValues', {})
+
+    @staticmethod
+    def _add_value(name, value):
+        """$add 的值轉換成 DynamoDB 的屬性值: 數值 (N) 或同一型別的字串/數值 list (SS/NS), 其他拋出 ValueError"""
+        def is_number(element):
+            return isinstance(element, (int, float, Decimal)) and not isinstance(element, bool)
+
+        if is_number(value):
+            return marshall(value)
+        if isinstance(value, list) and value and (all(isinstance(element, str) for element in value)
+                                                   or all(is_number(element) for element in value)):
+            return marshall(set(value))
+        raise ValueError(f"$add 的 {name} 必須是數值, 或全部是字串或全部是數值的非空 list")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _compile_update(set_names, remove_names, add_names, lock, version_attribute, active=None,
+                        active_attribute=None):
+        """將欄位名稱組合編譯成更新表達式, 結果依參數快取
+
+        欄位名稱一律以 #n0, #n1... 佔位, 值以 :s0 (SET)、:a0 (ADD) 佔位, 避免與保留字衝突
+        lock 為 'initial' 時要求資料尚無版本號, 'match' 時要求版本號等於 :version
+        active 為 'set' 時 SET active_attribute = :active, 'remove' 時 REMOVE,
+        'if_not_deleted' 時 SET 並要求資料尚未軟刪除 (is_deleted 不是 :deleted)
+        回傳的 names 為共用的 dict, 呼叫端不可修改
+        """
+        names = {}
+
+        def name_placeholder(name):
+            placeholder = f'#n{len(names)}'
+            names[placeholder] = name
+            return placeholder
+
+        set_values = tuple(f':s{i}' for i in range(len(set_names)))
+        add_values = tuple(f':a{i}' for i in range(len(add_names)))
+        set_clauses = [f'{name_placeholder(name)} = {value}' for name, value in zip(set_names, set_values)]
+        remove_clauses = [name_placeholder(name) for name in remove_names]
+        add_clauses = [f'{name_placeholder(name)} {value}' for name, value in zip(add_names, add_values)]
+
+        conditions = []
+        if lock:
+            version = name_placeholder(version_attribute)
+            set_clauses.append(f'{version} = :next_version')
+            if lock == 'initial':
+                conditions.append(f'attribute_not_exists({version})')
+            else:
+                conditions.append(f'{version} = :version')
+        if not (set_clauses or remove_clauses or add_clauses):
+            raise ValueError("沒有要更新的欄位")
+
+        if active == 'remove':
+            remove_clauses.append(name_placeholder(active_attribute))
+        elif active in ('set', 'if_not_deleted'):
+            set_clauses.append(f'{name_placeholder(active_attribute)} = :active')
+        if active == 'if_not_deleted':
+            deleted = name_placeholder('is_deleted')
+            conditions.append(f'(attribute_not_exists({deleted}) OR {deleted} <> :deleted)')
+
+        clauses = []
+        if set_clauses:
+            clauses.append('SET ' + ', '.join(set_clauses))
+        if remove_clauses:
+            clauses.append('REMOVE ' + ', '.join(remove_clauses))
+        if add_clauses:
+            clauses.append('ADD ' + ', '.join(add_clauses))
+        condition_expression = ' AND '.join(conditions) or None
+        return CompiledUpdate(' '.join(clauses), names, set_values, add_values, condition_expression)
 
-        # 建立更新表達式
-        update_expression = 'SET ' + ', '.join(update_expressions)
-        print("id: " + id)
-        
-        response = cls.dynamodb.update_item(
-            TableName=table_name,
-            Key={'ID': {"S": str(id)}},
-            ExpressionAttributeNames=expression_attribute_names,
-            ExpressionAttributeValues=expression_attribute_values,
-            UpdateExpression=update_expression,
-            ReturnValues="UPDATED_NEW"
-        )
-        return response
-    
     @classmethod
     def soft_delete_item(cls,table_name, new_data):
         """軟刪除資料
@@ -236,38 +867,61 @@ class DynamoDBDao:
         2. 刪除該ID
         3. 將該 ID 資料更新 is_deleted=true
         """
+        id, request = cls._soft_delete_request(table_name, new_data, cls.schema(table_name))
+        response = cls.dynamodb.update_item(**request)
+        cls._invalidate_cache(table_name, id)
+        return cls._unmarshall_attributes(response)
 
-        id = new_data.get("ID", "")
-        # name = new_data.get("Name", "")
-        del new_data["ID"]
-        # del new_data["Name"]
-
-        # 將 is_deleted 屬性設為 True
-        response = cls.dynamodb.update_item(
-            TableName=table_name,
-            # Key={'ID': {"S": str(id)}, 'Name':{"S": name}},
-            Key={'ID': {"S": str(id)}},
-            UpdateExpression="SET is_deleted = :true",
-            ExpressionAttributeValues={
+    @classmethod
+    def _soft_delete_request(cls, table_name, new_data, schema=TableRegistry.DEFAULT_SCHEMA):
+        """建立軟刪除特定資料的 update_item 參數, 回傳 (id, 參數), 缺少主鍵時拋出 ValueError"""
+        key = schema.key_of(new_data)
+        id = str(new_data[schema.hash_key])
+
+        # 將 is_deleted 屬性設為 True, 並移除 ACTIVE_ATTRIBUTE, 讓該筆資料離開 ACTIVE_INDEX
+        return id, {
+            'TableName': table_name,
+            'Key': key,
+            'UpdateExpression': "SET is_deleted = :true REMOVE #active",
+            'ExpressionAttributeNames': {'#active': cls.ACTIVE_ATTRIBUTE},
+            'ExpressionAttributeValues': {
                 ':true': {'BOOL': True}
             },
-            ReturnValues="UPDATED_NEW"
-        )
-        return response
+            'ReturnValues': "UPDATED_NEW",
+        }
     
     @classmethod
-    def delete_item(cls, table_name, id):
+    def delete_item(cls, table_name, id, sort_key=None):
         """直接刪除資料
 
         流程: 
-        1. 取出要刪除的資料的 ID
+        1. 取出要刪除的資料的 ID (分區鍵的值), 有排序鍵的表格另需傳入 sort_key
         2. 使用 dynamodb 物件直接刪除該筆 ID 的資料
         3. 回傳刪除的 response
         """
-        key = {'ID': {'S': id}}
-        response = cls.dynamodb.delete_item(
-            TableName=table_name,
-            Key=key  # 主鍵，必須是一個字典，例如：{'ID': {'S': '123'}}
-        )
+        request = cls._delete_request(table_name, id, cls.schema(table_name), sort_key)
+        response = cls.dynamodb.delete_item(**request)
+        cls._invalidate_cache(table_name, id)
     
-        return response
\ No newline at end of file
+        return response
+
+    @staticmethod
+    def _delete_request(table_name, id, schema=TableRegistry.DEFAULT_SCHEMA, sort_key=None):
+        """建立刪除特定資料的 delete_item 參數"""
+        return {
+            'TableName': table_name,
+            'Key': schema.key(id, sort_key),  # 主鍵，必須是一個字典，例如：{'ID': {'S': '123'}}
+        }
+
+    @classmethod
+    def _invalidate_cache(cls, table_name, id):
+        """資料有異動時, 清除該筆資料的快取"""
+        if cls.item_cache and id is not None:
+            cls.item_cache.invalidate(table_name, str(id))
+
+    @classmethod
+    def get_cache_stats(cls):
+        """回傳單筆查詢快取的統計資料, 未啟用時回傳 None"""
+        if not cls.item_cache:
+            return None
+        return cls.item_cache.stats()
@@ -0,0 +1,212 @@
+"""JSON 與 DynamoDB 屬性值 (attribute value) 之間的轉換, 以及快速的 JSON 序列化
+
+每一筆掃描、查詢的資料都會經過這裡, 因此以 type() 查表分派, 避免一連串的 isinstance 判斷
+DynamoDB 的數值最多 38 位有效數字, 轉換與序列化時保持原本的精確度, 不經過 float 捨入
+"""
+import re
+import math
+import json
+import base64
+from json.encoder import encode_basestring
+from decimal import Decimal
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:  # 未安裝 orjson 時使用標準函式庫的 json
+    orjson = None
+
+
+def marshall(value):
+    """將 Python/JSON 的值轉換成 DynamoDB 的屬性值
+
+    str -> S, int/float/Decimal -> N, bool -> BOOL, None -> NULL, dict -> M, list/tuple -> L,
+    bytes -> B, set -> SS/NS/BS (依元素型別決定)
+    無法轉換時拋出 TypeError, NaN 與無限大拋出 ValueError
+    """
+    marshaller = _MARSHALLERS.get(type(value))
+    if marshaller is None:
+        marshaller = _find_marshaller(value)
+    return marshaller(value)
+
+
+def unmarshall(attribute_value):
+    """將 DynamoDB 的屬性值轉換成可 JSON 序列化的 Python 值
+
+    N -> int、float 或 Decimal (見 _parse_number), SS/NS/BS -> list, B -> bytes (序列化成 JSON 時為 base64 字串)
+    """
+    (attribute_type, value), = attribute_value.items()
+    return _UNMARSHALLERS[attribute_type](value)
+
+
+def marshall_item(data):
+    """將一筆 JSON 物件轉換成 DynamoDB 的 Item"""
+    return {key: marshall(value) for key, value in data.items()}
+
+
+def unmarshall_item(item):
+    """將一筆 DynamoDB 的 Item 轉換成 JSON 物件"""
+    return {key: unmarshall(value) for key, value in item.items()}
+
+
+def dumps(obj):
+    """將物件序列化成 UTF-8 編碼的 JSON (bytes), 有安裝 orjson 時使用 orjson
+
+    orjson 不支援超過 64 位元的整數, float 無法精確表示的 Decimal 兩者都無法原樣輸出,
+    遇到時改以 _dumps_exact 序列化, 數值以原本的文字輸出
+    """
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj, default=_json_default)
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+    except TypeError:
+        return _dumps_exact(obj)
+
+
+def loads(data):
+    """將 JSON (str 或 bytes) 反序列化
+
+    orjson 與 json 預設都把小數轉成 float, orjson 也會把超過 64 位元的整數轉成 float;
+    內容含有 16 位以上數字 (float 可能失真) 時, 改以標準函式庫解析, 整數保持 int, 小數轉成 Decimal
+    """
+    if _LONG_NUMBER.search(data if isinstance(data, (bytes, bytearray)) else data.encode('utf-8')):
+        return json.loads(data, parse_float=Decimal)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# 16 個以上的數字 (中間最多一個小數點), float 只能保證 15 位有效數字
+_LONG_NUMBER = re.compile(rb'(?:\d\.?){16}')
+
+
+def _dumps_exact(obj):
+    """逐一序列化, Decimal 與任意大小的整數以原本的文字輸出, 無法序列化的型別拋出 TypeError"""
+    parts = []
+    _encode_exact(obj, parts.append)
+    return ''.join(parts).encode('utf-8')
+
+
+def _encode_exact(obj, write):
+    if isinstance(obj, str):
+        write(encode_basestring(obj))
+    elif obj is None or isinstance(obj, (bool, int, float)):
+        write(json.dumps(obj))
+    elif isinstance(obj, Decimal):
+        if not obj.is_finite():
+            raise ValueError(f"JSON 不支援的數值: {obj}")
+        write(str(obj))
+    elif isinstance(obj, dict):
+        write('{')
+        for index, (key, value) in enumerate(obj.items()):
+            if index:
+                write(',')
+            write(encode_basestring(key if isinstance(key, str) else str(key)))
+            write(':')
+            _encode_exact(value, write)
+        write('}')
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        write('[')
+        for index, value in enumerate(obj):
+            if index:
+                write(',')
+            _encode_exact(value, write)
+        write(']')
+    else:
+        _encode_exact(_json_default(obj), write)
+
+
+def _number(value):
+    if not math.isfinite(value):
+        raise ValueError(f"DynamoDB 不支援的數值: {value}")
+    return {'N': str(value)}
+
+
+def _decimal(value):
+    if not value.is_finite():
+        raise ValueError(f"DynamoDB 不支援的數值: {value}")
+    return {'N': str(value)}
+
+
+def _set(value):
+    if not value:
+        raise TypeError("DynamoDB 不支援空集合")
+    element_types = {type(element) for element in value}
+    if element_types <= {str}:
+        return {'SS': list(value)}
+    if element_types <= {int, float, Decimal} and bool not in element_types:
+        return {'NS': [_number(element)['N'] if not isinstance(element, Decimal) else str(element)
+                       for element in value]}
+    if element_types <= {bytes, bytearray}:
+        return {'BS': [bytes(element) for element in value]}
+    raise TypeError(f"集合的元素必須同為字串、數值或位元組: {value!r}")
+
+
+_MARSHALLERS = {
+    str: lambda value: {'S': value},
+    bool: lambda value: {'BOOL': value},
+    int: lambda value: {'N': str(value)},
+    float: _number,
+    Decimal: _decimal,
+    type(None): lambda value: {'NULL': True},
+    dict: lambda value: {'M': {key: marshall(element) for key, element in value.items()}},
+    list: lambda value: {'L': [marshall(element) for element in value]},
+    tuple: lambda value: {'L': [marshall(element) for element in value]},
+    set: _set,
+    frozenset: _set,
+    bytes: lambda value: {'B': value},
+    bytearray: lambda value: {'B': bytes(value)},
+}
+
+
+def _find_marshaller(value):
+    """處理子類別 (例如 OrderedDict), 找不到對應的型別時拋出 TypeError"""
+    for value_type, marshaller in _MARSHALLERS.items():
+        if value_type is not type(None) and isinstance(value, value_type):
+            return marshaller
+    raise TypeError(f"無法轉換成 DynamoDB 屬性值的型別: {type(value).__name__}")
+
+
+def _parse_number(value):
+    """整數轉成 int (任意大小); 小數轉成 float, float 無法精確表示時 (超過 15 位有效數字) 轉成 Decimal"""
+    if '.' in value or 'e' in value or 'E' in value:
+        number = float(value)
+        if repr(number) == value or Decimal(repr(number)) == Decimal(value):
+            return number
+        return Decimal(value)
+    return int(value)
+
+
+_UNMARSHALLERS = {
+    'S': lambda value: value,
+    'N': _parse_number,
+    'BOOL': lambda value: value,
+    'NULL': lambda value: None,
+    'M': lambda value: {key: unmarshall(element) for key, element in value.items()},
+    'L': lambda value: [unmarshall(element) for element in value],
+    'SS': list,
+    'NS': lambda value: [_parse_number(element) for element in value],
+    'B': bytes,
+    'BS': lambda value: [bytes(element) for element in value],
+}
+
+
+def _json_default(obj):
+    """標準 JSON 不支援的型別: bytes 轉 base64 字串, 集合轉 list, Decimal 轉數值
+
+    Decimal 只在可精確轉換成 int 或 float 時轉換, 否則拋出 TypeError, 由 dumps 改以 _dumps_exact 輸出
+    """
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(obj)).decode('ascii')
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        if obj == obj.to_integral_value():
+            return int(obj)
+        number = float(obj)
+        if Decimal(repr(number)) == obj:
+            return number
+        raise TypeError(f"無法精確轉換成 float 的 Decimal: {obj}")
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"無法序列化成 JSON 的型別: {type(obj).__name__}")
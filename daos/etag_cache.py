@@ -0,0 +1,68 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+class ETagCache:
+    """S3 物件 ETag 的行程內快取
+
+    - 上傳、更新、下載物件時記下 S3 回應的 ETag, 刪除物件時清除
+    - 未指定條件更新物件時, 以快取的 ETag 作為 If-Match 寫入 (省下 head_object), 過期的快取由 S3 拒絕 (412/404);
+      使用者指定的 If-Match 一律交給 S3 或 head_object 比對, 不依賴快取
+    - 以 OrderedDict 實作 LRU, 超過 max_items 時淘汰最久未使用的項目, 每筆存活 ttl 秒 (0 表示不快取)
+    - 只記錄這個行程看到的 ETag, 其他行程或用戶端直接寫入 S3 時, 最多 ttl 秒後才會察覺
+    """
+
+    # 比對並寫入時使用的鎖, 依 (值區, 物件名稱) 分配到固定數量的鎖, 不需為每個物件建立鎖
+    LOCK_STRIPES = 64
+
+    def __init__(self, max_items=10000, ttl=60.0, clock=time.monotonic):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    @classmethod
+    def from_env(cls):
+        """依環境變數 S3_ETAG_CACHE_MAX_ITEMS、S3_ETAG_CACHE_TTL (秒) 建立"""
+        return cls(max_items=int(os.getenv('S3_ETAG_CACHE_MAX_ITEMS', '10000')),
+                   ttl=float(os.getenv('S3_ETAG_CACHE_TTL', '60')))
+
+    def get(self, bucket_name, object_name):
+        """取得快取的 ETag, 未快取或已過期時回傳 None"""
+        key = (bucket_name, object_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, etag = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag
+
+    def put(self, bucket_name, object_name, etag):
+        if not etag or self.ttl <= 0 or self.max_items <= 0:
+            return
+        key = (bucket_name, object_name)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket_name, object_name):
+        with self._lock:
+            self._entries.pop((bucket_name, object_name), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lock(self, bucket_name, object_name):
+        """特定物件的鎖, 讓同一行程內的「以 head_object 比對 ETag 再寫入」不會交錯"""
+        return self._stripes[hash((bucket_name, object_name)) % self.LOCK_STRIPES]
@@ -0,0 +1,127 @@
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+
+class ItemCache:
+    """DynamoDB 單筆資料的行程內快取
+
+    - 以 OrderedDict 實作 LRU, 超過 max_items 時淘汰最久未使用的資料
+    - 每筆資料依表格設定存活時間 (TTL), 過期後視為未命中
+    - 寫入資料時呼叫 invalidate 清除該筆快取
+    - 記錄命中、未命中、淘汰、過期與清除的次數, 用來評估省下多少讀取容量
+    """
+
+    def __init__(self, max_items=10000, default_ttl=60.0, table_ttls=None, clock=time.monotonic):
+        self.max_items = max_items
+        self.default_ttl = default_ttl
+        self.table_ttls = dict(table_ttls or {})
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次清除快取都會遞增, 用來避免查詢途中被寫入的舊資料又被放回快取
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """依環境變數建立快取, 未啟用時回傳 None
+
+        DYNAMODB_CACHE_ENABLED: true 時啟用
+        DYNAMODB_CACHE_MAX_ITEMS: 最多快取的資料筆數
+        DYNAMODB_CACHE_TTL: 預設的存活秒數
+        DYNAMODB_CACHE_TABLE_TTLS: 個別表格的存活秒數, 例如 users=300,orders=5 (0 表示不快取該表格)
+        """
+        if os.getenv('DYNAMODB_CACHE_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+            return None
+        table_ttls = {}
+        for pair in os.getenv('DYNAMODB_CACHE_TABLE_TTLS', '').split(','):
+            if '=' in pair:
+                table_name, ttl = pair.split('=', 1)
+                table_ttls[table_name.strip()] = float(ttl)
+        return cls(
+            max_items=int(os.getenv('DYNAMODB_CACHE_MAX_ITEMS', '10000')),
+            default_ttl=float(os.getenv('DYNAMODB_CACHE_TTL', '60')),
+            table_ttls=table_ttls,
+        )
+
+    def ttl_for(self, table_name):
+        """取得特定表格的存活秒數"""
+        return self.table_ttls.get(table_name, self.default_ttl)
+
+    def get(self, table_name, key):
+        """讀取快取
+
+        回傳 (value, token), 未命中時 value 為 None
+        未命中時, 查詢完資料庫後需將 token 傳給 put, 才能判斷查詢途中是否有寫入
+        """
+        cache_key = (table_name, key)
+        with self._lock:
+            token = self._epoch
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None, token
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[cache_key]
+                self.expirations += 1
+                self.misses += 1
+                return None, token
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+        return copy.deepcopy(value), token
+
+    def put(self, table_name, key, value, token):
+        """寫入快取
+
+        若取得 token 之後有任何資料被清除, 代表讀到的資料可能已過時, 不寫入
+        """
+        ttl = self.ttl_for(table_name)
+        if ttl <= 0 or self.max_items <= 0:
+            return
+        value = copy.deepcopy(value)
+        cache_key = (table_name, key)
+        with self._lock:
+            if token != self._epoch:
+                return
+            self._entries[cache_key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table_name, key):
+        """清除特定表格特定 key 的快取"""
+        with self._lock:
+            self._epoch += 1
+            if self._entries.pop((table_name, key), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """清除所有快取"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """回傳快取的統計資料"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
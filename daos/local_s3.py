@@ -0,0 +1,662 @@
+"""以本機檔案系統儲存物件的 S3 後端
+
+ENV=memory 或 S3_BACKEND=local 時, AWSClientFactory.client('s3') 回傳 LocalS3Client,
+提供與 boto3 s3 客戶端相同的方法與回應格式, 不需要 Docker 或網路即可執行測試與壓測
+
+- 物件存放在 S3_LOCAL_ROOT (預設為系統暫存資料夾下的 microapp-local-s3) 中,
+  檔名為物件名稱的 sha256, 另存一份 JSON 的 metadata, 重新啟動後仍可讀取
+- 每個值區在記憶體中保留排序後的物件名稱索引, 列出物件 (prefix、delimiter、分頁) 以二分搜尋定位
+- 讀取時以 mmap 對應檔案, Range 請求只讀取需要的範圍;
+  完整物件的下載可交給 WSGI 伺服器的 file_wrapper (例如 gunicorn 以 sendfile 零複製傳送)
+- 寫入時先寫到暫存檔, 完成後才替換 metadata, 讀取中的物件不會讀到寫到一半的內容
+- 支援分段上傳 (create_multipart_upload/upload_part/complete_multipart_upload/abort_multipart_upload)
+- 支援條件寫入 (put_object 與 complete_multipart_upload 的 IfMatch、IfNoneMatch='*')
+- 支援伺服器端複製 (copy_object、upload_part_copy), 直接複製資料檔, 不需下載再上傳
+"""
+import os
+import re
+import json
+import mmap
+import uuid
+import base64
+import bisect
+import shutil
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timezone
+from urllib.parse import unquote
+
+from botocore.exceptions import ClientError
+
+from daos.memory_dynamodb import ClientExceptions
+
+# 分段上傳時, 除最後一段外每段的最小大小
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_NUMBER = 10000
+# copy_object 的來源大小上限, 更大的物件需以 upload_part_copy 分段複製
+COPY_MAX_SIZE = 5 * 1024 ** 3
+# 寫入與複製檔案時的緩衝區大小
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_BUCKET_NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9.\-]{1,61}[a-z0-9]$')
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class LocalS3Client:
+    """以本機檔案系統儲存物件的 S3 客戶端, 方法名稱、參數與回應格式與 boto3 的 s3 客戶端相同"""
+
+    def __init__(self, region_name='us-east-1', root=None):
+        self.region_name = region_name
+        self.root = root or os.getenv('S3_LOCAL_ROOT') or os.path.join(tempfile.gettempdir(), 'microapp-local-s3')
+        self.exceptions = ClientExceptions()
+        self._buckets = None
+        self._uploads = {}
+        self._lock = threading.RLock()
+        os.makedirs(os.path.join(self.root, 'buckets'), exist_ok=True)
+
+    # 值區
+    def list_buckets(self, **kwargs):
+        with self._lock:
+            buckets = [{'Name': bucket.name, 'CreationDate': bucket.created}
+                       for bucket in sorted(self._all_buckets().values(), key=lambda bucket: bucket.name)]
+        return self._response(Buckets=buckets, Owner={'DisplayName': 'local', 'ID': 'local'})
+
+    def create_bucket(self, Bucket, CreateBucketConfiguration=None, **kwargs):
+        if not _BUCKET_NAME_PATTERN.match(Bucket):
+            raise self._error('InvalidBucketName', 'The specified bucket is not valid.', 'CreateBucket', 400)
+        with self._lock:
+            buckets = self._all_buckets()
+            if Bucket in buckets:
+                # 與 S3 相同, us-east-1 重複建立自己的值區視為成功
+                if self.region_name == 'us-east-1':
+                    return self._response(Location=f'/{Bucket}')
+                raise self._error('BucketAlreadyOwnedByYou', 'Your previous request to create the named bucket '
+                                  'succeeded and you already own it.', 'CreateBucket', 409)
+            buckets[Bucket] = _Bucket.create(os.path.join(self.root, 'buckets', Bucket), Bucket)
+        return self._response(Location=f'/{Bucket}')
+
+    def head_bucket(self, Bucket, **kwargs):
+        with self._lock:
+            if Bucket not in self._all_buckets():
+                raise self._error('404', 'Not Found', 'HeadBucket', 404)
+        return self._response(BucketRegion=self.region_name)
+
+    def delete_bucket(self, Bucket, **kwargs):
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'DeleteBucket')
+            if bucket.keys:
+                raise self._error('BucketNotEmpty', 'The bucket you tried to delete is not empty',
+                                  'DeleteBucket', 409)
+            del self._buckets[Bucket]
+            shutil.rmtree(bucket.path, ignore_errors=True)
+        return self._response(204)
+
+    # 物件
+    def put_object(self, Bucket, Key, Body=b'', ContentType=None, Metadata=None, IfMatch=None, IfNoneMatch=None,
+                   **kwargs):
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'PutObject')
+        data_file, size, md5 = bucket.write_data(Key, _iter_body(Body))
+        etag = f'"{md5.hexdigest()}"'
+        self._commit(bucket, Key, data_file, size, etag, ContentType, Metadata, IfMatch, IfNoneMatch, 'PutObject')
+        return self._response(ETag=etag)
+
+    def head_object(self, Bucket, Key, IfMatch=None, IfNoneMatch=None, IfModifiedSince=None,
+                    IfUnmodifiedSince=None, **kwargs):
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'HeadObject', missing_code='404')
+            meta = bucket.objects.get(Key)
+        if meta is None:
+            raise self._error('404', 'Not Found', 'HeadObject', 404)
+        self._check_preconditions(meta, IfMatch, IfNoneMatch, IfModifiedSince, IfUnmodifiedSince, 'HeadObject')
+        return self._response(**self._object_headers(meta), ContentLength=meta['Size'])
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None, IfNoneMatch=None, IfModifiedSince=None,
+                   IfUnmodifiedSince=None, **kwargs):
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'GetObject')
+            meta = bucket.objects.get(Key)
+            if meta is None:
+                raise self._error('NoSuchKey', 'The specified key does not exist.', 'GetObject', 404)
+            # 持有鎖時開啟檔案, 之後即使物件被覆寫或刪除, 已開啟的檔案仍可讀到原本的內容
+            file = open(bucket.data_path(meta['DataFile']), 'rb')
+        try:
+            self._check_preconditions(meta, IfMatch, IfNoneMatch, IfModifiedSince, IfUnmodifiedSince, 'GetObject')
+            size = meta['Size']
+            start, end = 0, size - 1
+            response = self._response(**self._object_headers(meta))
+            if Range:
+                start, end = self._parse_range(Range, size)
+                response['ContentRange'] = f'bytes {start}-{end}/{size}'
+                response['ResponseMetadata']['HTTPStatusCode'] = 206
+        except Exception:
+            file.close()
+            raise
+        response['ContentLength'] = end - start + 1
+        response['Body'] = LocalObjectBody(file, start, end - start + 1, size)
+        return response
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        body = self.get_object(Bucket=Bucket, Key=Key)['Body']
+        try:
+            with open(Filename, 'wb') as target:
+                for chunk in body.iter_chunks(COPY_BUFFER_SIZE):
+                    target.write(chunk)
+        finally:
+            body.close()
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'DeleteObject')
+            bucket.remove(Key)
+        return self._response(204)
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective='COPY', ContentType=None, Metadata=None,
+                    CopySourceIfMatch=None, **kwargs):
+        source = self._read_copy_source(CopySource, CopySourceIfMatch, None)
+        try:
+            if source['ContentLength'] > COPY_MAX_SIZE:
+                raise self._error('InvalidRequest', 'The specified copy source is larger than the maximum allowable '
+                                  f'size for a copy source: {COPY_MAX_SIZE}', 'CopyObject', 400)
+            bucket = self._get_bucket(Bucket, 'CopyObject')
+            data_file, size, md5 = bucket.write_data(Key, _iter_body(source['Body']))
+        finally:
+            source['Body'].close()
+        if MetadataDirective == 'REPLACE':
+            content_type, metadata = ContentType, Metadata
+        else:
+            content_type, metadata = source['ContentType'], source['Metadata']
+        etag = f'"{md5.hexdigest()}"'
+        self._commit(bucket, Key, data_file, size, etag, content_type, metadata, operation='CopyObject')
+        return self._response(CopyObjectResult={'ETag': etag, 'LastModified': datetime.now(timezone.utc)})
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        objects = Delete.get('Objects', [])
+        if not objects or len(objects) > 1000:
+            raise self._error('MalformedXML', 'The XML you provided was not well-formed', 'DeleteObjects', 400)
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'DeleteObjects')
+            for obj in objects:
+                bucket.remove(obj['Key'])
+        # 與 S3 相同, 不存在的物件也視為刪除成功; Quiet 時只回傳失敗的物件
+        deleted = [] if Delete.get('Quiet') else [{'Key': obj['Key']} for obj in objects]
+        return self._response(Deleted=deleted)
+
+    def list_objects_v2(self, Bucket, Prefix='', Delimiter=None, MaxKeys=1000, ContinuationToken=None,
+                        StartAfter=None, **kwargs):
+        prefix = Prefix or ''
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'ListObjectsV2')
+            keys = bucket.keys
+            index = bisect.bisect_left(keys, prefix)
+            start_after = _decode_token(ContinuationToken) if ContinuationToken else StartAfter
+            if start_after:
+                if Delimiter and start_after.endswith(Delimiter) and start_after.startswith(prefix):
+                    # 上一頁停在子資料夾, 從該子資料夾之後繼續
+                    index = max(index, bisect.bisect_left(keys, _successor(start_after)))
+                else:
+                    index = max(index, bisect.bisect_right(keys, start_after))
+
+            contents, prefixes = [], []
+            last = None
+            while index < len(keys) and len(contents) + len(prefixes) < MaxKeys:
+                key = keys[index]
+                if not key.startswith(prefix):
+                    break
+                position = key.find(Delimiter, len(prefix)) if Delimiter else -1
+                if position >= 0:
+                    common_prefix = key[:position + len(Delimiter)]
+                    prefixes.append({'Prefix': common_prefix})
+                    last = common_prefix
+                    index = bisect.bisect_left(keys, _successor(common_prefix))
+                    continue
+                meta = bucket.objects[key]
+                contents.append({'Key': key, 'Size': meta['Size'], 'ETag': meta['ETag'],
+                                 'LastModified': _from_timestamp(meta['LastModified']),
+                                 'StorageClass': 'STANDARD'})
+                last = key
+                index += 1
+            truncated = index < len(keys) and keys[index].startswith(prefix)
+
+        response = self._response(Name=Bucket, Prefix=prefix, MaxKeys=MaxKeys, IsTruncated=truncated,
+                                  KeyCount=len(contents) + len(prefixes))
+        if contents:
+            response['Contents'] = contents
+        if prefixes:
+            response['CommonPrefixes'] = prefixes
+        if Delimiter:
+            response['Delimiter'] = Delimiter
+        if ContinuationToken:
+            response['ContinuationToken'] = ContinuationToken
+        if truncated and last is not None:
+            response['NextContinuationToken'] = _encode_token(last)
+        return response
+
+    # 分段上傳
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, Metadata=None, **kwargs):
+        with self._lock:
+            bucket = self._get_bucket(Bucket, 'CreateMultipartUpload')
+            upload_id = uuid.uuid4().hex
+            path = os.path.join(bucket.path, 'uploads', upload_id)
+            os.makedirs(path)
+            upload = {'Bucket': Bucket, 'Key': Key, 'ContentType': ContentType, 'Metadata': Metadata or {},
+                      'Path': path, 'Parts': {}}
+            self._uploads[upload_id] = upload
+        return self._response(Bucket=Bucket, Key=Key, UploadId=upload_id)
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body=b'', **kwargs):
+        upload = self._get_upload(Bucket, Key, UploadId, 'UploadPart')
+        if not 1 <= PartNumber <= MAX_PART_NUMBER:
+            raise self._error('InvalidArgument', 'Part number must be an integer between 1 and 10000, inclusive',
+                              'UploadPart', 400)
+        part_file = os.path.join(upload['Path'], f'{PartNumber}-{uuid.uuid4().hex}.part')
+        size, md5 = _write_file(part_file, _iter_body(Body))
+        etag = f'"{md5.hexdigest()}"'
+        with self._lock:
+            if UploadId not in self._uploads:
+                os.remove(part_file)
+                raise self._error('NoSuchUpload', 'The specified upload does not exist.', 'UploadPart', 404)
+            previous = upload['Parts'].get(PartNumber)
+            upload['Parts'][PartNumber] = {'File': part_file, 'Size': size, 'ETag': etag, 'Digest': md5.digest()}
+        if previous:
+            _remove_quietly(previous['File'])
+        return self._response(ETag=etag)
+
+    def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceRange=None,
+                         CopySourceIfMatch=None, **kwargs):
+        source = self._read_copy_source(CopySource, CopySourceIfMatch, CopySourceRange)
+        try:
+            etag = self.upload_part(Bucket=Bucket, Key=Key, UploadId=UploadId, PartNumber=PartNumber,
+                                    Body=source['Body'])['ETag']
+        finally:
+            source['Body'].close()
+        return self._response(CopyPartResult={'ETag': etag, 'LastModified': datetime.now(timezone.utc)})
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload=None, IfMatch=None, IfNoneMatch=None,
+                                  **kwargs):
+        upload = self._get_upload(Bucket, Key, UploadId, 'CompleteMultipartUpload')
+        requested = (MultipartUpload or {}).get('Parts', [])
+        if not requested:
+            raise self._error('MalformedXML', 'The XML you provided was not well-formed', 'CompleteMultipartUpload',
+                              400)
+        numbers = [part['PartNumber'] for part in requested]
+        if numbers != sorted(set(numbers)):
+            raise self._error('InvalidPartOrder', 'The list of parts was not in ascending order.',
+                              'CompleteMultipartUpload', 400)
+        with self._lock:
+            parts = []
+            for index, part in enumerate(requested):
+                uploaded = upload['Parts'].get(part['PartNumber'])
+                if uploaded is None or uploaded['ETag'].strip('"') != part.get('ETag', '').strip('"'):
+                    raise self._error('InvalidPart', 'One or more of the specified parts could not be found.',
+                                      'CompleteMultipartUpload', 400)
+                if index < len(requested) - 1 and uploaded['Size'] < MULTIPART_MIN_PART_SIZE:
+                    raise self._error('EntityTooSmall', 'Your proposed upload is smaller than the minimum '
+                                      'allowed object size.', 'CompleteMultipartUpload', 400)
+                parts.append(uploaded)
+            del self._uploads[UploadId]
+            bucket = self._get_bucket(Bucket, 'CompleteMultipartUpload')
+
+        def read_parts():
+            for part in parts:
+                with open(part['File'], 'rb') as file:
+                    while chunk := file.read(COPY_BUFFER_SIZE):
+                        yield chunk
+
+        data_file, size, _ = bucket.write_data(Key, read_parts())
+        digest = hashlib.md5(b''.join(part['Digest'] for part in parts))
+        etag = f'"{digest.hexdigest()}-{len(parts)}"'
+        try:
+            self._commit(bucket, Key, data_file, size, etag, upload['ContentType'], upload['Metadata'],
+                         IfMatch, IfNoneMatch, 'CompleteMultipartUpload')
+        except ClientError:
+            # 與 S3 相同, 條件不成立時分段上傳仍保留, 可重試或取消
+            with self._lock:
+                self._uploads[UploadId] = upload
+            raise
+        shutil.rmtree(upload['Path'], ignore_errors=True)
+        return self._response(Bucket=Bucket, Key=Key, ETag=etag)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        upload = self._get_upload(Bucket, Key, UploadId, 'AbortMultipartUpload')
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        shutil.rmtree(upload['Path'], ignore_errors=True)
+        return self._response(204)
+
+    # 共用
+    def _all_buckets(self):
+        """所有值區, 第一次使用時由磁碟載入, 需在持有 _lock 時呼叫"""
+        if self._buckets is None:
+            buckets_path = os.path.join(self.root, 'buckets')
+            self._buckets = {name: _Bucket.load(os.path.join(buckets_path, name), name)
+                             for name in sorted(os.listdir(buckets_path))
+                             if os.path.isdir(os.path.join(buckets_path, name))}
+        return self._buckets
+
+    def _get_bucket(self, bucket_name, operation, missing_code='NoSuchBucket'):
+        with self._lock:
+            bucket = self._all_buckets().get(bucket_name)
+        if bucket is None:
+            raise self._error(missing_code, 'The specified bucket does not exist', operation, 404)
+        return bucket
+
+    def _get_upload(self, bucket_name, key, upload_id, operation):
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+        if upload is None or upload['Bucket'] != bucket_name or upload['Key'] != key:
+            raise self._error('NoSuchUpload', 'The specified upload does not exist.', operation, 404)
+        return upload
+
+    def _read_copy_source(self, copy_source, if_match, copy_range):
+        """開啟複製來源, CopySource 可為 {'Bucket', 'Key'} 或 'bucket/key' (URL 編碼) 的字串"""
+        if isinstance(copy_source, str):
+            bucket_name, _, key = unquote(copy_source.lstrip('/')).partition('/')
+        else:
+            bucket_name, key = copy_source['Bucket'], copy_source['Key']
+        return self.get_object(Bucket=bucket_name, Key=key, IfMatch=if_match, Range=copy_range)
+
+    def _commit(self, bucket, key, data_file, size, etag, content_type, metadata, if_match=None,
+                if_none_match=None, operation='PutObject'):
+        """寫入物件的中繼資料, 讓新的資料檔生效
+
+        條件寫入 (If-Match / If-None-Match: *) 在持有 _lock 時判斷, 判斷與寫入之間不會有其他寫入;
+        條件不成立時刪除已寫入的資料檔
+        """
+        meta = {
+            'Key': key, 'Size': size, 'ETag': etag, 'DataFile': data_file,
+            'LastModified': datetime.now(timezone.utc).replace(microsecond=0).timestamp(),
+            'ContentType': content_type or 'binary/octet-stream', 'Metadata': metadata or {},
+        }
+        with self._lock:
+            if self._all_buckets().get(bucket.name) is not bucket:
+                _remove_quietly(bucket.data_path(data_file))
+                raise self._error('NoSuchBucket', 'The specified bucket does not exist', operation, 404)
+            try:
+                self._check_write_conditions(bucket.objects.get(key), if_match, if_none_match, operation)
+            except ClientError:
+                _remove_quietly(bucket.data_path(data_file))
+                raise
+            bucket.put(meta)
+
+    def _check_write_conditions(self, current, if_match, if_none_match, operation):
+        """寫入的條件, 與 S3 相同: If-None-Match 只支援 *, If-Match 的物件不存在時回應 NoSuchKey"""
+        if if_none_match is not None:
+            if if_none_match.strip() != '*':
+                raise self._error('NotImplemented', 'A header you provided implies functionality that is not '
+                                  'implemented', operation, 501)
+            if current is not None:
+                raise self._error('PreconditionFailed', 'At least one of the pre-conditions you specified did not '
+                                  'hold', operation, 412)
+        if if_match is not None:
+            if current is None:
+                raise self._error('NoSuchKey', 'The specified key does not exist.', operation, 404)
+            if not _etag_matches(if_match, current['ETag']):
+                raise self._error('PreconditionFailed', 'At least one of the pre-conditions you specified did not '
+                                  'hold', operation, 412)
+
+    def _check_preconditions(self, meta, if_match, if_none_match, if_modified_since, if_unmodified_since,
+                             operation):
+        """依 HTTP 條件標頭判斷, 與 S3 相同: If-Match 優先於 If-Unmodified-Since, If-None-Match 優先於 If-Modified-Since"""
+        last_modified = _from_timestamp(meta['LastModified'])
+        if if_match is not None:
+            if not _etag_matches(if_match, meta['ETag']):
+                raise self._error('PreconditionFailed', 'At least one of the pre-conditions you specified did not '
+                                  'hold', operation, 412)
+        elif if_unmodified_since is not None and last_modified > _as_utc(if_unmodified_since):
+            raise self._error('PreconditionFailed', 'At least one of the pre-conditions you specified did not hold',
+                              operation, 412)
+        if if_none_match is not None:
+            if _etag_matches(if_none_match, meta['ETag']):
+                raise self._error('304', 'Not Modified', operation, 304)
+        elif if_modified_since is not None and last_modified <= _as_utc(if_modified_since):
+            raise self._error('304', 'Not Modified', operation, 304)
+
+    def _parse_range(self, range_header, size):
+        """解析單一範圍的 Range 標頭, 回傳 (start, end), 無法滿足時拋出 InvalidRange"""
+        match = _RANGE_PATTERN.match(range_header.strip())
+        if not match or match.group(1) == match.group(2) == '':
+            # S3 對無法解析的 Range 回傳整個物件
+            return 0, size - 1
+        first, last = match.groups()
+        if first == '':
+            start, end = max(0, size - int(last)), size - 1
+            if int(last) == 0:
+                start = size
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return 0, size - 1
+        if start >= size:
+            raise self._error('InvalidRange', 'The requested range is not satisfiable', 'GetObject', 416)
+        return start, end
+
+    @staticmethod
+    def _object_headers(meta):
+        return {
+            'ETag': meta['ETag'],
+            'LastModified': _from_timestamp(meta['LastModified']),
+            'ContentType': meta['ContentType'],
+            'Metadata': dict(meta['Metadata']),
+            'AcceptRanges': 'bytes',
+        }
+
+    def _error(self, code, message, operation, status):
+        error_class = getattr(self.exceptions, code if code.isidentifier() else 'ClientError')
+        return error_class({'Error': {'Code': code, 'Message': message},
+                            'ResponseMetadata': {'HTTPStatusCode': status, 'RetryAttempts': 0}}, operation)
+
+    @staticmethod
+    def _response(status=200, **fields):
+        return {**fields, 'ResponseMetadata': {'HTTPStatusCode': status, 'RetryAttempts': 0}}
+
+
+class _Bucket:
+    """單一值區: 物件的 metadata 與排序後的物件名稱索引, 修改時需持有 LocalS3Client._lock"""
+
+    def __init__(self, path, name, created):
+        self.path = path
+        self.name = name
+        self.created = created
+        self.objects = {}
+        self.keys = []
+
+    @classmethod
+    def create(cls, path, name):
+        os.makedirs(os.path.join(path, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'uploads'), exist_ok=True)
+        return cls(path, name, datetime.now(timezone.utc).replace(microsecond=0))
+
+    @classmethod
+    def load(cls, path, name):
+        bucket = cls.create(path, name)
+        bucket.created = datetime.fromtimestamp(int(os.stat(path).st_mtime), timezone.utc)
+        objects_path = os.path.join(path, 'objects')
+        for directory, _, files in os.walk(objects_path):
+            for file_name in files:
+                if file_name.endswith('.json'):
+                    with open(os.path.join(directory, file_name), encoding='utf-8') as file:
+                        meta = json.load(file)
+                    bucket.objects[meta['Key']] = meta
+        bucket.keys = sorted(bucket.objects)
+        # 未完成的分段上傳不會在重新啟動後保留
+        shutil.rmtree(os.path.join(path, 'uploads'), ignore_errors=True)
+        os.makedirs(os.path.join(path, 'uploads'), exist_ok=True)
+        return bucket
+
+    @staticmethod
+    def object_id(key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def object_dir(self, key):
+        return os.path.join(self.path, 'objects', self.object_id(key)[:2])
+
+    def data_path(self, data_file):
+        return os.path.join(self.path, 'objects', data_file[:2], data_file)
+
+    def write_data(self, key, chunks):
+        """將內容寫入新的資料檔, 回傳 (資料檔名稱, 大小, md5)"""
+        object_id = self.object_id(key)
+        data_file = f'{object_id}-{uuid.uuid4().hex}.data'
+        os.makedirs(self.object_dir(key), exist_ok=True)
+        size, md5 = _write_file(self.data_path(data_file), chunks)
+        return data_file, size, md5
+
+    def put(self, meta):
+        key = meta['Key']
+        meta_path = os.path.join(self.object_dir(key), f'{self.object_id(key)}.json')
+        temp_path = f'{meta_path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        os.replace(temp_path, meta_path)
+        previous = self.objects.get(key)
+        self.objects[key] = meta
+        if previous is None:
+            bisect.insort(self.keys, key)
+        else:
+            _remove_quietly(self.data_path(previous['DataFile']))
+
+    def remove(self, key):
+        meta = self.objects.pop(key, None)
+        if meta is None:
+            return
+        del self.keys[bisect.bisect_left(self.keys, key)]
+        _remove_quietly(os.path.join(self.object_dir(key), f'{self.object_id(key)}.json'))
+        _remove_quietly(self.data_path(meta['DataFile']))
+
+
+class LocalObjectBody:
+    """get_object 回應中的 Body, 以 mmap 讀取檔案中的指定範圍
+
+    與 botocore 的 StreamingBody 相同, 提供 read、iter_chunks 與 close,
+    iter_chunks 同時支援 for 與 async for, 非同步模式也能直接使用
+    """
+
+    def __init__(self, file, start, length, object_size):
+        self._file = file
+        self._start = start
+        self._length = length
+        self._object_size = object_size
+        self._position = 0
+        self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if object_size else None
+
+    def read(self, amt=None):
+        remaining = self._length - self._position
+        size = remaining if amt is None or amt < 0 else min(amt, remaining)
+        if size <= 0 or self._map is None:
+            return b''
+        offset = self._start + self._position
+        self._position += size
+        return self._map[offset:offset + size]
+
+    def iter_chunks(self, chunk_size=COPY_BUFFER_SIZE):
+        return _ChunkIterator(self, chunk_size)
+
+    def whole_file(self):
+        """Body 為整個物件時, 回傳指向檔案開頭的檔案物件, 供 WSGI 伺服器的 file_wrapper 使用 (例如 sendfile)"""
+        if self._start != 0 or self._length != self._object_size or self._position:
+            return None
+        self._file.seek(0)
+        return self._file
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class _ChunkIterator:
+    def __init__(self, body, chunk_size):
+        self._body = body
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = self._body.read(self._chunk_size)
+        if not chunk:
+            raise StopIteration
+        return chunk
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = self._body.read(self._chunk_size)
+        if not chunk:
+            raise StopAsyncIteration
+        return chunk
+
+
+def _iter_body(body):
+    """將 put_object/upload_part 的 Body (bytes、str 或 file-like) 轉成逐段產出的 bytes"""
+    if body is None:
+        return
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        if body:
+            yield bytes(body)
+        return
+    while chunk := body.read(COPY_BUFFER_SIZE):
+        yield chunk
+
+
+def _write_file(path, chunks):
+    """寫入暫存檔後再替換成 path, 回傳 (大小, md5)"""
+    md5 = hashlib.md5()
+    size = 0
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            for chunk in chunks:
+                md5.update(chunk)
+                size += len(chunk)
+                file.write(chunk)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove_quietly(temp_path)
+        raise
+    return size, md5
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _successor(prefix):
+    """排序上緊接在所有以 prefix 開頭的字串之後的字串"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _encode_token(key):
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def _decode_token(token):
+    try:
+        return base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+    except Exception as e:
+        raise ClientError({'Error': {'Code': 'InvalidArgument', 'Message': 'The continuation token provided is '
+                                     'incorrect'}, 'ResponseMetadata': {'HTTPStatusCode': 400}},
+                          'ListObjectsV2') from e
+
+
+def _etag_matches(header, etag):
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or any(candidate.strip('"') == etag.strip('"') for candidate in candidates)
+
+
+def _from_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
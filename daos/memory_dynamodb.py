@@ -0,0 +1,1270 @@
+"""行程內的 DynamoDB 模擬後端
+
+ENV=memory 或 DYNAMODB_BACKEND=memory 時, AWSClientFactory.client('dynamodb') 回傳 MemoryDynamoDBClient,
+提供與 boto3 低階客戶端相同的方法與回應格式, 不需要 LocalStack 即可執行測試, 也可作為壓力測試的影子後端
+
+- 每張表格以主鍵為 key 的 dict 儲存資料, 另以 (crc32(分區鍵), 分區鍵, 排序鍵) 排序的 list 作為掃描順序,
+  分頁與 Segment/TotalSegments 平行掃描都以二分搜尋定位, 不需從頭走訪
+- 支援 UpdateExpression、ConditionExpression、FilterExpression、KeyConditionExpression 與 ProjectionExpression,
+  解析結果依表達式字串快取
+- 支援全域與本地次要索引 (GlobalSecondaryIndexes/LocalSecondaryIndexes), 只收錄含有索引主鍵屬性的資料 (稀疏索引),
+  以 IndexName 查詢或掃描時只走訪索引中的資料
+- TTL 設定 (update_time_to_live) 只記錄, 不會刪除過期的資料
+- 錯誤以 botocore 的 ClientError 拋出, 錯誤代碼與 DynamoDB 相同 (例如 ConditionalCheckFailedException)
+- 資料只存在目前的行程中, AWSClientFactory.reset() 不會清除資料 (相當於遠端的服務)
+"""
+import re
+import zlib
+import bisect
+import threading
+import functools
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+# DynamoDB 的限制: 單筆資料大小、單頁掃描/查詢回傳的資料量、批次寫入與讀取的筆數
+MAX_ITEM_SIZE = 400 * 1024
+MAX_PAGE_SIZE = 1024 * 1024
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+
+_KEY_TYPES = ('S', 'N', 'B')
+_SET_TYPES = ('SS', 'NS', 'BS')
+_SEGMENT_SPACE = 2 ** 32
+
+
+class ClientExceptions:
+    """仿照 client.exceptions, 依錯誤代碼產生 ClientError 的子類別"""
+
+    ClientError = ClientError
+
+    def __init__(self):
+        self._classes = {}
+
+    def __getattr__(self, code):
+        if code.startswith('_'):
+            raise AttributeError(code)
+        error_class = self._classes.get(code)
+        if error_class is None:
+            error_class = self._classes[code] = type(code, (ClientError,), {})
+        return error_class
+
+
+class _ExpressionError(Exception):
+    """表達式或參數錯誤, 由客戶端轉換成 ValidationException"""
+
+
+class MemoryDynamoDBClient:
+    """行程內的 DynamoDB 客戶端, 方法名稱、參數與回應格式與 boto3 的 dynamodb 客戶端相同
+
+    所有方法皆為執行緒安全, 資料寫入與讀出時都會複製, 呼叫端修改回傳值不影響已儲存的資料
+    """
+
+    def __init__(self, region_name='us-east-1'):
+        self.region_name = region_name
+        self.exceptions = ClientExceptions()
+        self._tables = {}
+        self._lock = threading.RLock()
+
+    # 表格管理
+    def create_table(self, TableName, KeySchema, AttributeDefinitions, **kwargs):
+        with self._lock:
+            if TableName in self._tables:
+                raise self._error('ResourceInUseException', f'Table already exists: {TableName}', 'CreateTable')
+            try:
+                table = _Table(TableName, KeySchema, AttributeDefinitions, self.region_name, kwargs)
+            except _ExpressionError as e:
+                raise self._error('ValidationException', str(e), 'CreateTable')
+            self._tables[TableName] = table
+            return self._response(TableDescription=table.describe())
+
+    def delete_table(self, TableName, **kwargs):
+        with self._lock:
+            table = self._get_table(TableName, 'DeleteTable')
+            del self._tables[TableName]
+            description = table.describe()
+            description['TableStatus'] = 'DELETING'
+            return self._response(TableDescription=description)
+
+    def describe_table(self, TableName, **kwargs):
+        with self._lock:
+            return self._response(Table=self._get_table(TableName, 'DescribeTable').describe())
+
+    def update_time_to_live(self, TableName, TimeToLiveSpecification, **kwargs):
+        with self._lock:
+            table = self._get_table(TableName, 'UpdateTimeToLive')
+            table.time_to_live = dict(TimeToLiveSpecification)
+            return self._response(TimeToLiveSpecification=dict(TimeToLiveSpecification))
+
+    def describe_time_to_live(self, TableName, **kwargs):
+        with self._lock:
+            specification = self._get_table(TableName, 'DescribeTimeToLive').time_to_live
+        description = {'TimeToLiveStatus': 'ENABLED' if specification.get('Enabled') else 'DISABLED'}
+        if specification.get('Enabled'):
+            description['AttributeName'] = specification['AttributeName']
+        return self._response(TimeToLiveDescription=description)
+
+    def list_tables(self, ExclusiveStartTableName=None, Limit=100, **kwargs):
+        with self._lock:
+            names = sorted(self._tables)
+        if ExclusiveStartTableName:
+            names = names[bisect.bisect_right(names, ExclusiveStartTableName):]
+        response = self._response(TableNames=names[:Limit])
+        if len(names) > Limit:
+            response['LastEvaluatedTableName'] = names[Limit - 1]
+        return response
+
+    # 單筆資料
+    def put_item(self, TableName, Item, ConditionExpression=None, ReturnValues='NONE',
+                 ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        with self._lock, self._validation('PutItem'):
+            table = self._get_table(TableName, 'PutItem')
+            item = _copy_item(Item, validate=True)
+            key = table.key_of(item)
+            table.check_item(item)
+            old = table.items.get(key)
+            self._check_condition(ConditionExpression, old, ExpressionAttributeNames,
+                                  ExpressionAttributeValues, 'PutItem')
+            table.put(key, item)
+            response = self._response()
+            if ReturnValues == 'ALL_OLD' and old is not None:
+                response['Attributes'] = _copy_item(old)
+            return response
+
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        with self._lock, self._validation('GetItem'):
+            table = self._get_table(TableName, 'GetItem')
+            item = table.items.get(table.key_of(Key, exact=True))
+            response = self._response()
+            if item is not None:
+                response['Item'] = _project(item, ProjectionExpression, ExpressionAttributeNames)
+            return response
+
+    def delete_item(self, TableName, Key, ConditionExpression=None, ReturnValues='NONE',
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        with self._lock, self._validation('DeleteItem'):
+            table = self._get_table(TableName, 'DeleteItem')
+            key = table.key_of(Key, exact=True)
+            old = table.items.get(key)
+            self._check_condition(ConditionExpression, old, ExpressionAttributeNames,
+                                  ExpressionAttributeValues, 'DeleteItem')
+            if old is not None:
+                table.delete(key)
+            response = self._response()
+            if ReturnValues == 'ALL_OLD' and old is not None:
+                response['Attributes'] = _copy_item(old)
+            return response
+
+    def update_item(self, TableName, Key, UpdateExpression=None, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues='NONE', **kwargs):
+        with self._lock, self._validation('UpdateItem'):
+            table = self._get_table(TableName, 'UpdateItem')
+            key = table.key_of(Key, exact=True)
+            old = table.items.get(key)
+            self._check_condition(ConditionExpression, old, ExpressionAttributeNames,
+                                  ExpressionAttributeValues, 'UpdateItem')
+            new = _copy_item(old) if old is not None else _copy_item(Key, validate=True)
+            updated = set()
+            if UpdateExpression:
+                context = _Context(ExpressionAttributeNames, ExpressionAttributeValues)
+                updated = _apply_update(_parse_update(UpdateExpression), old or {}, new, context)
+            if updated & set(table.key_attributes):
+                name = sorted(updated & set(table.key_attributes))[0]
+                raise _ExpressionError(f'Cannot update attribute {name}. This attribute is part of the key')
+            table.check_item(new)
+            table.put(key, new)
+
+            response = self._response()
+            if ReturnValues in ('ALL_OLD', 'UPDATED_OLD') and old is not None:
+                source, names = old, (old if ReturnValues == 'ALL_OLD' else updated)
+            elif ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+                source, names = new, (new if ReturnValues == 'ALL_NEW' else updated)
+            else:
+                return response
+            attributes = {name: _copy_value(source[name]) for name in names if name in source}
+            if attributes:
+                response['Attributes'] = attributes
+            return response
+
+    # 查詢與掃描
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeNames=None,
+              ExpressionAttributeValues=None, FilterExpression=None, ProjectionExpression=None,
+              Limit=None, ExclusiveStartKey=None, ScanIndexForward=True, Select=None, IndexName=None, **kwargs):
+        with self._lock, self._validation('Query'):
+            table = self._get_table(TableName, 'Query').source(IndexName)
+            context = _Context(ExpressionAttributeNames, ExpressionAttributeValues)
+            hash_value, range_condition = table.split_key_condition(
+                _parse_condition(KeyConditionExpression), context)
+            entries = table.partition_entries(hash_value, ExclusiveStartKey, ScanIndexForward)
+            if range_condition is not None:
+                entries = (entry for entry in entries
+                           if _evaluate(range_condition, table.items[table.entry_key(entry)], context))
+            return self._read_page(table, entries, context, FilterExpression, ProjectionExpression, Limit, Select)
+
+    def scan(self, TableName, FilterExpression=None, ProjectionExpression=None, ExpressionAttributeNames=None,
+             ExpressionAttributeValues=None, Limit=None, ExclusiveStartKey=None, Segment=None,
+             TotalSegments=None, Select=None, IndexName=None, **kwargs):
+        with self._lock, self._validation('Scan'):
+            table = self._get_table(TableName, 'Scan').source(IndexName)
+            if (Segment is None) != (TotalSegments is None):
+                raise _ExpressionError('Segment and TotalSegments must be specified together')
+            if TotalSegments is not None and not 0 <= Segment < TotalSegments:
+                raise _ExpressionError('Segment must be less than TotalSegments')
+            context = _Context(ExpressionAttributeNames, ExpressionAttributeValues)
+            entries = table.scan_entries(ExclusiveStartKey, Segment, TotalSegments)
+            return self._read_page(table, entries, context, FilterExpression, ProjectionExpression, Limit, Select)
+
+    def _read_page(self, table, entries, context, filter_expression, projection_expression, limit, select):
+        """依序讀取 entries, 直到 Limit 筆或超過單頁大小上限, 回傳 query/scan 的回應
+
+        table 為表格或索引, 以索引讀取時只會讀到索引投影 (Projection) 的屬性
+        """
+        condition = _parse_condition(filter_expression) if filter_expression else None
+        items = []
+        scanned = 0
+        size = 0
+        last_entry = None
+        has_more = False
+        for entry in entries:
+            if (limit is not None and scanned >= limit) or size >= MAX_PAGE_SIZE:
+                has_more = True
+                break
+            item = table.stored(table.items[table.entry_key(entry)])
+            scanned += 1
+            size += _item_size(item)
+            last_entry = entry
+            if condition is None or _evaluate(condition, item, context):
+                items.append(item)
+
+        response = self._response(Count=len(items), ScannedCount=scanned)
+        if select != 'COUNT':
+            response['Items'] = [_project(item, projection_expression, context.names) for item in items]
+        if has_more:
+            response['LastEvaluatedKey'] = table.key_attributes_of(table.items[table.entry_key(last_entry)])
+        return response
+
+    # 批次操作
+    def batch_write_item(self, RequestItems, **kwargs):
+        with self._lock, self._validation('BatchWriteItem'):
+            total = sum(len(requests) for requests in RequestItems.values())
+            if not 0 < total <= BATCH_WRITE_LIMIT:
+                raise _ExpressionError(f'Too many items requested for the BatchWriteItem call: {total}')
+            operations = []
+            for table_name, requests in RequestItems.items():
+                table = self._get_table(table_name, 'BatchWriteItem')
+                keys = set()
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = _copy_item(request['PutRequest']['Item'], validate=True)
+                        key = table.key_of(item)
+                        table.check_item(item)
+                    else:
+                        item = None
+                        key = table.key_of(request['DeleteRequest']['Key'], exact=True)
+                    if key in keys:
+                        raise _ExpressionError('Provided list of item keys contains duplicates')
+                    keys.add(key)
+                    operations.append((table, key, item))
+            # 全部驗證通過才寫入, 與 DynamoDB 相同, 參數錯誤時整批都不會寫入
+            for table, key, item in operations:
+                if item is None:
+                    table.delete(key)
+                else:
+                    table.put(key, item)
+            return self._response(UnprocessedItems={})
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        with self._lock, self._validation('BatchGetItem'):
+            total = sum(len(request.get('Keys', [])) for request in RequestItems.values())
+            if not 0 < total <= BATCH_GET_LIMIT:
+                raise _ExpressionError(f'Too many items requested for the BatchGetItem call: {total}')
+            responses = {}
+            for table_name, request in RequestItems.items():
+                table = self._get_table(table_name, 'BatchGetItem')
+                keys = [table.key_of(key, exact=True) for key in request['Keys']]
+                if len(set(keys)) != len(keys):
+                    raise _ExpressionError('Provided list of item keys contains duplicates')
+                projection = request.get('ProjectionExpression')
+                names = request.get('ExpressionAttributeNames')
+                responses[table_name] = [_project(table.items[key], projection, names)
+                                         for key in keys if key in table.items]
+            return self._response(Responses=responses, UnprocessedKeys={})
+
+    # 共用
+    def _get_table(self, table_name, operation):
+        table = self._tables.get(table_name)
+        if table is None:
+            raise self._error('ResourceNotFoundException', 'Requested resource not found', operation)
+        return table
+
+    def _check_condition(self, expression, item, names, values, operation):
+        if expression and not _evaluate(_parse_condition(expression), item or {}, _Context(names, values)):
+            raise self._error('ConditionalCheckFailedException', 'The conditional request failed', operation)
+
+    def _validation(self, operation):
+        return _ValidationGuard(self, operation)
+
+    def _error(self, code, message, operation):
+        error_class = getattr(self.exceptions, code)
+        return error_class({'Error': {'Code': code, 'Message': message},
+                            'ResponseMetadata': {'HTTPStatusCode': 400, 'RetryAttempts': 0}}, operation)
+
+    @staticmethod
+    def _response(**fields):
+        return {**fields, 'ResponseMetadata': {'HTTPStatusCode': 200, 'RetryAttempts': 0}}
+
+
+class _ValidationGuard:
+    """將表達式與參數錯誤轉換成 ValidationException"""
+
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None and issubclass(exc_type, (_ExpressionError, KeyError, TypeError, ValueError)):
+            message = str(exc) if exc_type is _ExpressionError else f'Invalid parameter: {exc}'
+            raise self.client._error('ValidationException', message, self.operation) from exc
+        return False
+
+
+class _KeySchema:
+    """表格與索引共用的主鍵定義: 分區鍵、排序鍵與其型別"""
+
+    def __init__(self, key_schema, types):
+        self.key_schema = key_schema
+        self.hash_key = next((key['AttributeName'] for key in key_schema if key['KeyType'] == 'HASH'), None)
+        self.range_key = next((key['AttributeName'] for key in key_schema if key['KeyType'] == 'RANGE'), None)
+        if self.hash_key is None:
+            raise _ExpressionError('Invalid KeySchema: a HASH key is required')
+        self.key_attributes = tuple(name for name in (self.hash_key, self.range_key) if name)
+        for name in self.key_attributes:
+            if types.get(name) not in _KEY_TYPES:
+                raise _ExpressionError(f'Invalid AttributeDefinitions for key attribute {name}')
+        self.key_types = {name: types[name] for name in self.key_attributes}
+
+    def key_value(self, name, attribute):
+        """檢查主鍵屬性的型別, 回傳可排序的值 (S: str, N: Decimal, B: bytes)"""
+        (attribute_type, value), = attribute.items()
+        if attribute_type != self.key_types[name]:
+            raise _ExpressionError(f'One or more parameter values were invalid: Type mismatch for key {name} '
+                                   f'expected: {self.key_types[name]} actual: {attribute_type}')
+        if attribute_type != 'N':
+            if len(value) == 0:
+                raise _ExpressionError(f'One or more parameter values are not valid. '
+                                       f'The AttributeValue for a key attribute cannot contain an empty value: {name}')
+            return value
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise _ExpressionError(f'A value provided cannot be converted into a number: {value}') from None
+
+    @staticmethod
+    def partition_hash(hash_value):
+        """分區鍵的 crc32, 掃描順序以此分散, 對應 DynamoDB 依雜湊值切分 Segment"""
+        if isinstance(hash_value, str):
+            raw = hash_value.encode('utf-8')
+        elif isinstance(hash_value, Decimal):
+            raw = str(hash_value.normalize()).encode('ascii')
+        else:
+            raw = hash_value
+        return zlib.crc32(raw)
+
+    @staticmethod
+    def segment_bounds(order, segment, total_segments):
+        """Segment 在掃描順序中的範圍 (start, end)"""
+        if not total_segments:
+            return 0, len(order)
+        return (bisect.bisect_left(order, (segment * _SEGMENT_SPACE // total_segments,)),
+                bisect.bisect_left(order, ((segment + 1) * _SEGMENT_SPACE // total_segments,)))
+
+    def split_key_condition(self, condition, context):
+        """將 KeyConditionExpression 拆成分區鍵的值與排序鍵的條件"""
+        conjuncts = []
+
+        def flatten(node):
+            if node[0] == 'and':
+                flatten(node[1])
+                flatten(node[2])
+            else:
+                conjuncts.append(node)
+
+        flatten(condition)
+        hash_value = None
+        range_conditions = []
+        for node in conjuncts:
+            if node[0] == 'cmp' and node[1] == '=':
+                for path, operand in ((node[2], node[3]), (node[3], node[2])):
+                    if path[0] == 'path' and len(path[1]) == 1 and \
+                            context.name(path[1][0][1]) == self.hash_key and operand[0] == 'value':
+                        hash_value = self.key_value(self.hash_key, context.value(operand[1]))
+                        break
+                else:
+                    range_conditions.append(node)
+                continue
+            range_conditions.append(node)
+        if hash_value is None:
+            raise _ExpressionError('Query condition missed key schema element')
+        for node in range_conditions:
+            if not self.range_key or _condition_paths(node, context) != {self.range_key}:
+                raise _ExpressionError('Query key condition not supported')
+        if not range_conditions:
+            return hash_value, None
+        if len(range_conditions) > 1:
+            raise _ExpressionError('Conditions can be of length 1 or 2 only')
+        return hash_value, range_conditions[0]
+
+    @staticmethod
+    def stored(item):
+        """以此表格或索引讀取時可見的資料, 表格為整筆資料"""
+        return item
+
+
+class _Table(_KeySchema):
+    """單一表格的資料與索引"""
+
+    def __init__(self, name, key_schema, attribute_definitions, region_name, options):
+        types = {definition['AttributeName']: definition['AttributeType'] for definition in attribute_definitions}
+        super().__init__(key_schema, types)
+        self.name = name
+        self.attribute_definitions = attribute_definitions
+        self.options = options
+        self.arn = f'arn:aws:dynamodb:{region_name}:000000000000:table/{name}'
+        self.created_at = datetime.now(timezone.utc)
+        # (分區鍵, 排序鍵) -> item; 掃描順序; 分區鍵 -> 排序後的排序鍵
+        self.items = {}
+        self.order = []
+        self.partitions = {}
+        self.time_to_live = {}
+        # IndexName -> _Index
+        self.indexes = {}
+        for option in ('GlobalSecondaryIndexes', 'LocalSecondaryIndexes'):
+            for definition in options.get(option) or []:
+                if definition['IndexName'] in self.indexes:
+                    raise _ExpressionError(f'Duplicate index name: {definition["IndexName"]}')
+                index = _Index(self, definition, types, local=option == 'LocalSecondaryIndexes')
+                if index.local and (index.hash_key != self.hash_key or not self.range_key or not index.range_key):
+                    raise _ExpressionError(f'Local secondary index {index.name} must use the table hash key '
+                                           f'and a range key, on a table that has a range key')
+                self.indexes[index.name] = index
+
+    def describe(self):
+        description = {
+            'TableName': self.name,
+            'TableStatus': 'ACTIVE',
+            'TableArn': self.arn,
+            'CreationDateTime': self.created_at,
+            'KeySchema': self.key_schema,
+            'AttributeDefinitions': self.attribute_definitions,
+            'ItemCount': len(self.items),
+            'TableSizeBytes': sum(_item_size(item) for item in self.items.values()),
+        }
+        if self.options.get('BillingMode') == 'PAY_PER_REQUEST':
+            description['BillingModeSummary'] = {'BillingMode': 'PAY_PER_REQUEST'}
+        else:
+            description['ProvisionedThroughput'] = self.options.get('ProvisionedThroughput', {})
+        for option, local in (('GlobalSecondaryIndexes', False), ('LocalSecondaryIndexes', True)):
+            indexes = [index.describe() for index in self.indexes.values() if index.local == local]
+            if indexes:
+                description[option] = indexes
+        return description
+
+    def source(self, index_name=None):
+        """query/scan 讀取的對象: 未指定 IndexName 時為表格本身, 否則為該索引"""
+        if not index_name:
+            return self
+        index = self.indexes.get(index_name)
+        if index is None:
+            raise _ExpressionError(f'The table does not have the specified index: {index_name}')
+        return index
+
+    def key_of(self, item, exact=False):
+        """由 item (或 Key) 取得主鍵 (分區鍵值, 排序鍵值), exact 時不允許主鍵以外的屬性"""
+        if exact and set(item) != set(self.key_attributes):
+            raise _ExpressionError('The provided key element does not match the schema')
+        values = []
+        for name in self.key_attributes:
+            attribute = item.get(name)
+            if attribute is None:
+                raise _ExpressionError(f'One or more parameter values were invalid: Missing the key {name} in the item')
+            values.append(self.key_value(name, attribute))
+        return values[0], (values[1] if self.range_key else None)
+
+    def key_attributes_of(self, item):
+        return {name: _copy_value(item[name]) for name in self.key_attributes}
+
+    @classmethod
+    def entry_of(cls, key):
+        """主鍵在掃描順序中的位置, 以分區鍵的 crc32 分散"""
+        hash_value, range_value = key
+        return cls.partition_hash(hash_value), hash_value, range_value
+
+    @staticmethod
+    def entry_key(entry):
+        return entry[1], entry[2]
+
+    def check_item(self, item):
+        """寫入前檢查資料大小與索引主鍵的型別"""
+        if _item_size(item) > MAX_ITEM_SIZE:
+            raise _ExpressionError('Item size has exceeded the maximum allowed size')
+        for index in self.indexes.values():
+            index.key_of(item)
+
+    def put(self, key, item):
+        old = self.items.get(key)
+        if old is None:
+            bisect.insort(self.order, self.entry_of(key))
+            if self.range_key:
+                bisect.insort(self.partitions.setdefault(key[0], []), key[1])
+        for index in self.indexes.values():
+            if old is not None:
+                index.remove(key, old)
+            index.add(key, item)
+        self.items[key] = item
+
+    def delete(self, key):
+        old = self.items.pop(key)
+        for index in self.indexes.values():
+            index.remove(key, old)
+        entry = self.entry_of(key)
+        del self.order[bisect.bisect_left(self.order, entry)]
+        if self.range_key:
+            range_values = self.partitions[key[0]]
+            del range_values[bisect.bisect_left(range_values, key[1])]
+            if not range_values:
+                del self.partitions[key[0]]
+
+    def scan_entries(self, exclusive_start_key=None, segment=None, total_segments=None):
+        """依掃描順序產出 entry, 可指定起始位置 (不含) 與 Segment"""
+        start, end = self.segment_bounds(self.order, segment, total_segments)
+        if exclusive_start_key:
+            start = max(start, bisect.bisect_right(self.order, self.entry_of(self.key_of(exclusive_start_key))))
+        index = start
+        while index < end and index < len(self.order):
+            yield self.order[index]
+            index += 1
+
+    def partition_entries(self, hash_value, exclusive_start_key=None, forward=True):
+        """依排序鍵順序產出同一分區的 entry"""
+        if not self.range_key:
+            key = (hash_value, None)
+            if key in self.items and not exclusive_start_key:
+                yield self.entry_of(key)
+            return
+        range_values = self.partitions.get(hash_value, [])
+        if forward:
+            start = bisect.bisect_right(range_values, self.key_of(exclusive_start_key)[1]) \
+                if exclusive_start_key else 0
+            indexes = range(start, len(range_values))
+        else:
+            end = bisect.bisect_left(range_values, self.key_of(exclusive_start_key)[1]) \
+                if exclusive_start_key else len(range_values)
+            indexes = range(end - 1, -1, -1)
+        crc = self.partition_hash(hash_value)
+        for index in indexes:
+            yield crc, hash_value, range_values[index]
+
+
+class _Index(_KeySchema):
+    """全域次要索引 (GSI) 或本地次要索引 (LSI)
+
+    只收錄含有索引主鍵屬性的資料 (稀疏索引), 以 (crc32(分區鍵), 分區鍵, 排序鍵, 表格主鍵) 排序,
+    資料本身仍存在表格的 items, 讀取時依 Projection 取出可見的屬性
+    """
+
+    def __init__(self, table, definition, types, local=False):
+        super().__init__(definition['KeySchema'], types)
+        self.name = definition['IndexName']
+        self.table = table
+        self.local = local
+        self.items = table.items
+        self.projection = definition.get('Projection') or {'ProjectionType': 'ALL'}
+        self.provisioned_throughput = definition.get('ProvisionedThroughput')
+        projection_type = self.projection.get('ProjectionType', 'ALL')
+        if projection_type not in ('ALL', 'KEYS_ONLY', 'INCLUDE'):
+            raise _ExpressionError(f'Unknown ProjectionType: {projection_type}')
+        self.projected = None
+        if projection_type != 'ALL':
+            self.projected = set(table.key_attributes) | set(self.key_attributes) | \
+                set(self.projection.get('NonKeyAttributes', ()) if projection_type == 'INCLUDE' else ())
+        self.order = []
+
+    def describe(self):
+        description = {
+            'IndexName': self.name,
+            'KeySchema': self.key_schema,
+            'Projection': self.projection,
+            'IndexArn': f'{self.table.arn}/index/{self.name}',
+            'ItemCount': len(self.order),
+        }
+        if not self.local:
+            description['IndexStatus'] = 'ACTIVE'
+        if self.provisioned_throughput:
+            description['ProvisionedThroughput'] = self.provisioned_throughput
+        return description
+
+    def key_of(self, item):
+        """資料在索引中的主鍵, 缺少索引主鍵屬性時回傳 None (不收錄)"""
+        if any(name not in item for name in self.key_attributes):
+            return None
+        hash_value = self.key_value(self.hash_key, item[self.hash_key])
+        range_value = self.key_value(self.range_key, item[self.range_key]) if self.range_key else None
+        return hash_value, range_value
+
+    def entry_of(self, table_key, item):
+        key = self.key_of(item)
+        if key is None:
+            return None
+        return self.partition_hash(key[0]), key[0], key[1], table_key
+
+    @staticmethod
+    def entry_key(entry):
+        return entry[3]
+
+    def add(self, table_key, item):
+        entry = self.entry_of(table_key, item)
+        if entry is not None:
+            bisect.insort(self.order, entry)
+
+    def remove(self, table_key, item):
+        entry = self.entry_of(table_key, item)
+        if entry is not None:
+            del self.order[bisect.bisect_left(self.order, entry)]
+
+    def key_attributes_of(self, item):
+        """索引的 LastEvaluatedKey 包含索引與表格的主鍵"""
+        return {name: _copy_value(item[name]) for name in (*self.table.key_attributes, *self.key_attributes)}
+
+    def start_entry(self, exclusive_start_key):
+        """由 ExclusiveStartKey 取得在索引中的位置"""
+        entry = self.entry_of(self.table.key_of(exclusive_start_key), exclusive_start_key)
+        if entry is None:
+            raise _ExpressionError('The provided starting key is invalid')
+        return entry
+
+    def stored(self, item):
+        if self.projected is None:
+            return item
+        return {name: value for name, value in item.items() if name in self.projected}
+
+    def scan_entries(self, exclusive_start_key=None, segment=None, total_segments=None):
+        """依索引的順序產出 entry, 可指定起始位置 (不含) 與 Segment"""
+        start, end = self.segment_bounds(self.order, segment, total_segments)
+        if exclusive_start_key:
+            start = max(start, bisect.bisect_right(self.order, self.start_entry(exclusive_start_key)))
+        index = start
+        while index < end and index < len(self.order):
+            yield self.order[index]
+            index += 1
+
+    def partition_entries(self, hash_value, exclusive_start_key=None, forward=True):
+        """依索引排序鍵的順序產出同一分區的 entry"""
+        crc = self.partition_hash(hash_value)
+        start = bisect.bisect_left(self.order, (crc, hash_value))
+        end = start
+        while end < len(self.order) and self.order[end][:2] == (crc, hash_value):
+            end += 1
+        if exclusive_start_key:
+            position = self.start_entry(exclusive_start_key)
+            if forward:
+                start = max(start, bisect.bisect_right(self.order, position, start, end))
+            else:
+                end = min(end, bisect.bisect_left(self.order, position, start, end))
+        indexes = range(start, end) if forward else range(end - 1, start - 1, -1)
+        for index in indexes:
+            yield self.order[index]
+
+
+class _Context:
+    """表達式的 ExpressionAttributeNames 與 ExpressionAttributeValues"""
+
+    def __init__(self, names=None, values=None):
+        self.names = names or {}
+        self.values = values or {}
+
+    def name(self, token):
+        if token.startswith('#'):
+            if token not in self.names:
+                raise _ExpressionError(f'An expression attribute name used in the document path is not defined; '
+                                       f'attribute name: {token}')
+            return self.names[token]
+        return token
+
+    def value(self, token):
+        if token not in self.values:
+            raise _ExpressionError(f'An expression attribute value used in expression is not defined; '
+                                   f'attribute value: {token}')
+        return self.values[token]
+
+    def path(self, elements):
+        return [(kind, self.name(key) if kind == 'name' else key) for kind, key in elements]
+
+
+# 表達式解析
+_TOKEN_PATTERN = re.compile(r'\s*(?:(?P<number>\d+)|(?P<name>#[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_]*)|'
+                            r'(?P<value>:[A-Za-z0-9_]+)|(?P<op><>|<=|>=|[=<>()\[\],.+\-]))')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'REMOVE', 'ADD', 'DELETE'}
+_BOOLEAN_FUNCTIONS = {'attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains'}
+_COMPARATORS = {'=', '<>', '<', '<=', '>', '>='}
+
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise _ExpressionError(f'Invalid expression: unexpected character at {position}: {expression}')
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and not text.startswith('#') and text.upper() in _KEYWORDS:
+            kind, text = 'keyword', text.upper()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """DynamoDB 表達式的遞迴下降解析器, 產生以 tuple 表示的語法樹"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise _ExpressionError(f'Invalid expression: unexpected end of input: {self.expression}')
+        self.position += 1
+        return token
+
+    def accept(self, kind, text=None):
+        token = self.peek()
+        if token[0] == kind and (text is None or token[1] == text):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, kind, text=None):
+        token = self.next()
+        if token[0] != kind or (text is not None and token[1] != text):
+            raise _ExpressionError(f'Invalid expression: unexpected token {token[1]}: {self.expression}')
+        return token
+
+    def done(self):
+        if self.peek()[0] is not None:
+            raise _ExpressionError(f'Invalid expression: unexpected token {self.peek()[1]}: {self.expression}')
+
+    # 共用
+    def path(self):
+        elements = [('name', self.expect('name')[1])]
+        while True:
+            if self.accept('op', '.'):
+                elements.append(('name', self.expect('name')[1]))
+            elif self.accept('op', '['):
+                elements.append(('index', int(self.expect('number')[1])))
+                self.expect('op', ']')
+            else:
+                return ('path', tuple(elements))
+
+    def operand(self):
+        kind, text = self.peek()
+        if kind == 'value':
+            self.next()
+            return ('value', text)
+        if kind == 'name' and self.peek(1) == ('op', '('):
+            self.next()
+            self.next()
+            if text == 'size':
+                node = ('size', self.path())
+            elif text == 'if_not_exists':
+                path = self.path()
+                self.expect('op', ',')
+                node = ('if_not_exists', path, self.operand())
+            elif text == 'list_append':
+                first = self.operand()
+                self.expect('op', ',')
+                node = ('list_append', first, self.operand())
+            else:
+                raise _ExpressionError(f'Invalid function name: {text}')
+            self.expect('op', ')')
+            return node
+        return self.path()
+
+    # ConditionExpression / FilterExpression / KeyConditionExpression
+    def condition(self):
+        node = self.conjunction()
+        while self.accept('keyword', 'OR'):
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept('keyword', 'AND'):
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.accept('keyword', 'NOT'):
+            return ('not', self.negation())
+        return self.primary()
+
+    def primary(self):
+        if self.accept('op', '('):
+            node = self.condition()
+            self.expect('op', ')')
+            return node
+        kind, text = self.peek()
+        if kind == 'name' and text in _BOOLEAN_FUNCTIONS and self.peek(1) == ('op', '('):
+            self.next()
+            self.next()
+            args = [self.operand()]
+            while self.accept('op', ','):
+                args.append(self.operand())
+            self.expect('op', ')')
+            return ('function', text, tuple(args))
+
+        left = self.operand()
+        kind, text = self.next()
+        if kind == 'op' and text in _COMPARATORS:
+            return ('cmp', text, left, self.operand())
+        if (kind, text) == ('keyword', 'BETWEEN'):
+            low = self.operand()
+            self.expect('keyword', 'AND')
+            return ('between', left, low, self.operand())
+        if (kind, text) == ('keyword', 'IN'):
+            self.expect('op', '(')
+            options = [self.operand()]
+            while self.accept('op', ','):
+                options.append(self.operand())
+            self.expect('op', ')')
+            return ('in', left, tuple(options))
+        raise _ExpressionError(f'Invalid expression: unexpected token {text}: {self.expression}')
+
+    # UpdateExpression
+    def update(self):
+        actions = {'SET': [], 'REMOVE': [], 'ADD': [], 'DELETE': []}
+        seen = set()
+        while self.peek()[0] is not None:
+            clause = self.expect('keyword')[1]
+            if clause not in actions or clause in seen:
+                raise _ExpressionError(f'Invalid UpdateExpression: unexpected {clause}: {self.expression}')
+            seen.add(clause)
+            while True:
+                path = self.path()
+                if clause == 'SET':
+                    self.expect('op', '=')
+                    value = self.operand()
+                    if self.peek() in (('op', '+'), ('op', '-')):
+                        operator = self.next()[1]
+                        value = ('plus' if operator == '+' else 'minus', value, self.operand())
+                    actions[clause].append((path, value))
+                elif clause == 'REMOVE':
+                    actions[clause].append((path, None))
+                else:
+                    actions[clause].append((path, self.operand()))
+                if not self.accept('op', ','):
+                    break
+        if not seen:
+            raise _ExpressionError('Invalid UpdateExpression: The expression can not be empty')
+        return actions
+
+    def projection(self):
+        paths = [self.path()]
+        while self.accept('op', ','):
+            paths.append(self.path())
+        return tuple(paths)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_condition(expression):
+    parser = _Parser(expression)
+    node = parser.condition()
+    parser.done()
+    return node
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_update(expression):
+    parser = _Parser(expression)
+    return parser.update()
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_projection(expression):
+    parser = _Parser(expression)
+    paths = parser.projection()
+    parser.done()
+    return paths
+
+
+# 表達式求值
+def _evaluate(node, item, context):
+    """計算條件式, item 為 DynamoDB 格式的資料 (不存在時為空 dict)"""
+    kind = node[0]
+    if kind == 'and':
+        return _evaluate(node[1], item, context) and _evaluate(node[2], item, context)
+    if kind == 'or':
+        return _evaluate(node[1], item, context) or _evaluate(node[2], item, context)
+    if kind == 'not':
+        return not _evaluate(node[1], item, context)
+    if kind == 'cmp':
+        return _compare(node[1], _operand(node[2], item, context), _operand(node[3], item, context))
+    if kind == 'between':
+        value = _operand(node[1], item, context)
+        return _compare('>=', value, _operand(node[2], item, context)) and \
+            _compare('<=', value, _operand(node[3], item, context))
+    if kind == 'in':
+        value = _operand(node[1], item, context)
+        return any(_compare('=', value, _operand(option, item, context)) for option in node[2])
+    if kind == 'function':
+        return _call_function(node[1], node[2], item, context)
+    raise _ExpressionError(f'Invalid condition: {kind}')
+
+
+def _operand(node, item, context):
+    kind = node[0]
+    if kind == 'path':
+        return _get_path(item, context.path(node[1]))
+    if kind == 'value':
+        return context.value(node[1])
+    if kind == 'size':
+        value = _get_path(item, context.path(node[1][1]))
+        if value is None:
+            return None
+        (attribute_type, raw), = value.items()
+        if attribute_type in ('N', 'BOOL', 'NULL'):
+            raise _ExpressionError(f'Invalid operand type for size: {attribute_type}')
+        return {'N': str(len(raw))}
+    if kind == 'if_not_exists':
+        value = _get_path(item, context.path(node[1][1]))
+        return value if value is not None else _operand(node[2], item, context)
+    if kind == 'list_append':
+        first, second = _operand(node[1], item, context), _operand(node[2], item, context)
+        if first is None or second is None or 'L' not in first or 'L' not in second:
+            raise _ExpressionError('Invalid operand type for list_append: operands must be lists')
+        return {'L': [_copy_value(value) for value in first['L'] + second['L']]}
+    if kind in ('plus', 'minus'):
+        first, second = _operand(node[1], item, context), _operand(node[2], item, context)
+        if first is None or second is None:
+            raise _ExpressionError('The provided expression refers to an attribute that does not exist in the item')
+        if 'N' not in first or 'N' not in second:
+            raise _ExpressionError('Incorrect operand type for operator or function; operator: +/-')
+        result = Decimal(first['N']) + Decimal(second['N']) if kind == 'plus' \
+            else Decimal(first['N']) - Decimal(second['N'])
+        return {'N': _format_number(result)}
+    raise _ExpressionError(f'Invalid operand: {kind}')
+
+
+def _call_function(name, args, item, context):
+    def path_arg(index=0):
+        if args[index][0] != 'path':
+            raise _ExpressionError(f'Invalid argument for {name}: the first argument must be a document path')
+        return _get_path(item, context.path(args[index][1]))
+
+    expected_args = 1 if name in ('attribute_exists', 'attribute_not_exists') else 2
+    if len(args) != expected_args:
+        raise _ExpressionError(f'Incorrect number of operands for function: {name}')
+    if name == 'attribute_exists':
+        return path_arg() is not None
+    if name == 'attribute_not_exists':
+        return path_arg() is None
+    value = path_arg()
+    argument = _operand(args[1], item, context)
+    if value is None or argument is None:
+        return False
+    (value_type, raw), = value.items()
+    if name == 'attribute_type':
+        return value_type == argument.get('S')
+    (argument_type, argument_raw), = argument.items()
+    if name == 'begins_with':
+        return value_type in ('S', 'B') and value_type == argument_type and raw.startswith(argument_raw)
+    # contains
+    if value_type == 'S' and argument_type == 'S':
+        return argument_raw in raw
+    if value_type in _SET_TYPES and value_type[0] == argument_type:
+        return _normalize(argument) in {_normalize({argument_type: element}) for element in raw}
+    if value_type == 'L':
+        return any(_compare('=', element, argument) for element in raw)
+    return False
+
+
+def _compare(operator, left, right):
+    if operator == '=':
+        return left is not None and right is not None and _normalize(left) == _normalize(right)
+    if operator == '<>':
+        return left is None or right is None or _normalize(left) != _normalize(right)
+    if left is None or right is None:
+        return False
+    (left_type, _), = left.items()
+    (right_type, _), = right.items()
+    if left_type != right_type or left_type not in _KEY_TYPES:
+        return False
+    left_value, right_value = _normalize(left)[1], _normalize(right)[1]
+    if operator == '<':
+        return left_value < right_value
+    if operator == '<=':
+        return left_value <= right_value
+    if operator == '>':
+        return left_value > right_value
+    return left_value >= right_value
+
+
+def _normalize(value):
+    """轉換成可比較的 Python 值, 數值以 Decimal 比較, 集合不分順序"""
+    (attribute_type, raw), = value.items()
+    if attribute_type == 'N':
+        return 'N', Decimal(raw)
+    if attribute_type in ('SS', 'BS'):
+        return attribute_type, frozenset(raw)
+    if attribute_type == 'NS':
+        return attribute_type, frozenset(Decimal(element) for element in raw)
+    if attribute_type == 'M':
+        return 'M', tuple(sorted((key, _normalize(element)) for key, element in raw.items()))
+    if attribute_type == 'L':
+        return 'L', tuple(_normalize(element) for element in raw)
+    return attribute_type, raw
+
+
+def _apply_update(actions, old, new, context):
+    """依 UpdateExpression 修改 new, SET 的值以更新前的資料計算, 回傳有異動的最上層屬性名稱"""
+    updated = set()
+    paths = set()
+
+    def resolve(path_node):
+        path = context.path(path_node[1])
+        identity = tuple(path)
+        for other in paths:
+            if identity[:len(other)] == other or other[:len(identity)] == identity:
+                raise _ExpressionError('Invalid UpdateExpression: Two document paths overlap with each other')
+        paths.add(identity)
+        updated.add(path[0][1])
+        return path
+
+    assignments = [(resolve(path), _operand(value, old, context)) for path, value in actions['SET']]
+    for path, value in assignments:
+        if value is None:
+            raise _ExpressionError('The provided expression refers to an attribute that does not exist in the item')
+        _set_path(new, path, _copy_value(value, validate=True))
+
+    removals = [resolve(path) for path, _ in actions['REMOVE']]
+    # 由後往前移除 list 元素, 避免前面的移除改變後面的索引
+    for path in sorted(removals, key=lambda path: [key if kind == 'index' else -1 for kind, key in path],
+                       reverse=True):
+        _remove_path(new, path)
+
+    for path_node, value_node in actions['ADD']:
+        path = resolve(path_node)
+        value = context.value(value_node[1]) if value_node[0] == 'value' else None
+        if value is None:
+            raise _ExpressionError('Invalid UpdateExpression: ADD requires an expression attribute value')
+        current = _get_path(new, path)
+        (value_type, raw), = value.items()
+        if value_type == 'N':
+            if current is not None and 'N' not in current:
+                raise _ExpressionError('An operand in the update expression has an incorrect data type')
+            base = Decimal(current['N']) if current is not None else Decimal(0)
+            _set_path(new, path, {'N': _format_number(base + Decimal(raw))})
+        elif value_type in _SET_TYPES:
+            if current is not None and value_type not in current:
+                raise _ExpressionError('An operand in the update expression has an incorrect data type')
+            elements = list(current[value_type]) if current is not None else []
+            seen = {_normalize({value_type[0]: element}) for element in elements}
+            for element in raw:
+                if _normalize({value_type[0]: element}) not in seen:
+                    seen.add(_normalize({value_type[0]: element}))
+                    elements.append(element)
+            _set_path(new, path, {value_type: elements})
+        else:
+            raise _ExpressionError('Incorrect operand type for operator or function; operator: ADD')
+
+    for path_node, value_node in actions['DELETE']:
+        path = resolve(path_node)
+        value = context.value(value_node[1]) if value_node[0] == 'value' else None
+        current = _get_path(new, path)
+        if value is None:
+            raise _ExpressionError('Invalid UpdateExpression: DELETE requires an expression attribute value')
+        (value_type, raw), = value.items()
+        if value_type not in _SET_TYPES:
+            raise _ExpressionError('Incorrect operand type for operator or function; operator: DELETE')
+        if current is None:
+            continue
+        if value_type not in current:
+            raise _ExpressionError('An operand in the update expression has an incorrect data type')
+        removed = {_normalize({value_type[0]: element}) for element in raw}
+        remaining = [element for element in current[value_type]
+                     if _normalize({value_type[0]: element}) not in removed]
+        if remaining:
+            _set_path(new, path, {value_type: remaining})
+        else:
+            _remove_path(new, path)
+    return updated
+
+
+def _get_path(item, path):
+    value = item.get(path[0][1])
+    for kind, key in path[1:]:
+        if value is None:
+            return None
+        if kind == 'name':
+            value = value['M'].get(key) if 'M' in value else None
+        else:
+            elements = value.get('L')
+            value = elements[key] if elements is not None and key < len(elements) else None
+    return value
+
+
+def _set_path(item, path, value):
+    if len(path) == 1:
+        item[path[0][1]] = value
+        return
+    parent = _get_path(item, path[:-1])
+    kind, key = path[-1]
+    if kind == 'name':
+        if parent is None or 'M' not in parent:
+            raise _ExpressionError('The document path provided in the update expression is invalid for update')
+        parent['M'][key] = value
+    else:
+        if parent is None or 'L' not in parent:
+            raise _ExpressionError('The document path provided in the update expression is invalid for update')
+        if key < len(parent['L']):
+            parent['L'][key] = value
+        else:
+            parent['L'].append(value)
+
+
+def _remove_path(item, path):
+    if len(path) == 1:
+        item.pop(path[0][1], None)
+        return
+    parent = _get_path(item, path[:-1])
+    kind, key = path[-1]
+    if parent is None:
+        return
+    if kind == 'name' and 'M' in parent:
+        parent['M'].pop(key, None)
+    elif kind == 'index' and 'L' in parent and key < len(parent['L']):
+        del parent['L'][key]
+
+
+def _condition_paths(node, context):
+    """條件式中出現的最上層屬性名稱"""
+    names = set()
+
+    def visit(node):
+        if not isinstance(node, tuple) or not node:
+            return
+        if node[0] == 'path':
+            names.add(context.name(node[1][0][1]))
+            return
+        for child in node[1:]:
+            if isinstance(child, tuple):
+                if child and isinstance(child[0], str):
+                    visit(child)
+                else:
+                    for element in child:
+                        visit(element)
+
+    visit(node)
+    return names
+
+
+def _project(item, expression, names):
+    """依 ProjectionExpression 取出部分屬性, 未指定時回傳整筆資料的複本"""
+    if not expression:
+        return _copy_item(item)
+    context = _Context(names)
+    result = {}
+    for path_node in _parse_projection(expression):
+        path = context.path(path_node[1])
+        value = _get_path(item, path)
+        if value is None:
+            continue
+        target = result
+        for (kind, key), (next_kind, _) in zip(path, path[1:]):
+            container = {'M': {}} if next_kind == 'name' else {'L': []}
+            if kind == 'name':
+                parent = target if target is result else target['M']
+                target = parent.setdefault(key, container)
+            else:
+                target['L'].append(container)
+                target = container
+        kind, key = path[-1]
+        if len(path) == 1:
+            result[key] = _copy_value(value)
+        elif kind == 'name':
+            target['M'][key] = _copy_value(value)
+        else:
+            target['L'].append(_copy_value(value))
+    return result
+
+
+# 資料複製與大小
+def _copy_item(item, validate=False):
+    return {name: _copy_value(value, validate) for name, value in item.items()}
+
+
+def _copy_value(value, validate=False):
+    if validate and (not isinstance(value, dict) or len(value) != 1):
+        raise _ExpressionError(f'Invalid attribute value: {value!r}')
+    (attribute_type, raw), = value.items()
+    if attribute_type == 'M':
+        return {'M': {key: _copy_value(element, validate) for key, element in raw.items()}}
+    if attribute_type == 'L':
+        return {'L': [_copy_value(element, validate) for element in raw]}
+    if attribute_type in _SET_TYPES:
+        if validate:
+            if not raw:
+                raise _ExpressionError('One or more parameter values were invalid: An string set may not be empty')
+            normalized = [_normalize({attribute_type[0]: element}) for element in raw]
+            if len(set(normalized)) != len(normalized):
+                raise _ExpressionError('Input collection contains duplicates')
+        return {attribute_type: list(raw)}
+    if validate:
+        if attribute_type == 'N':
+            try:
+                number = Decimal(raw)
+            except InvalidOperation:
+                raise _ExpressionError(f'A value provided cannot be converted into a number: {raw}') from None
+            if not number.is_finite():
+                raise _ExpressionError(f'A value provided cannot be converted into a number: {raw}')
+        elif attribute_type not in ('S', 'B', 'BOOL', 'NULL'):
+            raise _ExpressionError(f'Invalid attribute value type: {attribute_type}')
+    return {attribute_type: raw}
+
+
+def _item_size(item):
+    """估算資料大小 (bytes), 計算方式同 DynamoDB: 屬性名稱長度加上值的大小"""
+    return sum(len(name.encode('utf-8')) + _value_size(value) for name, value in item.items())
+
+
+def _value_size(value):
+    (attribute_type, raw), = value.items()
+    if attribute_type == 'S':
+        return len(raw.encode('utf-8'))
+    if attribute_type == 'N':
+        return len(raw) // 2 + 1
+    if attribute_type == 'B':
+        return len(raw)
+    if attribute_type in ('BOOL', 'NULL'):
+        return 1
+    if attribute_type == 'M':
+        return 3 + sum(len(key.encode('utf-8')) + _value_size(element) + 1 for key, element in raw.items())
+    if attribute_type == 'L':
+        return 3 + sum(_value_size(element) + 1 for element in raw)
+    return sum(_value_size({attribute_type[0]: element}) for element in raw)
+
+
+def _format_number(number):
+    text = format(number.normalize(), 'f')
+    return text if text not in ('-0', '') else '0'
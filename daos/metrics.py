@@ -0,0 +1,344 @@
+"""行程內的效能指標與 AWS 呼叫的量測
+
+- MetricsRegistry: 計數器 (Counter) 與直方圖 (Histogram), 以 Prometheus 的文字格式輸出 (/metrics)
+  不需安裝 prometheus_client; 每個行程 (例如 gunicorn 的每個 worker) 各自統計
+- AWSCallMetrics: 註冊在 boto3/aiobotocore 客戶端的事件 (before-call、after-call、needs-retry 等),
+  記錄每種 AWS 操作的延遲、重試、節流錯誤與傳輸量, 並累積到目前請求的呼叫明細 (慢請求記錄用)
+- ContextThreadPoolExecutor: 在提交時的 context 中執行工作, 執行緒池中的 AWS 呼叫也計入目前請求
+- 由環境變數 METRICS_ENABLED (預設 true) 決定是否啟用
+"""
+import os
+import time
+import threading
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor
+
+# 預設的延遲分桶 (秒), 包含行程內模擬後端等級的毫秒以下延遲
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 視為節流的錯誤代碼
+THROTTLING_CODES = frozenset([
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'RequestLimitExceeded',
+    'TransactionInProgressException', 'SlowDown', 'BandwidthLimitExceeded', 'EC2ThrottledException',
+])
+
+
+def metrics_enabled():
+    return os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+class _Metric:
+    """指標的共用部分: 名稱、說明與標籤, 各標籤組合的數值存在 _values"""
+
+    type_name = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} 需要標籤 {self.labels}")
+        return tuple(str(value) for value in labels)
+
+    def _label_text(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """只會增加的計數器"""
+
+    type_name = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}_total{self._label_text(key)} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    """分桶統計的直方圖, 輸出各分桶的累計次數、總和與次數"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (bucket_counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{self._label_text(key, ("le", _format_value(bound)))} {cumulative}'
+            yield f'{self.name}_bucket{self._label_text(key, ("le", "+Inf"))} {count}'
+            yield f'{self.name}_sum{self._label_text(key)} {_format_value(total)}'
+            yield f'{self.name}_count{self._label_text(key)} {count}'
+
+
+class MetricsRegistry:
+    """保存所有指標, 以 Prometheus 的文字格式 (text/plain; version=0.0.4) 輸出"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def _register(self, metric_class, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, help_text, labels, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labels != tuple(labels):
+                raise ValueError(f"指標 {name} 已以不同的型別或標籤註冊")
+        return metric
+
+    def render(self):
+        """所有指標的 Prometheus 文字格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """清除所有已記錄的數值 (測試用), 指標本身保留"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+class CallTrace:
+    """一次請求的 AWS 呼叫明細, 可逐筆取出 (service, operation, 秒數)
+
+    執行緒池中的呼叫會同時加入, 以鎖保護; 同時進行的呼叫重疊的時間在 aws_seconds 中只計算一次
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = []
+        self._intervals = []
+
+    def add(self, service, operation, started, ended):
+        with self._lock:
+            self._calls.append((service, operation, ended - started))
+            self._intervals.append((started, ended))
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._calls))
+
+    def __len__(self):
+        return len(self._calls)
+
+    def aws_seconds(self):
+        """至少有一個 AWS 呼叫進行中的時間 (合併重疊的區間), 不會超過請求本身的時間"""
+        with self._lock:
+            intervals = sorted(self._intervals)
+        total, current_start, current_end = 0.0, None, None
+        for start, end in intervals:
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """在提交工作時的 context 中執行工作的執行緒池
+
+    執行緒池的執行緒不會繼承請求的 ContextVar, 工作以 copy_context().run 執行,
+    讓批次讀寫、平行掃描、分段上傳等工作中的 AWS 呼叫計入目前請求的呼叫明細; map 也經由 submit
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(copy_context().run, fn, *args, **kwargs)
+
+
+class AWSCallMetrics:
+    """以 botocore 的事件量測每次 AWS 呼叫
+
+    流程:
+    1. before-call: 記錄開始時間與送出的位元組數 (存在這次呼叫的 context)
+    2. needs-retry: 每次嘗試的回應若為節流錯誤, 累計節流次數
+    3. after-call / after-call-error: 記錄延遲、狀態、重試次數、錯誤代碼與收到的位元組數,
+       並加入目前請求的呼叫明細 (start_trace 之後才會記錄)
+    行程內的模擬後端沒有 HTTP 往返, 不註冊事件
+    """
+
+    calls = REGISTRY.counter('aws_calls', 'AWS API 呼叫次數', ('service', 'operation', 'status'))
+    duration = REGISTRY.histogram('aws_call_duration_seconds', 'AWS API 呼叫的延遲 (含重試)',
+                                  ('service', 'operation'))
+    retries = REGISTRY.counter('aws_retries', 'AWS API 的重試次數', ('service', 'operation'))
+    throttles = REGISTRY.counter('aws_throttled', 'AWS API 回傳節流錯誤的次數 (含重試中的嘗試)',
+                                 ('service', 'operation'))
+    errors = REGISTRY.counter('aws_errors', 'AWS API 呼叫失敗的次數', ('service', 'operation', 'code'))
+    bytes_sent = REGISTRY.counter('aws_sent_bytes', '送出的 request body 位元組數', ('service', 'operation'))
+    bytes_received = REGISTRY.counter('aws_received_bytes', '收到的 response body 位元組數 (Content-Length)',
+                                      ('service', 'operation'))
+
+    # 目前請求的 AWS 呼叫明細 (CallTrace), 未在請求中時為 None
+    _trace = ContextVar('aws_call_trace', default=None)
+    _CONTEXT_KEY = 'metrics_started'
+
+    @classmethod
+    def install(cls, events):
+        """在客戶端的事件系統 (client.meta.events) 註冊量測的事件
+
+        before-call 註冊在最前面, 其他 before-call handler 直接回傳回應 (例如 Stubber) 時仍會開始計時
+        """
+        events.register_first('before-call.*.*', cls._before_call, unique_id='metrics-before-call')
+        events.register('needs-retry', cls._needs_retry, unique_id='metrics-needs-retry')
+        events.register('after-call', cls._after_call, unique_id='metrics-after-call')
+        events.register('after-call-error', cls._after_call_error, unique_id='metrics-after-call-error')
+
+    @classmethod
+    def start_trace(cls):
+        """開始記錄目前請求 (目前的執行緒或 asyncio task, 以及由此提交到 ContextThreadPoolExecutor 的工作) 的 AWS 呼叫明細"""
+        trace = CallTrace()
+        cls._trace.set(trace)
+        return trace
+
+    @classmethod
+    def stop_trace(cls):
+        """結束記錄, 回傳呼叫明細 (CallTrace)"""
+        trace = cls._trace.get()
+        cls._trace.set(None)
+        return trace if trace is not None else CallTrace()
+
+    @classmethod
+    def _before_call(cls, model, params, context, **kwargs):
+        context[cls._CONTEXT_KEY] = time.perf_counter()
+        size = _body_size(params.get('body'))
+        if size:
+            cls.bytes_sent.inc(*_labels(model), amount=size)
+
+    @classmethod
+    def _needs_retry(cls, operation, response=None, **kwargs):
+        if response is not None:
+            code = (response[1] or {}).get('Error', {}).get('Code')
+            if code in THROTTLING_CODES:
+                cls.throttles.inc(*_labels(operation))
+
+    @classmethod
+    def _after_call(cls, http_response, parsed, model, context, **kwargs):
+        service, operation = _labels(model)
+        cls._finish(service, operation, context)
+        cls.calls.inc(service, operation, http_response.status_code)
+        attempts = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts') or 0
+        if attempts:
+            cls.retries.inc(service, operation, amount=attempts)
+        if http_response.status_code >= 300:
+            cls.errors.inc(service, operation, (parsed or {}).get('Error', {}).get('Code') or 'Unknown')
+        length = http_response.headers.get('content-length')
+        if length and length.isdigit():
+            cls.bytes_received.inc(service, operation, amount=int(length))
+
+    @classmethod
+    def _after_call_error(cls, exception, context, event_name=None, **kwargs):
+        # after-call-error 沒有傳入 model, 由事件名稱 after-call-error.<service>.<operation> 取得
+        _, service, operation = (event_name or 'after-call-error.unknown.unknown').split('.', 2)
+        cls._finish(service, operation, context)
+        cls.calls.inc(service, operation, 'error')
+        cls.errors.inc(service, operation, type(exception).__name__)
+
+    @classmethod
+    def _finish(cls, service, operation, context):
+        started = context.pop(cls._CONTEXT_KEY, None)
+        if started is None:
+            return
+        ended = time.perf_counter()
+        cls.duration.observe(service, operation, value=ended - started)
+        trace = cls._trace.get()
+        if trace is not None:
+            trace.add(service, operation, started, ended)
+
+
+def _labels(operation_model):
+    return operation_model.service_model.service_id.hyphenize(), operation_model.name
+
+
+def _body_size(body):
+    """request body 的位元組數, 無法得知大小的串流回傳 0"""
+    if not body:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return os.fstat(body.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        pass
+    if hasattr(body, 'getbuffer'):
+        return body.getbuffer().nbytes
+    return len(body) if hasattr(body, '__len__') else 0
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else f'{value:.1f}'
+    return str(value)
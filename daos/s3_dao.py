@@ -1,32 +1,60 @@
 import os
-import boto3
+import math
 import logging
+from io import BytesIO
+from itertools import islice
+from collections import deque
+from urllib.parse import quote
 
+from botocore.exceptions import ClientError
+
+from daos.aws_client_factory import AWSClientFactory, LazyClient
+from daos.etag_cache import ETagCache
+from daos.metrics import ContextThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 class S3Dao:
     """對 S3 進行操作
     
     流程:
-    1. 建立 boto3 客戶端物件
+    1. 由 AWSClientFactory 依環境變數 (ENV 等) 建立共用的 boto3 客戶端物件
     2. 使用此客戶端物件進行功能操作
     """
-    # 讀取環境變數
-    env = os.getenv('ENV')
-
-    if env == 'development':
-        print('S3開發階段')
-        # 連接到 LocalStack 的 S3
-        s3 = boto3.client(
-            's3',
-            endpoint_url='http://localstack:4566',
-            region_name='us-east-1',  
-            aws_access_key_id='test',
-            aws_secret_access_key='test',
-        )
-    elif env == 'production':
-        # 連接到 AWS 生產環境的 S3
-        # 注意：請確保在此環境下，AWS 的訪問金鑰和秘密金鑰已通過其他方式設定（例如，透過 AWS CLI 或環境變數）
-        s3 = boto3.client('s3', region_name='ap-northeast-1') 
+    s3 = LazyClient('s3')
+    # 物件 ETag 的行程內快取, 更新物件時用來省下 head_object
+    etags = ETagCache.from_env()
+    # 後端是否支援條件寫入 (put_object 的 If-Match/If-None-Match), 不支援時改以快取的 ETag 比對
+    CONDITIONAL_WRITES = os.getenv('S3_CONDITIONAL_WRITES', 'true').lower() in ('1', 'true', 'yes')
+
+    # 分段上傳: 每段的大小 (S3 規定除最後一段外至少 5 MB) 與同時上傳的段數
+    MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+    MULTIPART_PART_SIZE = max(int(os.getenv('S3_MULTIPART_PART_SIZE', str(8 * 1024 * 1024))),
+                              MULTIPART_MIN_PART_SIZE)
+    MULTIPART_CONCURRENCY = int(os.getenv('S3_MULTIPART_CONCURRENCY', '4'))
+    # 串流下載時每次送出的區塊大小
+    DOWNLOAD_CHUNK_SIZE = int(os.getenv('S3_DOWNLOAD_CHUNK_SIZE', str(64 * 1024)))
+    # 列出物件時單頁的筆數上限 (S3 限制 1000 筆)
+    LIST_MAX_KEYS = 1000
+    # 預先簽署網址: 預設有效秒數與上限 (SigV4 最長 7 天)
+    PRESIGN_EXPIRES = int(os.getenv('S3_PRESIGN_EXPIRES', '3600'))
+    PRESIGN_MAX_EXPIRES = 7 * 24 * 3600
+    # 單次上傳 (PUT、POST 表單) 的大小上限, S3 限制 5 GB, 更大的檔案需分段上傳
+    PRESIGN_MAX_SIZE = int(os.getenv('S3_PRESIGN_MAX_SIZE', str(5 * 1024 ** 3)))
+    # 分段上傳: 最多 10000 段, 物件最大 5 TB
+    MULTIPART_MAX_PARTS = 10000
+    MAX_OBJECT_SIZE = 5 * 1024 ** 4
+    # 批次刪除: 每次 delete_objects 最多 1000 筆 (S3 限制), 同時送出的批次數
+    DELETE_BATCH_SIZE = 1000
+    DELETE_CONCURRENCY = int(os.getenv('S3_DELETE_CONCURRENCY', '4'))
+    # 伺服器端複製: copy_object 單次最多 5 GB, 更大的物件以 upload_part_copy 分段複製 (每段最大 5 GB)
+    COPY_MAX_SIZE = 5 * 1024 ** 3
+    COPY_PART_SIZE = min(max(int(os.getenv('S3_COPY_PART_SIZE', str(512 * 1024 * 1024))),
+                             MULTIPART_MIN_PART_SIZE), COPY_MAX_SIZE)
+    COPY_CONCURRENCY = int(os.getenv('S3_COPY_CONCURRENCY', '8'))
+    # 分段複製時由來源沿用到新物件的標頭 (copy_object 會自動沿用)
+    COPY_HEADERS = ('ContentType', 'CacheControl', 'ContentDisposition', 'ContentEncoding', 'ContentLanguage',
+                    'Expires', 'Metadata')
     
     @classmethod
     def check_s3_connection(cls):
@@ -40,11 +68,10 @@ class S3Dao:
         # 測試是否成功連線
         try:
             response = cls.s3.list_buckets()["Buckets"]
-            print(f"值區清單: {response}")
-            print("成功連線到 S3")
+            logger.info("成功連線到 S3, 值區: %s", [bucket["Name"] for bucket in response])
             return "成功連線到 S3"
         except Exception as e:
-            print("無法連線到 S3", str(e))
+            logger.error("無法連線到 S3: %s", e)
             return "無法連線到 S3" + str(e)
     
     # 新增值區
@@ -56,24 +83,18 @@ class S3Dao:
         若報出錯誤, 回傳 False
         若成功, 最後回傳 True
         """
-        import sys
-        sys.path.append('..')
-        from app import app
         try:
-
-            if cls.env == 'development':
+            region = AWSClientFactory.region()
+            # us-east-1 不可指定 LocationConstraint
+            if region == 'us-east-1':
                 cls.s3.create_bucket(Bucket=bucket_name)
             else:
                 cls.s3.create_bucket(Bucket=bucket_name, 
-    CreateBucketConfiguration={'LocationConstraint': 'ap-northeast-1'},
+    CreateBucketConfiguration={'LocationConstraint': region},
     )
-
-
-
-            app.logger.info("創建值區成功")
+            logger.info("創建值區成功: %s", bucket_name)
         except Exception as e:
-            print(e)
-            app.logger.info("創建值區失敗"+str(e))
+            logger.error("創建值區失敗: %s", e)
             return False
 
         return True
@@ -90,12 +111,246 @@ class S3Dao:
         """
         try:
             # 將 Bytes 資料寫入 S3 物件
-            cls.s3.put_object(Bucket=bucket_name, Key=object_name, Body=data)
+            response = cls.s3.put_object(Bucket=bucket_name, Key=object_name, Body=data)
+        except Exception as e:
+            logger.error("上傳物件失敗 %s/%s: %s", bucket_name, object_name, e)
+            return False
+        cls.etags.put(bucket_name, object_name, response.get('ETag'))
+        return True
+
+    @classmethod
+    def upload_stream(cls, bucket_name, object_name, stream, content_type=None,
+                      part_size=None, max_concurrency=None):
+        """以串流方式上傳 S3 物件到特定值區
+
+        流程:
+        1. 從 stream 讀取第一段, 若不足一段, 直接以 put_object 一次上傳
+        2. 否則建立 multipart upload, 邊讀取邊把每一段交給執行緒池上傳
+           同時在記憶體中的段數最多為 max_concurrency + 1, 記憶體用量與檔案大小無關
+        3. 全部上傳完成後, 呼叫 complete_multipart_upload 合併
+        4. 任一段失敗時, 呼叫 abort_multipart_upload 清除已上傳的段, 回傳 False
+        5. 若成功, 最後回傳 True
+        """
+        try:
+            cls._upload(bucket_name, object_name, stream, content_type, part_size, max_concurrency)
         except Exception as e:
-            print(e)
+            logger.error("上傳物件失敗 %s/%s: %s", bucket_name, object_name, e)
             return False
         return True
 
+    @classmethod
+    def _upload(cls, bucket_name, object_name, stream, content_type=None, part_size=None, max_concurrency=None,
+                conditions=None):
+        """upload_stream 的實作, 回傳物件的新 ETag, 失敗時拋出例外
+
+        conditions 為條件寫入的參數 ({'IfMatch': ETag} 或 {'IfNoneMatch': '*'}),
+        小物件加在 put_object, 分段上傳加在 complete_multipart_upload (S3 在合併時才判斷條件)
+        """
+        part_size = part_size or cls.MULTIPART_PART_SIZE
+        max_concurrency = max_concurrency or cls.MULTIPART_CONCURRENCY
+        extra_args = {'ContentType': content_type} if content_type else {}
+        conditions = conditions or {}
+
+        data = cls._read_part(stream, part_size)
+        if len(data) < part_size:
+            response = cls.s3.put_object(Bucket=bucket_name, Key=object_name, Body=data,
+                                         **extra_args, **conditions)
+            cls.etags.put(bucket_name, object_name, response.get('ETag'))
+            return response.get('ETag')
+        upload_id = cls.s3.create_multipart_upload(
+            Bucket=bucket_name, Key=object_name, **extra_args
+        )['UploadId']
+
+        try:
+            parts = []
+            with ContextThreadPoolExecutor(max_workers=max_concurrency,
+                                           thread_name_prefix='s3-multipart') as executor:
+                in_flight = deque()
+                part_number = 1
+                while data:
+                    in_flight.append(executor.submit(
+                        cls._upload_part, bucket_name, object_name, upload_id, part_number, data
+                    ))
+                    data = None
+                    if len(in_flight) >= max_concurrency:
+                        parts.append(in_flight.popleft().result())
+                    data = cls._read_part(stream, part_size)
+                    part_number += 1
+                while in_flight:
+                    parts.append(in_flight.popleft().result())
+
+            response = cls.s3.complete_multipart_upload(
+                Bucket=bucket_name, Key=object_name, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}, **conditions,
+            )
+        except Exception as e:
+            logger.error("%s 分段上傳失敗, 取消上傳: %s", object_name, e)
+            try:
+                cls.s3.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+            except Exception as abort_error:
+                logger.error("%s 取消分段上傳失敗: %s", object_name, abort_error)
+            raise
+        cls.etags.put(bucket_name, object_name, response.get('ETag'))
+        return response.get('ETag')
+
+    @classmethod
+    def _upload_part(cls, bucket_name, object_name, upload_id, part_number, data):
+        """上傳單一段, 回傳 complete_multipart_upload 需要的 {PartNumber, ETag}"""
+        response = cls.s3.upload_part(
+            Bucket=bucket_name, Key=object_name, UploadId=upload_id,
+            PartNumber=part_number, Body=data,
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    # 預先簽署網址
+    @classmethod
+    def _presigner(cls):
+        """簽署用的客戶端, 本機 S3 後端沒有可讓瀏覽器直接連線的端點, 拋出 NotImplementedError"""
+        if AWSClientFactory.backend('s3') != 'aws':
+            raise NotImplementedError("本機 S3 後端不支援預先簽署的網址, 請連接 LocalStack 或 AWS")
+        return AWSClientFactory.presign_client('s3')
+
+    @classmethod
+    def presign_expires(cls, expires=None):
+        """網址的有效秒數, 未指定時使用 S3_PRESIGN_EXPIRES, 超出 1 秒 ~ 7 天時拋出 ValueError"""
+        if expires is None:
+            return cls.PRESIGN_EXPIRES
+        if not 1 <= expires <= cls.PRESIGN_MAX_EXPIRES:
+            raise ValueError(f"expires 必須介於 1 與 {cls.PRESIGN_MAX_EXPIRES} 秒之間")
+        return expires
+
+    @classmethod
+    def presign_get(cls, bucket_name, object_name, expires=None, file_name=None):
+        """產生下載物件的預先簽署網址
+
+        file_name 指定時, S3 回應的 Content-Disposition 以此檔名下載
+        回傳 {url, method, expires_in}
+        """
+        expires = cls.presign_expires(expires)
+        params = {'Bucket': bucket_name, 'Key': object_name}
+        if file_name:
+            params['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(file_name)}"
+        url = cls._presigner().generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
+        return {'url': url, 'method': 'GET', 'expires_in': expires}
+
+    @classmethod
+    def presign_put(cls, bucket_name, object_name, expires=None, content_type=None, content_length=None):
+        """產生上傳物件 (PUT) 的預先簽署網址
+
+        content_type、content_length 會列入簽章, 上傳時必須帶上回傳的 headers, 否則 S3 拒絕 (403)
+        回傳 {url, method, expires_in, headers}
+        """
+        expires = cls.presign_expires(expires)
+        params = {'Bucket': bucket_name, 'Key': object_name}
+        headers = {}
+        if content_type:
+            params['ContentType'] = headers['Content-Type'] = content_type
+        if content_length is not None:
+            if not 0 <= content_length <= cls.PRESIGN_MAX_SIZE:
+                raise ValueError(f"content_length 必須介於 0 與 {cls.PRESIGN_MAX_SIZE} 之間, 更大的檔案請分段上傳")
+            params['ContentLength'] = content_length
+            headers['Content-Length'] = str(content_length)
+        url = cls._presigner().generate_presigned_url('put_object', Params=params, ExpiresIn=expires)
+        return {'url': url, 'method': 'PUT', 'expires_in': expires, 'headers': headers}
+
+    @classmethod
+    def presign_post(cls, bucket_name, object_name, expires=None, content_type=None, max_size=None, min_size=0):
+        """產生瀏覽器以 HTML 表單 (multipart/form-data) 上傳的預先簽署 POST
+
+        表單需包含回傳的 fields, 檔案欄位 (file) 放在最後
+        S3 依 policy 檢查檔案大小 (min_size ~ max_size) 與 Content-Type
+        回傳 {url, fields, expires_in}
+        """
+        expires = cls.presign_expires(expires)
+        max_size = cls.PRESIGN_MAX_SIZE if max_size is None else max_size
+        if not 0 <= min_size <= max_size <= cls.PRESIGN_MAX_SIZE:
+            raise ValueError(f"檔案大小的範圍必須介於 0 與 {cls.PRESIGN_MAX_SIZE} 之間")
+        fields = {}
+        conditions = [['content-length-range', min_size, max_size]]
+        if content_type:
+            fields['Content-Type'] = content_type
+            conditions.append({'Content-Type': content_type})
+        post = cls._presigner().generate_presigned_post(
+            bucket_name, object_name, Fields=fields, Conditions=conditions, ExpiresIn=expires)
+        return {'url': post['url'], 'fields': post['fields'], 'expires_in': expires}
+
+    @classmethod
+    def create_presigned_multipart_upload(cls, bucket_name, object_name, size, expires=None, content_type=None,
+                                          part_size=None):
+        """建立分段上傳, 並產生每一段的預先簽署網址
+
+        流程:
+        1. 依檔案大小決定每段的大小 (預設 S3_MULTIPART_PART_SIZE, 超過 10000 段時加大) 與段數
+        2. 建立 multipart upload, 取得 upload_id
+        3. 為每一段產生 upload_part 的預先簽署網址, 瀏覽器以 PUT 上傳並記下回應的 ETag
+        4. 全部上傳後呼叫 complete_multipart_upload 合併, 放棄時呼叫 abort_multipart_upload
+        回傳 {upload_id, part_size, parts: [{part_number, url}], expires_in}
+        """
+        if not 0 < size <= cls.MAX_OBJECT_SIZE:
+            raise ValueError(f"size 必須介於 1 與 {cls.MAX_OBJECT_SIZE} 之間")
+        part_size = max(part_size or cls.MULTIPART_PART_SIZE, cls.MULTIPART_MIN_PART_SIZE,
+                        math.ceil(size / cls.MULTIPART_MAX_PARTS))
+        expires = cls.presign_expires(expires)
+        cls._presigner()
+        extra_args = {'ContentType': content_type} if content_type else {}
+        upload_id = cls.s3.create_multipart_upload(Bucket=bucket_name, Key=object_name, **extra_args)['UploadId']
+        part_numbers = range(1, math.ceil(size / part_size) + 1)
+        return {
+            'upload_id': upload_id,
+            'part_size': part_size,
+            'parts': cls.presign_parts(bucket_name, object_name, upload_id, part_numbers, expires),
+            'expires_in': expires,
+        }
+
+    @classmethod
+    def presign_parts(cls, bucket_name, object_name, upload_id, part_numbers, expires=None):
+        """產生分段上傳中指定段的預先簽署網址 (例如網址過期後重新取得), 回傳 [{part_number, url}]"""
+        expires = cls.presign_expires(expires)
+        if any(not 1 <= number <= cls.MULTIPART_MAX_PARTS for number in part_numbers):
+            raise ValueError(f"part_number 必須介於 1 與 {cls.MULTIPART_MAX_PARTS} 之間")
+        presigner = cls._presigner()
+        return [{
+            'part_number': number,
+            'url': presigner.generate_presigned_url('upload_part', Params={
+                'Bucket': bucket_name, 'Key': object_name, 'UploadId': upload_id, 'PartNumber': number,
+            }, ExpiresIn=expires),
+        } for number in part_numbers]
+
+    @classmethod
+    def complete_multipart_upload(cls, bucket_name, object_name, upload_id, parts):
+        """以瀏覽器上傳後記下的 [{part_number, etag}] 合併分段上傳, 回傳合併後物件的 ETag
+
+        若段落不存在或 ETag 不符, 拋出 botocore 的 ClientError
+        """
+        if not parts:
+            raise ValueError("parts 不可為空")
+        try:
+            completed = sorted(({'PartNumber': int(part['part_number']), 'ETag': part['etag']} for part in parts),
+                               key=lambda part: part['PartNumber'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("parts 的每一項必須包含 part_number 與 etag") from None
+        response = cls.s3.complete_multipart_upload(
+            Bucket=bucket_name, Key=object_name, UploadId=upload_id, MultipartUpload={'Parts': completed})
+        return response.get('ETag')
+
+    @classmethod
+    def abort_multipart_upload(cls, bucket_name, object_name, upload_id):
+        """取消分段上傳, 刪除已上傳的段; 若 upload_id 不存在, 拋出 botocore 的 ClientError"""
+        cls.s3.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+
+    @staticmethod
+    def _read_part(stream, size):
+        """從 stream 讀滿 size bytes, 讀到結尾時回傳剩餘的資料"""
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = stream.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
     # 查詢、獲取物件
     @classmethod
     def download_file(cls, bucket_name, object_name, file_name):
@@ -109,31 +364,144 @@ class S3Dao:
         try:
             cls.s3.download_file(Bucket=bucket_name, Key=object_name, Filename=file_name)
         except Exception as e:
-            print(e)
+            logger.error("下載物件失敗 %s/%s: %s", bucket_name, object_name, e)
             return False
 
         return True
 
+    @classmethod
+    def get_object(cls, bucket_name, object_name, range_header=None, if_match=None,
+                   if_none_match=None, if_modified_since=None, if_unmodified_since=None):
+        """取得 S3 物件, 不落地到磁碟
+
+        流程:
+        1. 使用 S3 物件的 get_object 方法, 傳入值區名稱、物件名稱
+        2. 可傳入 HTTP Range 只讀取部分位元組, 以及 If-Match、If-None-Match 等條件
+        3. 回傳 get_object 的回應, 由呼叫端從 Body 逐段讀取
+        若物件不存在、條件不成立 (304/412) 或範圍無效 (416), 拋出 botocore 的 ClientError
+        """
+        kwargs = {'Bucket': bucket_name, 'Key': object_name}
+        if range_header:
+            kwargs['Range'] = range_header
+        if if_match:
+            kwargs['IfMatch'] = if_match
+        if if_none_match:
+            kwargs['IfNoneMatch'] = if_none_match
+        if if_modified_since:
+            kwargs['IfModifiedSince'] = if_modified_since
+        if if_unmodified_since:
+            kwargs['IfUnmodifiedSince'] = if_unmodified_since
+        response = cls.s3.get_object(**kwargs)
+        cls.etags.put(bucket_name, object_name, response.get('ETag'))
+        return response
+
     # 更新物件
     @classmethod
-    def update_object(cls, bucket_name, object_name, data):
+    def update_object(cls, bucket_name, object_name, data, content_type=None, if_match=None, if_none_match=None):
         """更新 S3 物件
         
         流程:
-        1. 使用 S3 物件的 head_object 方法, 傳入值區名稱與物件名稱
-        2. 確認物件是否存在
-        存在, 更新物件, 回傳結果
-        不存在, 回傳 False
+        1. 以 replace_object 寫入 (data 為 file-like 物件時以串流分段上傳), 條件與往返次數見 replace_object
+        2. 物件不存在, 回傳 False
+        3. If-Match/If-None-Match 條件不成立 (412), 拋出 botocore 的 ClientError; 其他錯誤回傳 False
+        4. 若成功, 回傳 True
         """
         try:
-            response = cls.s3.head_object(Bucket=bucket_name, Key=object_name)
-            print(response)
-            print(f"{object_name} 物件存在")
-            return cls.upload_bytes(bucket_name, object_name, data)
+            return cls.replace_object(bucket_name, object_name, data, content_type, if_match, if_none_match) is not None
         except Exception as e:
-            print(f"{object_name} 物件不存在")
+            if isinstance(e, ValueError) or cls.precondition_failed(e):
+                raise
+            logger.error("更新物件失敗 %s/%s: %s", bucket_name, object_name, e)
             return False
 
+    @classmethod
+    def replace_object(cls, bucket_name, object_name, data, content_type=None, if_match=None, if_none_match=None):
+        """覆寫已存在的物件, 回傳新的 ETag, 物件不存在時回傳 None
+
+        - if_match: 物件目前的 ETag 相同時才寫入, 避免覆蓋其他人的更新, 不同時拋出 ClientError (412)
+        - if_none_match: 只支援 *, 物件不存在時才建立, 已存在時拋出 ClientError (412)
+        - 後端支援條件寫入 (S3_CONDITIONAL_WRITES, 預設 true) 時, 條件交給 S3 在寫入時判斷,
+          只需一次往返, 也不會被兩次呼叫之間的其他寫入插隊
+        - 不支援時, 先以 head_object 取得目前的 ETag 比對後再寫入, 同一行程內以鎖避免交錯,
+          但無法阻擋其他行程在比對與寫入之間的寫入
+        - 未指定條件時, 物件必須存在: 支援條件寫入且 ETag 快取中有此物件時, 以快取的 ETag 作為 If-Match 寫入,
+          只需一次往返; 快取已過期 (412/404)、沒有快取或不支援條件寫入時, 先以 head_object 確認物件存在
+          快取只用來省下 head_object, 過期的快取不會把更新變成建立
+        """
+        if if_none_match is not None and if_none_match.strip() != '*':
+            raise ValueError("If-None-Match 只支援 *")
+        if if_match is not None and if_match.strip() == '*':
+            # If-Match: * 等同於物件必須存在, 與未指定條件相同
+            if_match = None
+        if not hasattr(data, 'read'):
+            data = BytesIO(data)
+
+        if if_match is None and if_none_match is None:
+            cached = cls.etags.get(bucket_name, object_name)
+            if cached is not None and cls.CONDITIONAL_WRITES and getattr(data, 'seekable', lambda: False)():
+                # 快取可能已過期 (其他 worker 刪除或覆寫了物件), 以快取的 ETag 作為 If-Match 寫入,
+                # 不成立 (412/404) 時清除快取, 改以 head_object 確認物件存在
+                start = data.tell()
+                try:
+                    return cls._upload(bucket_name, object_name, data, content_type, conditions={'IfMatch': cached})
+                except ClientError as e:
+                    if not (cls.precondition_failed(e) or _status(e) == 404):
+                        raise
+                    cls.etags.invalidate(bucket_name, object_name)
+                data.seek(start)
+            if cls._current_etag(bucket_name, object_name) is None:
+                logger.info("%s 物件不存在", object_name)
+                return None
+            return cls._upload(bucket_name, object_name, data, content_type)
+
+        if cls.CONDITIONAL_WRITES:
+            conditions = {'IfMatch': if_match} if if_match is not None else {'IfNoneMatch': '*'}
+            try:
+                return cls._upload(bucket_name, object_name, data, content_type, conditions=conditions)
+            except ClientError as e:
+                if cls.precondition_failed(e) or _status(e) == 404:
+                    cls.etags.invalidate(bucket_name, object_name)
+                if _status(e) == 404 and if_match is not None:
+                    return None
+                raise
+
+        # 快取的 ETag 無法反映其他用戶端的寫入, 比對時一律以 head_object 取得目前的 ETag
+        with cls.etags.lock(bucket_name, object_name):
+            current = cls._current_etag(bucket_name, object_name)
+            if if_match is not None:
+                if current is None:
+                    return None
+                if not _etag_matches(if_match, current):
+                    raise cls._precondition_error('PutObject')
+            elif current is not None:
+                raise cls._precondition_error('PutObject')
+            return cls._upload(bucket_name, object_name, data, content_type)
+
+    @classmethod
+    def _current_etag(cls, bucket_name, object_name):
+        """以 head_object 取得物件目前的 ETag 並更新快取, 物件不存在時回傳 None"""
+        try:
+            etag = cls.s3.head_object(Bucket=bucket_name, Key=object_name).get('ETag')
+        except ClientError as e:
+            if _status(e) != 404:
+                raise
+            cls.etags.invalidate(bucket_name, object_name)
+            return None
+        cls.etags.put(bucket_name, object_name, etag)
+        return etag
+
+    @staticmethod
+    def precondition_failed(error):
+        """是否為條件不成立 (412) 的錯誤"""
+        return isinstance(error, ClientError) and (
+            _status(error) == 412 or error.response.get('Error', {}).get('Code') == 'PreconditionFailed')
+
+    @staticmethod
+    def _precondition_error(operation):
+        return ClientError({'Error': {'Code': 'PreconditionFailed',
+                                      'Message': 'At least one of the pre-conditions you specified did not hold'},
+                            'ResponseMetadata': {'HTTPStatusCode': 412}}, operation)
+
     # 刪除物件
     @classmethod
     def delete_object(cls, bucket_name, object_name):
@@ -146,8 +514,232 @@ class S3Dao:
         
         # 刪除物件
         response = cls.s3.delete_object(Bucket=bucket_name, Key=object_name)
+        cls.etags.invalidate(bucket_name, object_name)
         return "刪除成功" 
 
+    @classmethod
+    def delete_objects(cls, bucket_name, keys=None, prefix=None, dry_run=False, max_concurrency=None):
+        """批次刪除物件清單 keys 或路徑 prefix 下的所有物件
+
+        流程:
+        1. keys 與 prefix 須擇一, 否則拋出 ValueError; prefix 不可為空字串, 避免誤刪整個值區
+        2. prefix 時以 list_objects_v2 逐頁列出, 每 1000 筆 (DeleteObjects 的上限) 為一批
+        3. 以執行緒池同時送出最多 max_concurrency 批 delete_objects, 列出下一頁與刪除同時進行
+        4. dry_run 時只回傳符合的物件數 {"count"}, 不刪除
+        5. 回傳 {"count": 符合的物件數, "deleted": 刪除成功數, "errors": [{"key", "code", "message"}]}
+        列出物件失敗 (例如值區不存在) 時拋出 botocore 的 ClientError; 一批刪除失敗時, 該批每個物件都列入 errors
+        """
+        if (keys is None) == (prefix is None):
+            raise ValueError("keys 與 prefix 須擇一")
+        if keys is not None:
+            if not isinstance(keys, list) or not all(isinstance(key, str) and key for key in keys):
+                raise ValueError("keys 必須是物件名稱的清單")
+            names = list(dict.fromkeys(keys))
+        else:
+            if not isinstance(prefix, str) or not prefix:
+                raise ValueError("prefix 不可為空")
+            names = (obj['Key'] for obj in cls.iter_objects(bucket_name, prefix))
+        if dry_run:
+            return {'count': sum(1 for _ in names)}
+
+        max_concurrency = max_concurrency or cls.DELETE_CONCURRENCY
+        result = {'count': 0, 'deleted': 0, 'errors': []}
+
+        def collect(batch, future):
+            errors = future.result()
+            result['deleted'] += len(batch) - len(errors)
+            result['errors'].extend(errors)
+
+        with ContextThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='s3-delete') as executor:
+            in_flight = deque()
+            for batch in _batches(names, cls.DELETE_BATCH_SIZE):
+                result['count'] += len(batch)
+                in_flight.append((batch, executor.submit(cls._delete_batch, bucket_name, batch)))
+                if len(in_flight) >= max_concurrency:
+                    collect(*in_flight.popleft())
+            while in_flight:
+                collect(*in_flight.popleft())
+        logger.info("批次刪除 %s: %d 筆, 失敗 %d 筆", bucket_name, result['count'], len(result['errors']))
+        return result
+
+    @classmethod
+    def _delete_batch(cls, bucket_name, keys):
+        """以 delete_objects 刪除一批物件, 回傳刪除失敗的物件"""
+        try:
+            response = cls.s3.delete_objects(Bucket=bucket_name, Delete={
+                'Objects': [{'Key': key} for key in keys], 'Quiet': True})
+            errors = [{'key': error['Key'], 'code': error.get('Code'), 'message': error.get('Message')}
+                      for error in response.get('Errors', [])]
+        except Exception as e:
+            logger.error("批次刪除失敗 %s (%d 筆): %s", bucket_name, len(keys), e)
+            errors = [_error_entry(key, e) for key in keys]
+        for key in keys:
+            cls.etags.invalidate(bucket_name, key)
+        return errors
+
+    # 伺服器端複製與搬移: 物件內容在 S3 內複製, 不經過應用程式
+    @classmethod
+    def copy_object(cls, bucket_name, object_name, dest_bucket, dest_object_name, size=None, etag=None,
+                    max_concurrency=None):
+        """在 S3 內複製物件, 保留 Content-Type 與 metadata, 回傳新物件的 ETag
+
+        流程:
+        1. size、etag 為來源的大小與 ETag (列出物件時已知), 未傳入時以 head_object 取得
+        2. 5 GB 以下以一次 copy_object 複製
+        3. 更大的物件建立分段上傳, 以 upload_part_copy 同時複製最多 max_concurrency 段; 失敗時取消分段上傳
+        兩者都以 CopySourceIfMatch 指定來源的 ETag, 來源在列出 (或 head_object) 之後被改變時拋出 ClientError (412),
+        複製到的一定是 etag 這個版本
+        若失敗, 拋出 botocore 的 ClientError
+        """
+        source = {'Bucket': bucket_name, 'Key': object_name}
+        head = None
+        if size is None or etag is None:
+            head = cls.s3.head_object(Bucket=bucket_name, Key=object_name)
+            size, etag = head['ContentLength'], head['ETag']
+        if size <= cls.COPY_MAX_SIZE:
+            response = cls.s3.copy_object(Bucket=dest_bucket, Key=dest_object_name, CopySource=source,
+                                          MetadataDirective='COPY', CopySourceIfMatch=etag)
+            etag = response['CopyObjectResult'].get('ETag')
+            cls.etags.put(dest_bucket, dest_object_name, etag)
+            return etag
+
+        head = head or cls.s3.head_object(Bucket=bucket_name, Key=object_name)
+        extra_args = {name: head[name] for name in cls.COPY_HEADERS if head.get(name)}
+        part_size = max(cls.COPY_PART_SIZE, math.ceil(size / cls.MULTIPART_MAX_PARTS))
+        upload_id = cls.s3.create_multipart_upload(
+            Bucket=dest_bucket, Key=dest_object_name, **extra_args
+        )['UploadId']
+
+        def copy_part(part_number):
+            start = (part_number - 1) * part_size
+            end = min(start + part_size, size) - 1
+            response = cls.s3.upload_part_copy(
+                Bucket=dest_bucket, Key=dest_object_name, UploadId=upload_id, PartNumber=part_number,
+                CopySource=source, CopySourceRange=f'bytes={start}-{end}', CopySourceIfMatch=etag,
+            )
+            return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+
+        try:
+            with ContextThreadPoolExecutor(max_workers=max_concurrency or cls.COPY_CONCURRENCY,
+                                           thread_name_prefix='s3-copy') as executor:
+                parts = list(executor.map(copy_part, range(1, math.ceil(size / part_size) + 1)))
+            response = cls.s3.complete_multipart_upload(
+                Bucket=dest_bucket, Key=dest_object_name, UploadId=upload_id, MultipartUpload={'Parts': parts},
+            )
+        except Exception as e:
+            logger.error("%s 分段複製失敗, 取消上傳: %s", dest_object_name, e)
+            try:
+                cls.s3.abort_multipart_upload(Bucket=dest_bucket, Key=dest_object_name, UploadId=upload_id)
+            except Exception as abort_error:
+                logger.error("%s 取消分段複製失敗: %s", dest_object_name, abort_error)
+            raise
+        cls.etags.put(dest_bucket, dest_object_name, response.get('ETag'))
+        return response.get('ETag')
+
+    @classmethod
+    def copy_objects(cls, bucket_name, dest_bucket=None, object_name=None, dest_object_name=None, prefix=None,
+                     dest_prefix=None, delete_source=False, max_concurrency=None):
+        """複製或搬移 (delete_source) 單一物件或路徑下的所有物件
+
+        流程:
+        1. object_name 與 prefix 須擇一: object_name 複製為 dest_object_name;
+           prefix 下的物件改以 dest_prefix 開頭, 例如 prefix="a/"、dest_prefix="b/" 時 a/1.txt 複製為 b/1.txt
+           dest_bucket 未傳入時為同一值區; 來源與目的地相同, 或目的地在來源路徑之下時, 拋出 ValueError
+           搬移 (delete_source) 時 prefix 不可為空字串, 與 delete_objects 相同, 避免刪除整個值區
+        2. prefix 時以 list_objects_v2 逐頁列出, 以執行緒池同時複製最多 max_concurrency 個物件
+        3. 搬移時, 全部複製完成後再次取得來源的 ETag (prefix 時重新列出, 單一物件時 head_object),
+           只以 delete_objects 刪除 ETag 與複製時相同的來源; 複製後被改變的來源保留, 列入 errors (SourceChanged)
+           中途失敗只會留下重複的物件, 不會遺失資料
+        4. 回傳 {"count": 符合的物件數, "copied": 複製成功數, "errors": [{"key", "code", "message"}]},
+           搬移時另有 "deleted": 刪除的來源數
+        列出物件失敗 (例如值區不存在) 時拋出 botocore 的 ClientError
+        """
+        dest_bucket = dest_bucket or bucket_name
+        if (object_name is None) == (prefix is None):
+            raise ValueError("object_name 與 prefix 須擇一")
+        if object_name is not None:
+            if not isinstance(object_name, str) or not object_name:
+                raise ValueError("缺少 object_name")
+            if not isinstance(dest_object_name, str) or not dest_object_name:
+                raise ValueError("缺少 dest_object_name")
+            if dest_bucket == bucket_name and dest_object_name == object_name:
+                raise ValueError("來源與目的地相同")
+            sources = [(object_name, None, None)]
+            target = lambda key: dest_object_name
+        else:
+            if not isinstance(prefix, str) or not isinstance(dest_prefix, str):
+                raise ValueError("prefix 與 dest_prefix 必須是字串")
+            if delete_source and not prefix:
+                # 與 delete_objects 相同, 不允許以空的 prefix 刪除整個值區
+                raise ValueError("搬移時 prefix 不可為空")
+            if dest_bucket == bucket_name and dest_prefix.startswith(prefix):
+                raise ValueError("dest_prefix 不可與 prefix 相同或在 prefix 之下")
+            sources = ((obj['Key'], obj['Size'], obj['ETag']) for obj in cls.iter_objects(bucket_name, prefix))
+            target = lambda key: dest_prefix + key[len(prefix):]
+
+        max_concurrency = max_concurrency or cls.COPY_CONCURRENCY
+        result = {'count': 0, 'copied': 0, 'errors': []}
+        # 複製成功的來源 {物件名稱: 複製的版本的 ETag}
+        copied = {}
+
+        def collect(key, future):
+            try:
+                etag = future.result()
+            except Exception as e:
+                logger.error("複製物件失敗 %s/%s: %s", bucket_name, key, e)
+                result['errors'].append(_error_entry(key, e))
+                return
+            result['copied'] += 1
+            copied[key] = etag
+
+        # 複製一個來源, 回傳複製的版本的 ETag
+        def copy(key, size, etag):
+            if etag is None:
+                head = cls.s3.head_object(Bucket=bucket_name, Key=key)
+                size, etag = head['ContentLength'], head['ETag']
+            cls.copy_object(bucket_name, key, dest_bucket, target(key), size, etag)
+            return etag
+
+        with ContextThreadPoolExecutor(max_workers=max_concurrency,
+                                       thread_name_prefix='s3-copy-objects') as executor:
+            in_flight = deque()
+            for key, size, etag in sources:
+                result['count'] += 1
+                in_flight.append((key, executor.submit(copy, key, size, etag)))
+                if len(in_flight) >= max_concurrency:
+                    collect(*in_flight.popleft())
+            while in_flight:
+                collect(*in_flight.popleft())
+
+        if delete_source:
+            unchanged = cls._unchanged_sources(bucket_name, copied, prefix) if copied else []
+            for key in copied.keys() - set(unchanged):
+                result['errors'].append({'key': key, 'code': 'SourceChanged',
+                                         'message': '來源在複製後已被改變或無法確認, 未刪除來源'})
+            deleted = cls.delete_objects(bucket_name, keys=unchanged) if unchanged else {'deleted': 0, 'errors': []}
+            result['deleted'] = deleted['deleted']
+            result['errors'].extend(deleted['errors'])
+        logger.info("%s %s -> %s: %d 筆, 失敗 %d 筆", "搬移" if delete_source else "複製", bucket_name, dest_bucket,
+                    result['count'], len(result['errors']))
+        return result
+
+    @classmethod
+    def _unchanged_sources(cls, bucket_name, copied, prefix=None):
+        """copied ({物件名稱: 複製時的 ETag}) 中目前 ETag 仍相同的物件名稱
+
+        prefix 時重新列出路徑 (每 1000 筆一次呼叫), 否則逐一 head_object; 無法取得的視為已改變
+        """
+        if prefix is not None:
+            current = {obj['Key']: obj['ETag'] for obj in cls.iter_objects(bucket_name, prefix)}
+        else:
+            current = {}
+            for key in copied:
+                try:
+                    current[key] = cls.s3.head_object(Bucket=bucket_name, Key=key)['ETag']
+                except Exception as e:
+                    logger.error("無法確認來源 %s/%s: %s", bucket_name, key, e)
+        return [key for key, etag in copied.items() if current.get(key) == etag]
+
     # 列出指定值區與路徑下的所有物件
     @classmethod
     def get_all_object_names_by_bucket_name_and_directory(cls, bucket_name, prefix):
@@ -155,13 +747,87 @@ class S3Dao:
 
         流程:
         1. 使用 S3物件的 list_objects_v2 方法並傳入桶子名稱與路徑開頭
-        2. 若成功, 取出所有路徑名稱, 並做成清單
-        3. 若失敗, 回傳 []
+        2. 依 ContinuationToken 逐頁讀取, 直到最後一頁
+        3. 取出所有路徑名稱, 並做成清單
+        若失敗 (例如值區不存在), 拋出 botocore 的 ClientError
         """
-        try:
-            response = cls.s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-        except :
-            return []
-        if 'Contents' not in response:
-            return []
-        return [content['Key'] for content in response['Contents']]
+        return [obj['Key'] for obj in cls.iter_objects(bucket_name, prefix)]
+
+    @classmethod
+    def list_objects_page(cls, bucket_name, prefix='', delimiter=None, max_keys=None, page_token=None):
+        """列出指定值區與路徑下的一頁物件
+
+        流程:
+        1. 使用 S3物件的 list_objects_v2 方法, 可指定 delimiter 以資料夾方式瀏覽
+        2. 從 page_token (上一頁的 next_token) 繼續讀取, 最多 max_keys 筆
+        3. 回傳 {"objects": [{Key, Size, LastModified, ETag}], "prefixes": [子資料夾], "next_token": 下一頁 token}
+        若已讀到最後一頁, next_token 為 None
+        若失敗, 拋出 botocore 的 ClientError
+        """
+        if not max_keys or max_keys <= 0 or max_keys > cls.LIST_MAX_KEYS:
+            max_keys = cls.LIST_MAX_KEYS
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix or '', 'MaxKeys': max_keys}
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        if page_token:
+            kwargs['ContinuationToken'] = page_token
+        response = cls.s3.list_objects_v2(**kwargs)
+        return {
+            'objects': [cls._object_summary(content) for content in response.get('Contents', [])],
+            'prefixes': [common_prefix['Prefix'] for common_prefix in response.get('CommonPrefixes', [])],
+            'next_token': response.get('NextContinuationToken') if response.get('IsTruncated') else None,
+        }
+
+    @classmethod
+    def iter_object_pages(cls, bucket_name, prefix='', delimiter=None):
+        """逐頁產出指定值區與路徑下的物件, 直到最後一頁"""
+        page_token = None
+        while True:
+            page = cls.list_objects_page(bucket_name, prefix, delimiter, page_token=page_token)
+            yield page
+            page_token = page['next_token']
+            if not page_token:
+                break
+
+    @classmethod
+    def iter_objects(cls, bucket_name, prefix='', delimiter=None):
+        """逐筆產出指定值區與路徑下的物件 {Key, Size, LastModified, ETag}"""
+        for page in cls.iter_object_pages(bucket_name, prefix, delimiter):
+            yield from page['objects']
+
+    @staticmethod
+    def _object_summary(content):
+        """將 list_objects_v2 的 Contents 轉成可 JSON 序列化的物件資訊"""
+        last_modified = content.get('LastModified')
+        return {
+            'Key': content['Key'],
+            'Size': content.get('Size'),
+            'LastModified': last_modified.isoformat() if last_modified else None,
+            'ETag': content.get('ETag'),
+        }
+
+
+def _batches(iterable, size):
+    """將 iterable 依序切成每批最多 size 筆的清單"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _error_entry(key, error):
+    """批次操作中單一物件的錯誤 {"key", "code", "message"}"""
+    detail = error.response.get('Error', {}) if isinstance(error, ClientError) else {}
+    return {'key': key, 'code': detail.get('Code', type(error).__name__), 'message': detail.get('Message', str(error))}
+
+
+def _status(error):
+    return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+
+
+def _etag_matches(header, etag):
+    """If-Match 標頭 (可能以逗號分隔多個 ETag) 是否符合物件的 ETag, 比對時忽略引號與弱驗證的 W/"""
+    if etag is None:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/').strip('"') == etag.strip('"')
+                                    for candidate in candidates)
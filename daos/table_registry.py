@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from decimal import Decimal, InvalidOperation
+
+from daos.dynamodb_marshaller import marshall
+
+
+class TableSchema:
+    """表格的主鍵與索引, 由 describe_table 的結果建立
+
+    - hash_key/range_key 為主鍵的屬性名稱, key_types 為主鍵屬性的型別 (S/N/B)
+    - indexes 為 {索引名稱: IndexStatus}, 包含 GSI 與 LSI (LSI 一律為 ACTIVE)
+    - 以 key_of/key 將 JSON 資料或路徑上的 id 轉換成 DynamoDB 的 Key
+    """
+
+    def __init__(self, name, hash_key='ID', range_key=None, key_types=None, indexes=None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.key_attributes = tuple(key for key in (hash_key, range_key) if key)
+        self.key_types = key_types or {key: 'S' for key in self.key_attributes}
+        self.indexes = indexes or {}
+
+    @classmethod
+    def from_description(cls, description):
+        """由 describe_table 回應中的 Table 建立"""
+        types = {definition['AttributeName']: definition['AttributeType']
+                 for definition in description.get('AttributeDefinitions', [])}
+        keys = {key['KeyType']: key['AttributeName'] for key in description['KeySchema']}
+        indexes = {index['IndexName']: index.get('IndexStatus', 'ACTIVE')
+                   for index in description.get('GlobalSecondaryIndexes', [])}
+        indexes.update((index['IndexName'], 'ACTIVE') for index in description.get('LocalSecondaryIndexes', []))
+        key_types = {name: types.get(name, 'S') for name in keys.values()}
+        return cls(description['TableName'], keys['HASH'], keys.get('RANGE'), key_types, indexes)
+
+    def has_index(self, index_name):
+        """索引是否存在且已可查詢 (ACTIVE)"""
+        return self.indexes.get(index_name) == 'ACTIVE'
+
+    def key_attribute(self, name, value):
+        """將主鍵屬性的值轉換成 DynamoDB 的格式, 型別不符時拋出 ValueError
+
+        S: 一律存成字串; N: 數值或可轉換成數值的字串; B: bytes 或字串 (以 UTF-8 編碼)
+        """
+        key_type = self.key_types[name]
+        if key_type == 'S':
+            return {'S': str(value)}
+        if key_type == 'B':
+            return {'B': value.encode('utf-8') if isinstance(value, str) else bytes(value)}
+        if isinstance(value, bool):
+            raise ValueError(f"{name} 必須是數值")
+        if isinstance(value, str):
+            try:
+                Decimal(value)
+            except InvalidOperation:
+                raise ValueError(f"{name} 必須是數值: {value}") from None
+            return {'N': value}
+        return marshall(value)
+
+    def key(self, hash_value, range_value=None):
+        """由分區鍵 (與排序鍵) 的值建立 Key, 有排序鍵的表格未傳入排序鍵時拋出 ValueError"""
+        key = {self.hash_key: self.key_attribute(self.hash_key, hash_value)}
+        if self.range_key:
+            if range_value is None:
+                raise ValueError(f"表格 {self.name} 的主鍵包含排序鍵 {self.range_key}")
+            key[self.range_key] = self.key_attribute(self.range_key, range_value)
+        return key
+
+    def key_of(self, data):
+        """由 JSON 資料取出 Key, 缺少主鍵屬性時拋出 ValueError"""
+        if not isinstance(data, dict) or any(data.get(name) in (None, '') for name in self.key_attributes):
+            raise ValueError(f"資料必須是含有 {'、'.join(self.key_attributes)} 的 JSON 物件")
+        return {name: self.key_attribute(name, data[name]) for name in self.key_attributes}
+
+    def identity(self, item):
+        """DynamoDB 格式的資料 (或 Key) 的主鍵, 可作為 dict 的 key"""
+        return tuple(next(iter(item[name].items())) for name in self.key_attributes)
+
+
+class TableRegistry:
+    """行程內的表格中繼資料 (describe_table) 快取, 所有請求共用
+
+    - DAO 由此取得每個表格的主鍵名稱與型別, 不需在每次請求時呼叫 describe_table
+    - 建立表格後由 DAO 直接寫入, 其他表格在第一次使用時讀取
+    - 快取存活 ttl 秒後重新讀取, 讓 UpdateTable 新增的索引 (建立中 -> ACTIVE) 能被察覺
+    """
+
+    # 讀取不到表格資訊時使用的預設主鍵 (ID 字串)
+    DEFAULT_SCHEMA = TableSchema(None)
+
+    def __init__(self, ttl=300.0, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """依環境變數 DYNAMODB_TABLE_CACHE_TTL (秒) 建立"""
+        return cls(ttl=float(os.getenv('DYNAMODB_TABLE_CACHE_TTL', '300')))
+
+    def get(self, table_name):
+        """取得快取的 TableSchema, 未快取或已過期時回傳 None"""
+        with self._lock:
+            entry = self._schemas.get(table_name)
+            if entry is None:
+                return None
+            expires_at, schema = entry
+            if expires_at <= self._clock():
+                del self._schemas[table_name]
+                return None
+            return schema
+
+    def put(self, description):
+        """以 describe_table 回應中的 Table 更新快取, 回傳 TableSchema"""
+        schema = TableSchema.from_description(description)
+        with self._lock:
+            self._schemas[schema.name] = (self._clock() + self.ttl, schema)
+        return schema
+
+    def invalidate(self, table_name):
+        with self._lock:
+            self._schemas.pop(table_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+    @staticmethod
+    def is_active(description):
+        """表格與所有 GSI 是否都已是 ACTIVE"""
+        return description.get('TableStatus') == 'ACTIVE' and all(
+            index.get('IndexStatus', 'ACTIVE') == 'ACTIVE' for index in description.get('GlobalSecondaryIndexes', []))
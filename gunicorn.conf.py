@@ -0,0 +1,82 @@
+"""正式環境的 WSGI 伺服器設定 (gunicorn)
+
+啟動: gunicorn -c gunicorn.conf.py (容器的預設指令)
+- 多個 worker 行程, 每個 worker 以多個執行緒處理請求 (gthread), 等待 AWS 回應時不會卡住其他請求
+- preload_app: 在 fork 前載入應用程式, AWS 客戶端與靜態檔案的資訊只建立一次, worker 以 copy-on-write 共用
+- 每個 worker 處理 max_requests (加上隨機的 jitter) 個請求後重新啟動, 避免記憶體持續增長
+- 收到 SIGTERM 時停止接受新連線, 等待處理中的請求最多 graceful_timeout 秒後才結束
+- 所有設定都可以環境變數調整, 見 Readme 的「選用的環境變數」
+注意: 行程內的狀態存在各 worker 的記憶體中, 不會在 worker 之間共用
+- 行程內的模擬後端 (ENV=memory) 的 DynamoDB 資料
+- /metrics 的指標: 每次抓取由接受連線的那個 worker 回應, 只包含該 worker 的統計
+- 單筆查詢的快取 (DYNAMODB_CACHE_ENABLED): 其他 worker 的寫入不會清除, 多個 worker 時拒絕啟動
+- S3 的 ETag 快取: 只用來省下 head_object, 寫入時以 If-Match 確認, 其他 worker 的寫入只會多一次往返
+"""
+import os
+import multiprocessing
+
+wsgi_app = 'app:app'
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+workers = int(os.getenv('GUNICORN_WORKERS') or os.getenv('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# worker 的心跳檔放在記憶體中的檔案系統, 避免容器的磁碟 I/O 延遲被誤判為 worker 沒有回應
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# log 由應用程式的 LogConfig 輸出, gunicorn 本身的 log 寫到 stderr
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def when_ready(server):
+    """fork worker 之前 (preload_app 時應用程式已載入), 先建立所有 worker 共用的資源"""
+    _check_worker_state(server)
+    if not server.cfg.preload_app:
+        return
+    from controllers.static_assets import StaticAssets
+    from daos.aws_client_factory import AWSClientFactory
+
+    # 等待啟動時的背景壓縮完成, 未啟用壓縮時只讀取檔案資訊
+    StaticAssets.wait()
+    server.log.info("靜態檔案共 %d 個", StaticAssets.index())
+    # boto3 客戶端在第一次請求時才建立連線, fork 前建立不會共用連線, 只共用已載入的服務定義
+    for service_name in ('dynamodb', 's3'):
+        AWSClientFactory.client(service_name)
+    if server.cfg.workers > 1 and AWSClientFactory.backend('dynamodb') != 'aws':
+        server.log.warning("DynamoDB 使用行程內的模擬後端, %d 個 worker 的資料各自獨立", server.cfg.workers)
+
+
+def _check_worker_state(server):
+    """多個 worker 時, 檢查依賴行程內狀態的設定; 會讀到過期資料的設定拋出 RuntimeError, gunicorn 顯示錯誤後結束"""
+    if server.cfg.workers <= 1:
+        return
+    from daos.item_cache import ItemCache
+
+    if ItemCache.from_env() is not None:
+        raise RuntimeError(f"DYNAMODB_CACHE_ENABLED 的快取存在各 worker 的記憶體中, 其他 worker 的寫入不會清除快取, "
+                           f"{server.cfg.workers} 個 worker 時會讀到過期的資料; 請設定 GUNICORN_WORKERS=1 或關閉快取")
+    if os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+        server.log.info("/metrics 的指標由 %d 個 worker 各自統計, 每次抓取只包含回應的 worker", server.cfg.workers)
+
+
+def post_fork(server, worker):
+    # 父行程的 log 背景執行緒不會複製到 worker, 需重新啟動
+    from controllers.log_config import LogConfig
+    LogConfig.after_fork()
+
+
+def worker_exit(server, worker):
+    # worker 結束前送出佇列中剩餘的 log
+    from controllers.log_config import LogConfig
+    LogConfig.shutdown()
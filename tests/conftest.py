@@ -0,0 +1,24 @@
+''' pytest 的共用設定, 未指定 ENV 時以行程內的模擬後端執行測試, 不需要 LocalStack'''
+import os
+import uuid
+import tempfile
+
+import pytest
+
+os.environ.setdefault("ENV", "memory")
+# 本機 S3 後端的物件存放在每次測試各自的暫存資料夾
+os.environ.setdefault("S3_LOCAL_ROOT", tempfile.mkdtemp(prefix="local-s3-"))
+# 測試時不在背景壓縮 web/ 的檔案, 由 test_static_assets 以暫存資料夾測試
+os.environ.setdefault("STATIC_PRECOMPRESS", "false")
+
+
+@pytest.fixture
+def bucket():
+    """每個測試使用各自的值區, 結束時刪除其中的物件與值區, 測試之間不互相影響"""
+    from daos.s3_dao import S3Dao
+    bucket_name = f"test-{uuid.uuid4().hex[:12]}"
+    assert S3Dao.create_bucket(bucket_name) == True
+    yield bucket_name
+    for key in S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket_name, ""):
+        S3Dao.delete_object(bucket_name, key)
+    S3Dao.s3.delete_bucket(Bucket=bucket_name)
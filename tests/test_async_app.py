@@ -0,0 +1,114 @@
+''' 需要在 tests/ 資料夾下執行 pytest, 非同步模式為選用功能, 未安裝 requirements-async.txt 時略過'''
+import sys
+import asyncio
+sys.path.append('/home/coder/project')
+import pytest
+
+pytest.importorskip("quart")
+from async_app import async_app
+from daos.async_client_factory import AsyncAWSClientFactory
+from daos.dynamodb_dao import DynamoDBDao
+from daos.s3_dao import S3Dao
+
+
+def run(test):
+    """以新的 event loop 執行 test(client), 結束時釋放該 loop 的 AWS 客戶端"""
+    async def main():
+        try:
+            return await test(async_app.test_client())
+        finally:
+            await AsyncAWSClientFactory.close()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def table():
+    """有 5 筆資料的表格, 結束時刪除"""
+    DynamoDBDao.create_table("async")
+    DynamoDBDao.batch_insert_into_dynamodb("async", [{"ID": str(i), "Name": "Tom"} for i in range(5)])
+    yield "async"
+    DynamoDBDao.dynamodb.delete_table(TableName="async")
+
+
+def test_async_scan(table):
+    """測試函式，非同步的掃描路由: 全部資料、以 limit 與 NextToken 分頁、平行掃描，參數錯誤回傳 400"""
+    async def test(client):
+        everything = await (await client.get(f"/table/{table}")).get_json()
+        ndjson = await (await client.get(f"/table/{table}?format=ndjson")).get_data()
+        paged, token = [], None
+        while True:
+            query = f"&page_token={token}" if token else ""
+            page = await (await client.get(f"/table/{table}?limit=2{query}")).get_json()
+            assert len(page["Items"]) <= 2
+            paged.extend(page["Items"])
+            token = page["NextToken"]
+            if not token:
+                break
+        segments = await (await client.get(f"/table/{table}?segments=3")).get_json()
+        invalid = await client.get(f"/table/{table}?segments=2&limit=1")
+        bad_token = await client.get(f"/table/{table}?limit=2&page_token=x")
+        return everything, ndjson, paged, segments, invalid.status_code, bad_token.status_code
+
+    everything, ndjson, paged, segments, invalid, bad_token = run(test)
+    ids = ["0", "1", "2", "3", "4"]
+    assert sorted(item["ID"] for item in everything) == ids
+    assert len(ndjson.splitlines()) == 5
+    assert sorted(item["ID"] for item in paged) == ids
+    assert sorted(item["ID"] for item in segments) == ids
+    assert invalid == 400 and bad_token == 400
+
+def test_async_batch_get_and_update(table):
+    """測試函式，非同步的批次查詢依 ids 順序回傳，更新時版本號不符回傳 409"""
+    async def test(client):
+        by_query = await (await client.get(f"/table/{table}?ids=3,missing,0&projection=Name")).get_json()
+        by_body = await (await client.post(f"/table/{table}/batch-get", json={"ids": ["4", "1"]})).get_json()
+        bad_body = await client.post(f"/table/{table}/batch-get", json={"ids": "4"})
+        updated = await client.put(f"/table/{table}", json={"ID": "1", "Name": "Amy", "$version": 0})
+        conflict = await client.put(f"/table/{table}", json={"ID": "1", "Name": "Bob", "$version": 0})
+        invalid = await client.put(f"/table/{table}", json={"ID": "1", "$add": {"Count": "1"}})
+        query = await (await client.get(f"/table/{table}/1")).get_json()
+        return by_query, by_body, bad_body.status_code, updated.status_code, conflict.status_code, \
+            invalid.status_code, query
+
+    by_query, by_body, bad_body, updated, conflict, invalid, query = run(test)
+    assert by_query["Items"] == [{"ID": "3", "Name": "Tom"}, None, {"ID": "0", "Name": "Tom"}]
+    assert [item["ID"] for item in by_body["Items"]] == ["4", "1"]
+    assert bad_body == 400
+    assert (updated, conflict, invalid) == (200, 409, 400)
+    assert query[0]["Name"] == "Amy" and query[0]["version"] == 1
+
+def test_async_download_and_list_objects(bucket):
+    """測試函式，非同步的下載路由支援 Range 與 If-None-Match，列出物件支援分頁與子資料夾"""
+    S3Dao.upload_bytes(bucket, "docs/a.txt", b"0123456789")
+    S3Dao.upload_bytes(bucket, "docs/sub/b.txt", b"b")
+    S3Dao.upload_bytes(bucket, "c.txt", b"c")
+
+    async def test(client):
+        url = f"/s3/bucket/{bucket}/object?object_name=docs/a.txt"
+        partial = await client.get(url, headers={"Range": "bytes=2-5"})
+        full = await client.get(url)
+        etag = full.headers["ETag"]
+        not_modified = await client.get(url, headers={"If-None-Match": etag})
+        missing = await client.get(f"/s3/bucket/{bucket}/object?object_name=missing.txt")
+        names = await (await client.get(f"/list_objects?bucket={bucket}")).get_json()
+        folders = await (await client.get(f"/list_objects?bucket={bucket}&prefix=docs/&delimiter=/")).get_json()
+        first = await (await client.get(f"/list_objects?bucket={bucket}&max_keys=2")).get_json()
+        second = await (await client.get(f"/list_objects?bucket={bucket}&max_keys=2"
+                                         f"&page_token={first['next_token']}")).get_json()
+        no_bucket = await client.get("/list_objects")
+        bad_max_keys = await client.get(f"/list_objects?bucket={bucket}&max_keys=x")
+        assert bad_max_keys.status_code == 400
+        return (partial.status_code, partial.headers.get("Content-Range"), await partial.get_data(),
+                await full.get_data(), not_modified.status_code, missing.status_code,
+                names, folders, first, second, no_bucket.status_code)
+
+    (status, content_range, partial, full, not_modified, missing,
+     names, folders, first, second, no_bucket) = run(test)
+    assert (status, content_range, partial) == (206, "bytes 2-5/10", b"2345")
+    assert full == b"0123456789"
+    assert not_modified == 304
+    assert missing == 404
+    assert names == ["c.txt", "docs/a.txt", "docs/sub/b.txt"]
+    assert folders == {"objects": ["docs/a.txt"], "prefixes": ["docs/sub/"], "next_token": None}
+    assert first["objects"] + second["objects"] == names and second["next_token"] is None
+    assert no_bucket == 400
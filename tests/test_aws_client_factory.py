@@ -0,0 +1,51 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import threading
+from daos.aws_client_factory import AWSClientFactory, LazyClient
+
+
+def test_client_is_shared():
+    """測試函式，同一服務在多個執行緒中取得的是同一個客戶端"""
+    AWSClientFactory.reset()
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(AWSClientFactory.client("s3")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(client) for client in clients}) == 1
+
+def test_client_config_from_env(monkeypatch):
+    """測試函式，依環境變數設定端點、區域、連線池與重試模式"""
+    monkeypatch.setenv("ENV", "development")
+    monkeypatch.setenv("AWS_ENDPOINT_URL", "http://localhost:4566")
+    monkeypatch.setenv("AWS_MAX_POOL_CONNECTIONS", "32")
+    monkeypatch.setenv("AWS_RETRY_MODE", "adaptive")
+    AWSClientFactory.reset()
+    client = AWSClientFactory.client("dynamodb")
+    AWSClientFactory.reset()
+    assert client.meta.endpoint_url == "http://localhost:4566"
+    assert client.meta.region_name == "us-east-1"
+    assert client.meta.config.max_pool_connections == 32
+    assert client.meta.config.retries["mode"] == "adaptive"
+
+def test_resource_per_thread():
+    """測試函式，resource 不可跨執行緒共用，每個執行緒各自建立"""
+    AWSClientFactory.reset()
+    resources = []
+    main_resource = AWSClientFactory.resource("s3")
+    thread = threading.Thread(target=lambda: resources.append(AWSClientFactory.resource("s3")))
+    thread.start()
+    thread.join()
+    assert AWSClientFactory.resource("s3") is main_resource
+    assert resources[0] is not main_resource
+
+def test_lazy_client():
+    """測試函式，類別屬性在讀取時才取得共用客戶端"""
+    class Dao:
+        s3 = LazyClient("s3")
+
+    AWSClientFactory.reset()
+    assert Dao.s3 is AWSClientFactory.client("s3")
@@ -1,6 +1,8 @@
 import sys
+import uuid
 sys.path.append('/home/coder/project')
 from controllers.controller import Controller
+from daos.s3_dao import S3Dao
 from flask import Flask
 import pytest
 
@@ -8,15 +10,98 @@ import pytest
 app = Flask(__name__)
 
 
+@pytest.fixture
+def client():
+    """完整應用程式 (app.py) 的測試用戶端, 測試路由的參數檢查與錯誤代碼"""
+    from app import app as flask_app
+    return flask_app.test_client()
+
+
 def test_check_localstack_connection():
     """測試函式，檢查是否成功連線到 LocalStack"""
     response = Controller.check_localstack_connection()
     # 上述程式碼為測試函式，對相應功能進行測試並進行斷言檢查，確保程式的正確性和預期結果。
     assert response == "成功連線到 LocalStack！"
 
-def test_get_all_object_names_from_bucket_and_directorya():
-    """測試函式，從指定的存儲桶和目錄中獲取所有物件名稱"""
-    with app.test_request_context():
-        response = Controller.get_all_object_names_from_bucket_and_directory("cxcxc", "")
-    print(response.json)
-    assert type(response.json) == list
\ No newline at end of file
+def test_list_objects_route(client, bucket):
+    """測試函式，從指定的存儲桶和目錄中獲取所有物件名稱，缺少 bucket 或整數參數格式錯誤時回傳 400"""
+    S3Dao.upload_bytes(bucket, "123.txt", b"testfile")
+    S3Dao.upload_bytes(bucket, "docs/a.txt", b"a")
+    assert client.get(f"/list_objects?bucket={bucket}&prefix=").json == ["123.txt", "docs/a.txt"]
+    assert client.get(f"/list_objects?bucket={bucket}&max_keys=1").json["next_token"] is not None
+    assert client.get(f"/list_objects?bucket={bucket}&details=yes").json["objects"][0]["Key"] == "123.txt"
+    assert client.get(f"/list_objects?bucket={bucket}&max_keys=x").status_code == 400
+    assert client.get("/list_objects").status_code == 400
+    assert client.get("/table/cxcxc?limit=x").status_code == 400
+    assert client.get("/table/cxcxc?segments=two").status_code == 400
+
+def test_big_number_routes(client):
+    """測試函式，38 位的整數與高精確度的小數經過寫入、查詢與掃描的路由後不失真"""
+    from daos.dynamodb_dao import DynamoDBDao
+    table_name = f"test-{uuid.uuid4().hex[:12]}"
+    body = b'{"ID":"1","Big":12345678901234567890123456789012345678,"Precise":0.12345678901234567890123}'
+    DynamoDBDao.create_table(table_name)
+    try:
+        assert client.post(f"/table/{table_name}", data=body, content_type="application/json").status_code == 200
+        assert client.get(f"/table/{table_name}/1").get_data().strip() == b"[" + body + b"]"
+        assert client.get(f"/table/{table_name}").get_data().strip() == b"[" + body + b"]"
+    finally:
+        DynamoDBDao.dynamodb.delete_table(TableName=table_name)
+
+def test_presign_routes(client, bucket):
+    """測試函式，預先簽署的路由: 參數錯誤回傳 400, 本機 S3 後端回傳 501, 合併不存在的分段上傳回傳 404"""
+    assert client.get(f"/s3/bucket/{bucket}/presigned-url").status_code == 400
+    assert client.get(f"/s3/bucket/{bucket}/presigned-url?object_name=a&method=POST").status_code == 400
+    assert client.get(f"/s3/bucket/{bucket}/presigned-url?object_name=a&expires=x").status_code == 400
+    assert client.get(f"/s3/bucket/{bucket}/presigned-url?object_name=a").status_code == 501
+    response = client.post(f"/s3/bucket/{bucket}/multipart-upload", json={"object_name": "a"})
+    assert response.status_code == 400 and "size" in response.get_data(as_text=True)
+    response = client.post(f"/s3/bucket/{bucket}/presigned-post", data="[]", content_type="application/json")
+    assert response.status_code == 400
+    response = client.post(f"/s3/bucket/{bucket}/multipart-upload/missing/complete",
+                           json={"object_name": "a", "parts": [{"part_number": 1, "etag": '"x"'}]})
+    assert response.status_code == 404
+
+def test_conditional_update_route(client, bucket):
+    """測試函式，更新物件的路由: If-Match 相符時回傳新的 ETag，過期的 ETag 回傳 412，If-None-Match 只支援 *"""
+    url = f"/s3/bucket/{bucket}/new-object?object_name=a.txt"
+    S3Dao.upload_bytes(bucket, "a.txt", b"v1")
+    etag = S3Dao.s3.head_object(Bucket=bucket, Key="a.txt")["ETag"]
+    response = client.put(url, data=b"v2", headers={"If-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert client.put(url, data=b"lost", headers={"If-Match": etag}).status_code == 412
+    assert client.put(url, data=b"lost", headers={"If-None-Match": "*"}).status_code == 412
+    assert client.put(url, data=b"lost", headers={"If-None-Match": etag}).status_code == 400
+    assert S3Dao.s3.get_object(Bucket=bucket, Key="a.txt")["Body"].read() == b"v2"
+
+def test_delete_objects_route(client, bucket):
+    """測試函式，批次刪除的路由: dry_run 只回傳筆數，缺少 keys 與 prefix 時回傳 400"""
+    url = f"/s3/bucket/{bucket}/delete-objects"
+    for key in ("tmp/a.txt", "tmp/b.txt"):
+        S3Dao.upload_bytes(bucket, key, b"data")
+    assert client.post(url, json={"prefix": "tmp/", "dry_run": True}).json == {"count": 2}
+    assert client.post(url, json={}).status_code == 400
+    assert client.post(url, json={"keys": "tmp/a.txt"}).status_code == 400
+    assert client.post(url, json={"keys": ["tmp/a.txt", "tmp/b.txt"]}).json["deleted"] == 2
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == []
+
+def test_copy_and_move_routes(client, bucket):
+    """測試函式，複製與搬移的路由: 搬移後來源刪除，來源與目的地相同或搬移整個值區 (prefix 為空) 時回傳 400"""
+    S3Dao.upload_bytes(bucket, "a.txt", b"data")
+    response = client.post(f"/s3/bucket/{bucket}/copy-objects",
+                           json={"object_name": "a.txt", "dest_object_name": "a.txt"})
+    assert response.status_code == 400
+    response = client.post(f"/s3/bucket/{bucket}/move-objects",
+                           json={"object_name": "a.txt", "dest_object_name": "b.txt"})
+    assert response.json == {"count": 1, "copied": 1, "errors": [], "deleted": 1}
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == ["b.txt"]
+    other = f"test-{uuid.uuid4().hex[:12]}"
+    S3Dao.create_bucket(other)
+    try:
+        response = client.post(f"/s3/bucket/{bucket}/move-objects",
+                               json={"prefix": "", "dest_prefix": "", "dest_bucket": other})
+        assert response.status_code == 400
+        assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == ["b.txt"]
+        assert S3Dao.get_all_object_names_by_bucket_name_and_directory(other, "") == []
+    finally:
+        S3Dao.s3.delete_bucket(Bucket=other)
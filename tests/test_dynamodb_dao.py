@@ -1,18 +1,14 @@
 ''' 需要在 tests/ 資料夾下執行 pytest'''
 import sys
 sys.path.append('/home/coder/project')
+from daos.aws_client_factory import AWSClientFactory
+from botocore.exceptions import ClientError
 from daos.dynamodb_dao import DynamoDBDao
-import boto3
 import json
+import pytest
 
-# 建立 dynamodb 物件
-dynamodb = boto3.client(
-        'dynamodb',
-        endpoint_url='http://localstack:4566',
-        region_name='us-east-1',
-        aws_access_key_id='test',
-        aws_secret_access_key='test',
-    )
+# 取得與 DynamoDBDao 共用的 dynamodb 物件
+dynamodb = AWSClientFactory.client('dynamodb')
 
 
 def test_check_dynamodb():
@@ -38,6 +34,20 @@ def test_insert_into_dynamodb():
     dynamodb.delete_table(TableName="cxcxc")
     assert response == 'OK'
 
+def test_batch_insert_into_dynamodb():
+    """測試函式，批次將資料插入到 DynamoDB"""
+    DynamoDBDao.create_table("cxcxc")
+    items = [{"ID": str(i), "Name": "Tom"} for i in range(60)]
+    items.append({"Name": "NoID"})
+    items.append({"ID": "0", "Name": "Duplicate"})
+    results = DynamoDBDao.batch_insert_into_dynamodb("cxcxc", iter(items))
+    scanned = list(DynamoDBDao.iter_scan("cxcxc"))
+    dynamodb.delete_table(TableName="cxcxc")
+    assert [result["index"] for result in results] == list(range(62))
+    assert all(result["success"] for result in results[:60])
+    assert results[60]["success"] == False
+    assert len(scanned) == 60
+
 def test_scan_dynamodb():
     """測試函式，從 DynamoDB 掃描資料"""
     DynamoDBDao.create_table("cxcxc")
@@ -45,6 +55,55 @@ def test_scan_dynamodb():
     dynamodb.delete_table(TableName="cxcxc")
     assert response == '[]'
 
+def test_scan_page():
+    """測試函式，以 limit 與 page_token 分頁讀取 DynamoDB 資料"""
+    DynamoDBDao.create_table("cxcxc")
+    for i in range(3):
+        DynamoDBDao.insert_into_dynamodb("cxcxc", {"ID": str(i), "Name": "Tom"})
+    first_items, token = DynamoDBDao.scan_page("cxcxc", 2)
+    second_items, last_token = DynamoDBDao.scan_page("cxcxc", 2, token)
+    dynamodb.delete_table(TableName="cxcxc")
+    assert len(first_items) == 2
+    assert token is not None
+    assert len(second_items) == 1
+    assert last_token is None
+
+def test_scan_page_binary_key():
+    """測試函式，分區鍵為 B 的表格以 page_token 分頁讀取，token 中的 bytes 解碼後相同"""
+    DynamoDBDao.create_table("binary", {"hash_key": "K", "hash_key_type": "B"})
+    for i in range(3):
+        DynamoDBDao.insert_into_dynamodb("binary", {"K": f"key-{i}", "Name": "Tom"})
+    items, token = DynamoDBDao.scan_page("binary", 1)
+    while token:
+        assert DynamoDBDao.decode_page_token(token) == {"K": {"B": items[-1]["K"]}}
+        page, token = DynamoDBDao.scan_page("binary", 1, token)
+        items.extend(page)
+    dynamodb.delete_table(TableName="binary")
+    assert sorted(item["K"] for item in items) == [b"key-0", b"key-1", b"key-2"]
+    with pytest.raises(ValueError):
+        DynamoDBDao.decode_page_token(DynamoDBDao.encode_page_token({"K": {"S": "a"}})[:-4] + "!!!!")
+
+def test_iter_scan():
+    """測試函式，逐頁讀取 DynamoDB 表格直到最後一頁"""
+    DynamoDBDao.create_table("cxcxc")
+    for i in range(5):
+        DynamoDBDao.insert_into_dynamodb("cxcxc", {"ID": str(i), "Name": "Tom"})
+    pages = list(DynamoDBDao.scan_pages("cxcxc", Limit=2))
+    items = list(DynamoDBDao.iter_scan("cxcxc", Limit=2))
+    dynamodb.delete_table(TableName="cxcxc")
+    assert len(pages) >= 3
+    assert sorted(item["ID"] for item in items) == ["0", "1", "2", "3", "4"]
+
+def test_parallel_scan_pages():
+    """測試函式，以多個分段平行掃描 DynamoDB 表格"""
+    DynamoDBDao.create_table("cxcxc")
+    for i in range(10):
+        DynamoDBDao.insert_into_dynamodb("cxcxc", {"ID": str(i), "Name": "Tom"})
+    pages = DynamoDBDao.parallel_scan_pages("cxcxc", 4, max_workers=2)
+    items = [item for page in pages for item in page]
+    dynamodb.delete_table(TableName="cxcxc")
+    assert sorted(int(item["ID"]) for item in items) == list(range(10))
+
 def test_query_dynamodb():
     """測試函式，從 DynamoDB 查詢資料"""
     DynamoDBDao.create_table("cxcxc")
@@ -54,7 +113,41 @@ def test_query_dynamodb():
     })
     response = DynamoDBDao.query_dynamodb("cxcxc", "12321")
     dynamodb.delete_table(TableName="cxcxc")
-    assert response ==  [{'ID': {'S': '12321'}, 'Name': {'S': 'Tom'}}]
+    assert response ==  [{'ID': '12321', 'Name': 'Tom'}]
+
+def test_query_typed_item():
+    """測試函式，數值、布林、list 與 map 以原本的型別寫入並查詢"""
+    DynamoDBDao.create_table("cxcxc")
+    data = {"ID": "7", "Age": 18, "Active": True, "Tags": ["a", "b"], "Address": {"City": "Taipei"}}
+    DynamoDBDao.insert_into_dynamodb("cxcxc", data)
+    response = DynamoDBDao.query_dynamodb("cxcxc", "7")
+    dynamodb.delete_table(TableName="cxcxc")
+    assert response == [data]
+
+def test_batch_get_dynamodb():
+    """測試函式，一次查詢 DynamoDB 中的多筆資料並保持查詢順序"""
+    DynamoDBDao.create_table("cxcxc")
+    DynamoDBDao.batch_insert_into_dynamodb("cxcxc", [
+        {"ID": str(i), "Name": "Tom", "Age": "18"} for i in range(150)
+    ])
+    ids = ["149", "missing", "0", "75", "0"]
+    response = DynamoDBDao.batch_get_dynamodb("cxcxc", ids, projection=["Name"])
+    dynamodb.delete_table(TableName="cxcxc")
+    assert [item["ID"] if item else None for item in response] == ["149", None, "0", "75", "0"]
+    assert response[0] == {"ID": "149", "Name": "Tom"}
+
+def test_batch_get_binary_and_number_keys():
+    """測試函式，分區鍵為 B 或 N 的表格, 批次查詢的結果依主鍵的型別與值對應回查詢的 id"""
+    DynamoDBDao.create_table("binary", {"hash_key": "K", "hash_key_type": "B"})
+    DynamoDBDao.create_table("number", {"hash_key": "K", "hash_key_type": "N"})
+    DynamoDBDao.insert_into_dynamodb("binary", {"K": "abc", "Name": "Tom"})
+    DynamoDBDao.insert_into_dynamodb("number", {"K": 1, "Name": "Amy"})
+    binary = DynamoDBDao.batch_get_dynamodb("binary", ["abc", "missing"])
+    number = DynamoDBDao.batch_get_dynamodb("number", ["1.0", 2, 1])
+    dynamodb.delete_table(TableName="binary")
+    dynamodb.delete_table(TableName="number")
+    assert [item and item["Name"] for item in binary] == ["Tom", None]
+    assert [item and item["Name"] for item in number] == ["Amy", None, "Amy"]
 
 def test_update_dynamodb_item():
     """測試函式，更新 DynamoDB 中的資料項目"""
@@ -68,7 +161,60 @@ def test_update_dynamodb_item():
             "Name": "Amy"
     })
     dynamodb.delete_table(TableName="cxcxc")
-    assert response["Attributes"]["Name"]["S"] == "Amy"
+    assert response["Attributes"]["Name"] == "Amy"
+
+def test_update_request_is_compiled_once():
+    """測試函式，相同欄位組合共用編譯好的更新表達式，且不修改傳入的資料"""
+    data = {"ID": "1", "Name": "Amy", "Age": 18, "$remove": ["Nickname"], "$add": {"Count": 1}}
+    _, first = DynamoDBDao._update_request("cxcxc", data)
+    _, second = DynamoDBDao._update_request("cxcxc", {**data, "Name": "Tom"})
+    assert data["ID"] == "1"
+    assert first["UpdateExpression"] == "SET #n0 = :s0, #n1 = :s1, #n4 = :active REMOVE #n2 ADD #n3 :a0"
+    assert first["ConditionExpression"] == "(attribute_not_exists(#n5) OR #n5 <> :deleted)"
+    assert first["ExpressionAttributeNames"] is second["ExpressionAttributeNames"]
+    assert second["ExpressionAttributeValues"][":s1"] == {"S": "Tom"}
+
+def test_update_request_add_values():
+    """測試函式，$add 的值為數值或同一型別的 list，其他格式拋出 ValueError"""
+    _, request = DynamoDBDao._update_request("cxcxc", {"ID": "1", "$add": {"Count": 2, "Tags": ["a", "b", "a"]}})
+    assert request["ExpressionAttributeValues"][":a0"] == {"N": "2"}
+    assert sorted(request["ExpressionAttributeValues"][":a1"]["SS"]) == ["a", "b"]
+    for value in ("1", True, [], [{"a": 1}], [["a"]], ["a", 1], [True], {"a": 1}, None):
+        with pytest.raises(ValueError):
+            DynamoDBDao._update_request("cxcxc", {"ID": "1", "$add": {"Count": value}})
+
+def test_update_with_version():
+    """測試函式，以 $version 樂觀鎖更新資料，版本號不符時更新失敗"""
+    DynamoDBDao.create_table("cxcxc")
+    DynamoDBDao.insert_into_dynamodb("cxcxc", {"ID": "12321", "Name": "Tom"})
+    first = DynamoDBDao.update_dynamodb_item("cxcxc", {"ID": "12321", "Name": "Amy", "$version": 0})
+    try:
+        DynamoDBDao.update_dynamodb_item("cxcxc", {"ID": "12321", "Name": "Bob", "$version": 0})
+        conflict = None
+    except ClientError as e:
+        conflict = e.response["Error"]["Code"]
+    query = DynamoDBDao.query_dynamodb("cxcxc", "12321")
+    dynamodb.delete_table(TableName="cxcxc")
+    assert first["Attributes"] == {"Name": "Amy", "version": 1}
+    assert conflict == "ConditionalCheckFailedException"
+    assert query == [{"ID": "12321", "Name": "Amy", "version": 1}]
+
+def test_update_keeps_active_index():
+    """測試函式，以更新 (upsert) 新增、軟刪除、修改已軟刪除的資料後，稀疏索引與篩選條件讀到相同的資料"""
+    results = {}
+    for active_index in (True, False):
+        DynamoDBDao.create_table("cxcxc", {"active_index": active_index})
+        for i in range(3):
+            DynamoDBDao.insert_into_dynamodb("cxcxc", {"ID": str(i), "Name": "Tom"})
+        DynamoDBDao.soft_delete_item("cxcxc", {"ID": "0"})
+        DynamoDBDao.update_dynamodb_item("cxcxc", {"ID": "0", "Name": "Amy"})
+        DynamoDBDao.update_dynamodb_item("cxcxc", {"ID": "2", "is_deleted": True})
+        DynamoDBDao.update_dynamodb_item("cxcxc", {"ID": "3", "Name": "Bob"})
+        DynamoDBDao.update_dynamodb_item("cxcxc", {"ID": "4", "Name": "Eve", "is_deleted": True})
+        scan_kwargs = DynamoDBDao.active_scan_kwargs("cxcxc")
+        results[active_index] = sorted(item["ID"] for item in DynamoDBDao.iter_scan("cxcxc", **scan_kwargs))
+        dynamodb.delete_table(TableName="cxcxc")
+    assert results[True] == results[False] == ["1", "3"]
 
 def test_soft_delete_item():
     """測試函式，軟刪除 DynamoDB 中的資料項目"""
@@ -82,7 +228,75 @@ def test_soft_delete_item():
     })
     query = DynamoDBDao.query_dynamodb("cxcxc", "12321")
     dynamodb.delete_table(TableName="cxcxc")
-    assert query == [{'is_deleted': {'BOOL': True}, 'ID': {'S': '12321'}, 'Name': {'S': 'Tom'}}]
+    assert query == [{'is_deleted': True, 'ID': '12321', 'Name': 'Tom'}]
+
+def test_include_deleted():
+    """測試函式，include_deleted=False 時只讀取未軟刪除的資料，有稀疏索引的表格改為掃描索引"""
+    results = {}
+    for active_index in (True, False):
+        DynamoDBDao.create_table("cxcxc", {"active_index": active_index})
+        for i in range(5):
+            DynamoDBDao.insert_into_dynamodb("cxcxc", {"ID": str(i), "Name": "Tom"})
+        DynamoDBDao.soft_delete_item("cxcxc", {"ID": "1"})
+        DynamoDBDao.soft_delete_item("cxcxc", {"ID": "3"})
+        scan_kwargs = DynamoDBDao.active_scan_kwargs("cxcxc")
+        items = list(DynamoDBDao.iter_scan("cxcxc", **scan_kwargs))
+        page, _ = DynamoDBDao.scan_page("cxcxc", 10, **scan_kwargs)
+        results[active_index] = (scan_kwargs, sorted(item["ID"] for item in items), len(page),
+                                 DynamoDBDao.query_dynamodb("cxcxc", "1", include_deleted=False),
+                                 DynamoDBDao.query_dynamodb("cxcxc", "2", include_deleted=False))
+        all_items = list(DynamoDBDao.iter_scan("cxcxc"))
+        dynamodb.delete_table(TableName="cxcxc")
+        assert len(all_items) == 5
+        assert all(DynamoDBDao.ACTIVE_ATTRIBUTE not in item for item in all_items)
+    assert results[True][0] == {"IndexName": DynamoDBDao.ACTIVE_INDEX}
+    assert "FilterExpression" in results[False][0]
+    for _, ids, page_size, deleted, active in results.values():
+        assert ids == ["0", "2", "4"]
+        assert page_size == 3
+        assert deleted is None
+        assert active == [{"ID": "2", "Name": "Tom"}]
+
+def test_table_with_sort_key():
+    """測試函式，以自訂的主鍵、排序鍵與索引建立表格，讀寫時依表格的主鍵轉換"""
+    response = DynamoDBDao.create_table("orders", {
+        "hash_key": "UserID", "sort_key": "OrderNo", "sort_key_type": "N", "billing_mode": "PAY_PER_REQUEST",
+        "global_indexes": [{"name": "by-status", "hash_key": "Status", "projection": "KEYS_ONLY"}],
+        "local_indexes": [{"name": "by-total", "sort_key": "Total", "sort_key_type": "N"}],
+        "ttl_attribute": "ExpiresAt",
+    })
+    description = dynamodb.describe_table(TableName="orders")["Table"]
+    ttl = dynamodb.describe_time_to_live(TableName="orders")["TimeToLiveDescription"]
+    for i in range(3):
+        DynamoDBDao.insert_into_dynamodb("orders", {"UserID": "u1", "OrderNo": i, "Status": "new", "Total": i})
+    DynamoDBDao.update_dynamodb_item("orders", {"UserID": "u1", "OrderNo": 1, "Status": "paid"})
+    DynamoDBDao.delete_item("orders", "u1", "0")
+    query = DynamoDBDao.query_dynamodb("orders", "u1")
+    try:
+        DynamoDBDao.batch_get_dynamodb("orders", ["u1"])
+        error = None
+    except ValueError as e:
+        error = str(e)
+    dynamodb.delete_table(TableName="orders")
+    assert response == "OK"
+    assert description["BillingModeSummary"]["BillingMode"] == "PAY_PER_REQUEST"
+    assert [index["IndexName"] for index in description["GlobalSecondaryIndexes"]] == ["by-status"]
+    assert [index["IndexName"] for index in description["LocalSecondaryIndexes"]] == ["by-total"]
+    assert ttl == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+    assert DynamoDBDao.tables.get("orders").key_types == {"UserID": "S", "OrderNo": "N"}
+    assert query == [{"UserID": "u1", "OrderNo": 1, "Status": "paid", "Total": 1},
+                     {"UserID": "u1", "OrderNo": 2, "Status": "new", "Total": 2}]
+    assert "排序鍵" in error
+
+def test_create_table_request_errors():
+    """測試函式，表格定義格式錯誤時拋出 ValueError"""
+    for definition in ({"hash_key_type": "X"}, {"billing_mode": "FREE"},
+                       {"local_indexes": [{"name": "by-name", "sort_key": "Name"}]},
+                       {"sort_key": "A", "global_indexes": [{"name": "by-a", "hash_key": "A", "hash_key_type": "N"}]},
+                       {"read_capacity": None}, {"write_capacity": "five"}, {"read_capacity": 0},
+                       {"global_indexes": [{"name": "by-a", "hash_key": "A", "write_capacity": 1.5}]}):
+        with pytest.raises(ValueError):
+            DynamoDBDao._create_table_request("cxcxc", definition)
 
 def test_delete_item():
     """測試函式，刪除 DynamoDB 中的資料項目"""
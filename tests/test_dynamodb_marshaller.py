@@ -0,0 +1,76 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+from decimal import Decimal
+
+import pytest
+
+from daos.dynamodb_marshaller import dumps, loads, marshall, marshall_item, unmarshall, unmarshall_item
+
+
+def test_marshall_scalars():
+    """測試函式，字串、數值、布林與 null 轉換成對應的屬性值"""
+    assert marshall("Tom") == {'S': 'Tom'}
+    assert marshall(18) == {'N': '18'}
+    assert marshall(1.5) == {'N': '1.5'}
+    assert marshall(Decimal("3.14")) == {'N': '3.14'}
+    assert marshall(True) == {'BOOL': True}
+    assert marshall(None) == {'NULL': True}
+    assert marshall(b"\x00\x01") == {'B': b"\x00\x01"}
+
+def test_marshall_nested():
+    """測試函式，巢狀的 dict 與 list 轉換成 M 與 L"""
+    assert marshall({"tags": ["a", 1], "meta": {"ok": False}}) == {'M': {
+        'tags': {'L': [{'S': 'a'}, {'N': '1'}]},
+        'meta': {'M': {'ok': {'BOOL': False}}},
+    }}
+
+def test_marshall_sets():
+    """測試函式，集合依元素型別轉換成 SS、NS 或 BS"""
+    assert sorted(marshall({"a", "b"})['SS']) == ['a', 'b']
+    assert sorted(marshall({1, 2})['NS']) == ['1', '2']
+    assert marshall(frozenset([b"x"])) == {'BS': [b"x"]}
+    with pytest.raises(TypeError):
+        marshall(set())
+    with pytest.raises(TypeError):
+        marshall({"a", 1})
+
+def test_marshall_invalid():
+    """測試函式，NaN 與不支援的型別會拋出錯誤"""
+    with pytest.raises(ValueError):
+        marshall(float("nan"))
+    with pytest.raises(TypeError):
+        marshall(object())
+
+def test_item_round_trip():
+    """測試函式，JSON 物件轉換成 Item 後可轉換回原本的值"""
+    data = {"ID": "1", "Age": 18, "Score": 97.5, "Active": True, "Note": None,
+            "Tags": ["a", "b"], "Address": {"City": "Taipei", "Floor": 3}}
+    item = marshall_item(data)
+    assert item["Age"] == {'N': '18'}
+    assert unmarshall_item(item) == data
+
+def test_unmarshall_sets_and_numbers():
+    """測試函式，集合轉換成 list，整數與小數分別轉換成 int 與 float"""
+    assert unmarshall({'NS': ['1', '2.5', '1e3']}) == [1, 2.5, 1000.0]
+    assert unmarshall({'SS': ['a']}) == ['a']
+    assert unmarshall({'N': '12345678901234567890'}) == 12345678901234567890
+
+def test_dumps_and_loads():
+    """測試函式，dumps 輸出 UTF-8 的 JSON，可序列化 bytes、集合與 Decimal"""
+    encoded = dumps({"Name": "湯姆", "Raw": b"hi", "Ids": {"1"}, "Price": Decimal("9.5")})
+    assert isinstance(encoded, bytes)
+    assert loads(encoded) == {"Name": "湯姆", "Raw": "aGk=", "Ids": ["1"], "Price": 9.5}
+
+def test_big_numbers_keep_precision():
+    """測試函式，38 位的整數與高精確度的小數在轉換、序列化與解析時都不失真"""
+    big = 12345678901234567890123456789012345678
+    precise = Decimal("3.1415926535897932384626433832795028")
+    item = {'Big': {'N': str(big)}, 'Precise': {'N': str(precise)}, 'Plain': {'N': '1.5'}}
+    data = unmarshall_item(item)
+    encoded = dumps([data])
+    assert data == {'Big': big, 'Precise': precise, 'Plain': 1.5}
+    assert encoded == b'[{"Big":12345678901234567890123456789012345678,' \
+                      b'"Precise":3.1415926535897932384626433832795028,"Plain":1.5}]'
+    assert loads(encoded) == [data]
+    assert marshall_item(loads(encoded)[0]) == item
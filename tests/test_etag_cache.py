@@ -0,0 +1,39 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+from daos.etag_cache import ETagCache
+
+
+class FakeClock:
+    """可手動調整時間的時鐘"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_get_and_expire():
+    """測試函式，寫入的 ETag 在 ttl 內可讀取，過期或清除後回傳 None"""
+    clock = FakeClock()
+    cache = ETagCache(max_items=10, ttl=60, clock=clock)
+    cache.put("cxcxc", "a.txt", '"1"')
+    cache.put("cxcxc", "b.txt", '"2"')
+    cache.invalidate("cxcxc", "b.txt")
+    assert cache.get("cxcxc", "a.txt") == '"1"'
+    assert cache.get("cxcxc", "b.txt") is None
+    clock.now = 61
+    assert cache.get("cxcxc", "a.txt") is None
+
+def test_lru_eviction():
+    """測試函式，超過筆數上限時淘汰最久未使用的 ETag，ttl 為 0 時不快取"""
+    cache = ETagCache(max_items=2, ttl=60)
+    cache.put("cxcxc", "1", '"1"')
+    cache.put("cxcxc", "2", '"2"')
+    cache.get("cxcxc", "1")
+    cache.put("cxcxc", "3", '"3"')
+    disabled = ETagCache(ttl=0)
+    disabled.put("cxcxc", "1", '"1"')
+    assert cache.get("cxcxc", "2") is None
+    assert cache.get("cxcxc", "1") == '"1"'
+    assert disabled.get("cxcxc", "1") is None
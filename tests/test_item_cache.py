@@ -0,0 +1,72 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+from daos.item_cache import ItemCache
+
+
+class FakeClock:
+    """可手動調整時間的時鐘"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_and_put():
+    """測試函式，未命中後寫入快取，再次讀取即命中"""
+    cache = ItemCache(max_items=10, default_ttl=60)
+    value, token = cache.get("cxcxc", "1")
+    cache.put("cxcxc", "1", [{"ID": {"S": "1"}}], token)
+    cached, _ = cache.get("cxcxc", "1")
+    assert value is None
+    assert cached == [{"ID": {"S": "1"}}]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_lru_eviction():
+    """測試函式，超過筆數上限時淘汰最久未使用的資料"""
+    cache = ItemCache(max_items=2, default_ttl=60)
+    for key in ("1", "2"):
+        _, token = cache.get("cxcxc", key)
+        cache.put("cxcxc", key, [key], token)
+    cache.get("cxcxc", "1")
+    _, token = cache.get("cxcxc", "3")
+    cache.put("cxcxc", "3", ["3"], token)
+    assert cache.get("cxcxc", "2")[0] is None
+    assert cache.get("cxcxc", "1")[0] == ["1"]
+    assert cache.stats()["evictions"] == 1
+
+def test_table_ttl():
+    """測試函式，依表格設定的存活時間讓快取過期"""
+    clock = FakeClock()
+    cache = ItemCache(max_items=10, default_ttl=60, table_ttls={"hot": 5, "nocache": 0}, clock=clock)
+    for table_name in ("hot", "cxcxc", "nocache"):
+        _, token = cache.get(table_name, "1")
+        cache.put(table_name, "1", ["1"], token)
+    clock.now = 10
+    assert cache.get("hot", "1")[0] is None
+    assert cache.get("cxcxc", "1")[0] == ["1"]
+    assert cache.get("nocache", "1")[0] is None
+    assert cache.stats()["expirations"] == 1
+
+def test_invalidate():
+    """測試函式，寫入資料後清除快取，且查詢途中被清除的舊資料不會再寫回快取"""
+    cache = ItemCache(max_items=10, default_ttl=60)
+    _, token = cache.get("cxcxc", "1")
+    cache.put("cxcxc", "1", ["old"], token)
+    cache.invalidate("cxcxc", "1")
+    _, stale_token = cache.get("cxcxc", "1")
+    cache.invalidate("cxcxc", "1")
+    cache.put("cxcxc", "1", ["stale"], stale_token)
+    assert cache.get("cxcxc", "1")[0] is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_cached_value_is_copied():
+    """測試函式，修改讀出的資料不會影響快取內容"""
+    cache = ItemCache(max_items=10, default_ttl=60)
+    _, token = cache.get("cxcxc", "1")
+    cache.put("cxcxc", "1", [{"Name": "Tom"}], token)
+    cached, _ = cache.get("cxcxc", "1")
+    cached[0]["Name"] = "Amy"
+    assert cache.get("cxcxc", "1")[0] == [{"Name": "Tom"}]
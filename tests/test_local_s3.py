@@ -0,0 +1,175 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import pytest
+from botocore.exceptions import ClientError
+
+from daos.local_s3 import MULTIPART_MIN_PART_SIZE, LocalS3Client
+
+
+@pytest.fixture
+def client(tmp_path):
+    """以 tmp_path 為根目錄, 建立只有一個 cxcxc 值區的本機 S3 後端"""
+    client = LocalS3Client(root=str(tmp_path))
+    client.create_bucket(Bucket='cxcxc')
+    return client
+
+def error_code(excinfo):
+    return excinfo.value.response['Error']['Code']
+
+
+def test_put_get_and_persist(client, tmp_path):
+    """測試函式，寫入後讀取，重新建立客戶端時由磁碟載入物件"""
+    response = client.put_object(Bucket='cxcxc', Key='a.txt', Body=b'hello', ContentType='text/plain',
+                                 Metadata={'owner': 'tom'})
+    client.put_object(Bucket='cxcxc', Key='a.txt', Body=b'hello world', ContentType='text/plain')
+    reloaded = LocalS3Client(root=str(tmp_path))
+    obj = reloaded.get_object(Bucket='cxcxc', Key='a.txt')
+    assert obj['Body'].read() == b'hello world'
+    assert obj['ContentLength'] == 11
+    assert obj['ContentType'] == 'text/plain'
+    assert response['ETag'] == '"5d41402abc4b2a76b9719d911017c592"'
+    assert reloaded.head_object(Bucket='cxcxc', Key='a.txt')['ContentLength'] == 11
+
+def test_get_range(client):
+    """測試函式，Range 的起訖、只有起點與最後 n bytes，超出範圍時回傳 InvalidRange"""
+    client.put_object(Bucket='cxcxc', Key='r.txt', Body=b'0123456789')
+
+    def read(range_header):
+        response = client.get_object(Bucket='cxcxc', Key='r.txt', Range=range_header)
+        return response['Body'].read(), response['ContentRange']
+
+    assert read('bytes=2-5') == (b'2345', 'bytes 2-5/10')
+    assert read('bytes=7-') == (b'789', 'bytes 7-9/10')
+    assert read('bytes=-3') == (b'789', 'bytes 7-9/10')
+    assert read('bytes=8-100') == (b'89', 'bytes 8-9/10')
+    with pytest.raises(ClientError) as excinfo:
+        client.get_object(Bucket='cxcxc', Key='r.txt', Range='bytes=10-')
+    assert error_code(excinfo) == 'InvalidRange'
+
+def test_conditional_get(client):
+    """測試函式，If-None-Match 相符時回傳 304，If-Match 不符時回傳 412"""
+    etag = client.put_object(Bucket='cxcxc', Key='c.txt', Body=b'data')['ETag']
+    with pytest.raises(ClientError) as excinfo:
+        client.get_object(Bucket='cxcxc', Key='c.txt', IfNoneMatch=etag)
+    assert excinfo.value.response['ResponseMetadata']['HTTPStatusCode'] == 304
+    with pytest.raises(ClientError) as excinfo:
+        client.get_object(Bucket='cxcxc', Key='c.txt', IfMatch='"other"')
+    assert error_code(excinfo) == 'PreconditionFailed'
+    assert client.get_object(Bucket='cxcxc', Key='c.txt', IfMatch=etag)['Body'].read() == b'data'
+
+def test_conditional_put(client):
+    """測試函式，If-Match 不符或 If-None-Match: * 的物件已存在時拒絕寫入，內容不變"""
+    etag = client.put_object(Bucket='cxcxc', Key='c.txt', Body=b'v1')['ETag']
+    with pytest.raises(ClientError) as excinfo:
+        client.put_object(Bucket='cxcxc', Key='c.txt', Body=b'lost', IfMatch='"stale"')
+    assert error_code(excinfo) == 'PreconditionFailed'
+    with pytest.raises(ClientError) as excinfo:
+        client.put_object(Bucket='cxcxc', Key='c.txt', Body=b'lost', IfNoneMatch='*')
+    assert error_code(excinfo) == 'PreconditionFailed'
+    with pytest.raises(client.exceptions.NoSuchKey):
+        client.put_object(Bucket='cxcxc', Key='new.txt', Body=b'lost', IfMatch=etag)
+    new_etag = client.put_object(Bucket='cxcxc', Key='c.txt', Body=b'v2', IfMatch=etag)['ETag']
+    client.put_object(Bucket='cxcxc', Key='created.txt', Body=b'v1', IfNoneMatch='*')
+    assert new_etag != etag
+    assert client.get_object(Bucket='cxcxc', Key='c.txt')['Body'].read() == b'v2'
+    assert client.head_object(Bucket='cxcxc', Key='created.txt')['ContentLength'] == 2
+
+def test_missing_objects(client):
+    """測試函式，物件或值區不存在時拋出對應的錯誤，非空的值區不可刪除"""
+    with pytest.raises(client.exceptions.NoSuchKey):
+        client.get_object(Bucket='cxcxc', Key='missing')
+    with pytest.raises(ClientError) as excinfo:
+        client.head_object(Bucket='cxcxc', Key='missing')
+    assert error_code(excinfo) == '404'
+    with pytest.raises(client.exceptions.NoSuchBucket):
+        client.put_object(Bucket='missing', Key='a', Body=b'')
+    client.put_object(Bucket='cxcxc', Key='a', Body=b'')
+    with pytest.raises(client.exceptions.BucketNotEmpty):
+        client.delete_bucket(Bucket='cxcxc')
+    client.delete_object(Bucket='cxcxc', Key='a')
+    client.delete_object(Bucket='cxcxc', Key='a')
+    client.delete_bucket(Bucket='cxcxc')
+    assert client.list_buckets()['Buckets'] == []
+
+def test_list_with_delimiter_and_pages(client):
+    """測試函式，以 delimiter 分頁列出時每個子資料夾只出現一次"""
+    keys = ['a/1', 'a/2', 'b', 'c/1', 'c/2', 'c/3', 'd']
+    for key in keys:
+        client.put_object(Bucket='cxcxc', Key=key, Body=b'x')
+    entries = []
+    kwargs = {'Bucket': 'cxcxc', 'Delimiter': '/', 'MaxKeys': 2}
+    while True:
+        response = client.list_objects_v2(**kwargs)
+        entries += [item['Key'] for item in response.get('Contents', [])]
+        entries += [item['Prefix'] for item in response.get('CommonPrefixes', [])]
+        if not response['IsTruncated']:
+            break
+        kwargs['ContinuationToken'] = response['NextContinuationToken']
+    prefixed = client.list_objects_v2(Bucket='cxcxc', Prefix='c/', StartAfter='c/1')
+    assert sorted(entries) == ['a/', 'b', 'c/', 'd']
+    assert [item['Key'] for item in prefixed['Contents']] == ['c/2', 'c/3']
+    assert prefixed['KeyCount'] == 2
+
+def test_multipart_upload(client):
+    """測試函式，分段上傳後合併成一個物件，ETag 為各段 md5 的 md5 加上段數"""
+    upload_id = client.create_multipart_upload(Bucket='cxcxc', Key='big.bin')['UploadId']
+    first = b'a' * MULTIPART_MIN_PART_SIZE
+    parts = [
+        {'PartNumber': 1, 'ETag': client.upload_part(Bucket='cxcxc', Key='big.bin', UploadId=upload_id,
+                                                     PartNumber=1, Body=first)['ETag']},
+        {'PartNumber': 2, 'ETag': client.upload_part(Bucket='cxcxc', Key='big.bin', UploadId=upload_id,
+                                                     PartNumber=2, Body=b'tail')['ETag']},
+    ]
+    with pytest.raises(ClientError) as excinfo:
+        client.complete_multipart_upload(Bucket='cxcxc', Key='big.bin', UploadId=upload_id,
+                                         MultipartUpload={'Parts': parts[::-1]})
+    assert error_code(excinfo) == 'InvalidPartOrder'
+    response = client.complete_multipart_upload(Bucket='cxcxc', Key='big.bin', UploadId=upload_id,
+                                                MultipartUpload={'Parts': parts})
+    body = client.get_object(Bucket='cxcxc', Key='big.bin', Range=f'bytes={MULTIPART_MIN_PART_SIZE - 1}-')
+    assert response['ETag'].endswith('-2"')
+    assert body['Body'].read() == b'atail'
+    with pytest.raises(client.exceptions.NoSuchUpload):
+        client.abort_multipart_upload(Bucket='cxcxc', Key='big.bin', UploadId=upload_id)
+
+def test_copy_object_and_part_copy(client):
+    """測試函式，copy_object 保留 metadata，upload_part_copy 只複製指定範圍，來源改變時回傳 412"""
+    etag = client.put_object(Bucket='cxcxc', Key='src.txt', Body=b'0123456789', ContentType='text/plain',
+                             Metadata={'owner': 'cxcxc'})['ETag']
+    client.copy_object(Bucket='cxcxc', Key='copy.txt', CopySource={'Bucket': 'cxcxc', 'Key': 'src.txt'})
+    head = client.head_object(Bucket='cxcxc', Key='copy.txt')
+    upload_id = client.create_multipart_upload(Bucket='cxcxc', Key='part.txt')['UploadId']
+    part = client.upload_part_copy(Bucket='cxcxc', Key='part.txt', UploadId=upload_id, PartNumber=1,
+                                   CopySource='cxcxc/src.txt', CopySourceRange='bytes=2-5', CopySourceIfMatch=etag)
+    client.complete_multipart_upload(Bucket='cxcxc', Key='part.txt', UploadId=upload_id, MultipartUpload={
+        'Parts': [{'PartNumber': 1, 'ETag': part['CopyPartResult']['ETag']}]})
+    with pytest.raises(ClientError) as excinfo:
+        client.copy_object(Bucket='cxcxc', Key='copy.txt', CopySource={'Bucket': 'cxcxc', 'Key': 'src.txt'},
+                           CopySourceIfMatch='"stale"')
+    assert head['ContentType'] == 'text/plain'
+    assert head['Metadata'] == {'owner': 'cxcxc'}
+    assert head['ETag'] == etag
+    assert client.get_object(Bucket='cxcxc', Key='part.txt')['Body'].read() == b'2345'
+    assert error_code(excinfo) == 'PreconditionFailed'
+
+def test_multipart_part_too_small(client):
+    """測試函式，最後一段以外的段小於 5 MB 時無法合併，取消後不可再上傳"""
+    upload_id = client.create_multipart_upload(Bucket='cxcxc', Key='small')['UploadId']
+    parts = [{'PartNumber': n, 'ETag': client.upload_part(Bucket='cxcxc', Key='small', UploadId=upload_id,
+                                                          PartNumber=n, Body=b'x')['ETag']} for n in (1, 2)]
+    with pytest.raises(client.exceptions.EntityTooSmall):
+        client.complete_multipart_upload(Bucket='cxcxc', Key='small', UploadId=upload_id,
+                                         MultipartUpload={'Parts': parts})
+    client.abort_multipart_upload(Bucket='cxcxc', Key='small', UploadId=upload_id)
+    with pytest.raises(client.exceptions.NoSuchUpload):
+        client.upload_part(Bucket='cxcxc', Key='small', UploadId=upload_id, PartNumber=3, Body=b'x')
+
+def test_body_while_overwritten(client):
+    """測試函式，讀取中的物件被覆寫時，已取得的 Body 仍讀到原本的內容"""
+    client.put_object(Bucket='cxcxc', Key='o', Body=b'old-content')
+    body = client.get_object(Bucket='cxcxc', Key='o')['Body']
+    client.put_object(Bucket='cxcxc', Key='o', Body=b'new')
+    assert b''.join(body.iter_chunks(4)) == b'old-content'
+    body.close()
+    assert client.get_object(Bucket='cxcxc', Key='o')['Body'].read() == b'new'
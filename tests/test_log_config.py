@@ -0,0 +1,97 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import io
+import json
+import logging
+
+from controllers.log_config import JSONFormatter, LogConfig, SamplingFilter, _QueueHandler
+
+
+def make_record(msg, *args, level=logging.INFO, exc_info=None, **extra):
+    record = logging.LogRecord('daos.s3_dao', level, __file__, 10, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter():
+    """測試函式，JSON 格式包含固定欄位、extra 欄位與例外的 traceback"""
+    try:
+        raise ValueError('壞掉了')
+    except ValueError:
+        record = make_record('上傳物件 %s/%s', 'bkt', 'a.txt', level=logging.ERROR,
+                             exc_info=sys.exc_info(), request_id='r-1')
+    payload = json.loads(JSONFormatter().format(record))
+    assert payload['level'] == 'ERROR'
+    assert payload['logger'] == 'daos.s3_dao'
+    assert payload['message'] == '上傳物件 bkt/a.txt'
+    assert payload['request_id'] == 'r-1'
+    assert 'ValueError: 壞掉了' in payload['exception']
+
+
+def test_module_levels(monkeypatch):
+    """測試函式，LOG_LEVELS 解析成 {logger 名稱: 等級}, 忽略格式不完整的項目"""
+    monkeypatch.setenv('LOG_LEVELS', 'daos.dynamodb_dao=debug, botocore=WARNING,,broken')
+    assert LogConfig.module_levels() == {'daos.dynamodb_dao': 'DEBUG', 'botocore': 'WARNING'}
+
+
+def test_sampling_filter():
+    """測試函式，DEBUG 依訊息樣板取樣, 每種事件的第一筆保留, INFO 以上不取樣"""
+    sampler = SamplingFilter(0.25)
+    kept = [sampler.filter(make_record('讀取 %s', i, level=logging.DEBUG)) for i in range(8)]
+    assert kept == [True, False, False, False, True, False, False, False]
+    assert sampler.filter(make_record('另一種事件 %s', 1, level=logging.DEBUG))
+    assert all(sampler.filter(make_record('讀取 %s', i, level=logging.WARNING)) for i in range(3))
+    assert not SamplingFilter(0).filter(make_record('讀取', level=logging.DEBUG))
+
+
+def test_queue_handler_prepare():
+    """測試函式，放進佇列前組合訊息與例外文字, 不保留參數與例外物件"""
+    try:
+        raise KeyError('id')
+    except KeyError:
+        record = make_record('查詢 %s 失敗', {'id': 1}, exc_info=sys.exc_info())
+    prepared = _QueueHandler(None).prepare(record)
+    assert prepared.msg == "查詢 {'id': 1} 失敗"
+    assert prepared.args is None and prepared.exc_info is None
+    assert 'KeyError' in prepared.exc_text
+    assert record.args  # 原本的 record 不受影響
+
+
+def test_configure_writes_through_queue(monkeypatch):
+    """測試函式，log 經由佇列與背景執行緒寫出, shutdown 時送出剩餘的 log"""
+    LogConfig.shutdown()
+    monkeypatch.setenv('LOG_FORMAT', 'json')
+    stream = io.StringIO()
+    root = logging.getLogger()
+    level = root.level
+    try:
+        LogConfig.configure(stream=stream)
+        assert LogConfig.configure(stream=io.StringIO()) is LogConfig._listener  # 重複呼叫不會重新設定
+        logging.getLogger('tests.log_config').warning('成功連線, 值區: %s', ['bkt'])
+    finally:
+        LogConfig.shutdown()
+        root.setLevel(level)
+    payload = json.loads(stream.getvalue().splitlines()[-1])
+    assert payload['message'] == "成功連線, 值區: ['bkt']"
+    assert payload['logger'] == 'tests.log_config'
+
+
+def test_after_fork_restarts_listener(monkeypatch):
+    """測試函式，fork 後重新建立佇列與背景執行緒, 未設定時不做任何事"""
+    LogConfig.shutdown()
+    LogConfig.after_fork()
+    assert LogConfig._listener is None
+    monkeypatch.setenv('LOG_FORMAT', 'json')
+    root = logging.getLogger()
+    level = root.level
+    try:
+        listener = LogConfig.configure(stream=io.StringIO())
+        handler = LogConfig._handler
+        LogConfig.after_fork()
+        assert LogConfig._listener is not listener and LogConfig._listener is not None
+        assert handler not in root.handlers and LogConfig._handler in root.handlers
+    finally:
+        LogConfig.shutdown()
+        listener.stop()
+        root.setLevel(level)
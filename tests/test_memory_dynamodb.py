@@ -0,0 +1,200 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import pytest
+from botocore.exceptions import ClientError
+
+from daos.memory_dynamodb import MemoryDynamoDBClient
+
+
+def create_client(range_key=False):
+    """建立只有一張 cxcxc 表格的模擬後端, range_key 時以 Sort (N) 為排序鍵"""
+    client = MemoryDynamoDBClient()
+    key_schema = [{'AttributeName': 'ID', 'KeyType': 'HASH'}]
+    definitions = [{'AttributeName': 'ID', 'AttributeType': 'S'}]
+    if range_key:
+        key_schema.append({'AttributeName': 'Sort', 'KeyType': 'RANGE'})
+        definitions.append({'AttributeName': 'Sort', 'AttributeType': 'N'})
+    client.create_table(TableName='cxcxc', KeySchema=key_schema, AttributeDefinitions=definitions,
+                        BillingMode='PAY_PER_REQUEST')
+    return client
+
+def error_code(excinfo):
+    return excinfo.value.response['Error']['Code']
+
+
+def test_put_and_get_item():
+    """測試函式，寫入後讀取，回傳值為複本"""
+    client = create_client()
+    client.put_item(TableName='cxcxc', Item={'ID': {'S': '1'}, 'Tags': {'L': [{'S': 'a'}]}})
+    item = client.get_item(TableName='cxcxc', Key={'ID': {'S': '1'}})['Item']
+    item['Tags']['L'].append({'S': 'b'})
+    assert client.get_item(TableName='cxcxc', Key={'ID': {'S': '1'}})['Item'] == \
+        {'ID': {'S': '1'}, 'Tags': {'L': [{'S': 'a'}]}}
+    assert 'Item' not in client.get_item(TableName='cxcxc', Key={'ID': {'S': '2'}})
+
+def test_delete_item_returns_copy():
+    """測試函式，刪除時 ALL_OLD 回傳的舊資料為複本，不是表格中存放的資料"""
+    client = create_client()
+    client.put_item(TableName='cxcxc', Item={'ID': {'S': '1'}, 'Tags': {'L': [{'S': 'a'}]}})
+    stored = next(iter(client._tables['cxcxc'].items.values()))
+    old = client.delete_item(TableName='cxcxc', Key={'ID': {'S': '1'}}, ReturnValues='ALL_OLD')['Attributes']
+    old['Tags']['L'].append({'S': 'b'})
+    assert old is not stored
+    assert stored == {'ID': {'S': '1'}, 'Tags': {'L': [{'S': 'a'}]}}
+
+def test_errors():
+    """測試函式，表格不存在、主鍵型別錯誤與條件不成立時拋出對應的 ClientError"""
+    client = create_client()
+    with pytest.raises(ClientError) as excinfo:
+        client.scan(TableName='missing')
+    assert error_code(excinfo) == 'ResourceNotFoundException'
+    with pytest.raises(ClientError) as excinfo:
+        client.put_item(TableName='cxcxc', Item={'ID': {'N': '1'}})
+    assert error_code(excinfo) == 'ValidationException'
+    client.put_item(TableName='cxcxc', Item={'ID': {'S': '1'}})
+    with pytest.raises(client.exceptions.ConditionalCheckFailedException):
+        client.put_item(TableName='cxcxc', Item={'ID': {'S': '1'}},
+                        ConditionExpression='attribute_not_exists(ID)')
+
+def test_update_expression():
+    """測試函式，SET、REMOVE、ADD、DELETE 與 if_not_exists、list_append"""
+    client = create_client()
+    client.put_item(TableName='cxcxc', Item={
+        'ID': {'S': '1'}, 'Count': {'N': '1'}, 'Old': {'S': 'x'},
+        'Tags': {'SS': ['a', 'b']}, 'List': {'L': [{'N': '1'}]}, 'Map': {'M': {'a': {'N': '1'}}},
+    })
+    response = client.update_item(
+        TableName='cxcxc', Key={'ID': {'S': '1'}},
+        UpdateExpression='SET #c = #c + :one, #n = if_not_exists(#n, :name), #l = list_append(#l, :list), '
+                         '#m.b = :one REMOVE Old ADD Visits :one DELETE Tags :tags',
+        ExpressionAttributeNames={'#c': 'Count', '#n': 'Name', '#l': 'List', '#m': 'Map'},
+        ExpressionAttributeValues={':one': {'N': '1'}, ':name': {'S': 'Tom'},
+                                   ':list': {'L': [{'N': '2'}]}, ':tags': {'SS': ['a']}},
+        ReturnValues='ALL_NEW',
+    )
+    assert response['Attributes'] == {
+        'ID': {'S': '1'}, 'Count': {'N': '2'}, 'Name': {'S': 'Tom'}, 'Tags': {'SS': ['b']},
+        'List': {'L': [{'N': '1'}, {'N': '2'}]}, 'Map': {'M': {'a': {'N': '1'}, 'b': {'N': '1'}}},
+        'Visits': {'N': '1'},
+    }
+
+def test_update_key_is_rejected():
+    """測試函式，不可更新主鍵"""
+    client = create_client()
+    with pytest.raises(ClientError) as excinfo:
+        client.update_item(TableName='cxcxc', Key={'ID': {'S': '1'}}, UpdateExpression='SET ID = :id',
+                           ExpressionAttributeValues={':id': {'S': '2'}})
+    assert error_code(excinfo) == 'ValidationException'
+
+def test_conditional_update():
+    """測試函式，ConditionExpression 不成立時不會更新"""
+    client = create_client()
+    client.put_item(TableName='cxcxc', Item={'ID': {'S': '1'}, 'version': {'N': '1'}})
+    update = dict(TableName='cxcxc', Key={'ID': {'S': '1'}}, UpdateExpression='SET version = :next',
+                  ConditionExpression='version = :expected',
+                  ExpressionAttributeValues={':expected': {'N': '1'}, ':next': {'N': '2'}})
+    client.update_item(**update)
+    with pytest.raises(client.exceptions.ConditionalCheckFailedException):
+        client.update_item(**update)
+    assert client.get_item(TableName='cxcxc', Key={'ID': {'S': '1'}})['Item']['version'] == {'N': '2'}
+
+def test_scan_pagination_and_segments():
+    """測試函式，以 Limit 分頁與 Segment 平行掃描都能讀到每筆資料各一次"""
+    client = create_client()
+    for i in range(50):
+        client.put_item(TableName='cxcxc', Item={'ID': {'S': str(i)}, 'Even': {'BOOL': i % 2 == 0}})
+    ids = []
+    kwargs = {'TableName': 'cxcxc', 'Limit': 7}
+    while True:
+        response = client.scan(**kwargs)
+        ids.extend(item['ID']['S'] for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    segment_ids = [item['ID']['S'] for segment in range(4)
+                   for item in client.scan(TableName='cxcxc', Segment=segment, TotalSegments=4)['Items']]
+    filtered = client.scan(TableName='cxcxc', FilterExpression='Even = :true',
+                           ExpressionAttributeValues={':true': {'BOOL': True}})
+    assert sorted(ids, key=int) == [str(i) for i in range(50)]
+    assert sorted(segment_ids, key=int) == [str(i) for i in range(50)]
+    assert filtered['Count'] == 25
+    assert filtered['ScannedCount'] == 50
+
+def test_query_range_key():
+    """測試函式，以分區鍵與排序鍵條件查詢，依排序鍵排序並可反向、分頁"""
+    client = create_client(range_key=True)
+    for sort in (3, 1, 10, 2):
+        client.put_item(TableName='cxcxc', Item={'ID': {'S': 'a'}, 'Sort': {'N': str(sort)}})
+    client.put_item(TableName='cxcxc', Item={'ID': {'S': 'b'}, 'Sort': {'N': '1'}})
+    query = dict(TableName='cxcxc', KeyConditionExpression='ID = :id AND Sort BETWEEN :low AND :high',
+                 ExpressionAttributeValues={':id': {'S': 'a'}, ':low': {'N': '2'}, ':high': {'N': '10'}})
+    forward = client.query(**query)
+    backward = client.query(**query, ScanIndexForward=False, Limit=2)
+    rest = client.query(**query, ScanIndexForward=False, ExclusiveStartKey=backward['LastEvaluatedKey'])
+    assert [item['Sort']['N'] for item in forward['Items']] == ['2', '3', '10']
+    assert [item['Sort']['N'] for item in backward['Items']] == ['10', '3']
+    assert [item['Sort']['N'] for item in rest['Items']] == ['2']
+
+def test_sparse_global_secondary_index():
+    """測試函式，GSI 只收錄含有索引主鍵的資料，更新與刪除時同步，可分頁掃描與依排序鍵查詢"""
+    client = MemoryDynamoDBClient()
+    client.create_table(
+        TableName='cxcxc', KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'},
+                              {'AttributeName': 'Owner', 'AttributeType': 'S'},
+                              {'AttributeName': 'Age', 'AttributeType': 'N'}],
+        GlobalSecondaryIndexes=[{'IndexName': 'by-owner', 'Projection': {'ProjectionType': 'KEYS_ONLY'},
+                                 'KeySchema': [{'AttributeName': 'Owner', 'KeyType': 'HASH'},
+                                               {'AttributeName': 'Age', 'KeyType': 'RANGE'}]}],
+        BillingMode='PAY_PER_REQUEST')
+    for i in range(10):
+        item = {'ID': {'S': str(i)}, 'Age': {'N': str(20 - i)}, 'Name': {'S': 'Tom'}}
+        if i < 6:
+            item['Owner'] = {'S': 'amy' if i % 2 else 'bob'}
+        client.put_item(TableName='cxcxc', Item=item)
+    client.update_item(TableName='cxcxc', Key={'ID': {'S': '0'}}, UpdateExpression='REMOVE #o',
+                       ExpressionAttributeNames={'#o': 'Owner'})
+    client.delete_item(TableName='cxcxc', Key={'ID': {'S': '1'}})
+    ids = []
+    kwargs = {'TableName': 'cxcxc', 'IndexName': 'by-owner', 'Limit': 2}
+    while True:
+        response = client.scan(**kwargs)
+        ids.extend(item['ID']['S'] for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    query = client.query(TableName='cxcxc', IndexName='by-owner', KeyConditionExpression='#o = :o',
+                         ExpressionAttributeNames={'#o': 'Owner'}, ExpressionAttributeValues={':o': {'S': 'amy'}})
+    description = client.describe_table(TableName='cxcxc')['Table']['GlobalSecondaryIndexes'][0]
+    with pytest.raises(ClientError) as excinfo:
+        client.put_item(TableName='cxcxc', Item={'ID': {'S': 'x'}, 'Owner': {'N': '1'}, 'Age': {'N': '1'}})
+    assert sorted(ids) == ['2', '3', '4', '5']
+    assert [item['ID']['S'] for item in query['Items']] == ['5', '3']
+    assert query['Items'][0] == {'ID': {'S': '5'}, 'Owner': {'S': 'amy'}, 'Age': {'N': '15'}}
+    assert description['ItemCount'] == 4
+    assert error_code(excinfo) == 'ValidationException'
+    with pytest.raises(ClientError):
+        client.scan(TableName='cxcxc', IndexName='missing')
+
+def test_batch_operations():
+    """測試函式，批次寫入與讀取，超過筆數上限或主鍵重複時整批失敗"""
+    client = create_client()
+    client.batch_write_item(RequestItems={'cxcxc': [
+        {'PutRequest': {'Item': {'ID': {'S': str(i)}, 'Name': {'S': 'Tom'}}}} for i in range(25)
+    ]})
+    response = client.batch_get_item(RequestItems={'cxcxc': {
+        'Keys': [{'ID': {'S': '3'}}, {'ID': {'S': 'missing'}}],
+        'ProjectionExpression': '#n', 'ExpressionAttributeNames': {'#n': 'Name'},
+    }})
+    with pytest.raises(ClientError) as excinfo:
+        client.batch_write_item(RequestItems={'cxcxc': [
+            {'PutRequest': {'Item': {'ID': {'S': str(i)}}}} for i in range(26)
+        ]})
+    assert error_code(excinfo) == 'ValidationException'
+    with pytest.raises(ClientError):
+        client.batch_write_item(RequestItems={'cxcxc': [
+            {'PutRequest': {'Item': {'ID': {'S': '1'}}}}, {'DeleteRequest': {'Key': {'ID': {'S': '1'}}}},
+        ]})
+    assert response['Responses']['cxcxc'] == [{'Name': {'S': 'Tom'}}]
+    assert client.scan(TableName='cxcxc', Select='COUNT')['Count'] == 25
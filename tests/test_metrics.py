@@ -0,0 +1,101 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from flask import Flask
+
+from controllers.request_metrics import RequestMetrics
+from daos.aws_client_factory import AWSClientFactory
+from daos.metrics import AWSCallMetrics, CallTrace, ContextThreadPoolExecutor, MetricsRegistry
+
+
+def create_client():
+    """建立註冊量測事件的 dynamodb 客戶端, 以 Stubber 模擬回應, 不會連線"""
+    client = boto3.client('dynamodb', region_name='us-east-1', aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    AWSClientFactory.instrument(client)
+    return client
+
+
+def test_registry_render():
+    """測試函式，計數器與直方圖以 Prometheus 的文字格式輸出"""
+    registry = MetricsRegistry()
+    counter = registry.counter('requests', '請求次數', ('route',))
+    histogram = registry.histogram('latency_seconds', '延遲', ('route',), buckets=(0.1, 1.0))
+    counter.inc('/a"b')
+    counter.inc('/a"b', amount=2)
+    histogram.observe('/a', value=0.05)
+    histogram.observe('/a', value=5)
+    text = registry.render()
+    assert '# TYPE requests counter' in text
+    assert 'requests_total{route="/a\\"b"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/a"} 2' in text
+    with pytest.raises(ValueError):
+        registry.histogram('requests', '請求次數', ('route',))
+
+def test_aws_call_metrics():
+    """測試函式，記錄每種 AWS 操作的次數、延遲與錯誤代碼，並加入目前請求的呼叫明細"""
+    client = create_client()
+    calls_before = AWSCallMetrics.calls.value('dynamodb', 'GetItem', 200)
+    throttled_before = AWSCallMetrics.errors.value('dynamodb', 'GetItem', 'ProvisionedThroughputExceededException')
+    with Stubber(client) as stubber:
+        stubber.add_response('get_item', {'Item': {'ID': {'S': '1'}}})
+        stubber.add_client_error('get_item', 'ProvisionedThroughputExceededException', http_status_code=400)
+        trace = AWSCallMetrics.start_trace()
+        client.get_item(TableName='cxcxc', Key={'ID': {'S': '1'}})
+        with pytest.raises(ClientError):
+            client.get_item(TableName='cxcxc', Key={'ID': {'S': '1'}})
+        AWSCallMetrics.stop_trace()
+    assert AWSCallMetrics.calls.value('dynamodb', 'GetItem', 200) == calls_before + 1
+    assert AWSCallMetrics.errors.value('dynamodb', 'GetItem', 'ProvisionedThroughputExceededException') == \
+        throttled_before + 1
+    assert [(service, operation) for service, operation, _ in trace] == [('dynamodb', 'GetItem')] * 2
+    assert AWSCallMetrics.bytes_sent.value('dynamodb', 'GetItem') > 0
+
+def test_trace_in_thread_pool():
+    """測試函式，ContextThreadPoolExecutor 中的 AWS 呼叫計入目前請求的呼叫明細，重疊的時間只計算一次"""
+    client = create_client()
+    with Stubber(client) as stubber:
+        for _ in range(4):
+            stubber.add_response('get_item', {'Item': {'ID': {'S': '1'}}})
+        trace = AWSCallMetrics.start_trace()
+        with ContextThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _: client.get_item(TableName='cxcxc', Key={'ID': {'S': '1'}}), range(4)))
+        AWSCallMetrics.stop_trace()
+    overlapping = CallTrace()
+    overlapping.add('s3', 'UploadPart', 0.0, 1.0)
+    overlapping.add('s3', 'UploadPart', 0.5, 2.0)
+    overlapping.add('s3', 'CompleteMultipartUpload', 3.0, 3.5)
+    assert [operation for _, operation, _ in trace] == ['GetItem'] * 4
+    assert overlapping.aws_seconds() == 2.5
+    assert len(overlapping) == 3
+
+def test_request_metrics(monkeypatch, caplog):
+    """測試函式，以路由樣板記錄請求次數，超過門檻時記錄慢請求與 AWS 呼叫明細"""
+    monkeypatch.setenv('METRICS_SLOW_REQUEST_MS', '0.0001')
+    app = Flask(__name__)
+    RequestMetrics.init_app(app)
+    client = create_client()
+
+    @app.route('/items/<id>')
+    def get_item(id):
+        with Stubber(client) as stubber:
+            stubber.add_response('get_item', {'Item': {'ID': {'S': id}}})
+            return client.get_item(TableName='cxcxc', Key={'ID': {'S': id}})['Item']['ID']['S']
+
+    before = RequestMetrics.requests.value('GET', '/items/<id>', 200)
+    with caplog.at_level('WARNING', logger='controllers.request_metrics'):
+        for id in ('1', '2'):
+            response = app.test_client().get(f'/items/{id}')
+            response.close()
+    body, content_type = RequestMetrics.render()
+    assert RequestMetrics.requests.value('GET', '/items/<id>', 200) == before + 2
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/<id>"}' in body
+    assert content_type.startswith('text/plain')
+    assert 'dynamodb.GetItem' in caplog.text
@@ -1,11 +1,11 @@
 ''' 需要在 tests/ 資料夾下執行 pytest'''
 
-import boto3
-import json
 from io import BytesIO
 import os
 import sys
 sys.path.append('/home/coder/project')
+import pytest
+from botocore.exceptions import ClientError
 from daos.s3_dao import S3Dao
 # from ..daos.s3_dao import S3Dao
 
@@ -16,57 +16,293 @@ def test_check_s3_connection():
     # 程式碼為測試函式，對 S3 相關功能進行測試並進行斷言檢查，確保程式的正確性和預期結果
     assert response == "成功連線到 S3"
 
-def test_create_bucket():
+def test_create_bucket(bucket):
     """測試函式，創建 S3 存儲桶"""
-    response = S3Dao.create_bucket("cxcxc")
-    assert response == True
+    buckets = [item["Name"] for item in S3Dao.s3.list_buckets()["Buckets"]]
+    assert bucket in buckets
 
-def test_upload_bytes():
+def test_upload_bytes(bucket, tmp_path):
     """測試函式，上傳位元組到 S3"""
-    filename = "123.txt"
-    # 檢查檔案是否存在
-    if not os.path.exists(filename):
-        # 如果檔案不存在，則建立它並寫入 "testfile"
-        with open(filename, 'w') as f:
-            f.write("testfile")
-    with open('123.txt', 'rb') as file:
-        file_content = file.read()
-        response = S3Dao.upload_bytes("cxcxc", "123.txt", 
-            BytesIO(file_content)
-        )
-    
+    filename = tmp_path / "123.txt"
+    filename.write_text("testfile")
+    with open(filename, 'rb') as file:
+        response = S3Dao.upload_bytes(bucket, "123.txt", BytesIO(file.read()))
+    body = S3Dao.s3.get_object(Bucket=bucket, Key="123.txt")["Body"].read()
+    assert response == True
+    assert body == b"testfile"
+
+def test_upload_stream(bucket):
+    """測試函式，以串流分段上傳大於一段的物件到 S3"""
+    part_size = S3Dao.MULTIPART_MIN_PART_SIZE
+    data = os.urandom(part_size * 2 + 1024)
+    response = S3Dao.upload_stream(bucket, "big.bin", BytesIO(data),
+                                   "application/octet-stream", part_size=part_size)
+    body = S3Dao.s3.get_object(Bucket=bucket, Key="big.bin")["Body"].read()
+    assert response == True
+    assert body == data
+
+def test_upload_stream_small_object(bucket):
+    """測試函式，以串流上傳不足一段的物件時直接上傳"""
+    response = S3Dao.upload_stream(bucket, "small.txt", BytesIO(b"small"))
+    body = S3Dao.s3.get_object(Bucket=bucket, Key="small.txt")["Body"].read()
     assert response == True
-    os.remove("123.txt")
+    assert body == b"small"
 
-def test_download_file():
+def test_download_file(bucket, tmp_path):
     """測試函式，從 S3 下載檔案"""
-    response = S3Dao.download_file("cxcxc", "123.txt", "abc.txt")
-    os.remove("abc.txt")
+    S3Dao.upload_bytes(bucket, "123.txt", b"testfile")
+    response = S3Dao.download_file(bucket, "123.txt", str(tmp_path / "abc.txt"))
     assert response == True
+    assert (tmp_path / "abc.txt").read_bytes() == b"testfile"
+
+def test_get_object_range(bucket):
+    """測試函式，以 Range 只讀取 S3 物件的部分內容"""
+    S3Dao.upload_bytes(bucket, "range.txt", b"0123456789")
+    response = S3Dao.get_object(bucket, "range.txt", range_header="bytes=2-5")
+    body = response["Body"].read()
+    assert body == b"2345"
+    assert response["ContentRange"] == "bytes 2-5/10"
 
-def test_update_object():
+def test_update_object(bucket):
     """測試函式，更新 S3 中的物件"""
-    filename = "xxx.txt"
-    # 檢查檔案是否存在
-    if not os.path.exists(filename):
-        # 如果檔案不存在，則建立它並寫入 "testfile"
-        with open(filename, 'w') as f:
-            f.write("updatefile")
-    with open('xxx.txt', 'rb') as file:
-        file_content = file.read()
-        response = S3Dao.update_object("cxcxc", "123.txt", 
-            BytesIO(file_content)
-        )
-    os.remove("xxx.txt")
+    missing = S3Dao.update_object(bucket, "123.txt", BytesIO(b"updatefile"))
+    S3Dao.upload_bytes(bucket, "123.txt", b"testfile")
+    response = S3Dao.update_object(bucket, "123.txt", BytesIO(b"updatefile"))
+    body = S3Dao.s3.get_object(Bucket=bucket, Key="123.txt")["Body"].read()
+    assert missing == False
     assert response == True
+    assert body == b"updatefile"
+
+@pytest.mark.parametrize("conditional_writes", [True, False])
+def test_update_object_stale_cache(bucket, monkeypatch, conditional_writes):
+    """測試函式，ETag 快取過期時 (其他行程刪除或覆寫物件)，未指定條件的更新不會建立已刪除的物件"""
+    monkeypatch.setattr(S3Dao, "CONDITIONAL_WRITES", conditional_writes)
+    S3Dao.upload_bytes(bucket, "deleted.txt", b"v1")
+    S3Dao.upload_bytes(bucket, "changed.txt", b"v1")
+    # 其他行程直接刪除與覆寫, 這個行程的快取仍有舊的 ETag
+    S3Dao.s3.delete_object(Bucket=bucket, Key="deleted.txt")
+    S3Dao.s3.put_object(Bucket=bucket, Key="changed.txt", Body=b"v2")
+    assert S3Dao.update_object(bucket, "deleted.txt", BytesIO(b"v3")) == False
+    assert S3Dao.update_object(bucket, "changed.txt", BytesIO(b"v3")) == True
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == ["changed.txt"]
+    assert S3Dao.s3.get_object(Bucket=bucket, Key="changed.txt")["Body"].read() == b"v3"
+
+@pytest.mark.parametrize("conditional_writes", [True, False])
+def test_update_object_preconditions(bucket, monkeypatch, conditional_writes):
+    """測試函式，以 If-Match / If-None-Match 更新 S3 物件，ETag 過期時拒絕覆蓋 (後端支援與不支援條件寫入)"""
+    monkeypatch.setattr(S3Dao, "CONDITIONAL_WRITES", conditional_writes)
+    S3Dao.upload_bytes(bucket, "doc.txt", b"v1")
+    etag = S3Dao.s3.head_object(Bucket=bucket, Key="doc.txt")["ETag"]
+    new_etag = S3Dao.replace_object(bucket, "doc.txt", b"v2", if_match=etag)
+    # 其他用戶端直接寫入 S3, 快取的 ETag 已過期
+    S3Dao.s3.put_object(Bucket=bucket, Key="doc.txt", Body=b"v3")
+    with pytest.raises(ClientError) as excinfo:
+        S3Dao.update_object(bucket, "doc.txt", BytesIO(b"lost"), if_match=new_etag)
+    assert S3Dao.precondition_failed(excinfo.value)
+    with pytest.raises(ClientError):
+        S3Dao.replace_object(bucket, "doc.txt", b"lost", if_none_match="*")
+    with pytest.raises(ValueError):
+        S3Dao.replace_object(bucket, "doc.txt", b"lost", if_none_match=etag)
+    assert S3Dao.replace_object(bucket, "missing.txt", b"v1", if_match=etag) is None
+    assert S3Dao.replace_object(bucket, "created.txt", b"v1", if_none_match="*") is not None
+    body = S3Dao.s3.get_object(Bucket=bucket, Key="doc.txt")["Body"].read()
+    assert new_etag != etag
+    assert body == b"v3"
 
-def test_get_all_object_names_by_bucket_name_and_directory():
+def test_conditional_write_parameters(monkeypatch):
+    """測試函式，requirements.txt 固定的 botocore 版本接受 put_object 與 complete_multipart_upload 的條件寫入參數"""
+    import boto3
+    from botocore.stub import ANY, Stubber
+    client = boto3.client("s3", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+    monkeypatch.setattr(S3Dao, "s3", client)
+    monkeypatch.setattr(S3Dao, "CONDITIONAL_WRITES", True)
+    with Stubber(client) as stubber:
+        stubber.add_response("put_object", {"ETag": '"2"'},
+                             {"Bucket": "cxcxc", "Key": "a.txt", "Body": ANY, "IfMatch": '"1"'})
+        stubber.add_response("create_multipart_upload", {"UploadId": "u"}, {"Bucket": "cxcxc", "Key": "b.bin"})
+        stubber.add_response("upload_part", {"ETag": '"p"'}, {"Bucket": "cxcxc", "Key": "b.bin", "UploadId": "u",
+                                                             "PartNumber": 1, "Body": ANY})
+        stubber.add_response("complete_multipart_upload", {"ETag": '"3-1"'}, {
+            "Bucket": "cxcxc", "Key": "b.bin", "UploadId": "u", "IfNoneMatch": "*",
+            "MultipartUpload": {"Parts": [{"PartNumber": 1, "ETag": '"p"'}]}})
+        assert S3Dao.replace_object("cxcxc", "a.txt", b"v2", if_match='"1"') == '"2"'
+        large = BytesIO(b"x" * S3Dao.MULTIPART_PART_SIZE)
+        assert S3Dao.replace_object("cxcxc", "b.bin", large, if_none_match="*") == '"3-1"'
+        stubber.assert_no_pending_responses()
+
+def test_get_all_object_names_by_bucket_name_and_directory(bucket):
     """測試函式，獲取指定存儲桶和目錄下的所有物件名稱"""
-    response = S3Dao.get_all_object_names_by_bucket_name_and_directory("cxcxc", "")
-    assert "123.txt" in response
+    for key in ("123.txt", "dir/456.txt"):
+        S3Dao.upload_bytes(bucket, key, b"data")
+    response = S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "")
+    assert response == ["123.txt", "dir/456.txt"]
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "dir/") == ["dir/456.txt"]
+
 
+def test_list_objects_page(bucket):
+    """測試函式，以分頁與 delimiter 列出 S3 物件"""
+    for key in ("list/a.txt", "list/b.txt", "list/c.txt", "list/sub/d.txt"):
+        S3Dao.upload_bytes(bucket, key, b"data")
+    first_page = S3Dao.list_objects_page(bucket, "list/", "/", max_keys=2)
+    second_page = S3Dao.list_objects_page(bucket, "list/", "/", max_keys=2,
+                                          page_token=first_page["next_token"])
+    all_keys = [obj["Key"] for obj in S3Dao.iter_objects(bucket, "list/")]
+    page_keys = [obj["Key"] for obj in first_page["objects"] + second_page["objects"]]
+    assert page_keys == ["list/a.txt", "list/b.txt", "list/c.txt"]
+    assert second_page["prefixes"] == ["list/sub/"]
+    assert second_page["next_token"] is None
+    assert first_page["objects"][0]["Size"] == 4
+    assert len(all_keys) == 4
 
-def test_delete_object():
+def test_delete_object(bucket):
     """測試函式，刪除 S3 中的物件"""
-    response = S3Dao.delete_object("cxcxc", "123.txt")
-    assert response == '刪除成功'
\ No newline at end of file
+    S3Dao.upload_bytes(bucket, "123.txt", b"testfile")
+    response = S3Dao.delete_object(bucket, "123.txt")
+    assert response == '刪除成功'
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == []
+
+def test_delete_objects(bucket, monkeypatch):
+    """測試函式，以物件清單或路徑批次刪除 S3 物件，dry_run 只計算筆數，失敗的批次列出每個物件"""
+    monkeypatch.setattr(S3Dao, "DELETE_BATCH_SIZE", 2)
+    for index in range(5):
+        S3Dao.upload_bytes(bucket, f"logs/{index}.txt", b"data")
+    S3Dao.upload_bytes(bucket, "keep.txt", b"data")
+    assert S3Dao.delete_objects(bucket, prefix="logs/", dry_run=True) == {"count": 5}
+    response = S3Dao.delete_objects(bucket, prefix="logs/", max_concurrency=2)
+    assert response == {"count": 5, "deleted": 5, "errors": []}
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == ["keep.txt"]
+    assert S3Dao.delete_objects(bucket, keys=["keep.txt", "keep.txt"])["deleted"] == 1
+    failed = S3Dao.delete_objects(f"{bucket}-missing", keys=["a", "b", "c"])
+    assert failed["deleted"] == 0
+    assert [error["key"] for error in failed["errors"]] == ["a", "b", "c"]
+    with pytest.raises(ValueError):
+        S3Dao.delete_objects(bucket, prefix="")
+    with pytest.raises(ValueError):
+        S3Dao.delete_objects(bucket, keys=["a"], prefix="logs/")
+
+def test_copy_and_move_objects(bucket):
+    """測試函式，在 S3 內複製單一物件與搬移整個路徑，目的地在來源之下時拋出 ValueError"""
+    S3Dao.s3.put_object(Bucket=bucket, Key="data/a.txt", Body=b"a", ContentType="text/plain",
+                        Metadata={"owner": "cxcxc"})
+    S3Dao.upload_bytes(bucket, "data/sub/b.txt", b"b")
+    copied = S3Dao.copy_objects(bucket, object_name="data/a.txt", dest_object_name="backup/a.txt")
+    moved = S3Dao.copy_objects(bucket, prefix="data/", dest_prefix="archive/", delete_source=True)
+    missing = S3Dao.copy_objects(bucket, object_name="missing.txt", dest_object_name="x.txt")
+    head = S3Dao.s3.head_object(Bucket=bucket, Key="archive/a.txt")
+    assert copied == {"count": 1, "copied": 1, "errors": []}
+    assert moved == {"count": 2, "copied": 2, "errors": [], "deleted": 2}
+    assert missing["errors"][0]["key"] == "missing.txt"
+    assert S3Dao.get_all_object_names_by_bucket_name_and_directory(bucket, "") == [
+        "archive/a.txt", "archive/sub/b.txt", "backup/a.txt"]
+    assert head["ContentType"] == "text/plain"
+    assert head["Metadata"] == {"owner": "cxcxc"}
+    with pytest.raises(ValueError):
+        S3Dao.copy_objects(bucket, prefix="archive/", dest_prefix="archive/old/")
+
+def test_move_skips_changed_sources(bucket, monkeypatch):
+    """測試函式，複製後才被覆寫的來源不刪除並列入 errors，複製時來源已改變則以 412 失敗"""
+    S3Dao.upload_bytes(bucket, "data/a.txt", b"a")
+    S3Dao.upload_bytes(bucket, "data/b.txt", b"b")
+    copy_object = S3Dao.copy_object
+    bodies = iter([b"new", b"newer"])
+
+    def copy_then_overwrite(bucket_name, object_name, *args, **kwargs):
+        etag = copy_object(bucket_name, object_name, *args, **kwargs)
+        if object_name == "data/b.txt":
+            S3Dao.s3.put_object(Bucket=bucket_name, Key=object_name, Body=next(bodies))
+        return etag
+
+    monkeypatch.setattr(S3Dao, "copy_object", copy_then_overwrite)
+    moved = S3Dao.copy_objects(bucket, prefix="data/", dest_prefix="archive/", delete_source=True)
+    single = S3Dao.copy_objects(bucket, object_name="data/b.txt", dest_object_name="backup/b.txt",
+                                delete_source=True)
+    assert moved["deleted"] == 1
+    assert [(error["key"], error["code"]) for error in moved["errors"]] == [("data/b.txt", "SourceChanged")]
+    assert single["errors"][0]["code"] == "SourceChanged"
+    assert S3Dao.s3.get_object(Bucket=bucket, Key="data/b.txt")["Body"].read() == b"newer"
+    assert S3Dao.s3.get_object(Bucket=bucket, Key="archive/b.txt")["Body"].read() == b"b"
+    assert S3Dao.s3.get_object(Bucket=bucket, Key="backup/b.txt")["Body"].read() == b"new"
+    with pytest.raises(ClientError) as error:
+        copy_object(bucket, "data/b.txt", bucket, "stale.txt", 1, '"0123456789abcdef0123456789abcdef"')
+    assert error.value.response["Error"]["Code"] in ("PreconditionFailed", "412")
+
+def test_copy_object_multipart(bucket, monkeypatch):
+    """測試函式，超過 copy_object 上限的物件以 upload_part_copy 分段複製"""
+    monkeypatch.setattr(S3Dao, "COPY_MAX_SIZE", 1024)
+    monkeypatch.setattr(S3Dao, "COPY_PART_SIZE", S3Dao.MULTIPART_MIN_PART_SIZE)
+    data = os.urandom(S3Dao.MULTIPART_MIN_PART_SIZE + 10)
+    S3Dao.s3.put_object(Bucket=bucket, Key="big.bin", Body=data, ContentType="application/zip")
+    etag = S3Dao.copy_object(bucket, "big.bin", bucket, "big-copy.bin")
+    response = S3Dao.s3.get_object(Bucket=bucket, Key="big-copy.bin")
+    assert etag.endswith('-2"')
+    assert response["ContentType"] == "application/zip"
+    assert response["Body"].read() == data
+
+
+@pytest.fixture
+def presign_env(monkeypatch):
+    """連接 LocalStack 的設定, 簽署只在本機計算, 不需要啟動 LocalStack"""
+    from daos.aws_client_factory import AWSClientFactory
+    monkeypatch.setenv("ENV", "development")
+    monkeypatch.setenv("S3_BACKEND", "aws")
+    monkeypatch.setenv("S3_PRESIGN_ENDPOINT_URL", "http://localhost:4566")
+    AWSClientFactory.reset()
+    yield
+    AWSClientFactory.reset()
+
+
+def test_presign_urls(presign_env):
+    """測試函式，產生下載、上傳、表單與分段上傳的預先簽署網址, Content-Type 與 Content-Length 列入簽章"""
+    download = S3Dao.presign_get("bkt", "docs/報告.pdf", expires=60, file_name="報告.pdf")
+    assert download["url"].startswith("http://localhost:4566/bkt/docs/")
+    assert "X-Amz-Expires=60" in download["url"] and "response-content-disposition=" in download["url"]
+
+    upload = S3Dao.presign_put("bkt", "a.txt", content_type="text/plain", content_length=10)
+    assert "X-Amz-SignedHeaders=content-length%3Bcontent-type%3Bhost" in upload["url"]
+    assert upload["headers"] == {"Content-Type": "text/plain", "Content-Length": "10"}
+    assert upload["expires_in"] == S3Dao.PRESIGN_EXPIRES
+
+    post = S3Dao.presign_post("bkt", "a.png", content_type="image/png", max_size=1024)
+    assert post["url"] == "http://localhost:4566/bkt"
+    assert post["fields"]["key"] == "a.png" and post["fields"]["Content-Type"] == "image/png"
+    assert "policy" in post["fields"] and "x-amz-signature" in post["fields"]
+
+    parts = S3Dao.presign_parts("bkt", "big.bin", "upload-1", [1, 2])
+    assert [part["part_number"] for part in parts] == [1, 2]
+    assert "uploadId=upload-1" in parts[1]["url"] and "partNumber=2" in parts[1]["url"]
+
+
+def test_presign_errors(presign_env):
+    """測試函式，有效秒數、大小與段號超出範圍時拋出 ValueError"""
+    with pytest.raises(ValueError):
+        S3Dao.presign_get("bkt", "a.txt", expires=S3Dao.PRESIGN_MAX_EXPIRES + 1)
+    with pytest.raises(ValueError):
+        S3Dao.presign_put("bkt", "a.txt", content_length=S3Dao.PRESIGN_MAX_SIZE + 1)
+    with pytest.raises(ValueError):
+        S3Dao.presign_post("bkt", "a.txt", max_size=10, min_size=20)
+    with pytest.raises(ValueError):
+        S3Dao.presign_parts("bkt", "a.txt", "upload-1", [0])
+    with pytest.raises(ValueError):
+        S3Dao.create_presigned_multipart_upload("bkt", "a.txt", 0)
+
+
+def test_multipart_upload_local_backend(bucket):
+    """測試函式，本機後端不支援預先簽署網址, 但可以合併與取消分段上傳"""
+    with pytest.raises(NotImplementedError):
+        S3Dao.presign_get(bucket, "a.txt")
+
+    upload_id = S3Dao.s3.create_multipart_upload(Bucket=bucket, Key="big.bin")["UploadId"]
+    first = S3Dao.s3.upload_part(Bucket=bucket, Key="big.bin", UploadId=upload_id, PartNumber=1,
+                                 Body=b"a" * S3Dao.MULTIPART_MIN_PART_SIZE)
+    second = S3Dao.s3.upload_part(Bucket=bucket, Key="big.bin", UploadId=upload_id, PartNumber=2, Body=b"b")
+    with pytest.raises(ValueError):
+        S3Dao.complete_multipart_upload(bucket, "big.bin", upload_id, [{"part_number": 1}])
+    etag = S3Dao.complete_multipart_upload(bucket, "big.bin", upload_id, [
+        {"part_number": 2, "etag": second["ETag"]}, {"part_number": 1, "etag": first["ETag"]}])
+    assert etag.endswith('-2"')
+    assert S3Dao.get_object(bucket, "big.bin", range_header="bytes=-1")["Body"].read() == b"b"
+
+    upload_id = S3Dao.s3.create_multipart_upload(Bucket=bucket, Key="cancel.bin")["UploadId"]
+    S3Dao.abort_multipart_upload(bucket, "cancel.bin", upload_id)
+    with pytest.raises(ClientError):
+        S3Dao.abort_multipart_upload(bucket, "cancel.bin", upload_id)
@@ -0,0 +1,116 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from controllers.static_assets import StaticAssets
+
+SCRIPT = b'function main() { return "hello flutter"; }\n' * 200
+
+
+@pytest.fixture
+def client(tmp_path):
+    web = tmp_path / 'web'
+    (web / 'canvaskit').mkdir(parents=True)
+    (web / 'index.html').write_bytes(b'<html><body>' + b'<p>index</p>' * 200 + b'</body></html>')
+    (web / 'main.dart.js').write_bytes(SCRIPT)
+    (web / 'canvaskit' / 'chunk.0123abcd89.js').write_bytes(SCRIPT)
+    (web / 'favicon.png').write_bytes(b'\x89PNG' + os.urandom(2048))
+    app = Flask(__name__, static_url_path='/', static_folder=str(web))
+    StaticAssets.init_app(app)
+    StaticAssets.configure(str(web), str(tmp_path / 'cache'))
+    app.add_url_rule('/', 'index', lambda: StaticAssets.serve('index.html'))
+    yield app.test_client()
+    StaticAssets.clear()
+
+
+def test_precompress_and_negotiate(client):
+    """測試函式，產生 gzip 版本後依 Accept-Encoding 回傳壓縮內容, 不接受 gzip 時回傳原始檔案"""
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers  # 尚未壓縮
+    response.close()
+
+    created = StaticAssets.precompress()
+    assert created == len(StaticAssets.compressors()) * 3  # png 不壓縮
+    assert StaticAssets.precompress() == 0  # 已存在的版本不重新壓縮
+
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Type'].startswith('text/javascript')
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['Content-Disposition'] == 'inline; filename=main.dart.js'
+    assert gzip.decompress(response.get_data()) == SCRIPT
+    response.close()
+
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == SCRIPT
+    response.close()
+
+    response = client.get('/favicon.png', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers and 'Vary' not in response.headers
+    response.close()
+
+
+def test_etag_and_cache_control(client):
+    """測試函式，strong ETag 支援 If-None-Match, 檔名含雜湊的檔案為 immutable, index.html 每次重新驗證"""
+    StaticAssets.precompress()
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/') and etag.endswith('-gzip"')
+    assert response.headers['Cache-Control'] == 'no-cache'
+    response.close()
+
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304 and response.get_data() == b''
+    response.close()
+    # 原始檔案與壓縮版本的 ETag 不同
+    response = client.get('/main.dart.js', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    response.close()
+
+    response = client.get('/canvaskit/chunk.0123abcd89.js')
+    assert response.headers['Cache-Control'] == StaticAssets.IMMUTABLE
+    response.close()
+    response = client.get('/main.dart.js?v=4086090737')
+    assert response.headers['Cache-Control'] == StaticAssets.IMMUTABLE
+    response.close()
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert b'index' in gzip.decompress(response.get_data())
+    response.close()
+
+
+def test_changed_file_and_invalid_path(client, tmp_path):
+    """測試函式，檔案內容改變後 ETag 跟著改變且不使用舊的壓縮版本, 根目錄以外的路徑回傳 404"""
+    StaticAssets.precompress()
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    response.close()
+
+    script = tmp_path / 'web' / 'main.dart.js'
+    script.write_bytes(SCRIPT + b'// v2\n')
+    os.utime(script, ns=(0, 10 ** 9))
+    response = client.get('/main.dart.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data().endswith(b'// v2\n')
+    response.close()
+
+    assert client.get('/../secret.txt').status_code == 404
+    assert client.get('/missing.js').status_code == 404
+    assert client.get('/canvaskit').status_code == 404
+
+
+def test_index_and_wait(client):
+    """測試函式，index 讀取所有檔案的資訊, 沒有背景壓縮時 wait 直接回傳"""
+    assert StaticAssets.wait(timeout=1)
+    assert StaticAssets.index() == 4
+    asset = StaticAssets.asset('canvaskit/chunk.0123abcd89.js')
+    assert asset.variants == {} and asset.mimetype == 'text/javascript'
+    StaticAssets.precompress()
+    assert 'gzip' in StaticAssets.asset('canvaskit/chunk.0123abcd89.js').variants
@@ -0,0 +1,48 @@
+''' 需要在 tests/ 資料夾下執行 pytest'''
+import sys
+sys.path.append('/home/coder/project')
+import pytest
+
+from daos.table_registry import TableRegistry, TableSchema
+
+DESCRIPTION = {
+    'TableName': 'orders',
+    'KeySchema': [{'AttributeName': 'UserID', 'KeyType': 'HASH'}, {'AttributeName': 'OrderNo', 'KeyType': 'RANGE'}],
+    'AttributeDefinitions': [{'AttributeName': 'UserID', 'AttributeType': 'S'},
+                             {'AttributeName': 'OrderNo', 'AttributeType': 'N'}],
+    'GlobalSecondaryIndexes': [{'IndexName': 'by-status', 'IndexStatus': 'CREATING'}],
+    'LocalSecondaryIndexes': [{'IndexName': 'by-total'}],
+    'TableStatus': 'ACTIVE',
+}
+
+
+def test_schema_from_description():
+    """測試函式，由 describe_table 的結果取得主鍵名稱、型別與索引狀態，並轉換成 Key"""
+    schema = TableSchema.from_description(DESCRIPTION)
+    assert schema.key_attributes == ('UserID', 'OrderNo')
+    assert schema.key('u1', '3') == {'UserID': {'S': 'u1'}, 'OrderNo': {'N': '3'}}
+    assert schema.key_of({'UserID': 7, 'OrderNo': 3, 'Name': 'Tom'}) == {'UserID': {'S': '7'}, 'OrderNo': {'N': '3'}}
+    assert schema.identity({'UserID': {'S': 'u1'}, 'OrderNo': {'N': '3'}, 'Name': {'S': 'Tom'}}) == \
+        (('S', 'u1'), ('N', '3'))
+    assert schema.has_index('by-total') and not schema.has_index('by-status')
+    assert not TableRegistry.is_active(DESCRIPTION)
+    with pytest.raises(ValueError):
+        schema.key('u1')
+    with pytest.raises(ValueError):
+        schema.key_of({'UserID': 'u1', 'OrderNo': 'abc'})
+    with pytest.raises(ValueError):
+        schema.key_of({'OrderNo': 1})
+
+
+def test_registry_ttl():
+    """測試函式，快取的表格資訊在存活時間後失效，可個別清除"""
+    now = [0.0]
+    registry = TableRegistry(ttl=10, clock=lambda: now[0])
+    registry.put(DESCRIPTION)
+    assert registry.get('orders').hash_key == 'UserID'
+    now[0] = 11
+    assert registry.get('orders') is None
+    registry.put(DESCRIPTION)
+    registry.invalidate('orders')
+    assert registry.get('orders') is None
+    assert registry.get('missing') is None